@@ -1,20 +1,20 @@
 """
 10 fraud detection restriction rules for Payon transactions.
 
-Each rule function receives a context dict and a DB session, and returns
-a RuleResult with (triggered, score_delta, reason_code, detail).
+Every history aggregate the rules need is fetched in a single CTE query
+(fetch_rule_context). Each rule function then receives the transaction
+context dict and that RuleContext, and returns a RuleResult with
+(triggered, score_delta, reason_code, detail) without touching the DB.
 """
 import logging
-import statistics
-from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
-from decimal import Decimal
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import func, and_, or_
-from sqlmodel import Session, select
+from sqlalchemy import distinct, false, func, literal, select, true
+from sqlmodel import Session
 
-from ..models import Transaction, User, Wallet, HumanReview
+from ..models import Transaction, User, HumanReview
 
 logger = logging.getLogger("restriction-rules")
 
@@ -27,6 +27,36 @@ class RuleResult:
     detail: str = ""
 
 
+@dataclass
+class RuleContext:
+    """
+    History aggregates used by the rules, computed once per transaction.
+
+    Windows are relative to `now`. Unless stated otherwise, aggregates cover
+    the initiator's transactions, excluding the transaction being evaluated.
+    """
+    now: datetime = field(default_factory=datetime.utcnow)
+    count_10m: int = 0
+    count_1h: int = 0
+    count_24h: int = 0
+    count_30d_before_1h: int = 0          # between now-30d and now-1h
+    amount_count_30d: int = 0             # non-rejected, last 30 days
+    amount_avg_30d: Optional[float] = None
+    amount_stddev_30d: Optional[float] = None
+    small_count_30m: int = 0              # amount <= SMALL_AMOUNT, last 30 min
+    small_sum_30m: float = 0.0
+    countries: List[str] = field(default_factory=list)  # distinct, all time
+    beneficiary_count: int = 0            # non-rejected, to destination_wallet_id
+    reverse_count_30m: int = 0            # destination → source wallet, non-rejected, last 30 min
+    rejected_count_90d: int = 0
+    fraud_review_count: int = 0           # human_reviews labelled 'fraud'
+    account_created_at: Optional[datetime] = None
+
+
+# Structuring: upper bound of a "small" payment (PYC)
+SMALL_AMOUNT = 15
+
+
 # ---------------------------------------------------------------------------
 # Helper: parse datetime from ISO string or return utcnow
 # ---------------------------------------------------------------------------
@@ -42,43 +72,183 @@ def _parse_dt(value: Any) -> datetime:
     return datetime.utcnow()
 
 
+# ---------------------------------------------------------------------------
+# Rule context prefetch: one round trip for all ten rules
+# ---------------------------------------------------------------------------
+
+def build_rule_context_query(ctx: Dict[str, Any], now: datetime, include_reviews: bool = True):
+    """
+    Build the single SELECT (CTEs + FILTER aggregates) behind RuleContext.
+
+    Every CTE returns exactly one row: the final SELECT cross-joins them
+    (the account CTE is outer-joined, the user may not exist).
+    Without include_reviews, human_reviews is not read and
+    fraud_review_count is 0.
+    """
+    user_id = ctx.get("initiator_user_id")
+    source_wallet = ctx.get("source_wallet_id")
+    dest_wallet = ctx.get("destination_wallet_id")
+    tx_id = ctx.get("transaction_id", "")
+
+    history = (
+        select(
+            Transaction.amount,
+            Transaction.created_at,
+            Transaction.kyc_status,
+            Transaction.destination_wallet_id,
+            Transaction.country,
+        )
+        .where(
+            Transaction.initiator_user_id == user_id if user_id else false(),
+            Transaction.transaction_id != tx_id,
+        )
+        .cte("user_history")
+    )
+    h = history.c
+    not_rejected = h.kyc_status != "REJECTED"
+    last_30d = h.created_at >= now - timedelta(days=30)
+    small_30m = (h.created_at >= now - timedelta(minutes=30)) & (h.amount <= SMALL_AMOUNT)
+
+    user_stats = select(
+        func.count().filter(h.created_at >= now - timedelta(minutes=10)).label("count_10m"),
+        func.count().filter(h.created_at >= now - timedelta(hours=1)).label("count_1h"),
+        func.count().filter(h.created_at >= now - timedelta(hours=24)).label("count_24h"),
+        func.count().filter(last_30d & (h.created_at < now - timedelta(hours=1))).label("count_30d_before_1h"),
+        func.count().filter(last_30d & not_rejected).label("amount_count_30d"),
+        func.avg(h.amount).filter(last_30d & not_rejected).label("amount_avg_30d"),
+        func.stddev_samp(h.amount).filter(last_30d & not_rejected).label("amount_stddev_30d"),
+        func.count().filter(small_30m).label("small_count_30m"),
+        func.coalesce(func.sum(h.amount).filter(small_30m), 0).label("small_sum_30m"),
+        func.array_agg(distinct(h.country)).filter(h.country.isnot(None)).label("countries"),
+        func.count()
+        .filter((h.destination_wallet_id == dest_wallet if dest_wallet else false()) & not_rejected)
+        .label("beneficiary_count"),
+        func.count()
+        .filter((h.kyc_status == "REJECTED") & (h.created_at >= now - timedelta(days=90)))
+        .label("rejected_count_90d"),
+    ).cte("user_stats")
+
+    reverse_flow = select(func.count().label("reverse_count_30m")).where(
+        Transaction.source_wallet_id == dest_wallet if dest_wallet and source_wallet else false(),
+        Transaction.destination_wallet_id == source_wallet,
+        Transaction.created_at >= now - timedelta(minutes=30),
+        Transaction.kyc_status != "REJECTED",
+        Transaction.transaction_id != tx_id,
+    ).cte("reverse_flow")
+
+    account = (
+        select(User.created_at.label("account_created_at"))
+        .where(User.user_id == user_id if user_id else false())
+        .cte("account")
+    )
+
+    if not include_reviews:
+        return select(
+            user_stats,
+            reverse_flow.c.reverse_count_30m,
+            literal(0).label("fraud_review_count"),
+            account.c.account_created_at,
+        ).select_from(user_stats.join(reverse_flow, true()).outerjoin(account, true()))
+
+    fraud_reviews = (
+        select(func.count(HumanReview.review_id).label("fraud_review_count"))
+        .select_from(HumanReview)
+        .join(Transaction, HumanReview.transaction_id == Transaction.transaction_id)
+        .where(
+            Transaction.initiator_user_id == user_id if user_id else false(),
+            Transaction.transaction_id != tx_id,
+            HumanReview.label == "fraud",
+        )
+        .cte("fraud_reviews")
+    )
+
+    return select(
+        user_stats,
+        reverse_flow.c.reverse_count_30m,
+        fraud_reviews.c.fraud_review_count,
+        account.c.account_created_at,
+    ).select_from(
+        user_stats.join(reverse_flow, true())
+        .join(fraud_reviews, true())
+        .outerjoin(account, true())
+    )
+
+
+def _to_float(value: Any) -> Optional[float]:
+    # avg / stddev_samp / sum over NUMERIC come back as Decimal (None without rows)
+    return None if value is None else float(value)
+
+
+def fetch_rule_context(
+    ctx: Dict[str, Any],
+    db: Session,
+    now: Optional[datetime] = None,
+    include_reviews: bool = True,
+) -> RuleContext:
+    """
+    Compute every aggregate the restriction rules need in one DB round trip.
+
+    Parameters
+    ----------
+    ctx : dict
+        Transaction data (initiator_user_id, source_wallet_id,
+        destination_wallet_id, transaction_id).
+    db : Session
+        Active database session.
+    now : datetime, optional
+        Reference time of the windows (default: utcnow).
+    include_reviews : bool
+        Count past fraud reviews (False: skip human_reviews, count is 0).
+    """
+    now = now or datetime.utcnow()
+    if not ctx.get("initiator_user_id") and not ctx.get("destination_wallet_id"):
+        # Nothing to aggregate: every history rule needs a user or a counterparty
+        return RuleContext(now=now)
+
+    row = db.execute(build_rule_context_query(ctx, now, include_reviews)).mappings().one()
+    return RuleContext(
+        now=now,
+        count_10m=int(row["count_10m"] or 0),
+        count_1h=int(row["count_1h"] or 0),
+        count_24h=int(row["count_24h"] or 0),
+        count_30d_before_1h=int(row["count_30d_before_1h"] or 0),
+        amount_count_30d=int(row["amount_count_30d"] or 0),
+        amount_avg_30d=_to_float(row["amount_avg_30d"]),
+        amount_stddev_30d=_to_float(row["amount_stddev_30d"]),
+        small_count_30m=int(row["small_count_30m"] or 0),
+        small_sum_30m=_to_float(row["small_sum_30m"]) or 0.0,
+        countries=[c for c in (row["countries"] or []) if c],
+        beneficiary_count=int(row["beneficiary_count"] or 0),
+        reverse_count_30m=int(row["reverse_count_30m"] or 0),
+        rejected_count_90d=int(row["rejected_count_90d"] or 0),
+        fraud_review_count=int(row["fraud_review_count"] or 0),
+        account_created_at=row["account_created_at"],
+    )
+
+
 # ===========================
 # RULE 1 — Unusual Amount
 # ===========================
 
 def rule_amount_anomaly(
     ctx: Dict[str, Any],
-    db: Session,
+    rule_ctx: RuleContext,
 ) -> RuleResult:
     """
     Flags transactions whose amount is significantly higher than the user's
-    historical average (> mean + 2*stddev, or > 95th percentile).
+    30-day average (> mean + 2*stddev, and > 2x the mean).
     """
     user_id = ctx.get("initiator_user_id")
     amount = float(ctx.get("amount", 0))
     if not user_id:
         return RuleResult(False, 0.0, "RULE_AMOUNT_ANOMALY")
 
-    tx_id = ctx.get("transaction_id", "")
-    cutoff = datetime.utcnow() - timedelta(days=30)
-    stmt = (
-        select(Transaction.amount)
-        .where(
-            Transaction.initiator_user_id == user_id,
-            Transaction.created_at >= cutoff,
-            Transaction.kyc_status != "REJECTED",
-            Transaction.transaction_id != tx_id,
-        )
-    )
-    rows = db.execute(stmt).scalars().all()
-    amounts = [float(a) for a in rows]
-
-    if len(amounts) < 3:
+    if rule_ctx.amount_count_30d < 3 or rule_ctx.amount_avg_30d is None:
         # Not enough history to judge
         return RuleResult(False, 0.0, "RULE_AMOUNT_ANOMALY")
 
-    mean = statistics.mean(amounts)
-    stdev = statistics.stdev(amounts) if len(amounts) > 1 else 0.0
+    mean = rule_ctx.amount_avg_30d
+    stdev = rule_ctx.amount_stddev_30d or 0.0
     threshold = mean + 2 * stdev if stdev > 0 else mean * 3
 
     if amount > threshold and amount > mean * 2:
@@ -95,65 +265,32 @@ def rule_amount_anomaly(
 
 def rule_freq_spike(
     ctx: Dict[str, Any],
-    db: Session,
+    rule_ctx: RuleContext,
 ) -> RuleResult:
     """
     Flags users with an abnormal number of transactions in a short window.
-    Thresholds: >10 tx in 1 hour  OR  >5 tx in 10 minutes.
+    Thresholds: >=5 tx in 10 minutes  OR  >=10 tx in 1 hour  OR  >=25 tx in 24 hours.
     """
     user_id = ctx.get("initiator_user_id")
     if not user_id:
         return RuleResult(False, 0.0, "RULE_FREQ_SPIKE")
 
-    tx_id = ctx.get("transaction_id", "")
-    now = datetime.utcnow()
-
-    # Count in last 10 minutes
-    ten_min_ago = now - timedelta(minutes=10)
-    count_10m = db.execute(
-        select(func.count(Transaction.transaction_id)).where(
-            Transaction.initiator_user_id == user_id,
-            Transaction.created_at >= ten_min_ago,
-            Transaction.transaction_id != tx_id,
-        )
-    ).scalar() or 0
-
-    if count_10m >= 5:
+    if rule_ctx.count_10m >= 5:
         return RuleResult(
             True, 0.30, "RULE_FREQ_SPIKE",
-            f"{count_10m} transactions in last 10 min",
+            f"{rule_ctx.count_10m} transactions in last 10 min",
         )
 
-    # Count in last 1 hour
-    one_hour_ago = now - timedelta(hours=1)
-    count_1h = db.execute(
-        select(func.count(Transaction.transaction_id)).where(
-            Transaction.initiator_user_id == user_id,
-            Transaction.created_at >= one_hour_ago,
-            Transaction.transaction_id != tx_id,
-        )
-    ).scalar() or 0
-
-    if count_1h >= 10:
+    if rule_ctx.count_1h >= 10:
         return RuleResult(
             True, 0.30, "RULE_FREQ_SPIKE",
-            f"{count_1h} transactions in last 1 hour",
+            f"{rule_ctx.count_1h} transactions in last 1 hour",
         )
 
-    # Count in last 24 hours
-    one_day_ago = now - timedelta(hours=24)
-    count_24h = db.execute(
-        select(func.count(Transaction.transaction_id)).where(
-            Transaction.initiator_user_id == user_id,
-            Transaction.created_at >= one_day_ago,
-            Transaction.transaction_id != tx_id,
-        )
-    ).scalar() or 0
-
-    if count_24h >= 25:
+    if rule_ctx.count_24h >= 25:
         return RuleResult(
             True, 0.30, "RULE_FREQ_SPIKE",
-            f"{count_24h} transactions in last 24 hours",
+            f"{rule_ctx.count_24h} transactions in last 24 hours",
         )
 
     return RuleResult(False, 0.0, "RULE_FREQ_SPIKE")
@@ -165,7 +302,7 @@ def rule_freq_spike(
 
 def rule_new_account_activity(
     ctx: Dict[str, Any],
-    db: Session,
+    rule_ctx: RuleContext,
 ) -> RuleResult:
     """
     Flags transactions from accounts created less than 10 minutes ago
@@ -173,14 +310,10 @@ def rule_new_account_activity(
     """
     user_id = ctx.get("initiator_user_id")
     amount = float(ctx.get("amount", 0))
-    if not user_id:
+    if not user_id or rule_ctx.account_created_at is None:
         return RuleResult(False, 0.0, "RULE_NEW_ACCOUNT_ACTIVITY")
 
-    user = db.get(User, user_id)
-    if not user:
-        return RuleResult(False, 0.0, "RULE_NEW_ACCOUNT_ACTIVITY")
-
-    account_age = datetime.utcnow() - user.created_at
+    account_age = rule_ctx.now - rule_ctx.account_created_at
     threshold_minutes = 10
     threshold_amount = 50.0
 
@@ -198,7 +331,7 @@ def rule_new_account_activity(
 
 def rule_new_beneficiary(
     ctx: Dict[str, Any],
-    db: Session,
+    rule_ctx: RuleContext,
 ) -> RuleResult:
     """
     Flags first-ever payment to a destination wallet.
@@ -210,17 +343,7 @@ def rule_new_beneficiary(
     if not user_id or not dest_wallet:
         return RuleResult(False, 0.0, "RULE_NEW_BENEFICIARY")
 
-    tx_id = ctx.get("transaction_id", "")
-    past_count = db.execute(
-        select(func.count(Transaction.transaction_id)).where(
-            Transaction.initiator_user_id == user_id,
-            Transaction.destination_wallet_id == dest_wallet,
-            Transaction.kyc_status != "REJECTED",
-            Transaction.transaction_id != tx_id,
-        )
-    ).scalar() or 0
-
-    if past_count == 0:
+    if rule_ctx.beneficiary_count == 0:
         return RuleResult(
             True, 0.10, "RULE_NEW_BENEFICIARY",
             f"first payment to wallet {dest_wallet[:8]}…, amount={amount:.2f}",
@@ -234,7 +357,7 @@ def rule_new_beneficiary(
 
 def rule_geo_anomaly(
     ctx: Dict[str, Any],
-    db: Session,
+    rule_ctx: RuleContext,
 ) -> RuleResult:
     """
     Flags transactions from a country never used by the user before.
@@ -244,23 +367,11 @@ def rule_geo_anomaly(
     if not user_id or not country:
         return RuleResult(False, 0.0, "RULE_GEO_ANOMALY")
 
-    tx_id = ctx.get("transaction_id", "")
-    # Get user's historical countries
-    stmt = (
-        select(Transaction.country)
-        .where(
-            Transaction.initiator_user_id == user_id,
-            Transaction.country.isnot(None),
-            Transaction.transaction_id != tx_id,
-        )
-        .distinct()
-    )
-    history = {row for row in db.execute(stmt).scalars().all()}
-
-    if history and country.upper() not in {c.upper() for c in history if c}:
+    history = set(rule_ctx.countries)
+    if history and country.upper() not in {c.upper() for c in history}:
         return RuleResult(
             True, 0.20, "RULE_GEO_ANOMALY",
-            f"country={country} not in history={history}",
+            f"country={country} not in history={sorted(history)}",
         )
     return RuleResult(False, 0.0, "RULE_GEO_ANOMALY")
 
@@ -271,7 +382,7 @@ def rule_geo_anomaly(
 
 def rule_odd_hour(
     ctx: Dict[str, Any],
-    db: Session,
+    rule_ctx: RuleContext,
 ) -> RuleResult:
     """
     Flags transactions between 01:00 and 05:00 (deep night).
@@ -293,35 +404,22 @@ def rule_odd_hour(
 
 def rule_structuring(
     ctx: Dict[str, Any],
-    db: Session,
+    rule_ctx: RuleContext,
 ) -> RuleResult:
     """
     Flags many small payments in a short window that cumulatively exceed
     a threshold, suggesting structuring to avoid detection.
-    Threshold: ≥5 tx of similar small amounts (< 15 PYC each) in 30 min
+    Threshold: ≥5 tx of small amounts (<= 15 PYC each) in 30 min
     with cumulative sum > 50 PYC.
     """
     user_id = ctx.get("initiator_user_id")
     if not user_id:
         return RuleResult(False, 0.0, "RULE_STRUCTURING")
 
-    tx_id = ctx.get("transaction_id", "")
-    window = datetime.utcnow() - timedelta(minutes=30)
-    stmt = (
-        select(Transaction.amount)
-        .where(
-            Transaction.initiator_user_id == user_id,
-            Transaction.created_at >= window,
-            Transaction.amount <= 15,  # small amounts
-            Transaction.transaction_id != tx_id,
-        )
-    )
-    small_amounts = [float(a) for a in db.execute(stmt).scalars().all()]
-
-    if len(small_amounts) >= 5 and sum(small_amounts) > 50:
+    if rule_ctx.small_count_30m >= 5 and rule_ctx.small_sum_30m > 50:
         return RuleResult(
             True, 0.30, "RULE_STRUCTURING",
-            f"{len(small_amounts)} small tx totalling {sum(small_amounts):.2f} PYC in 30min",
+            f"{rule_ctx.small_count_30m} small tx totalling {rule_ctx.small_sum_30m:.2f} PYC in 30min",
         )
     return RuleResult(False, 0.0, "RULE_STRUCTURING")
 
@@ -332,7 +430,7 @@ def rule_structuring(
 
 def rule_circular_flow(
     ctx: Dict[str, Any],
-    db: Session,
+    rule_ctx: RuleContext,
 ) -> RuleResult:
     """
     Flags if the destination wallet recently sent money back to the
@@ -343,22 +441,10 @@ def rule_circular_flow(
     if not source_wallet or not dest_wallet:
         return RuleResult(False, 0.0, "RULE_CIRCULAR_FLOW")
 
-    tx_id = ctx.get("transaction_id", "")
-    window = datetime.utcnow() - timedelta(minutes=30)
-    reverse_count = db.execute(
-        select(func.count(Transaction.transaction_id)).where(
-            Transaction.source_wallet_id == dest_wallet,
-            Transaction.destination_wallet_id == source_wallet,
-            Transaction.created_at >= window,
-            Transaction.kyc_status != "REJECTED",
-            Transaction.transaction_id != tx_id,
-        )
-    ).scalar() or 0
-
-    if reverse_count > 0:
+    if rule_ctx.reverse_count_30m > 0:
         return RuleResult(
             True, 0.35, "RULE_CIRCULAR_FLOW",
-            f"{reverse_count} reverse tx from dest→src in last 30min",
+            f"{rule_ctx.reverse_count_30m} reverse tx from dest→src in last 30min",
         )
     return RuleResult(False, 0.0, "RULE_CIRCULAR_FLOW")
 
@@ -369,7 +455,7 @@ def rule_circular_flow(
 
 def rule_activity_burst(
     ctx: Dict[str, Any],
-    db: Session,
+    rule_ctx: RuleContext,
 ) -> RuleResult:
     """
     Flags a user who was inactive for 30+ days but suddenly has ≥5
@@ -379,33 +465,11 @@ def rule_activity_burst(
     if not user_id:
         return RuleResult(False, 0.0, "RULE_ACTIVITY_BURST")
 
-    tx_id = ctx.get("transaction_id", "")
-    now = datetime.utcnow()
-    one_hour_ago = now - timedelta(hours=1)
-    thirty_days_ago = now - timedelta(days=30)
-
-    # Count in last hour
-    recent_count = db.execute(
-        select(func.count(Transaction.transaction_id)).where(
-            Transaction.initiator_user_id == user_id,
-            Transaction.created_at >= one_hour_ago,
-            Transaction.transaction_id != tx_id,
-        )
-    ).scalar() or 0
-
+    recent_count = rule_ctx.count_1h
     if recent_count < 5:
         return RuleResult(False, 0.0, "RULE_ACTIVITY_BURST")
 
-    # Count in last 30 days (excluding last hour)
-    older_count = db.execute(
-        select(func.count(Transaction.transaction_id)).where(
-            Transaction.initiator_user_id == user_id,
-            Transaction.created_at >= thirty_days_ago,
-            Transaction.created_at < one_hour_ago,
-            Transaction.transaction_id != tx_id,
-        )
-    ).scalar() or 0
-
+    older_count = rule_ctx.count_30d_before_1h
     if older_count <= 2:
         return RuleResult(
             True, 0.25, "RULE_ACTIVITY_BURST",
@@ -420,48 +484,19 @@ def rule_activity_burst(
 
 def rule_recidivism(
     ctx: Dict[str, Any],
-    db: Session,
+    rule_ctx: RuleContext,
 ) -> RuleResult:
     """
     Flags users who have had past transactions blocked or flagged as fraud.
-    Checks both rejected transactions and human_reviews with label='fraud'.
+    Checks both rejected transactions (last 90 days) and human_reviews
+    with label='fraud'.
     """
     user_id = ctx.get("initiator_user_id")
     if not user_id:
         return RuleResult(False, 0.0, "RULE_RECIDIVISM")
 
-    tx_id = ctx.get("transaction_id", "")
-
-    # Count rejected transactions in last 90 days
-    cutoff = datetime.utcnow() - timedelta(days=90)
-    rejected_count = db.execute(
-        select(func.count(Transaction.transaction_id)).where(
-            Transaction.initiator_user_id == user_id,
-            Transaction.kyc_status == "REJECTED",
-            Transaction.created_at >= cutoff,
-            Transaction.transaction_id != tx_id,
-        )
-    ).scalar() or 0
-
-    # Count fraud reviews
-    fraud_review_count = 0
-    try:
-        # Get user's transaction IDs
-        tx_ids_stmt = select(Transaction.transaction_id).where(
-            Transaction.initiator_user_id == user_id,
-            Transaction.transaction_id != tx_id,
-        )
-        tx_ids = db.execute(tx_ids_stmt).scalars().all()
-        if tx_ids:
-            fraud_review_count = db.execute(
-                select(func.count(HumanReview.review_id)).where(
-                    HumanReview.transaction_id.in_(tx_ids),
-                    HumanReview.label == "fraud",
-                )
-            ).scalar() or 0
-    except Exception:
-        logger.warning("Could not query human_reviews for recidivism check")
-
+    rejected_count = rule_ctx.rejected_count_90d
+    fraud_review_count = rule_ctx.fraud_review_count
     total_flags = rejected_count + fraud_review_count
     if total_flags >= 1:
         return RuleResult(
@@ -487,3 +522,8 @@ ALL_RULES = [
     rule_activity_burst,
     rule_recidivism,
 ]
+
+# Rules that do not read history (still evaluated when the prefetch fails)
+CONTEXT_FREE_RULES = [
+    rule_odd_hour,
+]
@@ -1,8 +1,9 @@
 """
 Rule Engine Orchestrator.
 
-Runs all restriction rules against a transaction, computes a weighted score,
-combines it with the ML risk_score, and produces the final decision.
+Prefetches the rule context (one SQL round trip), runs all restriction rules
+against it, computes a weighted score, combines it with the ML risk_score,
+and produces the final decision.
 Also updates the user's trust_score and risk_level when rules are triggered.
 """
 import logging
@@ -13,7 +14,7 @@ from typing import Any, Dict, List, Optional
 from sqlmodel import Session
 
 from ..models import User
-from .restriction_rules import ALL_RULES, RuleResult
+from .restriction_rules import ALL_RULES, CONTEXT_FREE_RULES, RuleContext, RuleResult, fetch_rule_context
 
 logger = logging.getLogger("rule-engine")
 
@@ -101,11 +102,41 @@ def evaluate_transaction(
     current_trust = int(user.trust_score or 100) if user else 100
     current_risk = (user.risk_level or "LOW").upper() if user else "LOW"
 
+    # Prefetch every history aggregate in a single query; rules are pure functions of it.
+    # The SAVEPOINT keeps the session usable if the query fails (the user
+    # update below would otherwise hit an aborted PostgreSQL transaction).
+    # If it fails, retry without human_reviews (fraud review count 0) before
+    # falling back to the context-free rules.
+    rules = ALL_RULES
+    try:
+        with db.begin_nested():
+            rule_ctx = fetch_rule_context(tx_context, db)
+    except Exception:
+        logger.warning(
+            "Rule context prefetch failed for tx=%s, retrying without human_reviews",
+            tx_context.get("transaction_id"),
+            exc_info=True,
+        )
+        try:
+            with db.begin_nested():
+                rule_ctx = fetch_rule_context(tx_context, db, include_reviews=False)
+            logger.warning(
+                "Fraud reviews unavailable for tx=%s, recidivism uses rejected transactions only",
+                tx_context.get("transaction_id"),
+            )
+        except Exception:
+            logger.exception(
+                "Rule context prefetch failed for tx=%s, history rules skipped",
+                tx_context.get("transaction_id"),
+            )
+            rule_ctx = RuleContext()
+            rules = CONTEXT_FREE_RULES
+
     # Run each rule
     raw_rule_score = 0.0
-    for rule_fn in ALL_RULES:
+    for rule_fn in rules:
         try:
-            rule_result = rule_fn(tx_context, db)
+            rule_result = rule_fn(tx_context, rule_ctx)
             if rule_result.triggered:
                 result.triggered_rules.append(rule_result)
                 raw_rule_score += rule_result.score_delta
@@ -5,6 +5,7 @@ Validates each rule's logic with mocked scenarios.
 Usage:
     cd backend
     python test_rules.py
+    TEST_DATABASE_URL=postgresql://... python test_rules.py  # + prefetch query on a real PostgreSQL
 """
 import sys
 import os
@@ -12,10 +13,17 @@ import os
 # Add project root to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+import statistics
 from datetime import datetime, timedelta
 from decimal import Decimal
 from unittest.mock import MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
 from app.services.restriction_rules import (
+    RuleContext,
+    build_rule_context_query,
+    fetch_rule_context,
     rule_amount_anomaly,
     rule_freq_spike,
     rule_new_account_activity,
@@ -38,35 +46,11 @@ from app.services.rule_engine import (
 
 # ========= Helpers =========
 
-class MockScalar:
-    """Mock for db.execute(...).scalar()"""
-    def __init__(self, value):
-        self._value = value
-    def scalar(self):
-        return self._value
-
-class MockScalarsAll:
-    """Mock for db.execute(...).scalars().all()"""
-    def __init__(self, values):
-        self._values = values
-    def scalars(self):
-        return self
-    def all(self):
-        return self._values
-
-class MockScalarAndAll:
-    """Mock that supports both .scalar() and .scalars().all()"""
-    def __init__(self, values=None, scalar_value=None):
-        self._values = values or []
-        self._scalar_value = scalar_value
-    def scalar(self):
-        return self._scalar_value
-    def scalars(self):
-        return self
-    def all(self):
-        return self._values
-    def first(self):
-        return self._values[0] if self._values else None
+def amount_context(amounts):
+    """RuleContext with the 30-day amount aggregates computed by the prefetch query."""
+    mean = statistics.mean(amounts) if amounts else None
+    stdev = statistics.stdev(amounts) if len(amounts) > 1 else None
+    return RuleContext(amount_count_30d=len(amounts), amount_avg_30d=mean, amount_stddev_30d=stdev)
 
 
 passed = 0
@@ -86,8 +70,8 @@ def assert_true(condition, test_name):
 
 def test_rule_odd_hour():
     print("\n--- RULE_ODD_HOUR ---")
-    db = MagicMock()
-    
+    db = RuleContext()
+
     # 3 AM → should trigger
     ctx_night = {"created_at": "2026-03-27T03:15:00Z"}
     result = rule_odd_hour(ctx_night, db)
@@ -116,7 +100,7 @@ def test_rule_odd_hour():
 def test_rule_odd_hour_edge():
     """Check edge: 5:59 → hour=5 → 1<=5<=5 → yes"""
     print("\n--- RULE_ODD_HOUR (edge) ---")
-    db = MagicMock()
+    db = RuleContext()
     ctx = {"created_at": "2026-03-27T05:59:00Z"}
     result = rule_odd_hour(ctx, db)
     assert_true(result.triggered, "5:59 AM triggers (hour=5 is in 1-5)")
@@ -152,28 +136,21 @@ def test_risk_level():
 
 def test_rule_amount_anomaly():
     print("\n--- RULE_AMOUNT_ANOMALY ---")
-    db = MagicMock()
-    
+
     # Not enough history → no trigger
-    db.execute.return_value = MockScalarsAll([Decimal("20"), Decimal("25")])  # only 2
     ctx = {"initiator_user_id": "u1", "amount": 500}
-    result = rule_amount_anomaly(ctx, db)
+    result = rule_amount_anomaly(ctx, amount_context([20, 25]))  # only 2
     assert_true(not result.triggered, "< 3 history entries → no trigger")
 
     # Normal amount within range
-    db.execute.return_value = MockScalarsAll([
-        Decimal("20"), Decimal("25"), Decimal("30"), Decimal("22"), Decimal("28")
-    ])
+    history = amount_context([20, 25, 30, 22, 28])
     ctx = {"initiator_user_id": "u1", "amount": 30}
-    result = rule_amount_anomaly(ctx, db)
+    result = rule_amount_anomaly(ctx, history)
     assert_true(not result.triggered, "amount=30 within normal range")
 
     # Big spike → trigger
-    db.execute.return_value = MockScalarsAll([
-        Decimal("20"), Decimal("25"), Decimal("30"), Decimal("22"), Decimal("28")
-    ])
     ctx = {"initiator_user_id": "u1", "amount": 450}
-    result = rule_amount_anomaly(ctx, db)
+    result = rule_amount_anomaly(ctx, history)
     assert_true(result.triggered, "amount=450 >> avg=25 → trigger")
     assert_true(result.score_delta == 0.25, "score delta = 0.25")
 
@@ -182,42 +159,234 @@ def test_rule_amount_anomaly():
 
 def test_rule_freq_spike():
     print("\n--- RULE_FREQ_SPIKE ---")
-    db = MagicMock()
 
     # 5 tx in 10 min → trigger
-    db.execute.return_value = MockScalarAndAll(scalar_value=5)
     ctx = {"initiator_user_id": "u1"}
-    result = rule_freq_spike(ctx, db)
+    result = rule_freq_spike(ctx, RuleContext(count_10m=5, count_1h=5, count_24h=5))
     assert_true(result.triggered, "5 tx in 10min → trigger")
     assert_true(result.score_delta == 0.30, "score delta = 0.30")
 
+    result = rule_freq_spike(ctx, RuleContext(count_10m=2, count_1h=9, count_24h=24))
+    assert_true(not result.triggered, "below every window threshold → no trigger")
+
 
 # ========= Test NEW ACCOUNT ACTIVITY =========
 
 def test_rule_new_account_activity():
     print("\n--- RULE_NEW_ACCOUNT_ACTIVITY ---")
-    db = MagicMock()
+    now = datetime.utcnow()
 
     # New account (2 min old) + high amount → trigger
-    mock_user = MagicMock()
-    mock_user.created_at = datetime.utcnow() - timedelta(minutes=2)
-    db.get.return_value = mock_user
+    new_account = RuleContext(now=now, account_created_at=now - timedelta(minutes=2))
     ctx = {"initiator_user_id": "u1", "amount": 200}
-    result = rule_new_account_activity(ctx, db)
+    result = rule_new_account_activity(ctx, new_account)
     assert_true(result.triggered, "2min old account + 200 PYC → trigger")
 
     # Old account → no trigger
-    mock_user.created_at = datetime.utcnow() - timedelta(days=30)
-    result = rule_new_account_activity(ctx, db)
+    old_account = RuleContext(now=now, account_created_at=now - timedelta(days=30))
+    result = rule_new_account_activity(ctx, old_account)
     assert_true(not result.triggered, "30d old account → no trigger")
 
     # New account but small amount → no trigger
-    mock_user.created_at = datetime.utcnow() - timedelta(minutes=2)
     ctx_small = {"initiator_user_id": "u1", "amount": 10}
-    result = rule_new_account_activity(ctx_small, db)
+    result = rule_new_account_activity(ctx_small, new_account)
     assert_true(not result.triggered, "2min old + 10 PYC → no trigger")
 
 
+# ========= Test HISTORY RULES (pure functions of the prefetched context) =========
+
+def test_history_rules():
+    print("\n--- HISTORY RULES ---")
+    ctx = {
+        "initiator_user_id": "u1",
+        "source_wallet_id": "w_src",
+        "destination_wallet_id": "w_dst",
+        "amount": 12,
+        "country": "fr",
+    }
+    quiet = RuleContext(beneficiary_count=3, countries=["FR", "BE"], count_30d_before_1h=40)
+
+    assert_true(rule_new_beneficiary(ctx, RuleContext()).triggered, "no past payment to dest → new beneficiary")
+    assert_true(not rule_new_beneficiary(ctx, quiet).triggered, "known beneficiary → no trigger")
+    assert_true(not rule_geo_anomaly(ctx, quiet).triggered, "country in history (case-insensitive) → no trigger")
+    assert_true(rule_geo_anomaly({**ctx, "country": "KP"}, quiet).triggered, "unseen country → trigger")
+    assert_true(not rule_geo_anomaly(ctx, RuleContext()).triggered, "no country history → no trigger")
+    assert_true(
+        rule_structuring(ctx, RuleContext(small_count_30m=5, small_sum_30m=60.0)).triggered,
+        "5 small tx totalling 60 PYC → structuring",
+    )
+    assert_true(not rule_structuring(ctx, RuleContext(small_count_30m=5, small_sum_30m=40.0)).triggered,
+                "small total <= 50 → no trigger")
+    assert_true(rule_circular_flow(ctx, RuleContext(reverse_count_30m=1)).triggered, "reverse flow → trigger")
+    assert_true(rule_activity_burst(ctx, RuleContext(count_1h=6, count_30d_before_1h=1)).triggered,
+                "burst after inactivity → trigger")
+    assert_true(not rule_activity_burst(ctx, RuleContext(count_1h=6, count_30d_before_1h=40)).triggered,
+                "burst of a regular user → no trigger")
+    assert_true(rule_recidivism(ctx, RuleContext(fraud_review_count=1)).triggered, "past fraud review → trigger")
+    assert_true(not rule_recidivism(ctx, quiet).triggered, "clean record → no trigger")
+
+
+# ========= Test RULE CONTEXT PREFETCH =========
+
+def test_fetch_rule_context_single_query():
+    print("\n--- RULE CONTEXT PREFETCH ---")
+    db = MagicMock()
+    db.execute.return_value.mappings.return_value.one.return_value = {
+        "count_10m": 1, "count_1h": 2, "count_24h": 3, "count_30d_before_1h": 4,
+        "amount_count_30d": 5, "amount_avg_30d": Decimal("25.00"), "amount_stddev_30d": Decimal("3.81"),
+        "small_count_30m": 0, "small_sum_30m": 0, "countries": ["FR", "BE"],
+        "beneficiary_count": 2, "reverse_count_30m": 0, "rejected_count_90d": 0,
+        "fraud_review_count": 1, "account_created_at": datetime(2026, 1, 1),
+    }
+    ctx = {"transaction_id": "tx1", "initiator_user_id": "u1", "source_wallet_id": "w1",
+           "destination_wallet_id": "w2"}
+    rule_ctx = fetch_rule_context(ctx, db)
+    assert_true(db.execute.call_count == 1, "all aggregates fetched in one query")
+    assert_true(rule_ctx.amount_avg_30d == 25.0 and rule_ctx.countries == ["FR", "BE"], "row mapped to RuleContext")
+
+    db.execute.reset_mock()
+    fetch_rule_context({"transaction_id": "tx2"}, db)
+    assert_true(db.execute.call_count == 0, "no user and no counterparty → no query")
+
+
+def test_rule_context_query_postgres_sql():
+    print("\n--- RULE CONTEXT QUERY (PostgreSQL SQL) ---")
+    ctx = {"transaction_id": "tx1", "initiator_user_id": "u1", "source_wallet_id": "w1",
+           "destination_wallet_id": "w2"}
+    sql = str(build_rule_context_query(ctx, datetime(2026, 1, 1)).compile(dialect=postgresql.dialect()))
+    assert_true(sql.startswith("WITH user_history AS"), "history CTE first")
+    assert_true(sql.count("FILTER (WHERE") == 12, "12 FILTER aggregates over the history")
+    assert_true("stddev_samp(user_history.amount) FILTER" in sql, "sample stddev like statistics.stdev")
+    assert_true("array_agg(DISTINCT user_history.country) FILTER" in sql, "distinct countries aggregated")
+    assert_true(
+        "FROM user_stats JOIN reverse_flow ON true JOIN fraud_reviews ON true LEFT OUTER JOIN account ON true" in sql,
+        "one-row CTEs cross-joined, account outer-joined",
+    )
+    assert_true(sql.count("transactions.transaction_id != ") == 3, "current tx excluded from every lookup")
+
+    sql = str(build_rule_context_query({"transaction_id": "tx1"}, datetime(2026, 1, 1))
+              .compile(dialect=postgresql.dialect()))
+    assert_true(sql.count("\nWHERE false") == 4 and "initiator_user_id =" not in sql, "missing ids → WHERE false")
+
+    sql = str(build_rule_context_query(ctx, datetime(2026, 1, 1), include_reviews=False)
+              .compile(dialect=postgresql.dialect()))
+    assert_true("human_reviews" not in sql and "AS fraud_review_count" in sql, "without reviews → count is a literal")
+
+
+def test_prefetch_failure_keeps_session_usable():
+    print("\n--- RULE CONTEXT PREFETCH FAILURE ---")
+    db = MagicMock()
+    db.get.return_value = None
+    db.execute.side_effect = RuntimeError("boom")
+    ctx = {"transaction_id": "tx1", "initiator_user_id": "u1", "destination_wallet_id": "w2",
+           "amount": 10, "created_at": "2026-01-01T03:00:00"}
+    result = evaluate_transaction(ctx, 0.1, [], db)
+    assert_true(db.begin_nested.call_count == 2, "prefetch and retry each run inside a SAVEPOINT")
+    exc_type = db.begin_nested.return_value.__exit__.call_args[0][0]
+    assert_true(exc_type is RuntimeError, "failed query rolled back to the SAVEPOINT")
+    assert_true(result.all_reasons == ["RULE_ODD_HOUR"], "only context-free rules run")
+
+
+def test_prefetch_retries_without_reviews():
+    print("\n--- RULE CONTEXT PREFETCH WITHOUT human_reviews ---")
+    db = MagicMock()
+    db.get.return_value = None
+    retry = MagicMock()
+    retry.mappings.return_value.one.return_value = {
+        "count_10m": 6, "count_1h": 6, "count_24h": 6, "count_30d_before_1h": 0,
+        "amount_count_30d": 0, "amount_avg_30d": None, "amount_stddev_30d": None,
+        "small_count_30m": 0, "small_sum_30m": 0, "countries": [],
+        "beneficiary_count": 1, "reverse_count_30m": 0, "rejected_count_90d": 1,
+        "fraud_review_count": 0, "account_created_at": None,
+    }
+    db.execute.side_effect = [RuntimeError('relation "human_reviews" does not exist'), retry]
+    ctx = {"transaction_id": "tx1", "initiator_user_id": "u1", "destination_wallet_id": "w2",
+           "amount": 10, "created_at": "2026-01-01T12:00:00"}
+    result = evaluate_transaction(ctx, 0.1, [], db)
+    retried_sql = str(db.execute.call_args_list[1][0][0])
+    assert_true("human_reviews" not in retried_sql, "retry skips human_reviews")
+    assert_true({"RULE_FREQ_SPIKE", "RULE_RECIDIVISM"} <= set(result.all_reasons), "history rules still evaluated")
+
+
+def test_fetch_rule_context_postgres():
+    """Runs the prefetch against a real PostgreSQL (TEST_DATABASE_URL), inside a rolled-back transaction."""
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        print("\n--- RULE CONTEXT PREFETCH (PostgreSQL) --- skipped, TEST_DATABASE_URL not set")
+        return
+    print("\n--- RULE CONTEXT PREFETCH (PostgreSQL) ---")
+    from sqlalchemy import create_engine
+    from sqlmodel import Session, SQLModel
+    from app.models import HumanReview, Transaction, User, Wallet
+
+    now = datetime.utcnow()
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            SQLModel.metadata.create_all(conn)  # no-op on a migrated database
+            db = Session(bind=conn)
+            db.add_all([
+                User(user_id="rt_u1", email="rt_u1@test", hashed_password="x", created_at=now - timedelta(days=60)),
+                User(user_id="rt_u2", email="rt_u2@test", hashed_password="x"),
+            ])
+            db.flush()
+            db.add_all([Wallet(wallet_id="rt_w1", user_id="rt_u1"), Wallet(wallet_id="rt_w2", user_id="rt_u2")])
+            db.flush()
+
+            def tx(tx_id, amount, created_at, status="APPROVED", user="rt_u1", src="rt_w1", dst="rt_w2", country="FR"):
+                return Transaction(
+                    transaction_id=tx_id, initiator_user_id=user, source_wallet_id=src,
+                    destination_wallet_id=dst, amount=Decimal(amount), currency="PYC",
+                    country=country, created_at=created_at, kyc_status=status,
+                )
+
+            history = [20, 25, 30, 22, 28]
+            db.add_all([tx(f"rt_t{i}", a, now - timedelta(days=i + 2), country="FR" if i % 2 else "BE")
+                        for i, a in enumerate(history)])
+            db.add_all([tx(f"rt_s{i}", 12, now - timedelta(minutes=i + 1)) for i in range(5)])
+            db.add_all([
+                tx("rt_rej", 99, now - timedelta(days=10), status="REJECTED"),
+                tx("rt_back", 5, now - timedelta(minutes=3), user="rt_u2", src="rt_w2", dst="rt_w1"),
+                tx("rt_cur", 500, now, status="PENDING"),
+            ])
+            db.flush()
+            db.add(HumanReview(review_id="rt_h1", transaction_id="rt_t1", label="fraud"))
+            db.flush()
+
+            ctx = {"transaction_id": "rt_cur", "initiator_user_id": "rt_u1",
+                   "source_wallet_id": "rt_w1", "destination_wallet_id": "rt_w2"}
+            rule_ctx = fetch_rule_context(ctx, db, now=now)
+            amounts = history + [12] * 5
+            assert_true((rule_ctx.count_10m, rule_ctx.count_1h, rule_ctx.count_24h) == (5, 5, 5), "window counts")
+            assert_true(rule_ctx.count_30d_before_1h == 6, "older 30d count (rejected included)")
+            assert_true(rule_ctx.amount_count_30d == 10, "amount history excludes rejected and current tx")
+            assert_true(abs(rule_ctx.amount_avg_30d - statistics.mean(amounts)) < 1e-9, "avg matches statistics.mean")
+            assert_true(abs(rule_ctx.amount_stddev_30d - statistics.stdev(amounts)) < 1e-9,
+                        "stddev_samp matches statistics.stdev")
+            assert_true((rule_ctx.small_count_30m, rule_ctx.small_sum_30m) == (5, 60.0), "small amounts in 30 min")
+            assert_true(sorted(rule_ctx.countries) == ["BE", "FR"], "distinct countries")
+            assert_true(rule_ctx.beneficiary_count == 10, "past payments to destination")
+            assert_true(rule_ctx.reverse_count_30m == 1, "reverse flow")
+            assert_true((rule_ctx.rejected_count_90d, rule_ctx.fraud_review_count) == (1, 1), "past flags")
+            assert_true(rule_ctx.account_created_at == now - timedelta(days=60), "account creation date")
+
+            unknown = fetch_rule_context({"transaction_id": "x", "initiator_user_id": "rt_nobody"}, db, now=now)
+            assert_true(unknown.amount_count_30d == 0 and unknown.account_created_at is None,
+                        "unknown user → one empty row (account outer-joined)")
+
+            # Missing human_reviews table: only the fraud review count is lost
+            conn.exec_driver_sql("DROP TABLE human_reviews CASCADE")
+            result = evaluate_transaction({**ctx, "amount": 500, "created_at": now.isoformat()}, 0.1, [], db)
+            assert_true("RULE_RECIDIVISM" in result.all_reasons and "RULE_STRUCTURING" in result.all_reasons,
+                        "history rules evaluated without human_reviews")
+            db.flush()
+            assert_true(db.get(User, "rt_u1").trust_score == result.trust_score_after < 100,
+                        "session still usable after the failed prefetch")
+        finally:
+            trans.rollback()
+
+
 # ========= Run all tests =========
 
 if __name__ == "__main__":
@@ -232,6 +401,12 @@ if __name__ == "__main__":
     test_rule_amount_anomaly()
     test_rule_freq_spike()
     test_rule_new_account_activity()
+    test_history_rules()
+    test_fetch_rule_context_single_query()
+    test_rule_context_query_postgres_sql()
+    test_prefetch_failure_keeps_session_usable()
+    test_prefetch_retries_without_reviews()
+    test_fetch_rule_context_postgres()
     
     print("\n" + "=" * 50)
     print(f"Results: {passed} passed, {failed} failed")
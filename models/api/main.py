@@ -16,13 +16,9 @@ from pydantic import BaseModel
 # Ajouter le répertoire parent au PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.features.pipeline import FeaturePipeline
-from src.models.supervised.predictor import SupervisedPredictor
-from src.models.unsupervised.predictor import UnsupervisedPredictor
+from src.monitoring.drift import DriftMonitor
 from src.monitoring.gcs_logger import log_inference_to_gcs
-from src.rules.engine import RulesEngine
-from src.scoring.decision import DecisionEngine
-from src.scoring.scorer import GlobalScorer
+from src.scoring.pipeline import ScoringPipeline
 
 # Initialiser l'application
 app = FastAPI(
@@ -34,27 +30,24 @@ app = FastAPI(
 # Charger les modèles au démarrage
 MODEL_VERSION = os.getenv("MODEL_VERSION", "latest")
 ARTIFACTS_DIR = Path(os.getenv("ARTIFACTS_DIR", "artifacts"))
+# "full" (LightGBM + IsolationForest) ou "distilled" (modèle distillé, canaux sensibles à la latence)
+SCORING_MODE = os.getenv("SCORING_MODE", "full")
 
-# Initialiser les composants
-feature_pipeline = FeaturePipeline()
-rules_engine = RulesEngine()
-global_scorer = GlobalScorer()
-decision_engine = DecisionEngine()
+# Initialiser le pipeline (features → règles → modèles → score global → décision)
+scoring_pipeline = ScoringPipeline.load(MODEL_VERSION, ARTIFACTS_DIR, scoring_mode=SCORING_MODE)
 
-# Charger les modèles
+# Monitoring de drift en mémoire (histogrammes glissants vs référence d'entraînement)
 try:
-    supervised_predictor = SupervisedPredictor.load_version(MODEL_VERSION, ARTIFACTS_DIR)
-    print(f"✅ Modèle supervisé chargé: {MODEL_VERSION}")
-except Exception as e:
-    print(f"⚠️  Modèle supervisé non disponible: {e}")
-    supervised_predictor = None
-
-try:
-    unsupervised_predictor = UnsupervisedPredictor.load_version(MODEL_VERSION, ARTIFACTS_DIR)
-    print(f"✅ Modèle non supervisé chargé: {MODEL_VERSION}")
+    drift_monitor = DriftMonitor.load_version(
+        MODEL_VERSION,
+        ARTIFACTS_DIR,
+        slot_seconds=int(os.getenv("DRIFT_SLOT_SECONDS", "60")),
+        retention=os.getenv("DRIFT_RETENTION", "24h"),
+    )
+    print(f"✅ Référence de drift chargée: {drift_monitor.reference_version}")
 except Exception as e:
-    print(f"⚠️  Modèle non supervisé non disponible: {e}")
-    unsupervised_predictor = None
+    print(f"⚠️  Monitoring de drift désactivé: {e}")
+    drift_monitor = None
 
 
 class ScoreRequest(BaseModel):
@@ -63,12 +56,23 @@ class ScoreRequest(BaseModel):
     context: dict | None = None
 
 
+class ScoreComponents(BaseModel):
+    """Scores intermédiaires combinés par le GlobalScorer."""
+    rule_score: float
+    rules_decision: str
+    boost_factor: float
+    supervised_score: float | None = None  # None si BLOCK par les règles
+    unsupervised_score: float | None = None
+    distilled_score: float | None = None  # mode distillé (modèles de l'ensemble non évalués)
+
+
 class ScoreResponse(BaseModel):
     """Réponse de scoring."""
     risk_score: float
     decision: str
     reasons: list[str]
     model_version: str
+    components: ScoreComponents | None = None
 
 
 @app.get("/health")
@@ -77,8 +81,9 @@ async def health():
     return {
         "status": "healthy",
         "model_version": MODEL_VERSION,
-        "supervised_loaded": supervised_predictor is not None,
-        "unsupervised_loaded": unsupervised_predictor is not None,
+        "scoring_mode": scoring_pipeline.scoring_mode,
+        "supervised_loaded": scoring_pipeline.supervised_predictor is not None,
+        "unsupervised_loaded": scoring_pipeline.unsupervised_predictor is not None,
     }
 
 
@@ -120,72 +125,66 @@ async def score_transaction(request: ScoreRequest, background_tasks: BackgroundT
     
     _require_enriched_transaction(transaction)
     
-    # 1. Feature Engineering (format enrichi uniquement)
-    features = feature_pipeline.transform(transaction)
-    
-    # 2. Règles métier
-    rules_output = rules_engine.evaluate(transaction, features, context)
-    
-    # Si BLOCK, arrêter ici (logging Vertex en arrière-plan)
-    if rules_output.decision == "BLOCK":
-        background_tasks.add_task(
-            log_inference_to_gcs,
-            features,
-            float(rules_output.rule_score),
-            "BLOCK",
-            MODEL_VERSION,
-        )
-        return ScoreResponse(
-            risk_score=rules_output.rule_score,
-            decision="BLOCK",
-            reasons=rules_output.reasons,
-            model_version=MODEL_VERSION,
+    # Features → règles → ML → score global → décision
+    # (si les règles décident BLOCK, les modèles ML ne sont pas évalués)
+    result = scoring_pipeline.score(transaction, context)
+
+    # Histogrammes de drift (quelques incréments de tableaux, synchrone)
+    if drift_monitor is not None:
+        drift_monitor.observe(
+            result.features,
+            {
+                "risk_score": result.risk_score,
+                "supervised_score": result.supervised_score,
+                "unsupervised_score": result.unsupervised_score,
+                "distilled_score": result.distilled_score,
+            },
         )
-    
-    # 3. Scoring ML
-    if supervised_predictor:
-        supervised_score = supervised_predictor.predict(features)
-    else:
-        supervised_score = 0.5  # Valeur par défaut
-    
-    if unsupervised_predictor:
-        unsupervised_score = unsupervised_predictor.predict(features)
-    else:
-        unsupervised_score = 0.5  # Valeur par défaut
-    
-    # 4. Score global
-    risk_score = global_scorer.compute_score(
-        rule_score=rules_output.rule_score,
-        supervised_score=supervised_score,
-        unsupervised_score=unsupervised_score,
-        boost_factor=rules_output.boost_factor,
-    )
-    
-    # 5. Décision finale
-    decision = decision_engine.decide(
-        risk_score=risk_score,
-        reasons=rules_output.reasons,
-        hard_block=False,
-        model_version=MODEL_VERSION,
-    )
 
     # Logging Vertex (GCS) en arrière-plan
     background_tasks.add_task(
         log_inference_to_gcs,
-        features,
-        decision.risk_score,
-        decision.decision,
+        result.features,
+        result.risk_score,
+        result.decision,
         MODEL_VERSION,
+        result.components(),
     )
 
     return ScoreResponse(
-        risk_score=decision.risk_score,
-        decision=decision.decision,
-        reasons=decision.reasons,
+        risk_score=result.risk_score,
+        decision=result.decision,
+        reasons=result.reasons,
         model_version=MODEL_VERSION,
+        components=ScoreComponents(**result.components()),
     )
 
 
+@app.get("/drift")
+async def drift(window: str = "1h"):
+    """
+    Drift des features et des scores sur une fenêtre glissante.
+
+    Args:
+        window: Fenêtre (ex: "15m", "1h", "24h"), bornée par DRIFT_RETENTION
+
+    Returns:
+        PSI, KS et taux de valeurs manquantes par feature et par score
+    """
+    if drift_monitor is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "code": "DRIFT_REFERENCE_MISSING",
+                "message": "Aucune référence de drift (drift_reference.json) pour cette version de modèle.",
+            },
+        )
+    try:
+        return drift_monitor.report(window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"code": "INVALID_WINDOW", "message": str(e)})
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8080))
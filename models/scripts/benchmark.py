@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de performance et contrôle de parité des scores (golden).
+
+Mesure, sur une charge synthétique reproductible (src/benchmark/suite.py) :
+FeaturePipeline.transform, RulesEngine.evaluate, chaque prédicteur (ligne
+par ligne et par lots), ScoringPipeline.score (full / distilled), le handler
+POST /score en processus et compute_features_for_dataset (10k, 100k lignes).
+
+Avant de mesurer, les sorties sont comparées à tests/fixtures/benchmark_golden.json :
+une optimisation ne doit changer ni les features, ni les règles, ni les scores.
+Code de sortie 1 si la parité échoue ou si un cas ralentit au-delà de --max-slowdown.
+
+Le rapport JSON (environnement, commit, durées par cas) est écrit dans
+--results-dir/<commit>[-dirty].json pour comparer les commits entre eux.
+
+Usage:
+    python scripts/benchmark.py
+    python scripts/benchmark.py --quick
+    python scripts/benchmark.py --compare benchmarks/1a2b3c4.json --max-slowdown 0.2
+    python scripts/benchmark.py --update-golden  # changement de scores voulu (modèle, règles)
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.benchmark import (
+    BenchmarkConfig,
+    BenchmarkWorkload,
+    compare_golden,
+    compare_results,
+    golden_outputs,
+    load_golden,
+    load_results,
+    run_suite,
+    save_results,
+    write_golden,
+)
+from src.benchmark.golden import DEFAULT_GOLDEN_PATH
+from src.benchmark.timing import default_results_path, environment
+
+
+def _sizes(value: str) -> list[int]:
+    return [int(size) for size in value.split(",") if size]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks du scoring et contrôle de parité (golden)")
+    parser.add_argument("--sizes", type=_sizes, default=[10_000, 100_000], help="Tailles compute_features_for_dataset")
+    parser.add_argument("--batch-sizes", type=_sizes, default=[1_000, 10_000], help="Tailles des lots de prédiction")
+    parser.add_argument("--repeat", type=int, default=5, help="Appels mesurés par cas")
+    parser.add_argument("--dataset-repeat", type=int, default=3, help="Appels mesurés par taille de dataset")
+    parser.add_argument("--quick", action="store_true", help="10k lignes seulement, 2 appels par cas")
+    parser.add_argument("--results-dir", type=Path, default=Path("benchmarks"), help="Dossier des rapports JSON")
+    parser.add_argument("--output", type=Path, default=None, help="Rapport JSON (défaut: <results-dir>/<commit>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="Rapport de référence à comparer")
+    parser.add_argument(
+        "--max-slowdown",
+        type=float,
+        default=None,
+        help="Ralentissement relatif toléré par cas avec --compare (ex: 0.2 = +20%%) ; au-delà, code de sortie 1",
+    )
+    parser.add_argument("--golden", type=Path, default=DEFAULT_GOLDEN_PATH, help="Fichier des sorties de référence")
+    parser.add_argument("--update-golden", action="store_true", help="Réécrire les sorties de référence")
+    parser.add_argument("--skip-parity", action="store_true", help="Ne pas contrôler la parité des sorties")
+    parser.add_argument("--skip-timing", action="store_true", help="Parité seulement (pas de mesures)")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.sizes, args.repeat, args.dataset_repeat = [10_000], 2, 1
+
+    # Rapport de référence relu avant d'écrire le nouveau (même commit = même fichier)
+    baseline = load_results(args.compare) if args.compare else None
+
+    # La charge de la référence golden fixe la config (mêmes données, mêmes modèles)
+    config = BenchmarkConfig()
+    golden = None
+    if not args.update_golden and not args.skip_parity:
+        if args.golden.exists():
+            golden = load_golden(args.golden)
+            config = BenchmarkConfig(**golden["config"])
+        else:
+            print(f"⚠️  Pas de référence golden ({args.golden}) : parité non contrôlée (--update-golden)")
+
+    print("🏗️  Construction de la charge (flux synthétique, modèles, requêtes)...")
+    start_time = time.time()
+    workload = BenchmarkWorkload.build(config, verbose=True)
+    print(f"   {len(workload.requests)} requêtes /score, {time.time() - start_time:.1f}s")
+
+    status = 0
+    parity = None
+    try:
+        if args.update_golden:
+            path = write_golden(golden_outputs(workload), args.golden)
+            print(f"✅ Sorties de référence écrites: {path}")
+        elif golden is not None:
+            differences = compare_golden(golden, golden_outputs(workload))
+            parity = {"passed": not differences, "differences": differences[:50]}
+            if differences:
+                status = 1
+                print(f"❌ Parité golden: {len(differences)} différence(s)")
+                for difference in differences[:20]:
+                    print(f"   - {difference}")
+            else:
+                print("✅ Parité golden: sorties identiques à la référence")
+
+        if args.skip_timing:
+            return status
+
+        print("\n⏱️  Mesures")
+        results = run_suite(
+            workload,
+            sizes=args.sizes,
+            batch_sizes=args.batch_sizes,
+            repeat=args.repeat,
+            dataset_repeat=args.dataset_repeat,
+        )
+    finally:
+        workload.close()
+
+    output = args.output or default_results_path(args.results_dir, environment())
+    save_results(
+        output,
+        results,
+        extra={
+            "config": {
+                "workload": asdict(config),
+                "sizes": args.sizes,
+                "batch_sizes": args.batch_sizes,
+                "repeat": args.repeat,
+                "dataset_repeat": args.dataset_repeat,
+            },
+            "parity": parity,
+        },
+    )
+    print(f"\n✅ Rapport: {output}")
+
+    if baseline is not None:
+        comparison = compare_results(baseline, load_results(output), tolerance=args.max_slowdown or 0.10)
+        commit = baseline.get("environment", {}).get("commit")
+        print(f"\n📊 Comparaison avec {args.compare} (commit {commit}) — speedup = durée avant / durée après")
+        print(comparison.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+        if args.max_slowdown is not None and (comparison["status"] == "slower").any():
+            slower = comparison.loc[comparison["status"] == "slower", "name"].tolist()
+            print(f"❌ Ralentissement > {args.max_slowdown:.0%}: {', '.join(slower)}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Rapport de drift et résumé des logs d'inférence, en streaming.
+
+Lit les logs JSONL (dossier local ou GCS) ligne à ligne, met à jour des
+histogrammes et des sketches de quantiles par feature/score, compare à la
+référence d'entraînement (drift_reference.json) et écrit un rapport JSON
+compact. Mémoire bornée quel que soit le nombre de jours lus.
+
+Usage:
+    python scripts/drift_report.py --source gs://sentinelle-485209-ml-data/monitoring/inference_logs --days-back 7
+    python scripts/drift_report.py --source logs/ --model-version v2.0.1 --output reports/drift.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.monitoring.drift import load_drift_reference
+from src.monitoring.log_readers import open_log_reader
+from src.monitoring.summary import LogSummary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rapport de drift des logs d'inférence (streaming)")
+    parser.add_argument("--source", required=True, help="Dossier local ou gs://bucket/prefix des logs JSONL")
+    parser.add_argument("--days-back", type=int, default=1, help="Nombre de jours lus (0 = tout)")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None, help="Dernier jour inclus (YYYY-MM-DD)")
+    parser.add_argument("--model-version", default="latest", help="Version de la référence (ex: v1.0.0 ou latest)")
+    parser.add_argument("--artifacts-dir", type=Path, default=Path("artifacts"), help="Dossier des artefacts")
+    parser.add_argument("--reference", type=Path, default=None, help="Fichier drift_reference.json explicite")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Lignes par mise à jour vectorisée")
+    parser.add_argument("--relative-accuracy", type=float, default=0.01, help="Erreur relative des quantiles")
+    parser.add_argument("--output", type=Path, default=None, help="Fichier JSON du rapport (défaut: stdout)")
+    args = parser.parse_args()
+
+    reference = None
+    try:
+        if args.reference:
+            with open(args.reference, "r") as f:
+                reference = json.load(f)
+        else:
+            reference = load_drift_reference(args.model_version, args.artifacts_dir)
+        print(f"✅ Référence de drift: {reference.get('version')}", file=sys.stderr)
+    except Exception as e:
+        print(f"⚠️  Pas de référence de drift (statistiques seules): {e}", file=sys.stderr)
+
+    reader = open_log_reader(args.source, days_back=args.days_back, end_date=args.end_date)
+    summary = LogSummary(reference, relative_accuracy=args.relative_accuracy, batch_size=args.batch_size)
+
+    print(f"📊 Lecture des logs: {args.source} ({args.days_back or 'tous les'} jours)", file=sys.stderr)
+    start_time = time.time()
+    for row in reader.iter_rows():
+        summary.update(row)
+        if summary.requests_total % 100_000 == 0:
+            print(f"   {summary.requests_total:,} lignes lues", file=sys.stderr, flush=True)
+    report = summary.report()
+    elapsed = time.time() - start_time
+    print(f"   ✅ {report['requests_total']:,} lignes en {elapsed:.1f}s", file=sys.stderr)
+    if report["drifted"]:
+        print(f"   ⚠️  Features dérivées (PSI >= {report['psi_alert_threshold']}): {', '.join(report['drifted'])}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+        print(f"💾 Rapport: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Génère un jeu de données synthétique au format Payon (benchmarks, tests de charge, parité).
+
+Écrit dans --out-dir (disposition attendue par train.py --data-dir) :
+- paysim_mapped.parquet/ (ou .csv) : flux labellisé (is_fraud, fraud_pattern)
+- payon_legit_clean.parquet/ (ou .csv) : flux légitime (autre graine, sans fraude)
+- score_payloads.jsonl : payloads enrichis POST /score (--payloads)
+- seed.sql : users, wallets, transactions, human_reviews en COPY PostgreSQL (--sql)
+- dataset_card.json : paramètres et volumes
+
+Déterministe : mêmes options → mêmes fichiers.
+
+Usage:
+    python scripts/generate_synthetic.py --rows 100000 --out-dir Data/synthetic
+    python scripts/generate_synthetic.py --rows 50000000 --wallets 2000000 --days 90 --format parquet
+    python scripts/generate_synthetic.py --rows 200000 --payloads 5000 --sql
+    python scripts/train.py --data-dir Data/synthetic --version synth-1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+
+import pandas as pd
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.synthetic import (
+    BLOCK_ROWS,
+    RAW_COLUMNS,
+    SyntheticConfig,
+    SyntheticTransactionGenerator,
+    build_score_payloads,
+    dataset_card,
+    write_payloads,
+    write_raw,
+    write_sql_seed,
+)
+from src.utils.config import load_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Générer des transactions synthétiques (format Payon)")
+    parser.add_argument("--rows", type=int, default=100_000, help="Transactions du flux labellisé (10k à 50M)")
+    parser.add_argument(
+        "--legit-rows",
+        type=int,
+        default=None,
+        help="Transactions du flux légitime payon_legit_clean (défaut: --rows ; 0 = pas de flux légitime)",
+    )
+    parser.add_argument("--wallets", type=int, default=None, help="Nombre de wallets (défaut: rows / 20)")
+    parser.add_argument("--days", type=int, default=30, help="Période couverte (jours)")
+    parser.add_argument("--start", type=str, default="2026-01-01", help="Date de début (UTC)")
+    parser.add_argument("--seed", type=int, default=42, help="Graine (flux légitime: seed + 1)")
+    parser.add_argument("--fraud-rate", type=float, default=0.005, help="Part de transactions frauduleuses")
+    parser.add_argument("--out-dir", type=Path, default=Path("Data/synthetic"), help="Dossier de sortie")
+    parser.add_argument("--format", choices=("parquet", "csv", "both"), default="parquet", help="Format brut")
+    parser.add_argument("--payloads", type=int, default=1000, help="Payloads POST /score (0 = aucun)")
+    parser.add_argument(
+        "--payload-history-blocks",
+        type=int,
+        default=4,
+        help=f"Blocs de fin de flux ({BLOCK_ROWS:,} lignes) servant d'historique aux payloads",
+    )
+    parser.add_argument("--sql", action="store_true", help="Écrire seed.sql (COPY PostgreSQL du backend)")
+    parser.add_argument("--config-dir", type=Path, default=Path("configs"), help="Dossier des configs")
+    args = parser.parse_args()
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    formats = ("parquet", "csv") if args.format == "both" else (args.format,)
+    config = SyntheticConfig(
+        n_transactions=args.rows,
+        n_wallets=args.wallets,
+        start=args.start,
+        days=args.days,
+        seed=args.seed,
+        fraud_rate=args.fraud_rate,
+    )
+    generator = SyntheticTransactionGenerator(config)
+    print(
+        f"🎲 Flux synthétique: {config.n_transactions:,} transactions, {config.wallet_count:,} wallets, "
+        f"{config.days} jours, seed {config.seed} ({generator.n_blocks} blocs)"
+    )
+    counts = {}
+
+    # 1. Flux labellisé (paysim_mapped)
+    for fmt in formats:
+        start_time = time.time()
+        path = args.out_dir / f"paysim_mapped.{fmt}"
+        rows = write_raw(generator.iter_blocks(), path)
+        counts["rows"] = rows
+        print(f"✅ {path} ({rows:,} lignes, {time.time() - start_time:.1f}s)")
+
+    # 2. Flux légitime (payon_legit_clean) : autre graine, mêmes habitudes, sans fraude
+    legit_rows = args.rows if args.legit_rows is None else args.legit_rows
+    if legit_rows > 0:
+        legit = SyntheticTransactionGenerator(
+            replace(config, n_transactions=legit_rows, seed=args.seed + 1, fraud_rate=0.0)
+        )
+        legit_columns = [c for c in RAW_COLUMNS if c not in ("is_fraud", "fraud_pattern")]
+        for fmt in formats:
+            start_time = time.time()
+            path = args.out_dir / f"payon_legit_clean.{fmt}"
+            rows = write_raw(legit.iter_blocks(), path, columns=legit_columns)
+            counts["legit_rows"] = rows
+            print(f"✅ {path} ({rows:,} lignes, {time.time() - start_time:.1f}s)")
+
+    # 3. Payloads POST /score (historique : fin du flux labellisé)
+    if args.payloads > 0:
+        start_time = time.time()
+        first_block = max(0, generator.n_blocks - args.payload_history_blocks)
+        history = pd.concat(list(generator.iter_blocks(first_block)), ignore_index=True)
+        windows = load_config(args.config_dir / "feature_config.yaml").get("windows")
+        payloads = build_score_payloads(history, generator.wallets(), args.payloads, seed=args.seed, windows=windows)
+        path = write_payloads(payloads, args.out_dir / "score_payloads.jsonl")
+        counts["payloads"] = len(payloads)
+        counts["payload_frauds"] = sum(p["transaction"]["metadata"]["is_fraud"] for p in payloads)
+        print(
+            f"✅ {path} ({len(payloads):,} payloads dont {counts['payload_frauds']} fraudes, "
+            f"{time.time() - start_time:.1f}s)"
+        )
+
+    # 4. Données SQL du backend
+    if args.sql:
+        start_time = time.time()
+        path = write_sql_seed(generator, args.out_dir / "seed.sql")
+        print(f"✅ {path} ({time.time() - start_time:.1f}s) — psql \"$DATABASE_URL\" -f {path}")
+
+    card_path = args.out_dir / "dataset_card.json"
+    with open(card_path, "w") as f:
+        json.dump(dataset_card(config, counts), f, indent=2)
+    print(f"✅ {card_path}")
+    print("\n💡 Lancer l'entraînement :")
+    print(f"   python scripts/train.py --data-dir {args.out_dir} --version synthetic")
+
+
+if __name__ == "__main__":
+    main()
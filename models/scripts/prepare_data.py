@@ -3,12 +3,16 @@
 Script de préparation des données pour l'entraînement.
 
 Génère les fichiers attendus dans Data/processed/ :
-- paysim_mapped.csv (depuis PaySim raw)
-- payon_legit_clean.csv (depuis Payon raw)
+- paysim_mapped.parquet/ (depuis PaySim raw, conversion en streaming par blocs)
+- payon_legit_clean.parquet/ (depuis Payon raw)
+- paysim_mapped.csv et payon_legit_clean.csv (sauf --no-csv)
+
+Les datasets .parquet (typés, partitionnés par date) sont préférés au CSV par train.py.
 
 Usage:
     python scripts/prepare_data.py
     python scripts/prepare_data.py --paysim Data/raw/mon_fichier.csv --payon Data/raw/mon_payon.csv
+    python scripts/prepare_data.py --no-csv --chunk-size 500000
 """
 
 from __future__ import annotations
@@ -18,10 +22,22 @@ import shutil
 import sys
 from pathlib import Path
 
+import pandas as pd
+
 # Ajouter le répertoire parent au PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.data.preparation import map_paysim_to_payon
+from src.data.columnar import ColumnarDatasetWriter, columnar_path
+from src.data.preparation import convert_paysim_to_columnar
+
+
+def _write_columnar(csv_path: Path, out_path: Path, chunk_size: int = 1_000_000) -> Path:
+    """Convertit un CSV au format Payon en dataset colonnaire (<nom>.parquet), par blocs."""
+    with ColumnarDatasetWriter(out_path) as writer:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+            writer.write(chunk)
+    print(f"✅ Dataset colonnaire: {out_path}")
+    return out_path
 
 
 def main():
@@ -44,11 +60,22 @@ def main():
         default=Path("Data/processed"),
         help="Dossier de sortie",
     )
+    parser.add_argument(
+        "--no-csv",
+        action="store_true",
+        help="Ne pas écrire les CSV (seulement les datasets Parquet)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1_000_000,
+        help="Lignes PaySim brutes lues par bloc (mémoire constante)",
+    )
     args = parser.parse_args()
 
     args.out_dir.mkdir(parents=True, exist_ok=True)
 
-    # 1. PaySim → paysim_mapped.csv
+    # 1. PaySim → paysim_mapped.parquet (+ paysim_mapped.csv)
     if not args.paysim.exists():
         print(f"❌ Fichier PaySim non trouvé: {args.paysim}")
         print("\n📋 Fichiers PaySim attendus dans Data/raw/ :")
@@ -56,12 +83,14 @@ def main():
         print("   - Ou Dataset_flaged.csv (avec colonnes: step, type, amount, nameOrig, nameDest, isFraud)")
         sys.exit(1)
 
-    map_paysim_to_payon(
+    convert_paysim_to_columnar(
         paysim_path=args.paysim,
-        output_path=args.out_dir / "paysim_mapped.csv",
+        output_path=columnar_path(args.out_dir, "paysim_mapped"),
+        csv_path=None if args.no_csv else args.out_dir / "paysim_mapped.csv",
+        chunk_size=args.chunk_size,
     )
 
-    # 2. Payon → payon_legit_clean.csv
+    # 2. Payon → payon_legit_clean.parquet (+ payon_legit_clean.csv)
     if not args.payon.exists():
         print(f"❌ Fichier Payon non trouvé: {args.payon}")
         print("\n📋 Fichiers Payon attendus dans Data/raw/ :")
@@ -69,14 +98,19 @@ def main():
         print("   - Ou dataset_legit_no_status.csv")
         sys.exit(1)
 
-    payon_out = args.out_dir / "payon_legit_clean.csv"
-    shutil.copy(args.payon, payon_out)
-    print(f"✅ Payon copié: {args.payon} → {payon_out}")
+    _write_columnar(args.payon, columnar_path(args.out_dir, "payon_legit_clean"), args.chunk_size)
+    if not args.no_csv:
+        payon_out = args.out_dir / "payon_legit_clean.csv"
+        shutil.copy(args.payon, payon_out)
+        print(f"✅ Payon copié: {args.payon} → {payon_out}")
 
     print("\n" + "=" * 50)
     print("✅ Préparation terminée !")
-    print(f"   {args.out_dir}/paysim_mapped.csv")
-    print(f"   {args.out_dir}/payon_legit_clean.csv")
+    print(f"   {args.out_dir}/paysim_mapped.parquet/")
+    print(f"   {args.out_dir}/payon_legit_clean.parquet/")
+    if not args.no_csv:
+        print(f"   {args.out_dir}/paysim_mapped.csv")
+        print(f"   {args.out_dir}/payon_legit_clean.csv")
     print("\n💡 Lancer l'entraînement :")
     print("   ./scripts/train-test.sh 2.0.1-mlflow 50000")
     print("   ou: ./scripts/train-local.sh 2.0.1-mlflow")
@@ -0,0 +1,344 @@
+"""
+Rafraîchissement incrémental des modèles à partir des labels de production.
+
+Sans repartir de PaySim :
+1. Export des transactions labellisées (revues humaines, REJECTED) et de
+   l'historique de leurs wallets ; features recalculées au moment de chaque
+   transaction
+2. Poursuite de l'entraînement LightGBM (init_model), nombre d'arbres borné,
+   early stopping sur les labels les plus récents
+3. Recalibration de l'IsolationForest sur une fenêtre récente
+4. Seuils et référence de drift recalculés sur la fenêtre récente, nouvelle
+   version des artefacts (symlink latest, comme train.py)
+
+Usage:
+    DATABASE_URL=postgresql+psycopg2://... python scripts/refresh_model.py --version 1.1.0
+    python scripts/refresh_model.py --version 1.1.0 --labels-file labels.parquet --recent-file recent.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.production import export_labeled_history, export_recent_transactions, load_export
+from src.features.aggregator import _parse_window
+from src.features.training import compute_features_for_splits
+from src.models.supervised.train import SupervisedModel
+from src.models.unsupervised.train import UnsupervisedModel
+from src.monitoring.drift import build_reference_histograms
+from src.scoring.scorer import GlobalScorer
+from src.utils.config import load_config
+
+# Artefacts de la version de base repris tels quels (les autres sont régénérés)
+_COPIED_ARTIFACTS = ("feature_schema.json",)
+
+
+def _parse_date(value: str) -> datetime:
+    """Date ISO (UTC si pas de fuseau)."""
+    date = pd.Timestamp(value)
+    return (date.tz_localize("UTC") if date.tzinfo is None else date.tz_convert("UTC")).to_pydatetime()
+
+
+def _features(transactions: pd.DataFrame, feature_kwargs: dict, columns: list) -> pd.DataFrame:
+    """Features point-in-time de toutes les lignes, alignées sur les colonnes du modèle."""
+    features = compute_features_for_splits({"production": transactions}, **feature_kwargs)["production"]
+    missing = [c for c in columns if c not in features.columns]
+    if missing:
+        print(f"   ⚠️  Features absentes (mises à 0): {', '.join(missing)}")
+    return features.reindex(columns=columns, fill_value=0)
+
+
+def _time_holdout(labels: pd.Series, order: pd.Series, ratio: float) -> tuple[pd.Index, pd.Index]:
+    """
+    Sépare les labels les plus récents (contrôle) du reste (entraînement).
+
+    Sans fraude ou sans légitime dans l'une des deux parties, tout est utilisé
+    pour l'entraînement (pas de contrôle).
+    """
+    ordered = order.sort_values(kind="stable").index
+    n_holdout = int(len(ordered) * ratio)
+    train_index, holdout_index = ordered[: len(ordered) - n_holdout], ordered[len(ordered) - n_holdout :]
+    if n_holdout == 0 or any(labels.loc[part].nunique() < 2 for part in (train_index, holdout_index)):
+        return labels.index, pd.Index([])
+    return train_index, holdout_index
+
+
+def _global_scores(supervised_scores: pd.Series, unsupervised_scores: pd.Series) -> pd.Series:
+    """Score global sans règles (rule_score=0), comme la calibration de train.py."""
+    scorer = GlobalScorer()
+    return pd.Series(
+        [
+            scorer.compute_score(rule_score=0.0, supervised_score=float(s), unsupervised_score=float(u))
+            for s, u in zip(supervised_scores, unsupervised_scores)
+        ]
+    )
+
+
+def _thresholds(global_scores: pd.Series) -> dict:
+    """Seuils BLOCK (top 0.1%) / REVIEW (top 1%) du score global, comme train.py."""
+    block_threshold, review_threshold = global_scores.quantile(0.999), global_scores.quantile(0.99)
+    if abs(block_threshold - review_threshold) < 0.001:
+        block_threshold = global_scores.quantile(0.995)
+        if block_threshold <= review_threshold:
+            block_threshold = review_threshold + 0.01
+    return {"block_threshold": float(block_threshold), "review_threshold": float(review_threshold)}
+
+
+def main():
+    """Point d'entrée principal."""
+    parser = argparse.ArgumentParser(description="Rafraîchissement incrémental des modèles (labels de production)")
+    parser.add_argument("--version", type=str, required=True, help="Version produite (SemVer)")
+    parser.add_argument(
+        "--base-version",
+        type=str,
+        default=None,
+        help="Version de départ (défaut: latest)",
+    )
+    parser.add_argument(
+        "--artifacts-dir",
+        type=Path,
+        default=Path(os.getenv("ARTIFACTS_DIR", "artifacts")),
+        help="Dossier des artefacts (ou variable ARTIFACTS_DIR)",
+    )
+    parser.add_argument("--config-dir", type=Path, default=Path("configs"), help="Dossier des configurations")
+    parser.add_argument(
+        "--database-url",
+        type=str,
+        default=os.getenv("DATABASE_URL"),
+        help="Base de production (URL SQLAlchemy ; défaut: DATABASE_URL)",
+    )
+    parser.add_argument(
+        "--labels-file",
+        type=Path,
+        default=None,
+        help="Export des labels déjà extrait (CSV/Parquet, colonnes de LABELED_HISTORY_QUERY), à la place de la base",
+    )
+    parser.add_argument(
+        "--recent-file",
+        type=Path,
+        default=None,
+        help="Export des transactions récentes (CSV/Parquet) pour la recalibration, à la place de la base",
+    )
+    parser.add_argument("--since", type=str, default=None, help="Début des labels exportés (ISO ; défaut: until - 7 jours)")
+    parser.add_argument("--until", type=str, default=None, help="Fin (exclue) des labels exportés (ISO ; défaut: maintenant)")
+    parser.add_argument("--no-rejected", action="store_true", help="Ignorer les transactions REJECTED sans revue")
+    parser.add_argument("--rounds", type=int, default=None, help="Arbres ajoutés au plus (défaut: model_config.yaml)")
+    parser.add_argument("--learning-rate", type=float, default=None, help="Taux d'apprentissage des nouveaux arbres")
+    parser.add_argument("--min-labels", type=int, default=50, help="Nombre minimal de labels pour rafraîchir")
+    parser.add_argument(
+        "--keep-thresholds",
+        action="store_true",
+        help="Conserver les seuils de la version de base (sinon recalculés sur la fenêtre récente)",
+    )
+    parser.add_argument("--n-jobs", type=int, default=None, help="Processus pour le calcul des features")
+    args = parser.parse_args()
+    start_time = time.time()
+
+    refresh_config = (load_config(args.config_dir / "model_config.yaml").get("supervised") or {}).get("refresh") or {}
+    feature_config_path = args.config_dir / "feature_config.yaml"
+    feature_config = load_config(feature_config_path) if feature_config_path.exists() else {}
+    label_lookback = _parse_window(refresh_config.get("label_lookback", "30d"))
+    feature_kwargs = {
+        "windows": feature_config.get("windows") or ["5m", "1h", "24h", "7d", "30d"],
+        "lookback": feature_config.get("history_lookback"),
+        "half_lives": feature_config.get("decay_half_lives") or [],
+        "n_jobs": args.n_jobs,
+    }
+
+    base_dir = (args.artifacts_dir / (f"v{args.base_version}" if args.base_version else "latest")).resolve()
+    if not (base_dir / "supervised_model.pkl").exists():
+        print(f"❌ Modèle supervisé introuvable dans {base_dir}")
+        sys.exit(1)
+    base_version = base_dir.name[1:] if base_dir.name.startswith("v") else base_dir.name
+
+    until = _parse_date(args.until) if args.until else datetime.now(timezone.utc)
+    since = _parse_date(args.since) if args.since else until - timedelta(days=7)
+    print(f"🔄 Rafraîchissement v{base_version} → v{args.version}")
+    print(f"   Labels du {since.isoformat()} au {until.isoformat()}")
+
+    # ========== 1. EXPORT DES LABELS ==========
+    if args.labels_file is not None:
+        history = load_export(args.labels_file)
+    elif args.database_url:
+        history = export_labeled_history(
+            args.database_url, since, until, lookback=label_lookback, include_rejected=not args.no_rejected
+        )
+    else:
+        print("❌ Fournir --database-url (ou DATABASE_URL) ou --labels-file")
+        sys.exit(1)
+    if args.no_rejected and "label_source" in history.columns:
+        history.loc[history["label_source"] == "rejected", "is_fraud"] = np.nan
+
+    labeled = history["is_fraud"].notna()
+    n_labels, n_frauds = int(labeled.sum()), int((history["is_fraud"] == 1).sum())
+    print(f"📥 {n_labels:,} transactions labellisées ({n_frauds:,} fraudes), {len(history):,} avec l'historique")
+    if n_labels < args.min_labels:
+        print(f"⚠️  Moins de {args.min_labels} labels : pas de rafraîchissement")
+        sys.exit(1)
+
+    supervised_model = SupervisedModel()
+    supervised_model.load(base_dir / "supervised_model.pkl")
+    unsupervised_model = UnsupervisedModel()
+    unsupervised_model.load(base_dir / "unsupervised_model.pkl")
+
+    print("\n🔧 Features point-in-time des transactions labellisées...")
+    features = _features(history, feature_kwargs, list(supervised_model.model.feature_name_))
+    X, y = features.loc[labeled], history.loc[labeled, "is_fraud"].astype(int)
+
+    # ========== 2. POURSUITE DE L'ENTRAÎNEMENT SUPERVISÉ ==========
+    print("\n🌲 Poursuite de l'entraînement LightGBM (init_model)...")
+    label_time = history["labeled_at"] if "labeled_at" in history.columns else history["created_at"]
+    train_index, holdout_index = _time_holdout(y, label_time.loc[labeled], float(refresh_config.get("holdout_ratio", 0.2)))
+    if len(holdout_index) == 0:
+        print("   ⚠️  Pas de contrôle exploitable (une seule classe) : tous les labels pour l'entraînement")
+    try:
+        supervised_metrics = supervised_model.refresh(
+            X.loc[train_index],
+            y.loc[train_index],
+            num_boost_round=args.rounds or int(refresh_config.get("num_boost_round", 100)),
+            learning_rate=args.learning_rate or refresh_config.get("learning_rate"),
+            val_data=X.loc[holdout_index] if len(holdout_index) else None,
+            val_labels=y.loc[holdout_index] if len(holdout_index) else None,
+            early_stopping_rounds=int(refresh_config.get("early_stopping_rounds", 20)),
+        )
+    except ValueError as e:
+        print(f"❌ Modèle de base non rafraîchissable ({base_dir / 'supervised_model.pkl'}): {e}")
+        sys.exit(1)
+    if supervised_metrics.get("val_pr_auc_after", 1.0) < supervised_metrics.get("val_pr_auc_before", 0.0):
+        print("   ⚠️  PR-AUC de contrôle en baisse : vérifier la version avant déploiement")
+    supervised_model.model_version = args.version
+
+    # ========== 3. RECALIBRATION NON SUPERVISÉE ==========
+    calibration_window = refresh_config.get("calibration_window", "7d")
+    window_start = until - _parse_window(calibration_window)
+    print(f"\n📐 Recalibration IsolationForest (fenêtre {calibration_window})...")
+    if args.recent_file is not None:
+        recent = load_export(args.recent_file)
+    elif args.database_url:
+        recent = export_recent_transactions(args.database_url, window_start - label_lookback, until)
+    else:
+        print("   ⚠️  Pas d'export récent : fenêtre prise dans l'historique des wallets labellisés")
+        recent = history
+    supervised_columns = list(supervised_model.model.feature_name_)
+    unsupervised_columns = list(getattr(unsupervised_model.model, "feature_names_in_", supervised_columns))
+    recent_features = _features(recent, feature_kwargs, list(dict.fromkeys(unsupervised_columns + supervised_columns)))
+    in_window = (recent["created_at"] >= window_start).to_numpy() & (recent["is_fraud"] != 1).to_numpy()
+    window_features = recent_features.loc[in_window]
+    calibration = unsupervised_model.recalibrate(window_features[unsupervised_columns])
+    unsupervised_model.model_version = args.version
+    print(
+        f"   ✅ {int(in_window.sum()):,} transactions légitimes, bornes "
+        f"[{calibration.get('min_before', float('nan')):.4f}, {calibration.get('max_before', float('nan')):.4f}] → "
+        f"[{calibration['min']:.4f}, {calibration['max']:.4f}]"
+    )
+
+    # ========== 4. SEUILS, RÉFÉRENCE DE DRIFT ET VERSIONNING ==========
+    # Scores des modèles rafraîchis sur la fenêtre récente (seuils et histogrammes de référence)
+    window_scores = {
+        "supervised_score": supervised_model.predict(window_features[supervised_columns]).reset_index(drop=True),
+        "unsupervised_score": unsupervised_model.predict(window_features[unsupervised_columns]).reset_index(drop=True),
+    }
+    window_scores["risk_score"] = _global_scores(window_scores["supervised_score"], window_scores["unsupervised_score"])
+    with open(base_dir / "thresholds.json", "r") as f:
+        thresholds = json.load(f)
+    if not args.keep_thresholds and in_window.sum() >= 1000:
+        thresholds = _thresholds(window_scores["risk_score"])
+        print(f"📊 Seuils recalculés: BLOCK {thresholds['block_threshold']:.4f}, REVIEW {thresholds['review_threshold']:.4f}")
+    elif not args.keep_thresholds:
+        print("⚠️  Fenêtre récente < 1000 transactions : seuils de la version de base conservés")
+
+    version_dir = args.artifacts_dir / f"v{args.version}"
+    version_dir.mkdir(parents=True, exist_ok=True)
+    for name in _COPIED_ARTIFACTS:
+        if (base_dir / name).exists():
+            shutil.copy2(base_dir / name, version_dir / name)
+    schema_path = version_dir / "feature_schema.json"
+    if schema_path.exists():
+        with open(schema_path, "r") as f:
+            schema = json.load(f)
+        with open(schema_path, "w") as f:
+            json.dump({**schema, "version": args.version}, f, indent=2)
+    supervised_model.save(version_dir / "supervised_model.pkl")
+    unsupervised_model.save(version_dir / "unsupervised_model.pkl")
+    with open(version_dir / "thresholds.json", "w") as f:
+        json.dump(thresholds, f, indent=2)
+    # Référence de drift régénérée : les scores de la version de base ne correspondent plus aux modèles
+    drift_reference = {
+        "version": args.version,
+        "features": build_reference_histograms(window_features[supervised_columns]),
+        "scores": build_reference_histograms(window_scores),
+    }
+    with open(version_dir / "drift_reference.json", "w") as f:
+        json.dump(drift_reference, f)
+    history.to_parquet(version_dir / "refresh_labels.parquet", index=False)
+
+    label_sources = (
+        history.loc[labeled, "label_source"].value_counts().to_dict() if "label_source" in history.columns else {}
+    )
+    report = {
+        "version": args.version,
+        "base_version": base_version,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "labels": n_labels,
+        "frauds": n_frauds,
+        "label_sources": {str(k): int(v) for k, v in label_sources.items()},
+        "train_labels": len(train_index),
+        "holdout_labels": len(holdout_index),
+        "supervised": supervised_metrics,
+        "calibration_window": calibration_window,
+        "calibration_rows": int(in_window.sum()),
+        "calibration": calibration,
+        "thresholds": thresholds,
+        "seconds": time.time() - start_time,
+    }
+    with open(version_dir / "refresh_report.json", "w") as f:
+        json.dump(report, f, indent=2)
+
+    latest_path = args.artifacts_dir / "latest"
+    if latest_path.exists() or latest_path.is_symlink():
+        latest_path.unlink()
+    latest_path.symlink_to(f"v{args.version}")
+
+    # MLflow : activé si MLFLOW_EXPERIMENT_NAME ou MLFLOW_TRACKING_URI est défini
+    if os.getenv("MLFLOW_EXPERIMENT_NAME") or os.getenv("MLFLOW_TRACKING_URI"):
+        import mlflow
+
+        mlflow.set_experiment(os.getenv("MLFLOW_EXPERIMENT_NAME", "/Shared/Sentinelle Production"))
+        with mlflow.start_run(run_name=f"refresh-v{args.version}"):
+            mlflow.set_tags({"project": "sentinelle", "run_type": "refresh", "base_version": base_version})
+            mlflow.log_params({"version": args.version, "since": report["since"], "until": report["until"]})
+            mlflow.log_metrics(
+                {
+                    "labels": float(n_labels),
+                    "frauds": float(n_frauds),
+                    **{f"refresh_{k}": float(v) for k, v in supervised_metrics.items()},
+                    "block_threshold": thresholds["block_threshold"],
+                    "review_threshold": thresholds["review_threshold"],
+                }
+            )
+            mlflow.log_dict(report, "refresh_report.json")
+
+    print("\n" + "=" * 60)
+    print(f"✅ RAFRAÎCHISSEMENT TERMINÉ en {report['seconds']:.0f}s")
+    print("=" * 60)
+    print(f"Version: {args.version} (base: {base_version})")
+    print(f"Artefacts: {version_dir}")
+    print(f"Symlink 'latest' → v{args.version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Scoring offline d'un fichier de transactions enrichies (sans HTTP).
+
+Rejoue exactement le pipeline de l'endpoint /score
+(FeaturePipeline → RulesEngine → prédicteurs → GlobalScorer → DecisionEngine)
+sur un fichier CSV ou Parquet, et écrit un Parquet avec tous les scores
+intermédiaires (rule_score, supervised_score, unsupervised_score, boost_factor,
+risk_score, decision).
+
+Format d'entrée : une ligne par transaction enrichie, colonnes "aplaties" avec
+des points (comme pd.json_normalize sur le body de /score) :
+- features.transactional.<nom>, features.historical.<nom>
+- context.<nom> (optionnel)
+- transaction.<champ> ou directement <champ> pour les champs de la transaction
+
+Le fichier est lu par chunks et les chunks sont répartis sur des processus
+workers qui chargent chacun les modèles une seule fois.
+
+Usage:
+    python scripts/score_offline.py --input Data/replay.parquet --output Data/replay_scores.parquet
+    python scripts/score_offline.py --input incident.csv --output out.parquet --model-version v2.0.1 --n-jobs 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import multiprocessing as mp
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Iterator
+
+import pandas as pd
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.scoring.pipeline import ScoringPipeline
+
+# Colonnes de scores écrites pour chaque transaction
+SCORE_COLUMNS = [
+    "rule_score",
+    "rules_decision",
+    "boost_factor",
+    "supervised_score",
+    "unsupervised_score",
+    "distilled_score",
+    "risk_score",
+    "decision",
+    "reasons",
+    "error",
+]
+
+# Types des colonnes recopiées par défaut, quand le Parquet d'entrée ne les fixe pas :
+# un premier chunk sans label (colonne entièrement nulle) ne doit pas figer un type null
+CARRY_TYPES = {
+    "transaction_id": "string",
+    "transaction.transaction_id": "string",
+    "is_fraud": "int64",
+    "label": "string",
+}
+
+# Pipeline chargé une fois par processus worker (voir _init_worker)
+_PIPELINE: ScoringPipeline | None = None
+
+
+def _init_worker(model_version: str, artifacts_dir: str) -> None:
+    """Charge les modèles une seule fois par processus worker."""
+    global _PIPELINE
+    _PIPELINE = ScoringPipeline.load(model_version, Path(artifacts_dir), verbose=False)
+
+
+def _clean_value(value: Any) -> Any:
+    """Convertit les NaN en None et les listes sérialisées (CSV) en listes."""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, str) and value.startswith("["):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    if hasattr(value, "tolist"):  # numpy array / scalar (Parquet)
+        return value.tolist()
+    return value
+
+
+def _row_to_request(row: dict[str, Any]) -> tuple[dict[str, Any], dict[str, Any]]:
+    """
+    Reconstruit (transaction enrichie, context) depuis une ligne aplatie.
+
+    Args:
+        row: Ligne avec des colonnes "a.b.c"
+
+    Returns:
+        Tuple (transaction avec features.transactional/historical, context)
+    """
+    nested: dict[str, Any] = {}
+    for key, value in row.items():
+        parts = str(key).split(".")
+        node = nested
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = _clean_value(value)
+
+    context = nested.pop("context", None) or {}
+    features = nested.pop("features", None) or {}
+    transaction = nested.pop("transaction", None) or nested
+    transaction["features"] = {
+        "transactional": features.get("transactional") or {},
+        "historical": features.get("historical") or {},
+    }
+    return transaction, context
+
+
+def _score_chunk(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Score un chunk de lignes dans un worker (pipeline déjà chargé)."""
+    rows = []
+    for record in records:
+        transaction, context = _row_to_request(record)
+        try:
+            result = _PIPELINE.score(transaction, context)
+        except Exception as e:
+            # Une ligne invalide ne fait pas échouer le batch
+            rows.append({column: None for column in SCORE_COLUMNS} | {"error": str(e)})
+            continue
+        rows.append(
+            {
+                "rule_score": result.rule_score,
+                "rules_decision": result.rules_decision,
+                "boost_factor": result.boost_factor,
+                "supervised_score": result.supervised_score,
+                "unsupervised_score": result.unsupervised_score,
+                "distilled_score": result.distilled_score,
+                "risk_score": result.risk_score,
+                "decision": result.decision,
+                "reasons": result.reasons,
+                "error": None,
+            }
+        )
+    return rows
+
+
+def _iter_input_chunks(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Lit le fichier d'entrée par chunks (CSV ou Parquet) sans le charger entièrement."""
+    if path.suffix == ".parquet" or path.is_dir():
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(path, format="parquet")
+        for batch in dataset.to_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif path.suffix == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    else:
+        raise ValueError(f"Format non supporté: {path.suffix} (attendu .csv ou .parquet)")
+
+
+def _input_schema(path: Path):
+    """Schéma du Parquet d'entrée (None pour un CSV : types déduits des chunks)."""
+    if path.suffix == ".parquet" or path.is_dir():
+        import pyarrow.dataset as ds
+
+        return ds.dataset(path, format="parquet").schema
+    return None
+
+
+def _carry_schema(columns: list[str], input_schema, first_chunk: pd.DataFrame | None):
+    """
+    Types des colonnes recopiées, fixés pour tout le fichier de sortie.
+
+    Ordre de priorité : type du Parquet d'entrée, CARRY_TYPES, type déduit du
+    premier chunk (string si la colonne y est entièrement nulle).
+    """
+    import pyarrow as pa
+
+    fields = []
+    for column in columns:
+        field_type = input_schema.field(column).type if input_schema is not None else None
+        if field_type is None or pa.types.is_null(field_type):
+            if column in CARRY_TYPES:
+                field_type = pa.type_for_alias(CARRY_TYPES[column])
+            elif first_chunk is not None and first_chunk[column].notna().any():
+                field_type = pa.Schema.from_pandas(first_chunk[[column]], preserve_index=False).field(column).type
+            else:
+                field_type = pa.string()
+        fields.append(pa.field(column, field_type))
+    return pa.schema(fields)
+
+
+def _to_text(value: Any) -> Any:
+    """Valeur d'une colonne recopiée de type string (1.0 lu d'un CSV avec des vides → "1")."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _carry_frame(chunk: pd.DataFrame, carry_schema) -> pd.DataFrame:
+    """Colonnes recopiées d'un chunk, converties pour le schéma de sortie."""
+    import pyarrow as pa
+
+    frame = chunk[carry_schema.names].reset_index(drop=True)
+    for field in carry_schema:
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            frame[field.name] = frame[field.name].map(_to_text).astype(object)
+    return frame
+
+
+def _output_schema(carry_schema):
+    """Schéma Parquet de sortie : colonnes conservées + scores typés explicitement."""
+    import pyarrow as pa
+
+    score_fields = [
+        pa.field("rule_score", pa.float64()),
+        pa.field("rules_decision", pa.string()),
+        pa.field("boost_factor", pa.float64()),
+        pa.field("supervised_score", pa.float64()),
+        pa.field("unsupervised_score", pa.float64()),
+        pa.field("distilled_score", pa.float64()),
+        pa.field("risk_score", pa.float64()),
+        pa.field("decision", pa.string()),
+        pa.field("reasons", pa.list_(pa.string())),
+        pa.field("error", pa.string()),
+    ]
+    return pa.schema(list(carry_schema) + score_fields)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Scoring offline (pipeline /score sans HTTP)")
+    parser.add_argument("--input", type=Path, required=True, help="Fichier CSV ou Parquet de transactions enrichies")
+    parser.add_argument("--output", type=Path, required=True, help="Fichier Parquet de sortie")
+    parser.add_argument("--model-version", default="latest", help="Version du modèle (ex: v1.0.0 ou latest)")
+    parser.add_argument("--artifacts-dir", type=Path, default=Path("artifacts"), help="Dossier des artefacts")
+    parser.add_argument("--n-jobs", type=int, default=max(1, mp.cpu_count() - 1), help="Nombre de processus workers")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Nombre de lignes par chunk")
+    parser.add_argument(
+        "--keep-columns",
+        nargs="*",
+        default=["transaction_id", "transaction.transaction_id", "is_fraud", "label"],
+        help="Colonnes d'entrée recopiées dans la sortie (si présentes)",
+    )
+    args = parser.parse_args(argv)
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if not args.input.exists():
+        print(f"❌ Fichier d'entrée non trouvé: {args.input}")
+        sys.exit(1)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"🚀 Scoring offline: {args.input} → {args.output}")
+    print(f"   Modèle: {args.model_version} ({args.artifacts_dir})")
+    print(f"   {args.n_jobs} processus, chunks de {args.chunk_size:,} lignes")
+
+    start_time = time.time()
+    total_rows = 0
+    decisions: dict[str, int] = {}
+    writer = None
+    carry_schema = None
+    input_schema = _input_schema(args.input)
+
+    def _write_chunk(chunk: pd.DataFrame, scores: list[dict[str, Any]]) -> None:
+        nonlocal writer, carry_schema, total_rows
+        if writer is None:
+            # Schéma fixé au premier chunk pour tout le fichier (types des colonnes recopiées explicites)
+            carry_columns = [c for c in args.keep_columns if c in chunk.columns]
+            carry_schema = _carry_schema(carry_columns, input_schema, chunk)
+            writer = pq.ParquetWriter(args.output, _output_schema(carry_schema))
+        out_df = pd.concat(
+            [
+                _carry_frame(chunk, carry_schema),
+                pd.DataFrame(scores, columns=SCORE_COLUMNS),
+            ],
+            axis=1,
+        )
+        writer.write_table(pa.Table.from_pandas(out_df, schema=writer.schema, preserve_index=False))
+
+        total_rows += len(out_df)
+        for decision, count in out_df["decision"].fillna("ERROR").value_counts().items():
+            decisions[decision] = decisions.get(decision, 0) + int(count)
+        elapsed = time.time() - start_time
+        print(f"   ✅ {total_rows:,} transactions scorées ({total_rows / elapsed:.0f} tx/s)", flush=True)
+
+    # Nombre borné de chunks en vol : mémoire constante quelle que soit la taille du fichier.
+    # Les résultats sont écrits dans l'ordre d'entrée.
+    max_in_flight = 2 * args.n_jobs
+    in_flight: deque = deque()
+    with mp.Pool(
+        processes=args.n_jobs,
+        initializer=_init_worker,
+        initargs=(args.model_version, str(args.artifacts_dir)),
+    ) as pool:
+        for chunk in _iter_input_chunks(args.input, args.chunk_size):
+            in_flight.append((chunk, pool.apply_async(_score_chunk, (chunk.to_dict("records"),))))
+            if len(in_flight) >= max_in_flight:
+                done_chunk, result = in_flight.popleft()
+                _write_chunk(done_chunk, result.get())
+        while in_flight:
+            done_chunk, result = in_flight.popleft()
+            _write_chunk(done_chunk, result.get())
+
+    if writer is None:
+        # Entrée vide : fichier vide avec le schéma des scores
+        carry_columns = [c for c in args.keep_columns if input_schema is not None and c in input_schema.names]
+        writer = pq.ParquetWriter(args.output, _output_schema(_carry_schema(carry_columns, input_schema, None)))
+    writer.close()
+
+    elapsed = time.time() - start_time
+    print(f"\n✅ Scoring terminé: {total_rows:,} transactions en {elapsed:.1f}s")
+    for decision, count in sorted(decisions.items()):
+        print(f"   {decision}: {count:,} ({count / max(total_rows, 1) * 100:.2f}%)")
+    print(f"💾 Résultats: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Simulation "what-if" des poids et seuils de scoring sur des scores loggés.
+
+Charge les scores intermédiaires (logs d'inférence JSONL téléchargés, ou sortie
+Parquet de scripts/score_offline.py), puis recalcule les décisions pour une
+grille de poids × seuils, sans re-scorer les transactions.
+
+Usage:
+    python scripts/simulate_scoring.py --input Data/replay_scores.parquet --label-column is_fraud \\
+        --supervised-weights 0.5 0.6 0.7 --unsupervised-weights 0.1 0.2 \\
+        --review-thresholds 0.6 0.7 0.8 --block-thresholds 0.9 0.95 0.99
+    python scripts/simulate_scoring.py --input logs/2026/03/ --output Data/simulation.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.scoring.simulation import load_score_components, simulate_grid
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulation des poids/seuils de scoring")
+    parser.add_argument("--input", type=Path, nargs="+", required=True, help="Fichiers ou dossiers .jsonl/.parquet")
+    parser.add_argument("--label-column", default=None, help="Colonne de label 0/1 (ex: is_fraud)")
+    parser.add_argument(
+        "--config",
+        type=Path,
+        default=Path("configs/scoring_config.yaml"),
+        help="Configuration actuelle (poids/seuils de référence, toujours inclus dans la grille)",
+    )
+    parser.add_argument("--rule-weights", type=float, nargs="*", default=None)
+    parser.add_argument("--supervised-weights", type=float, nargs="*", default=None)
+    parser.add_argument("--unsupervised-weights", type=float, nargs="*", default=None)
+    parser.add_argument("--review-thresholds", type=float, nargs="*", default=None)
+    parser.add_argument("--block-thresholds", type=float, nargs="*", default=None)
+    parser.add_argument("--output", type=Path, default=None, help="Export CSV des résultats")
+    parser.add_argument("--top", type=int, default=20, help="Nombre de lignes affichées")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.safe_load(f) or {}
+    current_weights = config.get("weights", {"rule_score": 0.2, "supervised": 0.6, "unsupervised": 0.2})
+    current_thresholds = config.get("thresholds", {"block": 0.99, "review": 0.99})
+
+    # Grille : produit cartésien (les valeurs actuelles sont toujours incluses)
+    weight_grid = [
+        {"rule_score": r, "supervised": s, "unsupervised": u}
+        for r, s, u in itertools.product(
+            sorted(set(args.rule_weights or []) | {current_weights["rule_score"]}),
+            sorted(set(args.supervised_weights or []) | {current_weights["supervised"]}),
+            sorted(set(args.unsupervised_weights or []) | {current_weights["unsupervised"]}),
+        )
+    ]
+    threshold_grid = [
+        {"review": r, "block": b}
+        for r, b in itertools.product(
+            sorted(set(args.review_thresholds or []) | {current_thresholds["review"]}),
+            sorted(set(args.block_thresholds or []) | {current_thresholds["block"]}),
+        )
+    ]
+
+    print(f"📊 Chargement des scores intermédiaires: {', '.join(str(p) for p in args.input)}")
+    start_time = time.time()
+    components = load_score_components(args.input, label_column=args.label_column)
+    print(f"   ✅ {len(components):,} lignes chargées en {time.time() - start_time:.1f}s")
+    print(f"   Hard blocks (règles): {int(components.hard_block.sum()):,}")
+    if components.distilled_score is not None:
+        n_distilled = int(np.isfinite(components.distilled_score).sum())
+        print(f"   Mode distillé: {n_distilled:,} lignes (distilled_score fixe, poids ML sans effet)")
+    if components.labels is not None:
+        print(f"   Labels positifs: {int(components.labels.sum()):,}")
+    else:
+        print("   ℹ️  Pas de labels: précision/rappel non calculés")
+
+    print(f"\n🔧 Simulation: {len(weight_grid)} jeux de poids × {len(threshold_grid)} couples de seuils")
+    start_time = time.time()
+    results = simulate_grid(components, weight_grid, threshold_grid)
+    print(f"   ✅ {len(results):,} combinaisons évaluées en {time.time() - start_time:.1f}s")
+
+    sort_column = "flagged_precision" if components.labels is not None else "block_rate"
+    results = results.sort_values(sort_column, ascending=components.labels is None)
+
+    current = results[
+        (results["w_rule_score"] == current_weights["rule_score"])
+        & (results["w_supervised"] == current_weights["supervised"])
+        & (results["w_unsupervised"] == current_weights["unsupervised"])
+        & (results["block_threshold"] == current_thresholds["block"])
+        & (results["review_threshold"] == current_thresholds["review"])
+    ]
+    print("\n📌 Configuration actuelle:")
+    print(current.to_string(index=False))
+    print(f"\n🏆 Top {args.top} (tri: {sort_column}):")
+    print(results.head(args.top).to_string(index=False))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        results.to_csv(args.output, index=False)
+        print(f"\n💾 Résultats: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
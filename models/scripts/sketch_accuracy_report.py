@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Précision du backend sketch des features de destinataires vs agrégation exacte.
+
+Rejoue PaySim (dataset colonnaire paysim_mapped.parquet, sinon
+paysim_mapped.csv) avec StreamingFeatureEngine en backend exact puis en
+backend sketch pour chaque couple (precision HyperLogLog, capacité top-k),
+et compare les features de destinataires : erreur absolue moyenne,
+p99, taille d'état par wallet (compteurs, sketches et paires source → destination).
+
+Usage:
+    python scripts/sketch_accuracy_report.py --data-dir Data/processed --max-rows 500000
+    python scripts/sketch_accuracy_report.py --precisions 6 8 10 --capacities 8 32 --output reports/sketches.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Ajouter le répertoire parent au PYTHONPATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.data.columnar import columnar_path, is_columnar_dataset, load_columnar_dataset
+from src.features.streaming import StreamingFeatureEngine, replay_historical_features
+
+DESTINATION_FEATURES = (
+    "src_unique_destinations_",
+    "src_destination_concentration_7d",
+    "src_destination_entropy_7d",
+    "days_since_last_src_to_dst",  # paires évincées hors horizon (--lookback full : au-delà de 30d)
+)
+
+
+def _replay(transactions: pd.DataFrame, engine: StreamingFeatureEngine) -> tuple[pd.DataFrame, dict, float]:
+    """Rejoue le dataset et retourne (features, tailles d'état, durée)."""
+    start_time = time.time()
+    features = replay_historical_features(transactions, engine=engine)
+    elapsed = time.time() - start_time
+    sizes = np.array(list(engine.destination_state_sizes().values()) or [0])
+    state = {"mean": float(sizes.mean()), "p99": float(np.percentile(sizes, 99)), "max": int(sizes.max())}
+    return features, state, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Précision des sketches de destinataires vs exact")
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=Path(os.getenv("DATA_DIR", "Data/processed")),
+        help="Dossier contenant paysim_mapped.parquet ou paysim_mapped.csv (ou variable DATA_DIR)",
+    )
+    parser.add_argument("--max-rows", type=int, default=None, help="Premières lignes (ordre de created_at)")
+    parser.add_argument("--lookback", default="30d", help="Profondeur d'historique ('full' = illimitée)")
+    parser.add_argument("--precisions", type=int, nargs="+", default=[6, 8, 10], help="log2 registres HyperLogLog")
+    parser.add_argument("--capacities", type=int, nargs="+", default=[8, 32], help="Tailles du top-k 7d")
+    parser.add_argument("--output", type=Path, default=None, help="Export JSON du rapport")
+    args = parser.parse_args()
+
+    # Dataset colonnaire préféré (prepare_data.py --no-csv n'écrit pas le CSV)
+    paysim_path = columnar_path(args.data_dir, "paysim_mapped")
+    if is_columnar_dataset(paysim_path):
+        print(f"📊 Chargement (colonnaire): {paysim_path}")
+        transactions = load_columnar_dataset(paysim_path)
+    else:
+        paysim_path = args.data_dir / "paysim_mapped.csv"
+        print(f"📊 Chargement: {paysim_path}")
+        transactions = pd.read_csv(paysim_path)
+        transactions["created_at"] = pd.to_datetime(transactions["created_at"], utc=True)
+        transactions = transactions.sort_values("created_at", kind="mergesort").reset_index(drop=True)
+    if args.max_rows:
+        transactions = transactions.iloc[: args.max_rows]
+    lookback = None if args.lookback == "full" else args.lookback
+    print(f"   {len(transactions):,} transactions, {transactions['source_wallet_id'].nunique():,} wallets")
+
+    print("\n🎯 Backend exact...")
+    exact, exact_state, exact_time = _replay(transactions, StreamingFeatureEngine(lookback=lookback))
+    columns = [c for c in exact.columns if c.startswith(DESTINATION_FEATURES)]
+    print(f"   ✅ {exact_time:.1f}s | état/wallet: moy {exact_state['mean']:.0f}, max {exact_state['max']}")
+
+    report = {
+        "rows": len(transactions),
+        "lookback": args.lookback,
+        "exact": {"seconds": exact_time, "state_entries": exact_state},
+        "sketches": [],
+    }
+    for precision, capacity in itertools.product(args.precisions, args.capacities):
+        print(f"\n🧮 Sketch precision={precision}, capacity={capacity}...")
+        engine = StreamingFeatureEngine(
+            lookback=lookback,
+            destination_backend="sketch",
+            sketch_precision=precision,
+            sketch_capacity=capacity,
+        )
+        sketched, state, elapsed = _replay(transactions, engine)
+        errors = {}
+        for column in columns:
+            error = (sketched[column].astype(float) - exact[column].astype(float)).abs()
+            scale = exact[column].astype(float).abs().clip(lower=1.0)
+            errors[column] = {
+                "mae": float(error.mean()),
+                "p99": float(error.quantile(0.99)),
+                "max": float(error.max()),
+                "mean_relative": float((error / scale).mean()),
+            }
+            print(f"   {column:<40} MAE {errors[column]['mae']:.4f} | p99 {errors[column]['p99']:.4f}")
+        print(f"   ✅ {elapsed:.1f}s | état/wallet: moy {state['mean']:.0f}, max {state['max']}")
+        report["sketches"].append(
+            {
+                "precision": precision,
+                "capacity": capacity,
+                "seconds": elapsed,
+                "state_entries": state,
+                "errors": errors,
+            }
+        )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\n💾 Rapport: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,13 +17,13 @@ echo "   Artefacts: $ARTIFACTS_DIR"
 echo ""
 
 # Vérifier que les données existent
-if [ ! -f "$DATA_DIR/paysim_mapped.csv" ]; then
-    echo "❌ Erreur: $DATA_DIR/paysim_mapped.csv non trouvé"
+if [ ! -f "$DATA_DIR/paysim_mapped.csv" ] && [ ! -d "$DATA_DIR/paysim_mapped.parquet" ]; then
+    echo "❌ Erreur: $DATA_DIR/paysim_mapped.parquet (ou .csv) non trouvé"
     exit 1
 fi
 
-if [ ! -f "$DATA_DIR/payon_legit_clean.csv" ]; then
-    echo "❌ Erreur: $DATA_DIR/payon_legit_clean.csv non trouvé"
+if [ ! -f "$DATA_DIR/payon_legit_clean.csv" ] && [ ! -d "$DATA_DIR/payon_legit_clean.parquet" ]; then
+    echo "❌ Erreur: $DATA_DIR/payon_legit_clean.parquet (ou .csv) non trouvé"
     exit 1
 fi
 
@@ -17,19 +17,33 @@ import json
 import os
 import pickle
 import sys
+import time
+from dataclasses import asdict
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import pandas as pd
 from sklearn.metrics import accuracy_score, average_precision_score, f1_score
 
 # Ajouter le répertoire parent au PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.data.columnar import columnar_path, is_columnar_dataset, load_columnar_dataset, read_columnar_metadata
 from src.data.preparation import prepare_training_data
-from src.features.training import compute_features_for_dataset
+from src.data.sampling import CORRECTIONS, downsample_negatives
+from src.features.cache import FeatureCache, feature_code_version
+from src.features.pruning import importance_table, lightgbm_importance, permutation_impact, plan_pruning
+from src.features.training import compute_features_for_splits
+from src.models.distilled.predictor import DistilledPredictor
+from src.models.distilled.train import decision_buckets, distill_ensemble, ensemble_model_scores, request_latency_us
+from src.models.supervised.search import run_search
 from src.models.supervised.train import train_supervised_model
 from src.models.unsupervised.train import train_unsupervised_model
+from src.monitoring.drift import build_reference_histograms
+from src.utils.config import load_config
+from src.utils.profiling import Profiler, annotate
+from src.utils.stages import Stage, run_stages
 from src.utils.versioning import save_artifacts
 from src.scoring.scorer import GlobalScorer
 
@@ -42,7 +56,7 @@ def _convert_features_to_numeric(df: pd.DataFrame) -> pd.DataFrame:
     - Si booléennes → bool
     - Sinon → float (avec gestion des NaN)
     """
-    df_converted = df.copy()
+    df_converted = df.copy(deep=False)  # seules les colonnes converties sont réallouées
     
     for col in df_converted.columns:
         dtype = df_converted[col].dtype
@@ -61,6 +75,205 @@ def _convert_features_to_numeric(df: pd.DataFrame) -> pd.DataFrame:
     return df_converted
 
 
+def _split_features_cache_entry(
+    *,
+    feature_cache: FeatureCache,
+    data_path: Path,
+    split_params: dict,
+    splits: dict,
+    **feature_kwargs,
+) -> tuple[str, dict]:
+    """
+    Clé de cache des features des splits (et paramètres enregistrés dans l'entrée).
+
+    La clé couvre le fichier de données, les paramètres de split et de
+    features, et le code (src/features + préparation des données).
+    """
+    sources = sorted((Path(__file__).parent.parent / "src" / "features").glob("*.py"))
+    sources.append(Path(__file__).parent.parent / "src" / "data" / "preparation.py")
+    params = {
+        **split_params,
+        **{k: v for k, v in feature_kwargs.items() if k not in ("n_jobs", "checkpoint_dir")},
+        "rows": {name: len(df) for name, df in splits.items()},
+    }
+    return feature_cache.key([data_path], params, code_version=feature_code_version(sources)), params
+
+
+def _load_cached_split_features(feature_cache: FeatureCache, key: str, splits: dict) -> dict | None:
+    """Features des splits relues depuis le cache, None si absentes ou incomplètes."""
+    cached = feature_cache.load(key)
+    if cached is not None and all(len(cached.get(name, [])) == len(df) for name, df in splits.items()):
+        print(f"   ♻️  Features lues depuis le cache ({key})")
+        return cached
+    return None
+
+
+def _compute_split_features(
+    *,
+    feature_cache: FeatureCache | None,
+    data_path: Path,
+    split_params: dict,
+    splits: dict,
+    cache_entry: tuple[str, dict] | None = None,
+    **feature_kwargs,
+) -> dict:
+    """
+    Features des splits, relues depuis le cache si disponible.
+
+    Avec cache_entry (clé déjà calculée et absente du cache), le cache n'est
+    pas relu : les features sont calculées puis enregistrées.
+    """
+    if feature_cache is None:
+        return compute_features_for_splits(splits, **feature_kwargs)
+
+    if cache_entry is None:
+        cache_entry = _split_features_cache_entry(
+            feature_cache=feature_cache, data_path=data_path, split_params=split_params, splits=splits, **feature_kwargs
+        )
+        cached = _load_cached_split_features(feature_cache, cache_entry[0], splits)
+        if cached is not None:
+            return cached
+    key, params = cache_entry
+    features = compute_features_for_splits(splits, **feature_kwargs)
+    entry = feature_cache.save(key, features, metadata={"data_file": str(data_path), "params": params})
+    print(f"   💾 Features mises en cache: {entry}")
+    return features
+
+
+def _feature_memory_mb(splits: dict, n_features: int = 80) -> float:
+    """Estimation mémoire d'une étape de features (float64, matrice + copies de travail)."""
+    rows = sum(len(df) for df in splits.values())
+    return 3 * rows * n_features * 8 / (1024.0 * 1024.0)
+
+
+def _load_splits(data_dir: Path, name: str, label: str, args, split_ratios: dict) -> tuple:
+    """
+    Charge un dataset et le découpe en (train, val, test).
+
+    Le dataset colonnaire <name>.parquet est préféré au CSV : --test-size et
+    les dates de split sont poussés jusqu'au scan Parquet. Avec des dates de
+    split, le test (hors entraînement) n'est lu que pour les colonnes loggées.
+
+    Returns:
+        (train, val, test, chemin des données, colonnaire ou non)
+    """
+    split_kwargs = {**split_ratios, "train_end": args.train_split_date, "val_end": args.val_split_date}
+    path = columnar_path(data_dir, name)
+    if is_columnar_dataset(path):
+        print(f"📊 Chargement {label} (colonnaire): {path}")
+        if args.val_split_date and args.test_size is None:
+            df = load_columnar_dataset(path, end=args.val_split_date)
+            print(f"   ✅ {len(df):,} transactions chargées (avant {args.val_split_date})")
+            train_df, val_df, _ = prepare_training_data(df, **split_kwargs)
+            del df
+            test_columns = [c for c in ("created_at", "is_fraud") if c in read_columnar_metadata(path)["columns"]]
+            test_df = load_columnar_dataset(path, start=args.val_split_date, columns=test_columns)
+            print(f"   Test (colonnes {', '.join(test_columns)}): {len(test_df):,} transactions")
+            return train_df, val_df, test_df, path, True
+        df = load_columnar_dataset(path, tail_rows=args.test_size)
+        print(f"   ✅ {len(df):,} transactions chargées")
+        if args.test_size is not None:
+            print(f"   🧪 MODE TEST: {args.test_size:,} transactions les plus récentes")
+            print(f"   📅 Période: {df['created_at'].min()} → {df['created_at'].max()}")
+        return (*prepare_training_data(df, **split_kwargs), path, True)
+
+    path = data_dir / f"{name}.csv"
+    if not path.exists():
+        raise FileNotFoundError(f"Dataset {label} non trouvé: {path}")
+    print(f"📊 Chargement {label}: {path}")
+    df = pd.read_csv(path)
+    df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
+    print(f"   ✅ {len(df)} transactions chargées")
+
+    # Mode test : limiter aux N transactions les plus récentes
+    if args.test_size is not None:
+        print(f"\n🧪 MODE TEST: Limitation à {args.test_size:,} transactions les plus récentes")
+        # Trier par date (plus récentes en dernier) et prendre les N dernières
+        df = df.sort_values("created_at").tail(args.test_size).reset_index(drop=True)
+        print(f"   ✅ Dataset limité à {len(df):,} transactions")
+        print(f"   📅 Période: {df['created_at'].min()} → {df['created_at'].max()}")
+    return (*prepare_training_data(df, **split_kwargs), path, False)
+
+
+def _sampling_report(
+    *,
+    train_df: pd.DataFrame,
+    train_features: pd.DataFrame,
+    train_labels: pd.Series,
+    val_features: pd.DataFrame,
+    val_labels: pd.Series,
+    rates: list,
+    correction: str,
+) -> pd.DataFrame:
+    """
+    PR-AUC de validation et durée d'entraînement par taux de sous-échantillonnage des légitimes.
+
+    Returns:
+        Une ligne par taux (lignes d'entraînement, fraudes, secondes, PR-AUC)
+    """
+    rows = []
+    for rate in rates:
+        start_time = time.time()
+        positions, weights = downsample_negatives(train_df, train_labels, rate)
+        labels = train_labels.iloc[positions].reset_index(drop=True)
+        model = train_supervised_model(
+            train_data=train_features.iloc[positions].reset_index(drop=True),
+            train_labels=labels,
+            val_data=val_features,
+            val_labels=val_labels,
+            sample_weight=weights if correction == "weight" else None,
+            negative_sampling_rate=rate if rate < 1.0 else None,
+        )
+        seconds = time.time() - start_time
+        pr_auc = float(average_precision_score(val_labels, model.predict(val_features)))
+        rows.append(
+            {"rate": rate, "train_rows": len(positions), "frauds": int(labels.sum()), "seconds": seconds, "val_pr_auc": pr_auc}
+        )
+        print(f"   📉 taux {rate:g}: {len(positions):,} lignes, {seconds:.1f}s, PR-AUC {pr_auc:.4f}")
+    return pd.DataFrame(rows)
+
+
+def _save_pruned_version(pruned_dir: Path, version: str, pruned: dict, report: dict) -> Path:
+    """
+    Sauvegarde la version élaguée (servable comme une version normale).
+
+    Args:
+        pruned_dir: Dossier de la version élaguée (ex: artifacts/v1.0.0-pruned)
+        version: Version élaguée (ex: "1.0.0-pruned")
+        pruned: Modèles, seuils et scores de l'étape prune_features
+        report: Rapport d'élagage
+
+    Returns:
+        Chemin du rapport d'élagage
+    """
+    pruned_dir.mkdir(parents=True, exist_ok=True)
+    if pruned["supervised_model"] is not None:
+        pruned["supervised_model"].model_version = version
+        pruned["supervised_model"].save(pruned_dir / "supervised_model.pkl")
+    pruned["unsupervised_model"].save(pruned_dir / "unsupervised_model.pkl")
+    with open(pruned_dir / "thresholds.json", "w") as f:
+        json.dump(pruned["thresholds"], f, indent=2)
+    with open(pruned_dir / "feature_schema.json", "w") as f:
+        json.dump({"version": version, "features": pruned["features"]}, f, indent=2)
+
+    reference_scores = {"unsupervised_score": pruned["unsupervised_scores"].reset_index(drop=True)}
+    if pruned["supervised_scores"] is not None and len(pruned["supervised_scores"]) > 0:
+        reference_scores["supervised_score"] = pruned["supervised_scores"].reset_index(drop=True)
+        reference_scores["risk_score"] = pruned["global_scores"].reset_index(drop=True)
+    drift_reference = {
+        "version": version,
+        "features": build_reference_histograms(pruned["payon_train_features"]),
+        "scores": build_reference_histograms(reference_scores),
+    }
+    with open(pruned_dir / "drift_reference.json", "w") as f:
+        json.dump(drift_reference, f)
+
+    report_path = pruned_dir / "pruning_report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    return report_path
+
+
 def _safe_float(value: Any) -> float | None:
     """Convertit proprement une valeur pandas/scalaire en float."""
     if value is None or pd.isna(value):
@@ -224,13 +437,92 @@ def main():
     parser.add_argument(
         "--train-split-date",
         type=str,
-        help="Date de fin du set d'entraînement (ISO format)",
+        help="Date de fin (exclue) du set d'entraînement (ISO format, avec --val-split-date ; remplace les ratios)",
     )
     parser.add_argument(
         "--val-split-date",
         type=str,
-        help="Date de fin du set de validation (ISO format)",
+        help="Date de fin (exclue) du set de validation (ISO format)",
+    )
+    parser.add_argument(
+        "--history-lookback",
+        type=str,
+        default=None,
+        help="Profondeur d'historique des features (ex: 30d, 90d, 'full' = tout ; défaut: feature_config.yaml)",
+    )
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=None,
+        help="Processus pour le calcul des features par shard de wallets (défaut: cores - 1)",
+    )
+    parser.add_argument(
+        "--feature-cache-dir",
+        type=Path,
+        default=None,
+        help="Cache des features (défaut: FEATURE_CACHE_DIR ou <artifacts-dir>/feature_cache)",
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        type=Path,
+        default=Path(os.environ["FEATURE_CHECKPOINT_DIR"]) if os.getenv("FEATURE_CHECKPOINT_DIR") else None,
+        help="Points de reprise du calcul des features (jobs préemptibles ; défaut: FEATURE_CHECKPOINT_DIR)",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="Recherche d'hyperparamètres LightGBM avant l'entraînement (model_config.yaml: supervised.search)",
+    )
+    parser.add_argument("--search-workers", type=int, default=None, help="Processus de la recherche (défaut: cores)")
+    parser.add_argument("--search-threads", type=int, default=1, help="Threads LightGBM par processus de recherche")
+    parser.add_argument(
+        "--distill",
+        action="store_true",
+        help="Distiller l'ensemble en un modèle compact (model_config.yaml: distilled ; SCORING_MODE=distilled)",
+    )
+    parser.add_argument(
+        "--prune-features",
+        action="store_true",
+        help="Élaguer les features selon importance et coût en ligne, réentraîner (version v<version>-pruned)",
+    )
+    parser.add_argument(
+        "--negative-rate",
+        type=float,
+        default=None,
+        help="Sous-échantillonnage des légitimes PaySim (taux conservé, ex: 0.1 ; stratifié jour × wallet)",
+    )
+    parser.add_argument(
+        "--sampling-correction",
+        choices=CORRECTIONS,
+        default="weight",
+        help="Correction du sous-échantillonnage: poids (distribution restaurée) ou prior (probabilités corrigées)",
+    )
+    parser.add_argument(
+        "--sampling-report",
+        type=str,
+        default=None,
+        help="Rapport PR-AUC / durée par taux de sous-échantillonnage (ex: 1,0.3,0.1,0.03)",
+    )
+    parser.add_argument(
+        "--max-parallel-stages",
+        type=int,
+        default=int(os.getenv("MAX_PARALLEL_STAGES", "2")),
+        help="Étapes indépendantes exécutées simultanément (branches PaySim / Payon ; défaut: 2)",
+    )
+    parser.add_argument(
+        "--memory-budget-mb",
+        type=float,
+        default=None,
+        help="Budget mémoire des étapes simultanées (défaut: 75%% de la mémoire disponible)",
+    )
+    parser.add_argument(
+        "--profile-tracemalloc",
+        type=int,
+        default=int(os.getenv("PROFILE_TRACEMALLOC_TOP", "0")),
+        help="Profil: N plus grosses allocations Python par étape (tracemalloc, plus lent ; défaut: 0)",
     )
+    parser.add_argument("--no-feature-cache", action="store_true", help="Recalculer les features sans cache")
+    parser.add_argument("--clear-feature-cache", action="store_true", help="Vider le cache des features avant le run")
     parser.add_argument(
         "--test-size",
         type=int,
@@ -289,282 +581,660 @@ def main():
     print(f"💾 Artefacts : {args.artifacts_dir}")
     print()
 
-    # ========== 1. PRÉPARATION DES DONNÉES ==========
-    print("=" * 60)
-    print("ÉTAPE 1: Préparation des données")
-    print("=" * 60)
-    
-    # Dataset PaySim (supervisé)
-    paysim_path = args.data_dir / "paysim_mapped.csv"
-    if not paysim_path.exists():
-        raise FileNotFoundError(f"Dataset PaySim non trouvé: {paysim_path}")
-    
-    print(f"📊 Chargement PaySim: {paysim_path}")
-    paysim_df = pd.read_csv(paysim_path)
-    paysim_df["created_at"] = pd.to_datetime(paysim_df["created_at"], utc=True)
-    print(f"   ✅ {len(paysim_df)} transactions chargées")
-    
-    # Mode test : limiter aux N transactions les plus récentes
-    if args.test_size is not None:
-        print(f"\n🧪 MODE TEST: Limitation à {args.test_size:,} transactions les plus récentes")
-        # Trier par date (plus récentes en dernier) et prendre les N dernières
-        paysim_df = paysim_df.sort_values("created_at").tail(args.test_size).reset_index(drop=True)
-        print(f"   ✅ Dataset limité à {len(paysim_df):,} transactions")
-        print(f"   📅 Période: {paysim_df['created_at'].min()} → {paysim_df['created_at'].max()}")
-    
-    # Split temporel PaySim (utilise le DataFrame déjà chargé pour éviter le rechargement)
-    print(f"\n📊 Split temporel PaySim...")
-    paysim_train, paysim_val, paysim_test = prepare_training_data(
-        paysim_df,  # Passe le DataFrame directement (optimisation)
-        train_ratio=0.7,
-        val_ratio=0.15,
-        test_ratio=0.15,
-    )
-    
-    # Dataset Payon Legit (non supervisé)
-    payon_path = args.data_dir / "payon_legit_clean.csv"
-    if not payon_path.exists():
-        raise FileNotFoundError(f"Dataset Payon non trouvé: {payon_path}")
-    
-    print(f"\n📊 Chargement Payon Legit: {payon_path}")
-    payon_df = pd.read_csv(payon_path)
-    payon_df["created_at"] = pd.to_datetime(payon_df["created_at"], utc=True)
-    print(f"   ✅ {len(payon_df)} transactions chargées")
-
-    # Mode test : limiter Payon aussi (même limite que PaySim)
-    if args.test_size is not None:
-        payon_df = payon_df.sort_values("created_at").tail(args.test_size).reset_index(drop=True)
-        print(f"   ✅ Payon limité à {len(payon_df):,} transactions (mode test)")
-    
-    # Split temporel Payon (utilise le DataFrame déjà chargé pour éviter le rechargement)
-    print(f"\n📊 Split temporel Payon...")
-    payon_train, payon_val, payon_test = prepare_training_data(
-        payon_df,  # Passe le DataFrame directement (optimisation)
-        train_ratio=0.7,
-        val_ratio=0.15,
-        test_ratio=0.15,
-    )
+    # Fenêtres et profondeur d'historique (configs/feature_config.yaml, surchargeable en CLI)
+    feature_config_path = args.config_dir / "feature_config.yaml"
+    feature_config = load_config(feature_config_path) if feature_config_path.exists() else {}
+    windows = feature_config.get("windows") or ["5m", "1h", "24h", "7d", "30d"]
+    history_lookback = feature_config.get("history_lookback")
+    if args.history_lookback is not None:
+        history_lookback = None if args.history_lookback == "full" else args.history_lookback
+    decay_half_lives = feature_config.get("decay_half_lives") or []
+    feature_kwargs = {
+        "windows": windows,
+        "lookback": history_lookback,
+        "half_lives": decay_half_lives,
+        "n_jobs": args.n_jobs,
+        "checkpoint_dir": args.checkpoint_dir,
+    }
 
+    feature_cache = None
+    if not args.no_feature_cache:
+        cache_dir = args.feature_cache_dir or Path(
+            os.getenv("FEATURE_CACHE_DIR", str(args.artifacts_dir / "feature_cache"))
+        )
+        feature_cache = FeatureCache(cache_dir)
+        if args.clear_feature_cache:
+            print(f"🗑️  Cache des features vidé: {feature_cache.invalidate()} entrée(s)")
+    # Datasets : <nom>.parquet (colonnaire, typé) si présent, sinon <nom>.csv
+    split_ratios = {"train_ratio": 0.7, "val_ratio": 0.15, "test_ratio": 0.15}
+    split_params = {
+        **split_ratios,
+        "test_size": args.test_size,
+        "train_split_date": args.train_split_date,
+        "val_split_date": args.val_split_date,
+    }
     if use_mlflow:
-        _log_dataset_context(
-            mlflow=mlflow,
-            paysim_train=paysim_train,
-            paysim_val=paysim_val,
-            paysim_test=paysim_test,
-            payon_train=payon_train,
-            payon_val=payon_val,
-            payon_test=payon_test,
+        mlflow.log_params(
+            {
+                "feature_windows": ",".join(windows),
+                "history_lookback": history_lookback or "full",
+                "decay_half_lives": ",".join(decay_half_lives) or "none",
+            }
         )
-    
+
+    # Pipeline en étapes : les branches PaySim (supervisé) et Payon (non supervisé)
+    # sont indépendantes jusqu'à la calibration et s'exécutent en parallèle
+
+    # ========== 1. PRÉPARATION DES DONNÉES ==========
+    def load_paysim() -> dict:
+        # Dataset PaySim (supervisé) + split temporel
+        train_df, val_df, test_df, path, columnar = _load_splits(
+            args.data_dir, "paysim_mapped", "PaySim", args, split_ratios
+        )
+        annotate(rows=len(train_df) + len(val_df) + len(test_df), train=train_df, val=val_df, test=test_df)
+        return {"paysim_splits": (train_df, val_df, test_df), "paysim_path": path, "paysim_columnar": columnar}
+
+    def load_payon() -> dict:
+        # Dataset Payon Legit (non supervisé) + split temporel (même limite --test-size)
+        train_df, val_df, test_df, path, _ = _load_splits(
+            args.data_dir, "payon_legit_clean", "Payon Legit", args, split_ratios
+        )
+        annotate(rows=len(train_df) + len(val_df) + len(test_df), train=train_df, val=val_df, test=test_df)
+        return {"payon_splits": (train_df, val_df, test_df), "payon_path": path}
+
     # ========== 2. FEATURE ENGINEERING ==========
-    print("\n" + "=" * 60)
-    print("ÉTAPE 2: Feature Engineering")
-    print("=" * 60)
-    
-    # Déterminer le nombre de jobs
-    import multiprocessing as mp
-    n_cores = mp.cpu_count()
-    
-    if args.local:
-        # Mode local: utiliser tous les cores disponibles (optimisé pour 10 cores / 32GB RAM)
-        n_jobs = max(1, n_cores - 1)  # Laisser 1 core libre
-        use_full_dataset = True
-        print(f"\n⚙️  Configuration LOCAL: {n_jobs} processus parallèles (sur {n_cores} cores)")
-        print(f"   💡 Mode local: dataset complet, pas d'échantillonnage")
-    else:
-        # Mode Cloud: réduire pour éviter OOM
-        n_jobs = min(5, max(1, n_cores - 2))  # Max 5 processus, laisser 2 cores libres
-        use_full_dataset = False
-        print(f"\n⚙️  Configuration CLOUD: {n_jobs} processus parallèles (sur {n_cores} cores)")
-        print(f"   💡 Mode Cloud: échantillonnage activé pour éviter timeout")
-    
-    # Features pour PaySim (supervisé)
-    if use_full_dataset:
-        # Mode local: utiliser le dataset complet
-        paysim_train_sample = paysim_train
-        print(f"\n🔧 Calcul des features PaySim (train) - DATASET COMPLET...")
-        print(f"   📊 {len(paysim_train_sample):,} transactions (dataset complet)")
-    else:
-        # Mode Cloud: échantillonnage pour accélérer
-        paysim_train_sample = paysim_train.sample(
-            n=min(500000, len(paysim_train)),
-            random_state=42
-        ).sort_values("created_at").reset_index(drop=True)
-        print(f"\n🔧 Calcul des features PaySim (train)...")
-        print(f"   ⚠️  Échantillon: {len(paysim_train_sample):,} transactions (sur {len(paysim_train):,})")
-        print(f"   💡 Pour l'entraînement complet, utiliser --local")
-    
-    paysim_train_features = compute_features_for_dataset(
-        paysim_train_sample,
-        verbose=True,
-        n_jobs=n_jobs,
-        chunk_size=1000,  # Chunks de 1000 transactions pour éviter la surcharge mémoire
-    )
-    paysim_train_labels = paysim_train_sample["is_fraud"] if "is_fraud" in paysim_train.columns else None
-    
-    print(f"\n🔧 Calcul des features PaySim (val)...")
-    paysim_val_features = compute_features_for_dataset(
-        paysim_val,
-        verbose=True,
-        n_jobs=n_jobs,
-        chunk_size=1000,
-    )
-    paysim_val_labels = paysim_val["is_fraud"] if "is_fraud" in paysim_val.columns else None
-    
-    # Features pour Payon (non supervisé)
-    print(f"\n🔧 Calcul des features Payon (train)...")
-    payon_train_features = compute_features_for_dataset(
-        payon_train,
-        verbose=True,
-        n_jobs=n_jobs,
-        chunk_size=1000,
-    )
-    
-    print(f"\n🔧 Calcul des features Payon (val)...")
-    payon_val_features = compute_features_for_dataset(
-        payon_val,
-        verbose=True,
-        n_jobs=n_jobs,
-        chunk_size=1000,
-    )
-    
-    print(f"\n✅ Features calculées:")
-    print(f"   PaySim train: {len(paysim_train_features)} transactions, {len(paysim_train_features.columns)} features")
-    print(f"   PaySim val: {len(paysim_val_features)} transactions, {len(paysim_val_features.columns)} features")
-    print(f"   Payon train: {len(payon_train_features)} transactions, {len(payon_train_features.columns)} features")
-    print(f"   Payon val: {len(payon_val_features)} transactions, {len(payon_val_features.columns)} features")
-    
+    # Features : une passe sur la timeline train + val, puis découpage
+    # (la validation voit l'historique de la période de train)
+    cache_entries = {}
+
+    def _features_stage(name: str, label: str) -> Stage:
+        def splits_of(inputs: dict) -> dict:
+            train_df, val_df, _ = inputs[f"{name}_splits"]
+            return {"train": train_df, "val": val_df}
+
+        def cached(**inputs) -> dict | None:
+            if feature_cache is None:
+                return None
+            cache_entries[name] = _split_features_cache_entry(
+                feature_cache=feature_cache,
+                data_path=inputs[f"{name}_path"],
+                split_params=split_params,
+                splits=splits_of(inputs),
+                **feature_kwargs,
+            )
+            features = _load_cached_split_features(feature_cache, cache_entries[name][0], splits_of(inputs))
+            return {f"{name}_features": features} if features is not None else None
+
+        def compute(**inputs) -> dict:
+            print(f"\n🔧 Calcul des features {label} (train + val)...")
+            features = _compute_split_features(
+                feature_cache=feature_cache,
+                data_path=inputs[f"{name}_path"],
+                split_params=split_params,
+                splits=splits_of(inputs),
+                cache_entry=cache_entries.get(name),
+                **feature_kwargs,
+            )
+            print(
+                f"✅ Features {label}: train {len(features['train'])} transactions, "
+                f"val {len(features['val'])} transactions, {len(features['train'].columns)} features"
+            )
+            return {f"{name}_features": features}
+
+        return Stage(
+            name=f"features_{name}",
+            fn=compute,
+            inputs=(f"{name}_splits", f"{name}_path"),
+            outputs=(f"{name}_features",),
+            memory_mb=lambda **inputs: _feature_memory_mb(splits_of(inputs)),
+            cached=cached,
+        )
+
     # ========== 3. ENTRAÎNEMENT SUPERVISÉ ==========
-    print("\n" + "=" * 60)
-    print("ÉTAPE 3: Entraînement Modèle Supervisé (LightGBM)")
-    print("=" * 60)
-    
-    if paysim_train_labels is None:
-        print("⚠️  Pas de labels dans PaySim, skip entraînement supervisé")
-        supervised_model = None
-    else:
-        print(f"📊 Entraînement sur {len(paysim_train_features)} transactions")
-        print(f"   Fraudes: {paysim_train_labels.sum()} ({paysim_train_labels.mean()*100:.2f}%)")
-        
+    def train_supervised(paysim_splits, paysim_features, paysim_columnar) -> dict:
+        print("\n" + "=" * 60)
+        print("ÉTAPE 3: Entraînement Modèle Supervisé (LightGBM)")
+        print("=" * 60)
+
+        paysim_train, paysim_val, _ = paysim_splits
+        train_features = paysim_features["train"]
+        val_features = paysim_features["val"]
+        train_labels = paysim_train["is_fraud"] if "is_fraud" in paysim_train.columns else None
+        # Lignes brutes alignées sur train_features/train_labels (strates du sous-échantillonnage)
+        train_rows = paysim_train
+        val_labels = paysim_val["is_fraud"] if "is_fraud" in paysim_val.columns else None
+        if train_labels is None:
+            print("⚠️  Pas de labels dans PaySim, skip entraînement supervisé")
+            return {
+                "supervised_model": None,
+                "supervised_scores": None,
+                "supervised_features": list(train_features.columns),
+                "paysim_val_labels": val_labels,
+                "supervised_training_set": None,
+            }
+
+        if args.local:
+            print(f"⚙️  Configuration LOCAL: dataset complet, pas d'échantillonnage")
+        elif paysim_columnar:
+            # Colonnes typées (codes int32, float32) : le train complet tient en mémoire
+            print(f"⚙️  Configuration CLOUD: dataset colonnaire, pas d'échantillonnage")
+        elif args.negative_rate is None:
+            # Mode Cloud: échantillonnage des lignes d'entraînement (features calculées sur l'historique complet)
+            sample_index = paysim_train.sample(n=min(500000, len(paysim_train)), random_state=42).index.sort_values()
+            train_features = train_features.loc[sample_index].reset_index(drop=True)
+            train_labels = train_labels.loc[sample_index].reset_index(drop=True)
+            train_rows = paysim_train.loc[sample_index].reset_index(drop=True)
+            print(f"⚙️  Configuration CLOUD: échantillonnage du train supervisé activé")
+            print(f"   ⚠️  Échantillon: {len(train_features):,} transactions (sur {len(paysim_train):,})")
+            print(f"   💡 Pour l'entraînement complet, utiliser --local")
+
+        print(f"📊 Entraînement sur {len(train_features)} transactions")
+        print(f"   Fraudes: {train_labels.sum()} ({train_labels.mean()*100:.2f}%)")
+
         # Convertir toutes les colonnes en types numériques (LightGBM n'accepte que int, float, bool)
         print("🔧 Conversion des types de features pour LightGBM...")
-        paysim_train_features = _convert_features_to_numeric(paysim_train_features)
-        paysim_val_features = _convert_features_to_numeric(paysim_val_features)
-        
-        supervised_model = train_supervised_model(
-            train_data=paysim_train_features,
-            train_labels=paysim_train_labels,
-            val_data=paysim_val_features,
-            val_labels=paysim_val_labels,
+        train_features = _convert_features_to_numeric(train_features)
+        val_features = _convert_features_to_numeric(val_features)
+
+        if args.sampling_report:
+            print("📉 Rapport de sous-échantillonnage des légitimes...")
+            sampling_report = _sampling_report(
+                train_df=train_rows,
+                train_features=train_features,
+                train_labels=train_labels,
+                val_features=val_features,
+                val_labels=val_labels,
+                rates=[float(rate) for rate in args.sampling_report.split(",")],
+                correction=args.sampling_correction,
+            )
+            args.artifacts_dir.mkdir(parents=True, exist_ok=True)
+            report_path = args.artifacts_dir / f"sampling_report_v{args.version}.csv"
+            sampling_report.to_csv(report_path, index=False)
+            print(f"   💾 Rapport: {report_path}")
+            if use_mlflow:
+                mlflow.log_artifact(str(report_path))
+
+        # Sous-échantillonnage des légitimes : durée proportionnelle au nombre de fraudes
+        sample_weight = None
+        if args.negative_rate is not None:
+            positions, weights = downsample_negatives(train_rows, train_labels, args.negative_rate)
+            train_features = train_features.iloc[positions].reset_index(drop=True)
+            train_labels = train_labels.iloc[positions].reset_index(drop=True)
+            if args.sampling_correction == "weight":
+                sample_weight = weights
+            print(
+                f"   📉 Légitimes sous-échantillonnés (taux {args.negative_rate:g}, correction "
+                f"{args.sampling_correction}): {len(positions):,} lignes"
+            )
+            if use_mlflow:
+                mlflow.log_params(
+                    {"negative_rate": args.negative_rate, "sampling_correction": args.sampling_correction}
+                )
+
+        # Datasets LightGBM binaires à côté du cache des features
+        dataset_cache_dir = feature_cache.root / "lgb_datasets" if feature_cache is not None else None
+
+        supervised_config = None
+        if args.search:
+            model_config = load_config(args.config_dir / "model_config.yaml")
+            supervised_config, _ = run_search(
+                train_features,
+                train_labels,
+                val_features,
+                val_labels,
+                search_config=model_config["supervised"].get("search") or {},
+                n_workers=args.search_workers,
+                threads_per_worker=args.search_threads,
+                dataset_cache_dir=dataset_cache_dir,
+                mlflow=mlflow if use_mlflow else None,
+                sample_weight=sample_weight,
+                negative_sampling_rate=args.negative_rate,
+            )
+
+        annotate(rows=len(train_features), train_features=train_features, val_features=val_features)
+        model = train_supervised_model(
+            train_data=train_features,
+            train_labels=train_labels,
+            val_data=val_features,
+            val_labels=val_labels,
+            config=supervised_config,
+            dataset_cache_dir=dataset_cache_dir,
+            sample_weight=sample_weight,
+            negative_sampling_rate=args.negative_rate,
         )
-        
+
         print(f"✅ Modèle supervisé entraîné")
+        if use_mlflow:
+            mlflow.log_metrics({f"lgb_{k}": float(v) for k, v in model.dataset_stats.items()})
 
-        # Métriques validation pour MLflow
-        if use_mlflow and paysim_val_labels is not None:
-            val_proba = supervised_model.predict(paysim_val_features)
+        # Scores de validation (métriques MLflow et calibration)
+        val_proba = model.predict(val_features) if val_labels is not None else None
+        if use_mlflow and val_labels is not None:
             val_pred_binary = (val_proba >= 0.5).astype(int)
-            mlflow.log_metric("val_accuracy", float(accuracy_score(paysim_val_labels, val_pred_binary)))
-            mlflow.log_metric("val_f1", float(f1_score(paysim_val_labels, val_pred_binary, zero_division=0)))
-            mlflow.log_metric("val_pr_auc", float(average_precision_score(paysim_val_labels, val_proba)))
-    
+            mlflow.log_metric("val_accuracy", float(accuracy_score(val_labels, val_pred_binary)))
+            mlflow.log_metric("val_f1", float(f1_score(val_labels, val_pred_binary, zero_division=0)))
+            mlflow.log_metric("val_pr_auc", float(average_precision_score(val_labels, val_proba)))
+        return {
+            "supervised_model": model,
+            "supervised_scores": val_proba,
+            "supervised_features": list(train_features.columns),
+            "paysim_val_labels": val_labels,
+            # Lignes et paramètres exacts de l'entraînement (réentraînement après élagage)
+            "supervised_training_set": {
+                "train_features": train_features,
+                "train_labels": train_labels,
+                "val_features": val_features,
+                "val_labels": val_labels,
+                "sample_weight": sample_weight,
+                "negative_sampling_rate": args.negative_rate,
+                "config": model.config,
+            },
+        }
+
     # ========== 4. ENTRAÎNEMENT NON SUPERVISÉ ==========
-    print("\n" + "=" * 60)
-    print("ÉTAPE 4: Entraînement Modèle Non Supervisé (IsolationForest)")
-    print("=" * 60)
-    
-    print(f"📊 Entraînement sur {len(payon_train_features)} transactions (normales uniquement)")
-    
-    # Convertir toutes les colonnes en types numériques
-    print("🔧 Conversion des types de features pour IsolationForest...")
-    payon_train_features = _convert_features_to_numeric(payon_train_features)
-    # Note: val_data n'est pas utilisé pour IsolationForest (modèle non supervisé)
-    
-    unsupervised_model = train_unsupervised_model(
-        train_data=payon_train_features,
-    )
-    
-    print(f"✅ Modèle non supervisé entraîné")
-    
+    def train_unsupervised(payon_features) -> dict:
+        print("\n" + "=" * 60)
+        print("ÉTAPE 4: Entraînement Modèle Non Supervisé (IsolationForest)")
+        print("=" * 60)
+
+        print(f"📊 Entraînement sur {len(payon_features['train'])} transactions (normales uniquement)")
+
+        # Convertir toutes les colonnes en types numériques
+        print("🔧 Conversion des types de features pour IsolationForest...")
+        train_features = _convert_features_to_numeric(payon_features["train"])
+        annotate(rows=len(train_features), train_features=train_features)
+        # Note: val_data n'est pas utilisé pour IsolationForest (modèle non supervisé)
+
+        model = train_unsupervised_model(
+            train_data=train_features,
+        )
+
+        print(f"✅ Modèle non supervisé entraîné")
+        # Pour le score non supervisé de la calibration, on utilise Payon val (transactions normales)
+        return {
+            "unsupervised_model": model,
+            "unsupervised_scores": model.predict(payon_features["val"]),
+            "payon_train_features": train_features,
+        }
+
     # ========== 5. CALIBRATION DES SEUILS ==========
-    print("\n" + "=" * 60)
-    print("ÉTAPE 5: Calibration des Seuils")
-    print("=" * 60)
-    
-    # Calculer les scores sur le validation set
-    if supervised_model and paysim_val_labels is not None:
-        supervised_scores = supervised_model.predict(paysim_val_features)
-    else:
-        supervised_scores = None
-    
-    # Pour le score non supervisé, on utilise Payon val (transactions normales)
-    unsupervised_scores = unsupervised_model.predict(payon_val_features)
-    
-    # Calculer le SCORE GLOBAL (comme en production) pour calibrer les seuils
-    # Le score global combine : règles (20%) + supervisé (60%) + non supervisé (20%)
-    global_scorer = GlobalScorer()
-    
-    if supervised_scores is not None and len(supervised_scores) > 0:
-        # Calculer le score global pour chaque transaction du validation set
-        # Pour la calibration, on simule rule_score=0 (pas de règles déclenchées)
-        # et on combine supervisé + non supervisé
-        min_len = min(len(supervised_scores), len(unsupervised_scores))
-        supervised_scores_aligned = supervised_scores.iloc[:min_len]
-        unsupervised_scores_aligned = unsupervised_scores.iloc[:min_len]
-        
-        global_scores = []
-        for i in range(min_len):
-            global_score = global_scorer.compute_score(
-                rule_score=0.0,  # Pas de règles pour la calibration
-                supervised_score=float(supervised_scores_aligned.iloc[i]),
-                unsupervised_score=float(unsupervised_scores_aligned.iloc[i]),
-                boost_factor=1.0,
-            )
-            global_scores.append(global_score)
-        
-        global_scores_series = pd.Series(global_scores)
-        
-        # Calculer les seuils sur le score global (top 0.1% BLOCK, top 1% REVIEW)
-        block_threshold = global_scores_series.quantile(0.999)  # Top 0.1%
-        review_threshold = global_scores_series.quantile(0.99)  # Top 1%
-        
-        print(f"📊 Scores calculés sur {len(global_scores_series)} transactions")
-        print(f"   Score global min: {global_scores_series.min():.4f}")
-        print(f"   Score global max: {global_scores_series.max():.4f}")
-        print(f"   Score global médian: {global_scores_series.median():.4f}")
-    else:
-        # Fallback : utiliser le score non supervisé uniquement
-        print("⚠️  Pas de modèle supervisé, utilisation du score non supervisé uniquement")
-        block_threshold = unsupervised_scores.quantile(0.999)
-        review_threshold = unsupervised_scores.quantile(0.99)
-    
-    # Si les seuils sont identiques (dataset trop petit), ajuster
-    if abs(block_threshold - review_threshold) < 0.001:
-        print("⚠️  Seuils identiques détectés (dataset petit), ajustement...")
-        # Utiliser des quantiles plus espacés
+    def calibrate(supervised_scores, unsupervised_scores) -> dict:
+        print("\n" + "=" * 60)
+        print("ÉTAPE 5: Calibration des Seuils")
+        print("=" * 60)
+
+        # Calculer le SCORE GLOBAL (comme en production) pour calibrer les seuils
+        # Le score global combine : règles (20%) + supervisé (60%) + non supervisé (20%)
+        global_scorer = GlobalScorer()
+        global_scores_series = None
+
         if supervised_scores is not None and len(supervised_scores) > 0:
-            review_threshold = global_scores_series.quantile(0.99)
-            block_threshold = global_scores_series.quantile(0.995)  # Top 0.5% au lieu de 0.1%
+            # Calculer le score global pour chaque transaction du validation set
+            # Pour la calibration, on simule rule_score=0 (pas de règles déclenchées)
+            # et on combine supervisé + non supervisé
+            min_len = min(len(supervised_scores), len(unsupervised_scores))
+            supervised_scores_aligned = supervised_scores.iloc[:min_len]
+            unsupervised_scores_aligned = unsupervised_scores.iloc[:min_len]
+
+            global_scores = []
+            for i in range(min_len):
+                global_score = global_scorer.compute_score(
+                    rule_score=0.0,  # Pas de règles pour la calibration
+                    supervised_score=float(supervised_scores_aligned.iloc[i]),
+                    unsupervised_score=float(unsupervised_scores_aligned.iloc[i]),
+                    boost_factor=1.0,
+                )
+                global_scores.append(global_score)
+
+            global_scores_series = pd.Series(global_scores)
+
+            # Calculer les seuils sur le score global (top 0.1% BLOCK, top 1% REVIEW)
+            block_threshold = global_scores_series.quantile(0.999)  # Top 0.1%
+            review_threshold = global_scores_series.quantile(0.99)  # Top 1%
+
+            print(f"📊 Scores calculés sur {len(global_scores_series)} transactions")
+            print(f"   Score global min: {global_scores_series.min():.4f}")
+            print(f"   Score global max: {global_scores_series.max():.4f}")
+            print(f"   Score global médian: {global_scores_series.median():.4f}")
         else:
+            # Fallback : utiliser le score non supervisé uniquement
+            print("⚠️  Pas de modèle supervisé, utilisation du score non supervisé uniquement")
+            block_threshold = unsupervised_scores.quantile(0.999)
             review_threshold = unsupervised_scores.quantile(0.99)
-            block_threshold = unsupervised_scores.quantile(0.995)
-        
-        # S'assurer que BLOCK > REVIEW
-        if block_threshold <= review_threshold:
-            block_threshold = review_threshold + 0.01  # Ajouter un petit écart
-    
-    thresholds = {
-        "block_threshold": float(block_threshold),
-        "review_threshold": float(review_threshold),
-    }
-    
-    print(f"✅ Seuils calculés:")
-    print(f"   BLOCK threshold: {block_threshold:.4f} (top 0.1-0.5%)")
-    print(f"   REVIEW threshold: {review_threshold:.4f} (top 1%)")
-    print(f"   💡 En production, une transaction avec score ≥ {block_threshold:.4f} sera BLOCK")
-    print(f"   💡 En production, une transaction avec score ≥ {review_threshold:.4f} sera REVIEW")
+
+        # Si les seuils sont identiques (dataset trop petit), ajuster
+        if abs(block_threshold - review_threshold) < 0.001:
+            print("⚠️  Seuils identiques détectés (dataset petit), ajustement...")
+            # Utiliser des quantiles plus espacés
+            if global_scores_series is not None:
+                review_threshold = global_scores_series.quantile(0.99)
+                block_threshold = global_scores_series.quantile(0.995)  # Top 0.5% au lieu de 0.1%
+            else:
+                review_threshold = unsupervised_scores.quantile(0.99)
+                block_threshold = unsupervised_scores.quantile(0.995)
+
+            # S'assurer que BLOCK > REVIEW
+            if block_threshold <= review_threshold:
+                block_threshold = review_threshold + 0.01  # Ajouter un petit écart
+
+        print(f"✅ Seuils calculés:")
+        print(f"   BLOCK threshold: {block_threshold:.4f} (top 0.1-0.5%)")
+        print(f"   REVIEW threshold: {review_threshold:.4f} (top 1%)")
+        print(f"   💡 En production, une transaction avec score ≥ {block_threshold:.4f} sera BLOCK")
+        print(f"   💡 En production, une transaction avec score ≥ {review_threshold:.4f} sera REVIEW")
+        return {
+            "thresholds": {"block_threshold": float(block_threshold), "review_threshold": float(review_threshold)},
+            "global_scores": global_scores_series,
+        }
+
+    # ========== 5b. DISTILLATION (optionnelle) ==========
+    def distill(paysim_features, supervised_model, unsupervised_model, thresholds) -> dict:
+        print("\n" + "=" * 60)
+        print("ÉTAPE 5b: Distillation de l'ensemble (modèle compact)")
+        print("=" * 60)
+
+        if supervised_model is None:
+            print("⚠️  Pas de modèle supervisé, skip distillation")
+            return {"distilled_model": None, "distilled_report": None, "distilled_scores": None}
+        distilled_config = dict(load_config(args.config_dir / "model_config.yaml").get("distilled") or {})
+        max_rows = int(distilled_config.pop("max_rows", 500000))
+        latency_requests = int(distilled_config.pop("latency_requests", 200))
+
+        # Colonnes des deux modèles (l'élève voit tout ce que voit le maître)
+        columns = list(supervised_model.model.feature_name_)
+        columns += [c for c in getattr(unsupervised_model.model, "feature_names_in_", []) if c not in columns]
+        train_features = _convert_features_to_numeric(paysim_features["train"]).reindex(columns=columns, fill_value=0)
+        val_features = _convert_features_to_numeric(paysim_features["val"]).reindex(columns=columns, fill_value=0)
+        if len(train_features) > max_rows:
+            train_features = train_features.sample(n=max_rows, random_state=42).sort_index()
+        annotate(rows=len(train_features), train_features=train_features)
+
+        model, report = distill_ensemble(
+            train_features,
+            supervised_model,
+            unsupervised_model,
+            thresholds,
+            val_features=val_features,
+            config=distilled_config,
+        )
+
+        # Coût par requête (prédiction unitaire, hors construction des features)
+        rows = val_features.head(latency_requests)
+        if len(rows) > 0:
+            unsupervised_columns = list(getattr(unsupervised_model.model, "feature_names_in_", columns))
+            records = rows.to_dict(orient="records")
+            predictor = DistilledPredictor(model=model)
+            report["teacher_us_per_request"] = request_latency_us(
+                lambda i: (
+                    supervised_model.predict(rows.iloc[[i]]),
+                    unsupervised_model.predict(rows.iloc[[i]][unsupervised_columns]),
+                ),
+                len(rows),
+            )
+            report["student_us_per_request"] = request_latency_us(lambda i: predictor.predict(records[i]), len(rows))
+
+        print(
+            f"✅ Modèle distillé: {report['trees']} arbres, accord des décisions "
+            f"{report['decision_agreement']:.2%}, erreur absolue moyenne {report['mean_abs_error']:.4f}"
+        )
+        for decision, bucket in report["buckets"].items():
+            if bucket["count"]:
+                print(
+                    f"   {decision:<8} {bucket['count']:>8,} transactions, accord {bucket['agreement']:.2%}, "
+                    f"erreur moyenne {bucket['mean_abs_error']:.4f}"
+                )
+        if "student_us_per_request" in report:
+            print(
+                f"   ⚡ Coût par requête: {report['teacher_us_per_request']:,.0f} µs (ensemble) → "
+                f"{report['student_us_per_request']:,.0f} µs (distillé)"
+            )
+        # Scores de validation : histogramme de référence de distilled_score (GET /drift en mode distillé)
+        return {"distilled_model": model, "distilled_report": report, "distilled_scores": model.predict(val_features)}
+
+    # ========== 5c. ÉLAGAGE DES FEATURES (optionnel) ==========
+    def prune_features(
+        payon_features,
+        supervised_model,
+        supervised_scores,
+        supervised_features,
+        supervised_training_set,
+        unsupervised_model,
+        unsupervised_scores,
+        payon_train_features,
+        thresholds,
+    ) -> dict:
+        print("\n" + "=" * 60)
+        print("ÉTAPE 5c: Élagage des features (importance × coût en ligne)")
+        print("=" * 60)
+
+        pruning_config = feature_config.get("pruning") or {}
+        features = list(supervised_features) if supervised_model is not None else list(payon_train_features.columns)
+        unsupervised_columns = list(payon_train_features.columns)
+        payon_val = _convert_features_to_numeric(payon_features["val"])[unsupervised_columns]
+
+        # Importance combinée : gain/splits LightGBM + permutation IsolationForest
+        gain_split = lightgbm_importance(supervised_model.model.booster_) if supervised_model is not None else None
+        permutation = permutation_impact(
+            unsupervised_model, payon_val, max_rows=int(pruning_config.get("permutation_rows", 5000))
+        )
+        table = importance_table(features, gain_split, permutation, pruning_config)
+        plan = plan_pruning(table, pruning_config)
+        report = {
+            **plan.to_dict(),
+            "importance": table.reset_index().to_dict(orient="records"),
+        }
+        print(
+            f"✂️  Features: {len(features)} → {len(plan.kept_features)} "
+            f"(importance perdue {plan.importance_lost:.2%}, "
+            f"coût en ligne {plan.cost_before:.1f} → {plan.cost_after:.1f})"
+        )
+        if plan.dropped_requirements:
+            print(f"   Agrégats / fenêtres éliminés: {', '.join(plan.dropped_requirements)}")
+        if not plan.dropped_features:
+            print("⚠️  Aucune feature à élaguer dans le budget d'importance, skip réentraînement")
+            return {"pruned_models": None, "pruning_report": report}
+
+        # Réentraînement sur les features conservées (mêmes lignes, mêmes paramètres)
+        kept = set(plan.kept_features)
+        pruned_unsupervised_columns = [c for c in unsupervised_columns if c in kept]
+        pruned_unsupervised = train_unsupervised_model(
+            train_data=payon_train_features[pruned_unsupervised_columns],
+            config=unsupervised_model.config or None,
+        )
+        pruned_unsupervised_scores = pruned_unsupervised.predict(payon_val[pruned_unsupervised_columns])
+        report["unsupervised"] = {
+            "mean_abs_score_delta": float(
+                np.mean(np.abs(pruned_unsupervised_scores.to_numpy() - unsupervised_scores.to_numpy()))
+            ),
+        }
+
+        pruned_supervised = None
+        pruned_supervised_scores = None
+        if supervised_model is not None and supervised_training_set is not None:
+            training = supervised_training_set
+            pruned_supervised_columns = [c for c in features if c in kept]
+            pruned_supervised = train_supervised_model(
+                train_data=training["train_features"][pruned_supervised_columns],
+                train_labels=training["train_labels"],
+                val_data=training["val_features"][pruned_supervised_columns],
+                val_labels=training["val_labels"],
+                config=training["config"],
+                sample_weight=training["sample_weight"],
+                negative_sampling_rate=training["negative_sampling_rate"],
+            )
+            pruned_supervised_scores = pruned_supervised.predict(training["val_features"][pruned_supervised_columns])
+
+        # Seuils recalculés sur les scores des modèles élagués
+        pruned_calibration = calibrate(pruned_supervised_scores, pruned_unsupervised_scores)
+        pruned_thresholds = pruned_calibration["thresholds"]
+        report["thresholds"] = {"full": thresholds, "pruned": pruned_thresholds}
+
+        # Écart de performance sur PaySim val (labels)
+        val_labels = supervised_training_set["val_labels"] if supervised_training_set is not None else None
+        if pruned_supervised is not None and val_labels is not None:
+            paysim_val = supervised_training_set["val_features"]
+            before = float(average_precision_score(val_labels, supervised_scores))
+            after = float(average_precision_score(val_labels, pruned_supervised_scores))
+            report["supervised"] = {
+                "val_pr_auc": before,
+                "val_pr_auc_pruned": after,
+                "val_pr_auc_delta": after - before,
+            }
+
+            unsupervised_before = unsupervised_model.predict(
+                paysim_val.reindex(columns=unsupervised_columns, fill_value=0)
+            )
+            unsupervised_after = pruned_unsupervised.predict(
+                paysim_val.reindex(columns=pruned_unsupervised_columns, fill_value=0)
+            )
+            report["unsupervised"].update(
+                {
+                    "paysim_val_pr_auc": float(average_precision_score(val_labels, unsupervised_before)),
+                    "paysim_val_pr_auc_pruned": float(average_precision_score(val_labels, unsupervised_after)),
+                }
+            )
+
+            # Score global (sans règle) et décisions, chaque ensemble avec ses propres seuils
+            full_ensemble = ensemble_model_scores(
+                paysim_val.reindex(columns=sorted(set(features) | set(unsupervised_columns)), fill_value=0),
+                supervised_model,
+                unsupervised_model,
+            ).to_numpy()
+            pruned_ensemble = ensemble_model_scores(
+                paysim_val.reindex(columns=plan.kept_features, fill_value=0), pruned_supervised, pruned_unsupervised
+            ).to_numpy()
+            full_decisions = decision_buckets(full_ensemble, thresholds)
+            pruned_decisions = decision_buckets(pruned_ensemble, pruned_thresholds)
+            report["global"] = {
+                "val_pr_auc": float(average_precision_score(val_labels, full_ensemble)),
+                "val_pr_auc_pruned": float(average_precision_score(val_labels, pruned_ensemble)),
+                "decision_agreement": float((full_decisions == pruned_decisions).mean()),
+                "decisions": pd.crosstab(
+                    pd.Series(full_decisions, name="full"), pd.Series(pruned_decisions, name="pruned")
+                ).to_dict(orient="index"),
+            }
+            print(
+                f"✅ PR-AUC validation (LightGBM): {before:.4f} → {after:.4f} ({after - before:+.4f}), "
+                f"accord des décisions {report['global']['decision_agreement']:.2%}"
+            )
+        print(
+            f"✅ IsolationForest: écart moyen des scores {report['unsupervised']['mean_abs_score_delta']:.4f} "
+            f"({len(unsupervised_columns)} → {len(pruned_unsupervised_columns)} features)"
+        )
+        return {
+            "pruned_models": {
+                "features": plan.kept_features,
+                "supervised_model": pruned_supervised,
+                "supervised_scores": pruned_supervised_scores,
+                "unsupervised_model": pruned_unsupervised,
+                "unsupervised_scores": pruned_unsupervised_scores,
+                "payon_train_features": payon_train_features[pruned_unsupervised_columns],
+                "thresholds": pruned_thresholds,
+                "global_scores": pruned_calibration["global_scores"],
+            },
+            "pruning_report": report,
+        }
+
+    stages = [
+        Stage("load_paysim", load_paysim, outputs=("paysim_splits", "paysim_path", "paysim_columnar")),
+        Stage("load_payon", load_payon, outputs=("payon_splits", "payon_path")),
+        _features_stage("paysim", "PaySim"),
+        _features_stage("payon", "Payon"),
+        Stage(
+            "train_supervised",
+            train_supervised,
+            inputs=("paysim_splits", "paysim_features", "paysim_columnar"),
+            outputs=(
+                "supervised_model",
+                "supervised_scores",
+                "supervised_features",
+                "paysim_val_labels",
+                "supervised_training_set",
+            ),
+            memory_mb=lambda **inputs: 2 * _feature_memory_mb(inputs["paysim_features"]),
+            main_thread=True,  # logging MLflow (run actif du thread principal)
+        ),
+        Stage(
+            "train_unsupervised",
+            train_unsupervised,
+            inputs=("payon_features",),
+            outputs=("unsupervised_model", "unsupervised_scores", "payon_train_features"),
+            memory_mb=lambda **inputs: 2 * _feature_memory_mb(inputs["payon_features"]),
+        ),
+        Stage(
+            "calibrate",
+            calibrate,
+            inputs=("supervised_scores", "unsupervised_scores"),
+            outputs=("thresholds", "global_scores"),
+        ),
+    ]
+    if args.distill:
+        stages.append(
+            Stage(
+                "distill",
+                distill,
+                inputs=("paysim_features", "supervised_model", "unsupervised_model", "thresholds"),
+                outputs=("distilled_model", "distilled_report", "distilled_scores"),
+                memory_mb=lambda **inputs: _feature_memory_mb(inputs["paysim_features"]),
+            )
+        )
+    if args.prune_features:
+        stages.append(
+            Stage(
+                "prune_features",
+                prune_features,
+                inputs=(
+                    "payon_features",
+                    "supervised_model",
+                    "supervised_scores",
+                    "supervised_features",
+                    "supervised_training_set",
+                    "unsupervised_model",
+                    "unsupervised_scores",
+                    "payon_train_features",
+                    "thresholds",
+                ),
+                outputs=("pruned_models", "pruning_report"),
+                memory_mb=lambda **inputs: 2 * _feature_memory_mb(inputs["payon_features"]),
+            )
+        )
+    # Profilage de chaque étape (durée, CPU, pic RSS, lignes/s, tailles des DataFrames)
+    profiler = Profiler(tracemalloc_top=args.profile_tracemalloc)
+    with profiler.activate():
+        results, stage_reports = run_stages(
+            stages,
+            max_workers=args.max_parallel_stages,
+            memory_budget_mb=args.memory_budget_mb,
+        )
+
+    paysim_train, paysim_val, paysim_test = results["paysim_splits"]
+    payon_train, payon_val, payon_test = results["payon_splits"]
+    supervised_model = results["supervised_model"]
+    supervised_scores = results["supervised_scores"]
+    paysim_val_labels = results["paysim_val_labels"]
+    unsupervised_model = results["unsupervised_model"]
+    unsupervised_scores = results["unsupervised_scores"]
+    payon_train_features = results["payon_train_features"]
+    global_scores_series = results["global_scores"]
+    thresholds = results["thresholds"]
+    block_threshold = thresholds["block_threshold"]
+    review_threshold = thresholds["review_threshold"]
+
+    print("\n⏱️  Profil des étapes (durée, CPU, pic RSS du processus):")
+    print(profiler.summary())
 
     if use_mlflow:
+        _log_dataset_context(
+            mlflow=mlflow,
+            paysim_train=paysim_train,
+            paysim_val=paysim_val,
+            paysim_test=paysim_test,
+            payon_train=payon_train,
+            payon_val=payon_val,
+            payon_test=payon_test,
+        )
+        profiler.log_to_mlflow(mlflow)
+        mlflow.log_dict({"stages": [asdict(report) for report in stage_reports]}, "stage_report.json")
         mlflow.log_metric("block_threshold", float(block_threshold))
         mlflow.log_metric("review_threshold", float(review_threshold))
     
@@ -586,6 +1256,26 @@ def main():
     unsupervised_path = version_dir / "unsupervised_model.pkl"
     unsupervised_model.save(unsupervised_path)
     print(f"✅ Modèle non supervisé sauvegardé: {unsupervised_path}")
+
+    # Modèle distillé et rapport de fidélité (--distill)
+    distilled_report = results.get("distilled_report")
+    if results.get("distilled_model") is not None:
+        distilled_model = results["distilled_model"]
+        distilled_model.model_version = args.version
+        distilled_model.save(version_dir / "distilled_model.pkl")
+        fidelity_path = version_dir / "distilled_fidelity.json"
+        with open(fidelity_path, "w") as f:
+            json.dump(distilled_report, f, indent=2)
+        print(f"✅ Modèle distillé sauvegardé: {version_dir / 'distilled_model.pkl'} (fidélité: {fidelity_path})")
+        if use_mlflow:
+            mlflow.log_metrics(
+                {
+                    f"distilled_{k}": float(v)
+                    for k, v in distilled_report.items()
+                    if isinstance(v, (int, float)) and v == v
+                }
+            )
+            mlflow.log_artifact(str(fidelity_path))
     
     # Sauvegarder les seuils
     thresholds_path = version_dir / "thresholds.json"
@@ -596,13 +1286,62 @@ def main():
     # Sauvegarder le schéma de features (liste des colonnes)
     feature_schema = {
         "version": args.version,
-        "features": list(paysim_train_features.columns) if supervised_model else list(payon_train_features.columns),
+        "features": results["supervised_features"] if supervised_model else list(payon_train_features.columns),
     }
     schema_path = version_dir / "feature_schema.json"
     with open(schema_path, "w") as f:
         json.dump(feature_schema, f, indent=2)
     print(f"✅ Schéma de features sauvegardé: {schema_path}")
-    
+
+    # Histogrammes de référence pour le monitoring de drift en ligne (GET /drift)
+    # Features : distribution "normale" (Payon train), scores : validation
+    reference_scores = {"unsupervised_score": unsupervised_scores.reset_index(drop=True)}
+    if supervised_scores is not None and len(supervised_scores) > 0:
+        reference_scores["supervised_score"] = supervised_scores.reset_index(drop=True)
+        reference_scores["risk_score"] = global_scores_series.reset_index(drop=True)
+    if results.get("distilled_scores") is not None:
+        # Mode distillé : supervised/unsupervised_score ne sont pas calculés, distilled_score l'est
+        reference_scores["distilled_score"] = results["distilled_scores"].reset_index(drop=True)
+    drift_reference = {
+        "version": args.version,
+        "features": build_reference_histograms(
+            payon_train_features[[c for c in feature_schema["features"] if c in payon_train_features.columns]]
+        ),
+        "scores": build_reference_histograms(reference_scores),
+    }
+    drift_reference_path = version_dir / "drift_reference.json"
+    with open(drift_reference_path, "w") as f:
+        json.dump(drift_reference, f)
+    print(f"✅ Référence de drift sauvegardée: {drift_reference_path}")
+
+    profile_path = profiler.save(version_dir / "profile_report.json")
+    print(f"✅ Profil des étapes sauvegardé: {profile_path}")
+
+    # Version élaguée (--prune-features) : version sœur, latest inchangé
+    pruning_report = results.get("pruning_report")
+    pruned_version = None
+    if pruning_report is not None:
+        with open(version_dir / "pruning_report.json", "w") as f:
+            json.dump(pruning_report, f, indent=2)
+        if results.get("pruned_models") is not None:
+            pruned_version = f"{args.version}-pruned"
+            pruning_path = _save_pruned_version(
+                args.artifacts_dir / f"v{pruned_version}", pruned_version, results["pruned_models"], pruning_report
+            )
+            print(f"✅ Version élaguée sauvegardée: {pruning_path.parent} (rapport: {pruning_path})")
+        if use_mlflow:
+            pruning_metrics = {
+                "pruning_features_after": float(pruning_report["features_after"]),
+                "pruning_importance_lost": float(pruning_report["importance_lost"]),
+                "pruning_online_cost_after": float(pruning_report["online_cost_after"]),
+            }
+            for section in ("supervised", "unsupervised", "global"):
+                for key, value in (pruning_report.get(section) or {}).items():
+                    if isinstance(value, (int, float)):
+                        pruning_metrics[f"pruning_{section}_{key}"] = float(value)
+            mlflow.log_metrics(pruning_metrics)
+            mlflow.log_artifact(str(version_dir / "pruning_report.json"))
+
     # Créer/mettre à jour le symlink latest
     latest_path = args.artifacts_dir / "latest"
     if latest_path.exists():
@@ -615,6 +1354,7 @@ def main():
     if use_mlflow:
         mlflow.log_artifact(str(schema_path))
         mlflow.log_artifact(str(thresholds_path))
+        mlflow.log_artifact(str(drift_reference_path))
         baseline_path = version_dir / "baseline_train.jsonl"
         payon_train_features.head(1000).to_json(
             baseline_path, orient="records", lines=True, date_format="iso"
@@ -707,6 +1447,13 @@ def main():
     if supervised_model:
         print(f"  ✅ Supervisé (LightGBM)")
     print(f"  ✅ Non supervisé (IsolationForest)")
+    if results.get("distilled_model") is not None:
+        print(f"  ✅ Distillé (accord des décisions {distilled_report['decision_agreement']:.2%})")
+    if pruned_version is not None:
+        print(
+            f"  ✅ Élagué: v{pruned_version} ({pruning_report['features_after']}/"
+            f"{pruning_report['features_before']} features, {len(pruning_report['dropped_requirements'])} agrégat(s) éliminé(s))"
+        )
     print(f"\nSeuils:")
     print(f"  BLOCK: {block_threshold:.4f}")
     print(f"  REVIEW: {review_threshold:.4f}")
@@ -0,0 +1,26 @@
+"""
+Benchmarks de performance.
+
+Ce module contient la suite de benchmarks (features, règles, prédicteurs,
+pipeline et handler /score) et le contrôle de parité des sorties (golden).
+"""
+
+from .golden import compare_golden, load_golden, summarize_frame, write_golden
+from .suite import BenchmarkConfig, BenchmarkWorkload, golden_outputs, run_suite
+from .timing import BenchmarkResult, compare_results, load_results, measure, save_results
+
+__all__ = [
+    "BenchmarkConfig",
+    "BenchmarkResult",
+    "BenchmarkWorkload",
+    "compare_golden",
+    "compare_results",
+    "golden_outputs",
+    "load_golden",
+    "load_results",
+    "measure",
+    "run_suite",
+    "save_results",
+    "summarize_frame",
+    "write_golden",
+]
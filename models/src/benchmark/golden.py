@@ -0,0 +1,118 @@
+"""
+Contrôle de parité des sorties (golden) : une optimisation ne doit pas changer les scores.
+
+Les sorties de référence sont écrites une fois (tests/fixtures/benchmark_golden.json)
+et comparées à chaque exécution de la suite (scripts/benchmark.py, tests) :
+- valeurs par transaction (règles, scores des modèles, décision) : exactes pour
+  les chaînes, à tolérance près pour les flottants
+- tableaux volumineux (features d'un dataset, prédictions par lot) : résumé
+  par colonne (somme, somme pondérée par la position, min, max, NaN), sensible
+  aux valeurs comme à l'ordre des lignes
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Fichier de référence versionné avec les tests
+DEFAULT_GOLDEN_PATH = Path(__file__).resolve().parents[2] / "tests" / "fixtures" / "benchmark_golden.json"
+
+
+def summarize_values(values: Any) -> Dict[str, float]:
+    """
+    Résumé d'un tableau numérique, sensible aux valeurs et à leur ordre.
+
+    Args:
+        values: Tableau ou série (booléens acceptés)
+
+    Returns:
+        count, nan, sum, weighted_sum (Σ (i+1)·x_i / n), min, max (NaN ignorés)
+    """
+    array = np.asarray(pd.to_numeric(pd.Series(values), errors="coerce"), dtype=np.float64)
+    finite = ~np.isnan(array)
+    clean = np.where(finite, array, 0.0)
+    n = len(array)
+    return {
+        "count": int(n),
+        "nan": int(n - finite.sum()),
+        "sum": float(clean.sum()),
+        "weighted_sum": float((np.arange(1, n + 1) * clean).sum() / n) if n else 0.0,
+        "min": float(array[finite].min()) if finite.any() else None,
+        "max": float(array[finite].max()) if finite.any() else None,
+    }
+
+
+def summarize_frame(df: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    """Résumé summarize_values de chaque colonne numérique ou booléenne d'un DataFrame."""
+    return {
+        column: summarize_values(df[column])
+        for column in df.columns
+        if pd.api.types.is_numeric_dtype(df[column]) or pd.api.types.is_bool_dtype(df[column])
+    }
+
+
+def compare_golden(expected: Any, actual: Any, rtol: float = 1e-6, atol: float = 1e-9, path: str = "") -> List[str]:
+    """
+    Différences entre des sorties de référence et des sorties recalculées.
+
+    Args:
+        expected: Sorties de référence (JSON relu)
+        actual: Sorties recalculées (même structure)
+        rtol: Tolérance relative des flottants
+        atol: Tolérance absolue des flottants
+        path: Préfixe des chemins rapportés (récursion)
+
+    Returns:
+        Liste des différences ("chemin: attendu … obtenu …"), vide si parité
+    """
+    where = path or "<racine>"
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        differences = []
+        for key in expected.keys() | actual.keys():
+            child = f"{path}.{key}" if path else str(key)
+            if key not in actual:
+                differences.append(f"{child}: absent des sorties recalculées")
+            elif key not in expected:
+                differences.append(f"{child}: absent de la référence")
+            else:
+                differences.extend(compare_golden(expected[key], actual[key], rtol, atol, child))
+        return sorted(differences)
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [f"{where}: {len(expected)} éléments attendus, {len(actual)} obtenus"]
+        differences = []
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            differences.extend(compare_golden(e, a, rtol, atol, f"{path}[{i}]"))
+        return differences
+    numeric = (int, float)
+    if isinstance(expected, numeric) and isinstance(actual, numeric) and not isinstance(expected, bool):
+        if math.isnan(expected) and math.isnan(actual):
+            return []
+        if math.isclose(expected, actual, rel_tol=rtol, abs_tol=atol):
+            return []
+        return [f"{where}: attendu {expected!r}, obtenu {actual!r}"]
+    if expected != actual:
+        return [f"{where}: attendu {expected!r}, obtenu {actual!r}"]
+    return []
+
+
+def load_golden(path: str | Path | None = None) -> Dict[str, Any]:
+    """Relit le fichier de référence (défaut: tests/fixtures/benchmark_golden.json)."""
+    with open(path or DEFAULT_GOLDEN_PATH, "r") as f:
+        return json.load(f)
+
+
+def write_golden(outputs: Dict[str, Any], path: str | Path | None = None) -> Path:
+    """Écrit (ou remplace) le fichier de référence."""
+    path = Path(path or DEFAULT_GOLDEN_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(outputs, f, indent=1, sort_keys=True)
+        f.write("\n")
+    return path
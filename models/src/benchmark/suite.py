@@ -0,0 +1,412 @@
+"""
+Suite de benchmarks du scoring et du feature engineering.
+
+La charge est entièrement reproductible (graine fixe) :
+- flux synthétique (src/data/synthetic.py) et ses features d'entraînement
+- petits modèles entraînés sur ce flux (LightGBM déterministe mono-thread,
+  IsolationForest à graine fixe, modèle distillé), sauvegardés comme une
+  version d'artefacts et rechargés par ScoringPipeline.load (chemin servi)
+- requêtes POST /score : fixtures de tests/fixtures + payloads synthétiques
+
+Cas mesurés : FeaturePipeline.transform, RulesEngine.evaluate, chaque
+prédicteur (ligne par ligne et par lots), ScoringPipeline.score (modes full
+et distilled), handler POST /score en processus (TestClient FastAPI) et
+compute_features_for_dataset par taille de dataset.
+
+golden_outputs() produit les sorties comparées à la référence (cf. golden.py).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence
+
+import pandas as pd
+
+from ..data.synthetic import SyntheticConfig, SyntheticTransactionGenerator, build_score_payloads
+from ..features.training import compute_features_for_dataset
+from ..scoring.pipeline import ScoringPipeline
+from .golden import summarize_frame, summarize_values
+from .timing import BenchmarkResult, measure
+
+FIXTURES_DIR = Path(__file__).resolve().parents[2] / "tests" / "fixtures"
+BENCHMARK_VERSION = "bench"
+MODEL_KINDS = ("supervised", "unsupervised", "distilled")
+
+
+@dataclass
+class BenchmarkConfig:
+    """Paramètres de la charge (les sorties golden dépendent de tous ces champs)."""
+
+    rows: int = 20_000  # flux d'entraînement des modèles de la suite
+    payloads: int = 100  # payloads synthétiques POST /score (en plus des fixtures)
+    seed: int = 42
+    fraud_rate: float = 0.01
+    days: int = 30
+    windows: List[str] = field(default_factory=lambda: ["5m", "1h", "24h", "7d", "30d"])
+    supervised: Dict[str, Any] = field(
+        default_factory=lambda: {
+            "n_estimators": 60,
+            "num_leaves": 15,
+            "num_threads": 1,
+            "deterministic": True,
+            "force_row_wise": True,
+        }
+    )
+    unsupervised: Dict[str, Any] = field(
+        default_factory=lambda: {"n_estimators": 50, "max_samples": 256, "random_state": 42, "n_jobs": 1}
+    )
+    distilled: Dict[str, Any] = field(default_factory=lambda: {"n_estimators": 40, "num_threads": 1})
+
+
+def load_fixture_requests(fixtures_dir: Path | None = None) -> List[Dict[str, Any]]:
+    """
+    Corps POST /score des fixtures enrichies (tests/fixtures/enriched_transaction_*.json).
+
+    Returns:
+        Requêtes {"transaction": {..., "features": {...}}, "context": {...}}, par nom de fichier
+    """
+    requests = []
+    for path in sorted((fixtures_dir or FIXTURES_DIR).glob("enriched_transaction_*.json")):
+        payload = json.loads(path.read_text())
+        transaction = dict(payload["transaction"])
+        transaction["features"] = payload["features"]
+        requests.append({"transaction": transaction, "context": payload.get("context") or {}})
+    return requests
+
+
+def _generator(config: BenchmarkConfig, rows: int, seed: int) -> SyntheticTransactionGenerator:
+    return SyntheticTransactionGenerator(
+        SyntheticConfig(
+            n_transactions=rows,
+            days=config.days,
+            seed=seed,
+            fraud_rate=config.fraud_rate,
+        )
+    )
+
+
+class BenchmarkWorkload:
+    """Données, modèles et requêtes de la suite (construits par build())."""
+
+    def __init__(self, config: BenchmarkConfig, artifacts_dir: Path, owns_artifacts: bool = False):
+        self.config = config
+        self.artifacts_dir = artifacts_dir
+        self._owns_artifacts = owns_artifacts
+        self.transactions: pd.DataFrame | None = None
+        self.features: pd.DataFrame | None = None
+        self.pipeline: ScoringPipeline | None = None
+        self.distilled_pipeline: ScoringPipeline | None = None
+        self.drift_monitor = None
+        self.requests: List[Dict[str, Any]] = []
+        self.request_features: List[Dict[str, Any]] = []
+
+    @classmethod
+    def build(
+        cls,
+        config: BenchmarkConfig | None = None,
+        artifacts_dir: Path | None = None,
+        verbose: bool = False,
+    ) -> "BenchmarkWorkload":
+        """
+        Génère le flux, entraîne et sauvegarde les modèles, prépare les requêtes.
+
+        Args:
+            config: Paramètres de la charge (défaut: BenchmarkConfig())
+            artifacts_dir: Dossier des artefacts de la version "bench" (défaut: dossier temporaire)
+            verbose: Afficher la progression
+
+        Returns:
+            BenchmarkWorkload (close() supprime le dossier temporaire)
+        """
+        from ..models.distilled.train import distill_ensemble
+        from ..models.supervised.train import SupervisedModel
+        from ..models.unsupervised.train import UnsupervisedModel
+        from ..monitoring.drift import DriftMonitor, build_reference_histograms
+
+        config = config or BenchmarkConfig()
+        owns_artifacts = artifacts_dir is None
+        workload = cls(config, Path(artifacts_dir or tempfile.mkdtemp(prefix="benchmark_")), owns_artifacts)
+
+        generator = _generator(config, config.rows, config.seed)
+        transactions = generator.generate().sort_values("created_at", kind="mergesort").reset_index(drop=True)
+        features = compute_features_for_dataset(transactions, windows=config.windows, verbose=False, n_jobs=1)
+        labels = transactions["is_fraud"].astype(int)
+        legit = features[labels.to_numpy() == 0].reset_index(drop=True)
+        if verbose:
+            print(
+                f"🎲 Charge: {len(transactions):,} transactions, {labels.sum():,} fraudes, "
+                f"{features.shape[1]} features"
+            )
+
+        supervised = SupervisedModel(model_version=BENCHMARK_VERSION, config=config.supervised)
+        supervised.train(features, labels)
+        unsupervised = UnsupervisedModel(model_version=BENCHMARK_VERSION, config=config.unsupervised)
+        unsupervised.train(legit)
+        thresholds = {"block_threshold": 0.99, "review_threshold": 0.99}  # seuils par défaut de DecisionEngine
+        distilled, _ = distill_ensemble(features, supervised, unsupervised, thresholds, config=config.distilled)
+        distilled.model_version = BENCHMARK_VERSION
+
+        version_dir = workload.artifacts_dir / f"v{BENCHMARK_VERSION}"
+        version_dir.mkdir(parents=True, exist_ok=True)
+        supervised.save(version_dir / "supervised_model.pkl")
+        unsupervised.save(version_dir / "unsupervised_model.pkl")
+        distilled.save(version_dir / "distilled_model.pkl")
+        with open(version_dir / "feature_schema.json", "w") as f:
+            json.dump({"version": BENCHMARK_VERSION, "features": list(features.columns)}, f, indent=2)
+        with open(version_dir / "thresholds.json", "w") as f:
+            json.dump(thresholds, f, indent=2)
+        with open(version_dir / "drift_reference.json", "w") as f:
+            json.dump(
+                {
+                    "version": BENCHMARK_VERSION,
+                    "features": build_reference_histograms(legit),
+                    "scores": build_reference_histograms(
+                        {"supervised_score": supervised.predict(features), "distilled_score": distilled.predict(features)}
+                    ),
+                },
+                f,
+            )
+
+        workload.transactions = transactions
+        workload.features = features
+        workload.pipeline = ScoringPipeline.load(BENCHMARK_VERSION, workload.artifacts_dir, verbose=verbose)
+        workload.distilled_pipeline = ScoringPipeline.load(
+            BENCHMARK_VERSION, workload.artifacts_dir, verbose=verbose, scoring_mode="distilled"
+        )
+        workload.drift_monitor = DriftMonitor.load_version(BENCHMARK_VERSION, workload.artifacts_dir)
+
+        workload.requests = load_fixture_requests() + build_score_payloads(
+            transactions, generator.wallets(), config.payloads, seed=config.seed, windows=config.windows
+        )
+        workload.request_features = [
+            workload.pipeline.feature_pipeline.transform(request["transaction"]) for request in workload.requests
+        ]
+        return workload
+
+    def close(self) -> None:
+        """Supprime le dossier d'artefacts temporaire."""
+        if self._owns_artifacts:
+            shutil.rmtree(self.artifacts_dir, ignore_errors=True)
+
+    def __enter__(self) -> "BenchmarkWorkload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def predictor(self, kind: str):
+        """Prédicteur chargé d'un type de modèle ("supervised", "unsupervised", "distilled")."""
+        if kind == "distilled":
+            return self.distilled_pipeline.distilled_predictor
+        return getattr(self.pipeline, f"{kind}_predictor")
+
+    def batch_frame(self, kind: str, rows: int | None = None) -> pd.DataFrame:
+        """Features du flux dans l'ordre de colonnes attendu par le modèle (prédiction par lots)."""
+        model = self.predictor(kind).model
+        columns = list(getattr(model, "feature_names", None) or self.features.columns)
+        frame = self.features[columns]
+        return frame if rows is None else frame.iloc[:rows]
+
+
+@contextmanager
+def api_client(workload: BenchmarkWorkload) -> Iterator[Any]:
+    """
+    Client FastAPI en processus sur l'API servie (api/main.py) avec le pipeline de la charge.
+
+    Yields:
+        fastapi.testclient.TestClient (pipeline et moniteur de drift restaurés à la sortie)
+    """
+    from fastapi.testclient import TestClient
+
+    if "api.main" not in sys.modules:
+        # Premier import : l'API charge directement la version de la charge (variables restaurées ensuite)
+        saved = {name: os.environ.get(name) for name in ("MODEL_VERSION", "ARTIFACTS_DIR")}
+        os.environ.update(MODEL_VERSION=BENCHMARK_VERSION, ARTIFACTS_DIR=str(workload.artifacts_dir))
+        try:
+            import api.main  # noqa: F401
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+    import api.main as api_main
+
+    previous = api_main.scoring_pipeline, api_main.drift_monitor
+    api_main.scoring_pipeline, api_main.drift_monitor = workload.pipeline, workload.drift_monitor
+    try:
+        with TestClient(api_main.app) as client:
+            yield client
+    finally:
+        api_main.scoring_pipeline, api_main.drift_monitor = previous
+
+
+def run_suite(
+    workload: BenchmarkWorkload,
+    sizes: Sequence[int] = (10_000, 100_000),
+    batch_sizes: Sequence[int] = (1_000, 10_000),
+    repeat: int = 5,
+    dataset_repeat: int = 3,
+    verbose: bool = True,
+) -> List[BenchmarkResult]:
+    """
+    Mesure tous les cas de la suite.
+
+    Args:
+        workload: Charge construite par BenchmarkWorkload.build()
+        sizes: Tailles de dataset de compute_features_for_dataset
+        batch_sizes: Tailles de lot des prédictions par lots (bornées par le flux)
+        repeat: Appels mesurés par cas (requêtes, prédictions)
+        dataset_repeat: Appels mesurés par taille de dataset
+        verbose: Afficher chaque résultat
+
+    Returns:
+        Résultats dans l'ordre d'exécution
+    """
+    results: List[BenchmarkResult] = []
+    requests = workload.requests
+    features = workload.request_features
+    n = len(requests)
+
+    def record(result: BenchmarkResult) -> None:
+        results.append(result)
+        if verbose:
+            summary = result.to_dict()
+            print(
+                f"   ⏱️  {result.name:<45} {summary['median_seconds'] * 1e3:9.2f} ms"
+                f"  ({summary['per_item_us']:9.1f} µs/élément, {result.items:,} éléments)"
+            )
+
+    feature_pipeline = workload.pipeline.feature_pipeline
+    record(
+        measure(
+            "features.pipeline_transform",
+            lambda: [feature_pipeline.transform(r["transaction"]) for r in requests],
+            items=n,
+            repeat=repeat,
+        )
+    )
+    rules_engine = workload.pipeline.rules_engine
+    record(
+        measure(
+            "rules.evaluate",
+            lambda: [rules_engine.evaluate(r["transaction"], f, r["context"]) for r, f in zip(requests, features)],
+            items=n,
+            repeat=repeat,
+        )
+    )
+
+    for kind in MODEL_KINDS:
+        predictor = workload.predictor(kind)
+        record(
+            measure(
+                f"models.{kind}.predict_row",
+                lambda: [predictor.predict(f) for f in features],
+                items=n,
+                repeat=repeat,
+            )
+        )
+        for batch_size in batch_sizes:
+            frame = workload.batch_frame(kind, batch_size)
+            record(
+                measure(
+                    f"models.{kind}.predict_batch[{batch_size}]",
+                    lambda frame=frame: predictor.model.predict(frame),
+                    items=len(frame),
+                    repeat=repeat,
+                    params={"batch_size": len(frame)},
+                )
+            )
+
+    for mode, pipeline in (("full", workload.pipeline), ("distilled", workload.distilled_pipeline)):
+        record(
+            measure(
+                f"scoring.pipeline[{mode}]",
+                lambda pipeline=pipeline: [pipeline.score(r["transaction"], r["context"]) for r in requests],
+                items=n,
+                repeat=repeat,
+            )
+        )
+
+    with api_client(workload) as client:
+        record(
+            measure("api.score", lambda: [client.post("/score", json=r) for r in requests], items=n, repeat=repeat)
+        )
+
+    for size in sizes:
+        transactions = _generator(workload.config, size, workload.config.seed + size).generate()
+        record(
+            measure(
+                f"features.compute_features_for_dataset[{size}]",
+                lambda transactions=transactions: compute_features_for_dataset(
+                    transactions, windows=workload.config.windows, verbose=False, n_jobs=1
+                ),
+                items=len(transactions),
+                repeat=dataset_repeat,
+                warmup=0,
+                params={"rows": len(transactions), "n_jobs": 1},
+            )
+        )
+    return results
+
+
+def _optional_float(value: Any) -> float | None:
+    return None if value is None else float(value)
+
+
+def golden_outputs(workload: BenchmarkWorkload) -> Dict[str, Any]:
+    """
+    Sorties de la charge comparées à la référence (tests/fixtures/benchmark_golden.json).
+
+    Returns:
+        config, résumés des features (dataset et FeaturePipeline), résumés des
+        prédictions par lots, et par requête : règles, scores, décisions
+        (pipeline full, pipeline distilled, handler POST /score)
+    """
+    transactions = []
+    with api_client(workload) as client:
+        for request, features in zip(workload.requests, workload.request_features):
+            rules = workload.pipeline.rules_engine.evaluate(request["transaction"], features, request["context"])
+            full = workload.pipeline.score(request["transaction"], request["context"])
+            distilled = workload.distilled_pipeline.score(request["transaction"], request["context"])
+            response = client.post("/score", json=request)
+            response.raise_for_status()
+            api = response.json()
+            transactions.append(
+                {
+                    "transaction_id": request["transaction"].get("transaction_id"),
+                    "rule_score": float(rules.rule_score),
+                    "rules_decision": rules.decision,
+                    "boost_factor": float(rules.boost_factor),
+                    "reasons": list(rules.reasons),
+                    "supervised_score": _optional_float(full.supervised_score),
+                    "unsupervised_score": _optional_float(full.unsupervised_score),
+                    "risk_score": float(full.risk_score),
+                    "decision": full.decision,
+                    "distilled_score": _optional_float(distilled.distilled_score),
+                    "distilled_risk_score": float(distilled.risk_score),
+                    "distilled_decision": distilled.decision,
+                    "api_risk_score": float(api["risk_score"]),
+                    "api_decision": api["decision"],
+                    "api_reasons": api["reasons"],
+                }
+            )
+
+    return {
+        "config": asdict(workload.config),
+        "dataset_features": summarize_frame(workload.features),
+        "pipeline_features": summarize_frame(pd.DataFrame(workload.request_features).infer_objects()),
+        "batch_predictions": {
+            kind: summarize_values(workload.predictor(kind).model.predict(workload.batch_frame(kind)))
+            for kind in MODEL_KINDS
+        },
+        "transactions": transactions,
+    }
@@ -0,0 +1,199 @@
+"""
+Mesures de durée des benchmarks et rapports JSON comparables entre commits.
+
+Chaque cas est une fonction sans argument appelée `repeat` fois après un
+échauffement ; on garde la durée de chaque appel (médiane, p95, min) et le
+débit (éléments/s) rapporté au nombre d'éléments traités par appel.
+
+Le rapport JSON contient l'environnement (commit git, versions, CPU) pour
+comparer deux exécutions (compare_results).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ..utils.profiling import current_rss_mb
+
+
+@dataclass
+class BenchmarkResult:
+    """Durées mesurées d'un cas de benchmark."""
+
+    name: str
+    items: int  # éléments traités par appel (transactions, lignes)
+    seconds: List[float] = field(default_factory=list)  # durée de chaque appel mesuré
+    params: Dict[str, Any] = field(default_factory=dict)
+    rss_mb: float = 0.0  # mémoire résidente après le cas
+
+    @property
+    def median_seconds(self) -> float:
+        return float(np.median(self.seconds)) if self.seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Résumé sérialisable (une entrée de results dans le rapport JSON)."""
+        seconds = np.asarray(self.seconds, dtype=np.float64)
+        median = self.median_seconds
+        return {
+            "name": self.name,
+            "params": self.params,
+            "items": self.items,
+            "calls": len(self.seconds),
+            "min_seconds": float(seconds.min()) if len(seconds) else 0.0,
+            "median_seconds": median,
+            "p95_seconds": float(np.percentile(seconds, 95)) if len(seconds) else 0.0,
+            "mean_seconds": float(seconds.mean()) if len(seconds) else 0.0,
+            "per_item_us": median / max(self.items, 1) * 1e6,
+            "items_per_second": self.items / median if median > 0 else None,
+            "rss_mb": self.rss_mb,
+        }
+
+
+def measure(
+    name: str,
+    fn: Callable[[], Any],
+    items: int = 1,
+    repeat: int = 5,
+    warmup: int = 1,
+    params: Dict[str, Any] | None = None,
+) -> BenchmarkResult:
+    """
+    Mesure la durée d'un cas de benchmark.
+
+    Args:
+        name: Nom du cas (ex: "rules.evaluate")
+        fn: Fonction mesurée (un appel = un lot de `items` éléments)
+        items: Éléments traités par appel (pour la durée par élément et le débit)
+        repeat: Appels mesurés
+        warmup: Appels d'échauffement non mesurés (caches, imports paresseux)
+        params: Paramètres du cas reportés dans le rapport
+
+    Returns:
+        BenchmarkResult
+    """
+    for _ in range(warmup):
+        fn()
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+    result = BenchmarkResult(name=name, items=items, seconds=seconds, params=dict(params or {}))
+    result.rss_mb = current_rss_mb()
+    return result
+
+
+def _git(*args: str) -> str | None:
+    try:
+        output = subprocess.run(
+            ["git", *args],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() if output.returncode == 0 else None
+
+
+def environment() -> Dict[str, Any]:
+    """Commit git, versions des bibliothèques et machine de l'exécution."""
+    import lightgbm
+    import sklearn
+
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "lightgbm": lightgbm.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def default_results_path(directory: str | Path, env: Dict[str, Any]) -> Path:
+    """Chemin du rapport d'une exécution : <directory>/<commit>[-dirty].json."""
+    name = env.get("commit") or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    if env.get("dirty"):
+        name = f"{name}-dirty"
+    return Path(directory) / f"{name}.json"
+
+
+def save_results(path: str | Path, results: List[BenchmarkResult], extra: Dict[str, Any] | None = None) -> Path:
+    """
+    Écrit le rapport JSON d'une exécution.
+
+    Args:
+        path: Fichier de sortie
+        results: Cas mesurés
+        extra: Champs additionnels (ex: config de la suite, statut de parité)
+
+    Returns:
+        Chemin du rapport
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    report = {"environment": environment(), **(extra or {}), "results": [r.to_dict() for r in results]}
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def load_results(path: str | Path) -> Dict[str, Any]:
+    """Relit un rapport JSON écrit par save_results."""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.10) -> pd.DataFrame:
+    """
+    Compare deux rapports cas par cas (durées médianes).
+
+    Args:
+        baseline: Rapport de référence (load_results)
+        current: Rapport à comparer
+        tolerance: Écart relatif en dessous duquel un cas est "unchanged"
+
+    Returns:
+        DataFrame (name, baseline_seconds, current_seconds, speedup, status), les
+        cas absents d'un des deux rapports ayant le statut "added" / "removed"
+    """
+    before = {r["name"]: r for r in baseline.get("results", [])}
+    after = {r["name"]: r for r in current.get("results", [])}
+    rows = []
+    for name in list(before) + [n for n in after if n not in before]:
+        old, new = before.get(name), after.get(name)
+        row = {
+            "name": name,
+            "baseline_seconds": old["median_seconds"] if old else None,
+            "current_seconds": new["median_seconds"] if new else None,
+            "speedup": None,
+            "status": "removed" if new is None else "added" if old is None else "unchanged",
+        }
+        if old and new and new["median_seconds"] > 0:
+            # Durée par élément : les lots peuvent changer de taille entre deux exécutions
+            speedup = old["per_item_us"] / new["per_item_us"]
+            row["speedup"] = speedup
+            if speedup > 1.0 + tolerance:
+                row["status"] = "faster"
+            elif speedup < 1.0 / (1.0 + tolerance):
+                row["status"] = "slower"
+        rows.append(row)
+    return pd.DataFrame(rows, columns=["name", "baseline_seconds", "current_seconds", "speedup", "status"])
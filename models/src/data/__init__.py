@@ -3,6 +3,16 @@ Module de nettoyage et préparation des données.
 """
 
 from .cleaning import clean_transaction_data
+from .columnar import ColumnarDatasetWriter, load_columnar_dataset, write_columnar_dataset
 from .preparation import prepare_training_data
+from .synthetic import SyntheticConfig, SyntheticTransactionGenerator
 
-__all__ = ["clean_transaction_data", "prepare_training_data"]
+__all__ = [
+    "ColumnarDatasetWriter",
+    "clean_transaction_data",
+    "load_columnar_dataset",
+    "prepare_training_data",
+    "SyntheticConfig",
+    "SyntheticTransactionGenerator",
+    "write_columnar_dataset",
+]
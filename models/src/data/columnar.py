@@ -0,0 +1,330 @@
+"""
+Stockage colonnaire typé des datasets d'entraînement (Parquet partitionné par date).
+
+Format d'un dataset (dossier <nom>.parquet/) :
+- date=YYYY-MM-DD/part-*.parquet : transactions, une partition par jour (UTC)
+- _wallets.parquet : dictionnaire des identifiants de wallets (code = position)
+- _dataset.json : métadonnées (colonnes wallets, nombre de lignes, période)
+
+Types stockés :
+- identifiants de wallets (source, destination, initiateur) : codes int32
+  d'un dictionnaire commun (-1 = manquant)
+- amount : float32
+- created_at : int64 (epoch nanosecondes UTC)
+- is_fraud : int8
+
+Le chargement pousse les filtres de période (start / end) et de taille
+(tail_rows) jusqu'au scan Parquet : seules les partitions et row groups
+utiles sont lus, en mémoire mappée.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+WALLET_COLUMNS = ("source_wallet_id", "destination_wallet_id", "initiator_user_id")
+WALLETS_FILE = "_wallets.parquet"
+METADATA_FILE = "_dataset.json"
+PARTITION_COLUMN = "date"
+_DAY_NS = 86_400 * 1_000_000_000
+_PARTITIONING = ds.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+
+
+def columnar_path(data_dir: Path, name: str) -> Path:
+    """Chemin du dataset colonnaire <name>.parquet dans data_dir."""
+    return Path(data_dir) / f"{name}.parquet"
+
+
+def is_columnar_dataset(path: Path) -> bool:
+    """Vrai si path est un dataset écrit par ColumnarDatasetWriter."""
+    return (Path(path) / METADATA_FILE).exists()
+
+
+def _timestamp_ns(value: Any) -> int:
+    """Date (str ISO, datetime, Timestamp) → epoch nanosecondes UTC."""
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return int(ts.as_unit("ns").value)
+
+
+def _partition_value(ns: int) -> str:
+    """Partition (jour UTC) d'un instant en nanosecondes."""
+    return pd.Timestamp(ns, unit="ns", tz="UTC").strftime("%Y-%m-%d")
+
+
+class ColumnarDatasetWriter:
+    """
+    Écrit un dataset colonnaire par blocs (le dictionnaire des wallets est
+    complété au fil des blocs).
+
+    L'écriture se fait dans un dossier temporaire renommé à la fermeture :
+    le dataset est complet ou absent.
+
+    Usage:
+        with ColumnarDatasetWriter("Data/processed/paysim_mapped.parquet") as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, path: str | Path, wallet_columns: Sequence[str] = WALLET_COLUMNS):
+        """
+        Initialise l'écriture.
+
+        Args:
+            path: Dossier du dataset (remplacé à la fermeture s'il existe)
+            wallet_columns: Colonnes d'identifiants encodées par le dictionnaire commun
+        """
+        self.path = Path(path)
+        self.wallet_columns = tuple(wallet_columns)
+        self._tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+        self._tmp_path.mkdir(parents=True)
+        self._wallets: Dict[str, int] = {}
+        self._schema: pa.Schema | None = None
+        self._chunks = 0
+        self._rows = 0
+        self._min_ns: int | None = None
+        self._max_ns: int | None = None
+
+    def _encode_wallets(self, columns: List[pd.Series]) -> List[np.ndarray]:
+        """Identifiants → codes int32 du dictionnaire commun (-1 = manquant), une factorisation pour toutes les colonnes."""
+        values = np.concatenate([column.to_numpy(dtype=object) for column in columns])
+        codes, uniques = pd.factorize(values)
+        lookup = self._wallets
+        mapping = np.array([lookup.setdefault(u, len(lookup)) for u in uniques.astype(str).tolist()] + [-1], dtype=np.int32)
+        encoded = mapping[codes]  # code -1 de factorize → dernier élément (-1)
+        return np.split(encoded, len(columns))
+
+    def _to_table(self, df: pd.DataFrame) -> pa.Table:
+        """Convertit un bloc en table typée (avec la colonne de partition)."""
+        created_at = pd.to_datetime(df["created_at"], utc=True)
+        keep = created_at.notna().to_numpy()
+        if not keep.all():
+            print(f"   ⚠️  {int((~keep).sum())} transactions sans created_at ignorées")
+            df, created_at = df[keep], created_at[keep]
+        times = created_at.dt.as_unit("ns").astype("int64").to_numpy()
+
+        wallet_columns = [c for c in df.columns if c in self.wallet_columns]
+        wallet_codes = dict(zip(wallet_columns, self._encode_wallets([df[c] for c in wallet_columns])))
+        arrays: Dict[str, pa.Array] = {}
+        for column in df.columns:
+            values = df[column]
+            if column == "created_at":
+                arrays[column] = pa.array(times, type=pa.int64())
+            elif column in wallet_codes:
+                arrays[column] = pa.array(wallet_codes[column], type=pa.int32())
+            elif column == "amount":
+                arrays[column] = pa.array(pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float32))
+            elif column == "is_fraud":
+                arrays[column] = pa.array(values.fillna(0).to_numpy(dtype=np.int8))
+            elif pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+                arrays[column] = pa.array(values.to_numpy(), from_pandas=True)
+            else:
+                strings = values.astype(str).to_numpy(dtype=object)
+                strings[values.isna().to_numpy()] = None
+                arrays[column] = pa.array(strings, type=pa.string())
+        # Partition : jour UTC (formaté une fois par jour distinct)
+        days, day_index = np.unique(times // _DAY_NS, return_inverse=True)
+        labels = np.array([_partition_value(int(day) * _DAY_NS) for day in days], dtype=object)
+        arrays[PARTITION_COLUMN] = pa.array(labels[day_index], type=pa.string())
+        table = pa.table(arrays)
+
+        # Schéma figé par le premier bloc (les blocs suivants s'y conforment)
+        if self._schema is None:
+            self._schema = table.schema
+        else:
+            table = table.select(self._schema.names).cast(self._schema)
+        if len(times):
+            self._min_ns = int(times.min()) if self._min_ns is None else min(self._min_ns, int(times.min()))
+            self._max_ns = int(times.max()) if self._max_ns is None else max(self._max_ns, int(times.max()))
+        return table
+
+    def write(self, df: pd.DataFrame) -> int:
+        """
+        Écrit un bloc de transactions.
+
+        Args:
+            df: Transactions (created_at obligatoire)
+
+        Returns:
+            Nombre de lignes écrites
+        """
+        table = self._to_table(df)
+        if table.num_rows == 0:
+            return 0
+        ds.write_dataset(
+            table,
+            self._tmp_path,
+            format="parquet",
+            partitioning=_PARTITIONING,
+            basename_template=f"part-{self._chunks:05d}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        self._chunks += 1
+        self._rows += table.num_rows
+        return table.num_rows
+
+    def close(self) -> Path:
+        """
+        Écrit le dictionnaire et les métadonnées, puis publie le dataset.
+
+        Returns:
+            Dossier du dataset
+        """
+        pq.write_table(pa.table({"wallet_id": pa.array(list(self._wallets), type=pa.string())}), self._tmp_path / WALLETS_FILE)
+        metadata = {
+            "rows": self._rows,
+            "wallets": len(self._wallets),
+            "wallet_columns": list(self.wallet_columns),
+            "columns": [name for name in (self._schema.names if self._schema else []) if name != PARTITION_COLUMN],
+            "period": [
+                None if self._min_ns is None else str(pd.Timestamp(self._min_ns, unit="ns", tz="UTC")),
+                None if self._max_ns is None else str(pd.Timestamp(self._max_ns, unit="ns", tz="UTC")),
+            ],
+        }
+        with open(self._tmp_path / METADATA_FILE, "w") as f:
+            json.dump(metadata, f, indent=2)
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        """Abandonne l'écriture (supprime le dossier temporaire)."""
+        shutil.rmtree(self._tmp_path, ignore_errors=True)
+
+    def __enter__(self) -> "ColumnarDatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_columnar_dataset(df: pd.DataFrame, path: str | Path, chunk_size: int = 1_000_000) -> Path:
+    """
+    Écrit un DataFrame en dataset colonnaire partitionné par date.
+
+    Args:
+        df: Transactions
+        path: Dossier du dataset (<nom>.parquet)
+        chunk_size: Taille des blocs d'écriture
+
+    Returns:
+        Dossier du dataset
+    """
+    with ColumnarDatasetWriter(path) as writer:
+        for start in range(0, len(df), chunk_size):
+            writer.write(df.iloc[start : start + chunk_size])
+    return Path(path)
+
+
+def read_columnar_metadata(path: str | Path) -> Dict[str, Any]:
+    """Métadonnées d'un dataset colonnaire (_dataset.json)."""
+    with open(Path(path) / METADATA_FILE, "r") as f:
+        return json.load(f)
+
+
+def _period_filter(start: Any = None, end: Any = None, start_ns: int | None = None) -> ds.Expression | None:
+    """Filtre [start, end[ sur created_at, doublé d'un filtre de partition (élagage des dossiers)."""
+    expression = None
+    bounds = []
+    if start is not None:
+        bounds.append((_timestamp_ns(start), ">="))
+    if start_ns is not None:
+        bounds.append((start_ns, ">="))
+    if end is not None:
+        bounds.append((_timestamp_ns(end), "<"))
+    for ns, op in bounds:
+        if op == ">=":
+            clause = (ds.field("created_at") >= ns) & (ds.field(PARTITION_COLUMN) >= _partition_value(ns))
+        else:
+            clause = (ds.field("created_at") < ns) & (ds.field(PARTITION_COLUMN) <= _partition_value(ns))
+        expression = clause if expression is None else expression & clause
+    return expression
+
+
+def load_columnar_dataset(
+    path: str | Path,
+    start: Any = None,
+    end: Any = None,
+    tail_rows: int | None = None,
+    columns: List[str] | None = None,
+    decode_wallets: bool = True,
+) -> pd.DataFrame:
+    """
+    Charge un dataset colonnaire, trié par created_at.
+
+    Args:
+        path: Dossier du dataset (<nom>.parquet)
+        start: Début de période inclus (date ISO ou Timestamp ; None = pas de borne)
+        end: Fin de période exclue (None = pas de borne)
+        tail_rows: Ne garder que les N transactions les plus récentes de la période
+        columns: Colonnes à charger (défaut: toutes)
+        decode_wallets: Identifiants de wallets en Categorical (sinon codes int32, -1 = manquant)
+
+    Returns:
+        DataFrame (created_at en datetime UTC, index 0..n-1)
+
+    Raises:
+        FileNotFoundError: Si le dataset n'existe pas
+    """
+    path = Path(path)
+    if not is_columnar_dataset(path):
+        raise FileNotFoundError(f"Dataset colonnaire non trouvé: {path}")
+    metadata = read_columnar_metadata(path)
+    dataset = ds.dataset(
+        path,
+        format="parquet",
+        partitioning=_PARTITIONING,
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+    columns = [c for c in (columns or metadata["columns"]) if c != PARTITION_COLUMN]
+    if "created_at" not in columns:
+        columns = ["created_at"] + columns
+    expression = _period_filter(start, end)
+
+    if tail_rows is not None:
+        # Première passe sur created_at seul pour trouver l'instant de coupure
+        times = dataset.to_table(columns=["created_at"], filter=expression).column(0).to_numpy()
+        if len(times) > tail_rows:
+            cutoff = int(np.partition(times, len(times) - tail_rows)[len(times) - tail_rows])
+            expression = _period_filter(start, end, start_ns=cutoff)
+        del times
+
+    table = dataset.to_table(columns=columns, filter=expression)
+    table = table.take(pc.sort_indices(table, sort_keys=[("created_at", "ascending")]))
+    if tail_rows is not None and table.num_rows > tail_rows:
+        table = table.slice(table.num_rows - tail_rows)
+
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    df["created_at"] = pd.to_datetime(df["created_at"].to_numpy(dtype=np.int64), unit="ns", utc=True)
+
+    wallet_columns = [c for c in metadata["wallet_columns"] if c in df.columns]
+    if decode_wallets and wallet_columns:
+        # Catégories communes restreintes aux wallets présents
+        all_codes = np.concatenate([df[c].to_numpy() for c in wallet_columns])
+        used = np.unique(all_codes[all_codes >= 0])
+        del all_codes
+        dictionary = pq.read_table(path / WALLETS_FILE, memory_map=True).column("wallet_id")
+        categories = pd.Index(dictionary.take(pa.array(used)).to_pandas())
+        for column in wallet_columns:
+            codes = df[column].to_numpy()
+            local = np.where(codes >= 0, np.searchsorted(used, codes), -1).astype(np.int32)
+            df[column] = pd.Categorical.from_codes(local, categories=categories)
+    return df.reset_index(drop=True)
@@ -7,32 +7,47 @@ des datasets pour l'entraînement des modèles.
 
 from __future__ import annotations
 
+import time
 from pathlib import Path
-from typing import Tuple
+from typing import Dict, Iterator, Tuple
 
+import numpy as np
 import pandas as pd
 
 
+def _utc(value: str | pd.Timestamp) -> pd.Timestamp:
+    """Date → Timestamp UTC (une date sans fuseau est supposée UTC)."""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
 def prepare_training_data(
     data_source: Path | pd.DataFrame,
     train_ratio: float = 0.7,
     val_ratio: float = 0.15,
     test_ratio: float = 0.15,
+    train_end: str | pd.Timestamp | None = None,
+    val_end: str | pd.Timestamp | None = None,
 ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     """
     Prépare les données pour l'entraînement avec split temporel.
 
+    Le DataFrame fourni n'est pas copié s'il est déjà trié par created_at
+    (cas des datasets colonnaires) ; seuls les splits sont matérialisés.
+
     Args:
         data_source: Chemin vers le fichier de données nettoyées OU un DataFrame
         train_ratio: Proportion pour l'entraînement (défaut: 0.7)
         val_ratio: Proportion pour la validation (défaut: 0.15)
         test_ratio: Proportion pour le test (défaut: 0.15)
+        train_end: Date de fin (exclue) du train ; avec val_end, remplace les ratios
+        val_end: Date de fin (exclue) de la validation
 
     Returns:
         Tuple de (train_df, val_df, test_df)
 
     Raises:
-        ValueError: Si les ratios ne somment pas à 1.0
+        ValueError: Si les ratios ne somment pas à 1.0, ou si une seule date de split est fournie
         FileNotFoundError: Si le fichier de données n'existe pas (si data_source est un Path)
         TypeError: Si data_source n'est ni un Path ni un DataFrame
     """
@@ -42,6 +57,8 @@ def prepare_training_data(
             f"Les ratios doivent sommer à 1.0, reçu: "
             f"train={train_ratio}, val={val_ratio}, test={test_ratio}"
         )
+    if (train_end is None) != (val_end is None):
+        raise ValueError("train_end et val_end doivent être fournis ensemble")
 
     # Charger les données si data_source est un Path
     if isinstance(data_source, Path):
@@ -51,18 +68,24 @@ def prepare_training_data(
         df = pd.read_csv(data_source)
         print(f"   ✅ {len(df)} transactions chargées")
     elif isinstance(data_source, pd.DataFrame):
-        df = data_source.copy()
+        df = data_source
         print(f"📊 Utilisation du DataFrame fourni ({len(df)} transactions)...")
     else:
         raise TypeError("data_source doit être un Path ou un DataFrame")
 
     # Convertir created_at en datetime si ce n'est pas déjà fait
-    if "created_at" in df.columns:
-        df["created_at"] = pd.to_datetime(df["created_at"], utc=True)
-        # Trier par date pour le split temporel
-        df = df.sort_values("created_at").reset_index(drop=True)
-    else:
+    if "created_at" not in df.columns:
         raise ValueError("Colonne 'created_at' manquante dans les données")
+    created_at = pd.to_datetime(df["created_at"], utc=True)
+    # Trier par date pour le split temporel (une seule copie, évitée si déjà trié)
+    if not created_at.is_monotonic_increasing:
+        order = np.argsort(created_at.to_numpy(), kind="stable")
+        df = df.take(order)
+        created_at = created_at.take(order)
+    elif df is data_source:
+        df = df.copy(deep=False)
+    df["created_at"] = created_at.to_numpy()
+    df = df.reset_index(drop=True)
 
     # Validation : vérifier qu'il n'y a pas de valeurs manquantes dans created_at
     if df["created_at"].isna().any():
@@ -72,8 +95,16 @@ def prepare_training_data(
 
     # Split temporel
     n_total = len(df)
-    n_train = int(n_total * train_ratio)
-    n_val = int(n_total * val_ratio)
+    if train_end is not None:
+        # Split par dates : [.., train_end[, [train_end, val_end[, [val_end, ..]
+        times = df["created_at"]
+        n_train = int(times.searchsorted(_utc(train_end), side="left"))
+        n_val = int(times.searchsorted(_utc(val_end), side="left")) - n_train
+        if n_val < 0:
+            raise ValueError(f"val_end ({val_end}) doit être postérieure à train_end ({train_end})")
+    else:
+        n_train = int(n_total * train_ratio)
+        n_val = int(n_total * val_ratio)
     # Le reste va au test
 
     train_df = df.iloc[:n_train].copy()
@@ -121,16 +152,117 @@ def prepare_training_data(
     return train_df, val_df, test_df
 
 
+PAYSIM_COLUMNS = ("step", "type", "amount", "nameOrig", "nameDest", "isFraud")
+PAYSIM_BASE_TIMESTAMP = pd.Timestamp("2020-01-01 00:00:00", tz="UTC")
+_PAYSIM_OUTGOING_TYPES = ["CASH_OUT", "DEBIT", "TRANSFER"]
+
+
+def _map_paysim_chunk(chunk: pd.DataFrame, first_id: int, step_counts: Dict[int, int]) -> pd.DataFrame:
+    """
+    Mappe un bloc PaySim au format Payon (vectorisé, ordre des lignes conservé).
+
+    created_at = base + step heures + rang secondes, où le rang est la position
+    de la transaction dans son step (ordre du fichier, blocs précédents inclus).
+
+    Args:
+        chunk: Bloc PaySim brut
+        first_id: Numéro de la première transaction du bloc (transaction_id)
+        step_counts: Transactions déjà vues par step (mis à jour)
+
+    Returns:
+        Bloc au format Payon
+    """
+    n = len(chunk)
+    steps = chunk["step"].to_numpy(dtype=np.int64)
+    offsets = pd.Series(steps).map(step_counts).fillna(0).to_numpy(dtype=np.int64)
+    ranks = chunk.groupby("step", sort=False).cumcount().to_numpy(dtype=np.int64) + offsets
+    for step, count in pd.Series(steps).value_counts(sort=False).items():
+        step_counts[int(step)] = step_counts.get(int(step), 0) + int(count)
+
+    transaction_type = chunk["type"].astype(str)
+    # Direction : CASH_OUT, DEBIT, TRANSFER → outgoing ; CASH_IN, PAYMENT → incoming (approximation)
+    direction = np.where(transaction_type.isin(_PAYSIM_OUTGOING_TYPES), "outgoing", "incoming")
+    source_wallet_id = chunk["nameOrig"].astype(str).to_numpy()
+    created_at_ns = PAYSIM_BASE_TIMESTAMP.as_unit("ns").value + steps * 3_600_000_000_000 + ranks * 1_000_000_000
+
+    payon_df = pd.DataFrame(
+        {
+            "transaction_id": np.char.add("paysim_", np.arange(first_id, first_id + n).astype(str)).astype(object),
+            "source_wallet_id": source_wallet_id,
+            "destination_wallet_id": chunk["nameDest"].astype(str).to_numpy(),
+            "amount": chunk["amount"].to_numpy(dtype=np.float64),
+            "transaction_type": transaction_type.to_numpy(),
+            "direction": direction.astype(object),
+            "created_at": pd.to_datetime(created_at_ns, unit="ns", utc=True),
+            # PaySim n'a pas de currency, on ajoute PYC
+            "currency": "PYC",
+            # Champs optionnels (vides pour PaySim)
+            "provider": "PAYSIM",
+            "provider_tx_id": None,
+            "initiator_user_id": source_wallet_id,  # Approximation
+            "country": None,
+            "city": None,
+            "description": None,
+        }
+    )
+    if "isFraud" in chunk.columns:
+        payon_df["is_fraud"] = chunk["isFraud"].to_numpy(dtype=np.int64)
+    return payon_df
+
+
+def iter_paysim_to_payon(
+    paysim_path: Path,
+    max_amount: float | None = None,
+    chunk_size: int = 1_000_000,
+) -> Iterator[pd.DataFrame]:
+    """
+    Mappe PaySim vers le format Payon par blocs (mémoire constante).
+
+    Seules les colonnes utiles du CSV brut sont lues. Les blocs sont produits
+    dans l'ordre du fichier ; les timestamps ne dépendent que de (step, rang
+    dans le step), donc pas de la taille des blocs.
+
+    Args:
+        paysim_path: Chemin vers le fichier PaySim CSV
+        max_amount: Montant maximum autorisé (None = pas de filtrage)
+        chunk_size: Nombre de lignes brutes par bloc
+
+    Yields:
+        Blocs au format Payon
+    """
+    step_counts: Dict[int, int] = {}
+    n_mapped = 0
+    n_filtered = 0
+    reader = pd.read_csv(
+        paysim_path,
+        usecols=lambda column: column in PAYSIM_COLUMNS,
+        dtype={"step": np.int64, "type": "category", "amount": np.float64, "isFraud": np.int8},
+        chunksize=chunk_size,
+    )
+    for chunk in reader:
+        # Filtrer les montants si max_amount est spécifié (avant l'attribution des rangs)
+        if max_amount is not None:
+            keep = chunk["amount"] <= max_amount
+            n_filtered += int((~keep).sum())
+            chunk = chunk[keep]
+        payon_chunk = _map_paysim_chunk(chunk, n_mapped, step_counts)
+        n_mapped += len(payon_chunk)
+        yield payon_chunk
+    if n_filtered > 0:
+        print(f"   ⚠️  {n_filtered} transactions filtrées (amount > {max_amount})")
+
+
 def map_paysim_to_payon(
     paysim_path: Path,
     max_amount: float | None = None,
     output_path: Path | None = None,
+    chunk_size: int = 1_000_000,
 ) -> pd.DataFrame:
     """
     Mappe le dataset PaySim vers le format Payon.
 
     Mapping:
-    - step → created_at (step = heures depuis le début, converti en timestamp)
+    - step → created_at (step = heures depuis le début, + rang dans le step en secondes)
     - type → transaction_type
     - amount → amount (filtré si max_amount spécifié)
     - nameOrig → source_wallet_id
@@ -138,85 +270,29 @@ def map_paysim_to_payon(
     - isFraud → label (pour supervisé)
     - Balances (oldbalanceOrg, etc.) → IGNORÉES (pas disponibles en prod)
 
+    Pour les gros fichiers, préférer convert_paysim_to_columnar() (mémoire constante).
+
     Args:
         paysim_path: Chemin vers le fichier PaySim CSV
         max_amount: Montant maximum autorisé (None = pas de filtrage, recommandé pour l'entraînement)
         output_path: Chemin optionnel pour sauvegarder le résultat
+        chunk_size: Nombre de lignes brutes lues par bloc
 
     Returns:
         DataFrame au format Payon
     """
     print(f"📊 Mapping PaySim → Payon depuis {paysim_path}...")
-
-    # Charger PaySim
-    df = pd.read_csv(paysim_path)
-
-    print(f"   ✅ {len(df)} transactions PaySim chargées")
-
-    # Filtrer les montants si max_amount est spécifié
-    if max_amount is not None:
-        n_before = len(df)
-        df = df[df["amount"] <= max_amount].copy()
-        n_filtered = n_before - len(df)
-        if n_filtered > 0:
-            print(f"   ⚠️  {n_filtered} transactions filtrées (amount > {max_amount})")
-    else:
+    if max_amount is None:
         print(f"   ℹ️  Aucun filtrage sur le montant (toutes les transactions conservées)")
 
-    # Mapping des colonnes
-    payon_df = pd.DataFrame()
-
-    # Identifiants
-    payon_df["transaction_id"] = [f"paysim_{i}" for i in range(len(df))]
-    payon_df["source_wallet_id"] = df["nameOrig"].astype(str)
-    payon_df["destination_wallet_id"] = df["nameDest"].astype(str)
-
-    # Montant
-    payon_df["amount"] = df["amount"].astype(float)
-
-    # Type de transaction
-    payon_df["transaction_type"] = df["type"].astype(str)
-
-    # Direction : dérivée du type PaySim
-    # CASH_OUT, DEBIT, TRANSFER → outgoing
-    # CASH_IN, PAYMENT → incoming (approximation)
-    outgoing_types = {"CASH_OUT", "DEBIT", "TRANSFER"}
-    payon_df["direction"] = df["type"].apply(
-        lambda x: "outgoing" if x in outgoing_types else "incoming"
-    )
-
-    # Timestamp : step = heures depuis le début
-    # On crée un timestamp de base et on ajoute les heures
-    # Pour éviter les doublons, on ajoute aussi des secondes basées sur l'index
-    base_timestamp = pd.Timestamp("2020-01-01 00:00:00", tz="UTC")
-    # Créer des timestamps uniques en ajoutant des secondes basées sur l'index
-    # On groupe par step et on ajoute des secondes incrémentales pour chaque transaction
-    df_sorted = df.sort_values("step").reset_index(drop=True)
-    df_sorted["step_rank"] = df_sorted.groupby("step").cumcount()
-    payon_df["created_at"] = (
-        base_timestamp
-        + pd.to_timedelta(df_sorted["step"], unit="h")
-        + pd.to_timedelta(df_sorted["step_rank"], unit="s")  # Ajouter des secondes pour différencier
-    )
-
-    # Currency : PaySim n'a pas de currency, on ajoute PYC
-    payon_df["currency"] = "PYC"
-
-    # Champs optionnels (vides pour PaySim)
-    payon_df["provider"] = "PAYSIM"
-    payon_df["provider_tx_id"] = None
-    payon_df["initiator_user_id"] = payon_df["source_wallet_id"]  # Approximation
-    payon_df["country"] = None
-    payon_df["city"] = None
-    payon_df["description"] = None
-
-    # Label pour supervisé (si présent)
-    if "isFraud" in df.columns:
-        payon_df["is_fraud"] = df["isFraud"].astype(int)
+    chunks = list(iter_paysim_to_payon(paysim_path, max_amount=max_amount, chunk_size=chunk_size))
+    payon_df = pd.concat(chunks, ignore_index=True)
+    del chunks
+    if "is_fraud" in payon_df.columns:
         print(f"   ✅ Label 'is_fraud' ajouté ({payon_df['is_fraud'].sum()} fraudes)")
 
     # Trier par created_at
-    payon_df = payon_df.sort_values("created_at").reset_index(drop=True)
+    payon_df = payon_df.sort_values("created_at", kind="stable").reset_index(drop=True)
 
     print(f"   ✅ {len(payon_df)} transactions mappées au format Payon")
 
@@ -226,3 +302,46 @@ def map_paysim_to_payon(
         print(f"   💾 Sauvegardé dans {output_path}")
 
     return payon_df
+
+
+def convert_paysim_to_columnar(
+    paysim_path: Path,
+    output_path: Path,
+    max_amount: float | None = None,
+    csv_path: Path | None = None,
+    chunk_size: int = 1_000_000,
+) -> int:
+    """
+    Convertit PaySim en dataset colonnaire Payon (Parquet partitionné par date), en streaming.
+
+    Chaque bloc est mappé puis écrit directement : la mémoire ne dépend que
+    de chunk_size (et du dictionnaire des wallets).
+
+    Args:
+        paysim_path: Chemin vers le fichier PaySim CSV
+        output_path: Dossier du dataset colonnaire (<nom>.parquet)
+        max_amount: Montant maximum autorisé (None = pas de filtrage)
+        csv_path: Écrire aussi le CSV au format Payon (ordre du fichier brut)
+        chunk_size: Nombre de lignes brutes par bloc
+
+    Returns:
+        Nombre de transactions écrites
+    """
+    from .columnar import ColumnarDatasetWriter
+
+    print(f"📊 Conversion PaySim → Payon (colonnaire) depuis {paysim_path}...")
+    start_time = time.time()
+    n_rows = 0
+    n_fraud = 0
+    with ColumnarDatasetWriter(output_path) as writer:
+        for i, payon_chunk in enumerate(iter_paysim_to_payon(paysim_path, max_amount=max_amount, chunk_size=chunk_size)):
+            writer.write(payon_chunk)
+            if csv_path is not None:
+                payon_chunk.to_csv(csv_path, index=False, mode="w" if i == 0 else "a", header=i == 0)
+            n_rows += len(payon_chunk)
+            n_fraud += int(payon_chunk["is_fraud"].sum()) if "is_fraud" in payon_chunk.columns else 0
+            print(f"   {n_rows:,} transactions ({time.time() - start_time:.1f}s)", flush=True)
+    print(f"   ✅ {n_rows:,} transactions ({n_fraud:,} fraudes) → {output_path} en {time.time() - start_time:.1f}s")
+    if csv_path is not None:
+        print(f"   💾 CSV: {csv_path}")
+    return n_rows
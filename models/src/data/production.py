@@ -0,0 +1,206 @@
+"""
+Export des transactions labellisées en production (rafraîchissement des modèles).
+
+Labels :
+- revue humaine (human_reviews, dernière revue avec un label) : 1 si le
+  label est "fraud", 0 sinon
+- sans revue, transaction REJECTED (kyc_status) : 1
+
+Pour recalculer les features au moment de chaque transaction (point-in-time),
+l'export contient aussi l'historique des wallets sources concernés : de
+lookback avant leur première transaction labellisée jusqu'à la dernière.
+Les lignes d'historique ont is_fraud = NaN.
+
+La recalibration du modèle non supervisé utilise toutes les transactions
+d'une fenêtre récente (RECENT_TRANSACTIONS_QUERY, historique compris).
+
+L'accès à la base (sqlalchemy + driver PostgreSQL) est optionnel : un export
+au même format (CSV ou Parquet) peut être fourni à la place.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+LABELED_HISTORY_QUERY = """
+WITH latest_review AS (
+    SELECT DISTINCT ON (transaction_id) transaction_id, label, created_at AS reviewed_at
+    FROM human_reviews
+    WHERE label IS NOT NULL
+    ORDER BY transaction_id, created_at DESC
+),
+labeled AS (
+    SELECT
+        t.transaction_id,
+        t.source_wallet_id,
+        t.created_at,
+        CASE
+            WHEN r.transaction_id IS NULL THEN 1
+            WHEN lower(r.label) = 'fraud' THEN 1
+            ELSE 0
+        END AS is_fraud,
+        CASE WHEN r.transaction_id IS NULL THEN 'rejected' ELSE 'review' END AS label_source,
+        COALESCE(r.reviewed_at, t.created_at) AS labeled_at
+    FROM transactions t
+    LEFT JOIN latest_review r ON r.transaction_id = t.transaction_id
+    WHERE (r.transaction_id IS NOT NULL OR (:include_rejected AND t.kyc_status = 'REJECTED'))
+      AND COALESCE(r.reviewed_at, t.created_at) >= :since
+      AND COALESCE(r.reviewed_at, t.created_at) < :until
+),
+wallets AS (
+    SELECT
+        source_wallet_id,
+        min(created_at) - CAST(:lookback AS interval) AS history_start,
+        max(created_at) AS history_end
+    FROM labeled
+    GROUP BY source_wallet_id
+)
+SELECT
+    t.transaction_id,
+    t.created_at,
+    t.source_wallet_id,
+    t.destination_wallet_id,
+    t.direction,
+    t.transaction_type,
+    t.currency,
+    t.amount,
+    t.country,
+    l.is_fraud,
+    l.label_source,
+    l.labeled_at
+FROM transactions t
+JOIN wallets w ON w.source_wallet_id = t.source_wallet_id
+LEFT JOIN labeled l ON l.transaction_id = t.transaction_id
+WHERE t.created_at >= w.history_start AND t.created_at <= w.history_end
+ORDER BY t.created_at, t.transaction_id
+"""
+
+RECENT_TRANSACTIONS_QUERY = """
+SELECT
+    t.transaction_id,
+    t.created_at,
+    t.source_wallet_id,
+    t.destination_wallet_id,
+    t.direction,
+    t.transaction_type,
+    t.currency,
+    t.amount,
+    t.country,
+    CASE WHEN t.kyc_status = 'REJECTED' THEN 1 END AS is_fraud
+FROM transactions t
+WHERE t.created_at >= :start AND t.created_at < :until
+ORDER BY t.created_at, t.transaction_id
+"""
+
+
+def normalize_production_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aligne un export de production sur le format des données d'entraînement.
+
+    - created_at en UTC, lignes triées par date
+    - direction en minuscules (OUTGOING → outgoing)
+    - amount en float (Decimal en base)
+    - is_fraud en float (NaN pour l'historique non labellisé)
+
+    Args:
+        df: Export (colonnes de LABELED_HISTORY_QUERY)
+
+    Returns:
+        Transactions normalisées (index 0..n-1)
+
+    Raises:
+        ValueError: Si la colonne is_fraud est absente
+    """
+    df = df.copy()
+    df["created_at"] = pd.to_datetime(df["created_at"], utc=True, format="mixed")
+    if "direction" in df.columns:
+        df["direction"] = df["direction"].astype("string").str.lower()
+    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").astype(float)
+    if "is_fraud" not in df.columns:
+        raise ValueError("Colonne is_fraud absente de l'export")
+    df["is_fraud"] = pd.to_numeric(df["is_fraud"], errors="coerce").astype(float)
+    if "labeled_at" in df.columns:
+        df["labeled_at"] = pd.to_datetime(df["labeled_at"], utc=True, format="mixed")
+    return df.sort_values(["created_at", "transaction_id"], kind="stable").reset_index(drop=True)
+
+
+def export_labeled_history(
+    database_url: str,
+    since: datetime,
+    until: datetime,
+    lookback: timedelta = timedelta(days=30),
+    include_rejected: bool = True,
+) -> pd.DataFrame:
+    """
+    Exporte les transactions labellisées entre since et until, avec l'historique de leurs wallets.
+
+    La date de label est celle de la revue (ou de la transaction REJECTED) :
+    une transaction ancienne revue récemment est incluse.
+
+    Args:
+        database_url: URL SQLAlchemy de la base de production
+        since: Début (inclus) de la période de labels
+        until: Fin (exclue) de la période de labels
+        lookback: Historique exporté avant la première transaction labellisée d'un wallet
+        include_rejected: Inclure les transactions REJECTED sans revue (label 1)
+
+    Returns:
+        Transactions normalisées (cf. normalize_production_transactions)
+
+    Raises:
+        ImportError: Si sqlalchemy n'est pas installé
+    """
+    params = {
+        "since": since,
+        "until": until,
+        "lookback": f"{lookback.total_seconds():g} seconds",
+        "include_rejected": include_rejected,
+    }
+    return normalize_production_transactions(_read_query(database_url, LABELED_HISTORY_QUERY, params))
+
+
+def export_recent_transactions(database_url: str, start: datetime, until: datetime) -> pd.DataFrame:
+    """
+    Exporte toutes les transactions entre start et until (REJECTED : is_fraud = 1).
+
+    Args:
+        database_url: URL SQLAlchemy de la base de production
+        start: Début (inclus), fenêtre et historique des features compris
+        until: Fin (exclue)
+
+    Returns:
+        Transactions normalisées (cf. normalize_production_transactions)
+
+    Raises:
+        ImportError: Si sqlalchemy n'est pas installé
+    """
+    params = {"start": start, "until": until}
+    return normalize_production_transactions(_read_query(database_url, RECENT_TRANSACTIONS_QUERY, params))
+
+
+def _read_query(database_url: str, query: str, params: dict) -> pd.DataFrame:
+    """Exécute une requête en lecture (sqlalchemy importé à la demande)."""
+    try:
+        from sqlalchemy import create_engine, text
+    except ImportError as e:
+        raise ImportError(
+            "sqlalchemy (et un driver PostgreSQL) est requis pour l'export depuis la base ; "
+            "fournir un export CSV/Parquet à la place"
+        ) from e
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as connection:
+            return pd.read_sql(text(query), connection, params=params)
+    finally:
+        engine.dispose()
+
+
+def load_export(path: str | Path) -> pd.DataFrame:
+    """Relit un export (CSV ou Parquet, colonnes de LABELED_HISTORY_QUERY ou RECENT_TRANSACTIONS_QUERY)."""
+    path = Path(path)
+    df = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+    return normalize_production_transactions(df)
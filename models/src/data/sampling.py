@@ -0,0 +1,109 @@
+"""
+Sous-échantillonnage des transactions légitimes pour l'entraînement supervisé.
+
+PaySim contient ~0.1% de fraudes : l'essentiel du temps d'entraînement est
+passé sur des négatifs quasi redondants. On conserve toutes les fraudes et
+une fraction `rate` des légitimes, stratifiée par jour et par wallet source
+(bucket de hash) : chaque strate garde la même proportion de légitimes.
+
+Deux corrections possibles :
+- "weight" : poids 1/taux d'inclusion de la strate sur les légitimes
+  conservés ; la distribution d'origine est restaurée (même objectif, en
+  espérance, qu'un entraînement sur toutes les lignes)
+- "prior" : pas de poids ; les probabilités sont ramenées à la prévalence
+  d'origine après prédiction (cf. prior_correction)
+"""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+CORRECTIONS = ("weight", "prior")
+
+
+def prior_correction(proba: np.ndarray, rate: float) -> np.ndarray:
+    """
+    Ramène des probabilités apprises sur un échantillon à la prévalence d'origine.
+
+    Légitimes conservés au taux `rate` : odds(origine) = rate × odds(échantillon).
+
+    Args:
+        proba: Probabilités de fraude du modèle entraîné sur l'échantillon
+        rate: Taux de conservation des légitimes
+
+    Returns:
+        Probabilités corrigées
+    """
+    proba = np.asarray(proba, dtype=np.float64)
+    return rate * proba / (rate * proba + 1.0 - proba)
+
+
+def downsample_negatives(
+    df: pd.DataFrame,
+    labels: pd.Series | np.ndarray,
+    rate: float,
+    seed: int = 42,
+    time_column: str = "created_at",
+    wallet_column: str = "source_wallet_id",
+    wallet_buckets: int = 64,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sous-échantillonne les légitimes, stratifié par jour et par wallet source.
+
+    Dans chaque strate (jour × bucket de wallet) de n légitimes, exactement
+    floor(n × rate) ou ceil(n × rate) lignes sont tirées (arrondi aléatoire,
+    exact en espérance). Toutes les fraudes sont conservées.
+
+    Args:
+        df: Transactions (colonnes time_column et wallet_column, si présentes)
+        labels: Labels (1 = fraude), alignés sur les lignes de df
+        rate: Taux de conservation des légitimes, dans ]0, 1]
+        seed: Graine du tirage
+        time_column: Colonne de date (strates journalières)
+        wallet_column: Colonne du wallet source
+        wallet_buckets: Nombre de buckets de wallets par jour
+
+    Returns:
+        (positions des lignes conservées, triées ; poids d'échantillonnage
+        correspondants : 1 pour les fraudes, n / conservés pour les légitimes)
+
+    Raises:
+        ValueError: Si rate n'est pas dans ]0, 1] ou si df et labels n'ont pas le même nombre de lignes
+    """
+    if not 0.0 < rate <= 1.0:
+        raise ValueError(f"Taux de sous-échantillonnage invalide: {rate} (attendu dans ]0, 1])")
+    labels = np.asarray(labels)
+    n_rows = len(labels)
+    if len(df) != n_rows:
+        raise ValueError(f"Transactions et labels non alignés: {len(df):,} lignes pour {n_rows:,} labels")
+    if rate == 1.0:
+        return np.arange(n_rows), np.ones(n_rows)
+
+    # Strates : jour × bucket de wallet (codes de factorisation)
+    stratum = np.zeros(n_rows, dtype=np.int64)
+    if time_column in df.columns:
+        days = pd.to_datetime(df[time_column], utc=True).dt.floor("D")
+        stratum = pd.factorize(days)[0].astype(np.int64) * wallet_buckets
+    if wallet_column in df.columns:
+        stratum += pd.factorize(df[wallet_column])[0] % wallet_buckets
+
+    rng = np.random.default_rng(seed)
+    negatives = np.flatnonzero(labels == 0)
+    # Ordre aléatoire dans chaque strate, puis rang de chaque ligne dans sa strate
+    order = negatives[np.lexsort((rng.random(len(negatives)), stratum[negatives]))]
+    strata, starts, sizes = np.unique(stratum[order], return_index=True, return_counts=True)
+    ranks = np.arange(len(order)) - np.repeat(starts, sizes)
+    expected = sizes * rate
+    kept = np.floor(expected + rng.random(len(strata))).astype(np.int64)
+    keep_sizes = np.repeat(kept, sizes)
+    keep = ranks < keep_sizes
+
+    rows = np.concatenate([np.flatnonzero(labels != 0), order[keep]])
+    weights = np.concatenate(
+        [np.ones(n_rows - len(negatives)), (np.repeat(sizes, sizes) / np.maximum(keep_sizes, 1))[keep]]
+    )
+    sort = np.argsort(rows, kind="stable")
+    return rows[sort], weights[sort]
@@ -0,0 +1,696 @@
+"""
+Générateur de transactions synthétiques au format Payon (benchmarks, tests de charge, parité).
+
+Déterministe : même configuration (dont seed) → mêmes transactions, quel que
+soit le découpage en blocs de l'écriture. Le flux est produit par blocs de
+BLOCK_ROWS lignes indépendants (générateur aléatoire par bloc), en ordre
+chronologique : la mémoire est bornée par un bloc, de 10k à 50M lignes.
+
+Modélisé :
+- wallets à activité en loi de puissance (Zipf), pays de résidence, montant habituel
+- bénéficiaires récurrents (liste fixe par wallet) et commerçants
+- profil journalier (plus d'activité en journée), voyages (pays ≠ résidence), échecs
+- fraudes injectées par épisodes (fraud_pattern) :
+  burst (rafale vers des mules), structuring (montants sous un seuil),
+  circular (flux circulaire entre mules), account_takeover (nouveau
+  bénéficiaire, pays étranger, montant élevé)
+
+Sorties : transactions brutes (CSV ou Parquet colonnaire, cf. write_raw),
+payloads enrichis de POST /score (build_score_payloads) et données SQL du
+backend (write_sql_seed, COPY PostgreSQL).
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from .columnar import ColumnarDatasetWriter
+
+BLOCK_ROWS = 250_000
+FRAUD_PATTERNS = ("burst", "structuring", "circular", "account_takeover")
+RAW_COLUMNS = [
+    "transaction_id",
+    "created_at",
+    "initiator_user_id",
+    "source_wallet_id",
+    "destination_wallet_id",
+    "amount",
+    "currency",
+    "transaction_type",
+    "direction",
+    "country",
+    "status",
+    "is_fraud",
+    "fraud_pattern",
+]
+_NS_PER_SECOND = 1_000_000_000
+_DAY_NS = 86_400 * _NS_PER_SECOND
+
+
+@dataclass
+class SyntheticConfig:
+    """Paramètres du générateur (défauts : ~0.5% de fraude sur 30 jours)."""
+
+    n_transactions: int = 100_000
+    n_wallets: int | None = None  # défaut: n_transactions / 20 (min 100)
+    start: str = "2026-01-01"
+    days: int = 30
+    seed: int = 42
+    activity_exponent: float = 0.7  # Zipf : poids du k-ième wallet ∝ k^-exposant
+    beneficiaries_per_wallet: int = 5
+    recurring_ratio: float = 0.7  # part des P2P vers un bénéficiaire récurrent
+    merchant_ratio: float = 0.05
+    incoming_ratio: float = 0.15
+    travel_ratio: float = 0.03
+    failed_ratio: float = 0.01
+    countries: Dict[str, float] = field(
+        default_factory=lambda: {"FR": 0.72, "BE": 0.08, "DE": 0.06, "ES": 0.05, "IT": 0.04, "GB": 0.03, "MA": 0.02}
+    )
+    fraud_rate: float = 0.005
+    fraud_patterns: Dict[str, float] = field(
+        default_factory=lambda: {"burst": 0.3, "structuring": 0.25, "circular": 0.15, "account_takeover": 0.3}
+    )
+    fraud_countries: Dict[str, float] = field(
+        default_factory=lambda: {"NG": 0.3, "RU": 0.25, "CN": 0.2, "BR": 0.2, "KP": 0.05}
+    )
+    mule_ratio: float = 0.005
+    structuring_threshold: float = 1000.0
+
+    @property
+    def wallet_count(self) -> int:
+        """Nombre de wallets effectif."""
+        return int(self.n_wallets or max(100, self.n_transactions // 20))
+
+
+class SyntheticTransactionGenerator:
+    """Flux de transactions synthétiques, généré par blocs indépendants."""
+
+    def __init__(self, config: SyntheticConfig | Dict[str, Any] | None = None):
+        """
+        Initialise le générateur (population de wallets tirée une fois).
+
+        Args:
+            config: SyntheticConfig ou dictionnaire de ses champs
+
+        Raises:
+            ValueError: Si un motif de fraude est inconnu ou si la configuration est vide
+        """
+        if not isinstance(config, SyntheticConfig):
+            config = SyntheticConfig(**(config or {}))
+        unknown = set(config.fraud_patterns) - set(FRAUD_PATTERNS)
+        if unknown:
+            raise ValueError(f"Motifs de fraude inconnus: {sorted(unknown)} (disponibles: {FRAUD_PATTERNS})")
+        if config.n_transactions <= 0 or config.days <= 0:
+            raise ValueError("n_transactions et days doivent être positifs")
+        self.config = config
+        self.start_ns = int(pd.Timestamp(config.start, tz="UTC").value)
+        self.duration_ns = int(config.days) * _DAY_NS
+        self._build_population()
+        self._diurnal_cdf = self._diurnal_profile()
+
+    # ---------- Population ----------
+    def _build_population(self) -> None:
+        """Wallets : activité, pays, montant habituel, bénéficiaires, commerçants, mules."""
+        cfg = self.config
+        rng = np.random.default_rng([cfg.seed, 0])
+        n = cfg.wallet_count
+        self.wallet_ids = np.array([f"w{i}" for i in range(n)], dtype=object)
+        self.user_ids = np.array([f"u{i}" for i in range(n)], dtype=object)
+
+        activity = (rng.permutation(n) + 1.0) ** -float(cfg.activity_exponent)
+        self._activity_cdf = np.cumsum(activity / activity.sum())
+        countries = list(cfg.countries)
+        weights = np.array([cfg.countries[c] for c in countries], dtype=np.float64)
+        self._countries = np.array(countries, dtype=object)
+        self._country_p = weights / weights.sum()
+        self.home_country = self._countries[rng.choice(len(countries), size=n, p=self._country_p)]
+        self.mean_amount = np.exp(rng.normal(3.5, 0.9, size=n))
+        self.balance = np.round(self.mean_amount * np.exp(rng.normal(2.0, 1.0, size=n)), 2)
+        age_days = rng.exponential(365.0, size=n)
+        recent = rng.random(n) < 0.03
+        age_days[recent] = rng.uniform(0.0, 3.0, size=int(recent.sum()))  # comptes récents
+        self.created_at_ns = self.start_ns - (age_days * _DAY_NS).astype(np.int64)
+        self.risk_level = np.array(["low", "medium", "high"], dtype=object)[
+            rng.choice(3, size=n, p=[0.9, 0.08, 0.02])
+        ]
+
+        # Bénéficiaires récurrents : tirés selon l'activité (wallets populaires), jamais soi-même
+        k = max(1, int(cfg.beneficiaries_per_wallet))
+        beneficiaries = self._draw_wallets(rng, n * k).reshape(n, k)
+        own = beneficiaries == np.arange(n)[:, None]
+        beneficiaries[own] = (beneficiaries[own] + 1) % n
+        self.beneficiaries = beneficiaries
+
+        self.merchants = np.flatnonzero(rng.random(n) < cfg.merchant_ratio)
+        if len(self.merchants) == 0:
+            self.merchants = np.array([0])
+        self.mules = np.flatnonzero(rng.random(n) < cfg.mule_ratio)
+        if len(self.mules) < 5:
+            self.mules = rng.choice(n, size=min(n, 5), replace=False)
+
+        fraud_countries = list(cfg.fraud_countries)
+        fraud_weights = np.array([cfg.fraud_countries[c] for c in fraud_countries], dtype=np.float64)
+        self._fraud_countries = np.array(fraud_countries, dtype=object)
+        self._fraud_country_p = fraud_weights / fraud_weights.sum()
+        patterns = list(cfg.fraud_patterns)
+        pattern_weights = np.array([cfg.fraud_patterns[p] for p in patterns], dtype=np.float64)
+        self._patterns = patterns
+        self._pattern_p = pattern_weights / pattern_weights.sum()
+
+    @staticmethod
+    def _diurnal_profile() -> np.ndarray:
+        """CDF de l'heure de la journée (par minute) : creux la nuit, pics midi et soir."""
+        minutes = np.arange(1440) / 60.0
+        density = 0.15 + np.exp(-((minutes - 12.5) ** 2) / 8.0) + 0.8 * np.exp(-((minutes - 19.0) ** 2) / 6.0)
+        cdf = np.concatenate([[0.0], np.cumsum(density)])
+        return cdf / cdf[-1]
+
+    def _draw_wallets(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        """Wallets tirés selon l'activité (loi de puissance)."""
+        return np.minimum(np.searchsorted(self._activity_cdf, rng.random(size)), len(self._activity_cdf) - 1)
+
+    def _warp(self, times_ns: np.ndarray) -> np.ndarray:
+        """Applique le profil journalier (monotone : l'ordre des dates est conservé)."""
+        day = (times_ns - self.start_ns) // _DAY_NS
+        fraction = ((times_ns - self.start_ns) % _DAY_NS) / _DAY_NS
+        warped = np.interp(fraction, self._diurnal_cdf, np.linspace(0.0, 1.0, len(self._diurnal_cdf)))
+        return self.start_ns + day * _DAY_NS + (warped * _DAY_NS).astype(np.int64)
+
+    def wallets(self) -> pd.DataFrame:
+        """
+        Population de wallets (un utilisateur par wallet).
+
+        Returns:
+            DataFrame wallet_id, user_id, home_country, balance, created_at, risk_level, is_merchant, is_mule
+        """
+        n = len(self.wallet_ids)
+        is_merchant = np.zeros(n, dtype=bool)
+        is_merchant[self.merchants] = True
+        is_mule = np.zeros(n, dtype=bool)
+        is_mule[self.mules] = True
+        return pd.DataFrame(
+            {
+                "wallet_id": self.wallet_ids,
+                "user_id": self.user_ids,
+                "home_country": self.home_country,
+                "balance": self.balance,
+                "created_at": pd.to_datetime(self.created_at_ns, utc=True),
+                "risk_level": self.risk_level,
+                "is_merchant": is_merchant,
+                "is_mule": is_mule,
+            }
+        )
+
+    # ---------- Blocs ----------
+    @property
+    def n_blocks(self) -> int:
+        """Nombre de blocs du flux."""
+        return -(-int(self.config.n_transactions) // BLOCK_ROWS)
+
+    def block(self, index: int) -> pd.DataFrame:
+        """
+        Génère un bloc du flux (lignes [index × BLOCK_ROWS, (index + 1) × BLOCK_ROWS)).
+
+        Args:
+            index: Numéro du bloc (0 ≤ index < n_blocks)
+
+        Returns:
+            Transactions du bloc (colonnes RAW_COLUMNS), triées par date
+
+        Raises:
+            IndexError: Si le bloc n'existe pas
+        """
+        if not 0 <= index < self.n_blocks:
+            raise IndexError(f"Bloc {index} hors du flux ({self.n_blocks} blocs)")
+        cfg = self.config
+        total = int(cfg.n_transactions)
+        first = index * BLOCK_ROWS
+        rows = min(BLOCK_ROWS, total - first)
+        rng = np.random.default_rng([cfg.seed, 1, index])
+        lo = self.start_ns + int(first / total * self.duration_ns)
+        hi = self.start_ns + int((first + rows) / total * self.duration_ns)
+
+        fraud_target = int(rng.binomial(rows, min(max(cfg.fraud_rate, 0.0), 1.0))) if cfg.fraud_patterns else 0
+        fraud = self._fraud_rows(rng, fraud_target, lo, hi)
+        legit = self._legit_rows(rng, rows - len(fraud["src"]), lo, hi)
+
+        columns = {key: np.concatenate([legit[key], fraud[key]]) for key in legit}
+        order = np.argsort(columns["time"], kind="stable")
+        columns = {key: values[order] for key, values in columns.items()}
+
+        src, dst = columns["src"], columns["dst"]
+        destination = np.full(rows, None, dtype=object)
+        destination[dst >= 0] = self.wallet_ids[dst[dst >= 0]]
+        return pd.DataFrame(
+            {
+                "transaction_id": [f"syn_{i}" for i in range(first, first + rows)],
+                "created_at": pd.to_datetime(columns["time"], utc=True),
+                "initiator_user_id": self.user_ids[src],
+                "source_wallet_id": self.wallet_ids[src],
+                "destination_wallet_id": destination,
+                "amount": np.round(columns["amount"], 2),
+                "currency": "PYC",
+                "transaction_type": columns["type"],
+                "direction": np.where(columns["outgoing"], "outgoing", "incoming").astype(object),
+                "country": columns["country"],
+                "status": np.where(columns["failed"], "FAILED", "COMPLETED").astype(object),
+                "is_fraud": columns["is_fraud"].astype(np.int8),
+                "fraud_pattern": columns["pattern"],
+            },
+            columns=RAW_COLUMNS,
+        )
+
+    def iter_blocks(self, start: int = 0, stop: int | None = None) -> Iterator[pd.DataFrame]:
+        """Blocs start..stop-1 du flux, en ordre chronologique."""
+        for index in range(start, self.n_blocks if stop is None else min(stop, self.n_blocks)):
+            yield self.block(index)
+
+    def generate(self) -> pd.DataFrame:
+        """Flux complet en mémoire (petits volumes : tests, benchmarks locaux)."""
+        return pd.concat(list(self.iter_blocks()), ignore_index=True)
+
+    def _legit_rows(self, rng: np.random.Generator, m: int, lo: int, hi: int) -> Dict[str, np.ndarray]:
+        """Transactions légitimes : habitudes du wallet source."""
+        cfg = self.config
+        time = self._warp(np.sort(rng.integers(lo, max(hi, lo + 1), size=m)))
+        src = self._draw_wallets(rng, m)
+        outgoing = rng.random(m) >= cfg.incoming_ratio
+        tx_type = np.where(
+            outgoing,
+            np.array(["P2P", "MERCHANT", "CASHOUT"], dtype=object)[rng.choice(3, size=m, p=[0.55, 0.35, 0.10])],
+            np.array(["CASHIN", "P2P"], dtype=object)[rng.choice(2, size=m, p=[0.6, 0.4])],
+        )
+
+        dst = np.full(m, -1, dtype=np.int64)
+        p2p = tx_type == "P2P"
+        recurring = p2p & (rng.random(m) < cfg.recurring_ratio)
+        k = self.beneficiaries.shape[1]
+        slot = np.minimum(rng.geometric(0.5, size=m) - 1, k - 1)  # premiers bénéficiaires favoris
+        dst[recurring] = self.beneficiaries[src[recurring], slot[recurring]]
+        occasional = p2p & ~recurring
+        dst[occasional] = self._draw_wallets(rng, int(occasional.sum()))
+        merchant = tx_type == "MERCHANT"
+        dst[merchant] = self.merchants[
+            np.minimum(rng.zipf(1.5, size=int(merchant.sum())) - 1, len(self.merchants) - 1)
+        ]
+        dst[dst == src] = (dst[dst == src] + 1) % len(self.wallet_ids)
+
+        scale = np.where(merchant, 0.6, np.where(tx_type == "CASHIN", 2.0, 1.0))
+        amount = self.mean_amount[src] * scale * np.exp(rng.normal(0.0, 0.5, size=m))
+        country = self.home_country[src].copy()
+        travel = rng.random(m) < cfg.travel_ratio
+        country[travel] = self._countries[rng.choice(len(self._countries), size=int(travel.sum()), p=self._country_p)]
+        return {
+            "time": time,
+            "src": src,
+            "dst": dst,
+            "amount": np.maximum(amount, 0.01),
+            "type": tx_type,
+            "outgoing": outgoing,
+            "country": country,
+            "failed": rng.random(m) < cfg.failed_ratio,
+            "is_fraud": np.zeros(m, dtype=np.int8),
+            "pattern": np.full(m, "", dtype=object),
+        }
+
+    def _fraud_rows(self, rng: np.random.Generator, target: int, lo: int, hi: int) -> Dict[str, np.ndarray]:
+        """Épisodes de fraude jusqu'à target lignes (dernier épisode tronqué)."""
+        episodes: List[Dict[str, np.ndarray]] = []
+        count = 0
+        while count < target:
+            pattern = self._patterns[rng.choice(len(self._patterns), p=self._pattern_p)]
+            episode = getattr(self, f"_episode_{pattern}")(rng)
+            size = min(len(episode["src"]), target - count)
+            start = self._warp(np.array([rng.integers(lo, max(hi, lo + 1))]))[0]
+            offsets = (np.cumsum(episode.pop("gaps_s")) * _NS_PER_SECOND).astype(np.int64)
+            episode["time"] = np.minimum(start + offsets, max(hi - 1, lo))
+            episode["pattern"] = np.full(len(episode["src"]), pattern, dtype=object)
+            episodes.append({key: values[:size] for key, values in episode.items()})
+            count += size
+        if not episodes:
+            return {
+                "time": np.zeros(0, dtype=np.int64),
+                "src": np.zeros(0, dtype=np.int64),
+                "dst": np.zeros(0, dtype=np.int64),
+                "amount": np.zeros(0),
+                "type": np.zeros(0, dtype=object),
+                "outgoing": np.zeros(0, dtype=bool),
+                "country": np.zeros(0, dtype=object),
+                "failed": np.zeros(0, dtype=bool),
+                "is_fraud": np.zeros(0, dtype=np.int8),
+                "pattern": np.zeros(0, dtype=object),
+            }
+        return {key: np.concatenate([e[key] for e in episodes]) for key in episodes[0]}
+
+    def _episode(
+        self,
+        src: np.ndarray,
+        dst: np.ndarray,
+        amount: np.ndarray,
+        gaps_s: np.ndarray,
+        country: np.ndarray,
+        tx_type: str = "P2P",
+    ) -> Dict[str, np.ndarray]:
+        """Colonnes d'un épisode de fraude (transactions sortantes)."""
+        size = len(src)
+        return {
+            "src": src.astype(np.int64),
+            "dst": dst.astype(np.int64),
+            "amount": np.maximum(amount, 0.01),
+            "gaps_s": gaps_s,
+            "type": np.full(size, tx_type, dtype=object),
+            "outgoing": np.ones(size, dtype=bool),
+            "country": country,
+            "failed": np.zeros(size, dtype=bool),
+            "is_fraud": np.ones(size, dtype=np.int8),
+        }
+
+    def _episode_burst(self, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Rafale : wallet compromis, 5 à 20 virements vers des mules en quelques minutes."""
+        victim = self._draw_wallets(rng, 1)[0]
+        size = int(rng.integers(5, 21))
+        return self._episode(
+            src=np.full(size, victim),
+            dst=rng.choice(self.mules, size=size),
+            amount=self.mean_amount[victim] * np.exp(rng.normal(1.0, 0.4, size=size)),
+            gaps_s=np.concatenate([[0.0], rng.exponential(20.0, size=size - 1)]),
+            country=np.full(size, self.home_country[victim], dtype=object),
+        )
+
+    def _episode_structuring(self, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Fractionnement : montants juste sous le seuil, vers une ou deux mules, sur quelques heures."""
+        source = rng.choice(self.mules) if rng.random() < 0.5 else self._draw_wallets(rng, 1)[0]
+        size = int(rng.integers(4, 11))
+        return self._episode(
+            src=np.full(size, source),
+            dst=rng.choice(rng.choice(self.mules, size=2), size=size),
+            amount=self.config.structuring_threshold * rng.uniform(0.85, 0.99, size=size),
+            gaps_s=np.concatenate([[0.0], rng.exponential(1800.0, size=size - 1)]),
+            country=np.full(size, self.home_country[source], dtype=object),
+        )
+
+    def _episode_circular(self, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Flux circulaire : A → B → C → A entre mules, 1 à 3 tours, commission à chaque saut."""
+        ring = rng.choice(self.mules, size=min(int(rng.integers(3, 6)), len(self.mules)), replace=False)
+        laps = int(rng.integers(1, 4))
+        src = np.tile(ring, laps)
+        hops = len(src)
+        base = float(rng.uniform(300.0, 3000.0))
+        return self._episode(
+            src=src,
+            dst=np.roll(ring, -1)[np.arange(hops) % len(ring)],
+            amount=base * np.cumprod(np.full(hops, 1.0 - rng.uniform(0.0, 0.02))),
+            gaps_s=np.concatenate([[0.0], rng.exponential(300.0, size=hops - 1)]),
+            country=self.home_country[src],
+        )
+
+    def _episode_account_takeover(self, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Prise de contrôle : nouveau bénéficiaire, pays étranger, montants 10 à 40× l'habitude."""
+        victim = self._draw_wallets(rng, 1)[0]
+        size = int(rng.integers(1, 4))
+        country = self._fraud_countries[rng.choice(len(self._fraud_countries), p=self._fraud_country_p)]
+        return self._episode(
+            src=np.full(size, victim),
+            dst=np.full(size, rng.choice(self.mules)),
+            amount=self.mean_amount[victim] * rng.uniform(10.0, 40.0, size=size),
+            gaps_s=np.concatenate([[0.0], rng.exponential(120.0, size=size - 1)]),
+            country=np.full(size, country, dtype=object),
+            tx_type="CASHOUT" if rng.random() < 0.3 else "P2P",
+        )
+
+
+def write_raw(
+    blocks: Iterator[pd.DataFrame],
+    path: str | Path,
+    columns: List[str] | None = None,
+) -> int:
+    """
+    Écrit le flux brut : CSV (path en .csv) ou dataset colonnaire (path en .parquet).
+
+    Args:
+        blocks: Blocs de transactions (SyntheticTransactionGenerator.iter_blocks)
+        path: Fichier CSV ou dossier <nom>.parquet
+        columns: Colonnes écrites (défaut: toutes)
+
+    Returns:
+        Nombre de lignes écrites
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    if path.suffix == ".parquet":
+        with ColumnarDatasetWriter(path) as writer:
+            for block in blocks:
+                rows += writer.write(block[columns] if columns else block)
+        return rows
+    with open(path, "w", newline="") as f:
+        for i, block in enumerate(blocks):
+            (block[columns] if columns else block).to_csv(f, index=False, header=i == 0)
+            rows += len(block)
+    return rows
+
+
+# ---------- Payloads POST /score ----------
+def build_score_payloads(
+    transactions: pd.DataFrame,
+    wallets: pd.DataFrame,
+    n_payloads: int = 1000,
+    seed: int = 42,
+    windows: List[str] | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Corps de requêtes POST /score : {"transaction": {..., "features": {...}}, "context": {...}}.
+
+    Le contexte porte les clés lues par le moteur de règles (wallet_info,
+    user_profile, destination_wallet_info, account_age_minutes). Les features
+    historiques sont calculées au moment de chaque transaction sur l'historique
+    fourni (compute_historical_features_vectorized), plus les champs lus par
+    les règles (avg_amount_30d, tx_last_10min, is_new_beneficiary,
+    user_country_history, blocked_tx_last_24h).
+
+    Args:
+        transactions: Flux (ou fin de flux) trié par date, colonnes RAW_COLUMNS
+        wallets: Population (SyntheticTransactionGenerator.wallets())
+        n_payloads: Nombre de transactions sortantes tirées
+        seed: Graine du tirage
+        windows: Fenêtres des features (défaut: celles de feature_config.yaml)
+
+    Returns:
+        Requêtes (dictionnaires sérialisables en JSON), avec is_fraud et fraud_pattern
+        dans transaction.metadata (vérité terrain des benchmarks)
+    """
+    from ..features.vectorized import (
+        compute_historical_features_vectorized,
+        compute_transaction_features_vectorized,
+    )
+
+    windows = list(windows or ["5m", "1h", "24h", "7d", "30d"])
+    df = transactions.reset_index(drop=True)
+    candidates = np.flatnonzero((df["direction"] == "outgoing").to_numpy())
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(candidates, size=min(n_payloads, len(candidates)), replace=False))
+    if len(rows) == 0:
+        return []
+
+    history = compute_historical_features_vectorized(df, windows=sorted(set(windows) | {"10m"}), lookback=None)
+    transactional = compute_transaction_features_vectorized(df.iloc[rows]).to_dict(orient="records")
+    historical = history.iloc[rows].to_dict(orient="records")
+    wallet_info = wallets.set_index("wallet_id")
+
+    payloads = []
+    for row, features, all_hist in zip(rows, transactional, historical):
+        tx = df.iloc[row]
+        hist = {name: value for name, value in all_hist.items() if "10m" in windows or not name.endswith("_10m")}
+        if hist.get("days_since_last_src_to_dst", -1.0) < 0:
+            hist["days_since_last_src_to_dst"] = None
+        source = wallet_info.loc[tx["source_wallet_id"]]
+        countries = [source["home_country"]]
+        if not hist["is_new_country_30d"] and tx["country"] not in countries:
+            countries.append(tx["country"])
+        hist.update(
+            {
+                "avg_amount_30d": hist["src_tx_amount_mean_out_30d"] if "30d" in windows else None,
+                "tx_last_10min": int(all_hist["src_tx_count_out_10m"]),
+                "is_new_beneficiary": bool(hist.get("is_new_destination_30d", 0)),
+                "user_country_history": countries,
+                "blocked_tx_last_24h": int(hist["src_failed_count_24h"]),
+            }
+        )
+        created_at = tx["created_at"]
+        destination_id = tx["destination_wallet_id"] if isinstance(tx["destination_wallet_id"], str) else None
+        transaction = {
+            "transaction_id": tx["transaction_id"],
+            "provider": "synthetic",
+            "initiator_user_id": tx["initiator_user_id"],
+            "source_wallet_id": tx["source_wallet_id"],
+            "destination_wallet_id": destination_id,
+            "amount": float(tx["amount"]),
+            "currency": tx["currency"],
+            "transaction_type": tx["transaction_type"],
+            "direction": tx["direction"],
+            "status": "PENDING",
+            "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "country": tx["country"],
+            "metadata": {"is_fraud": int(tx["is_fraud"]), "fraud_pattern": tx["fraud_pattern"] or None},
+            "features": {"transactional": features, "historical": hist},
+        }
+        context = {
+            "wallet_info": {
+                "wallet_id": tx["source_wallet_id"],
+                "balance": float(source["balance"]),
+                "status": "active",
+            },
+            "user_profile": {
+                "user_id": tx["initiator_user_id"],
+                "status": "active",
+                "risk_level": source["risk_level"],
+            },
+            "account_age_minutes": float((created_at - source["created_at"]).total_seconds() / 60),
+        }
+        if destination_id is not None:
+            context["destination_wallet_info"] = {"wallet_id": destination_id, "status": "active"}
+        payloads.append({"transaction": transaction, "context": context})
+    return payloads
+
+
+def write_payloads(payloads: List[Dict[str, Any]], path: str | Path) -> Path:
+    """Écrit les requêtes en JSON Lines (un POST /score par ligne)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        for payload in payloads:
+            f.write(json.dumps(payload, default=lambda v: v.item() if hasattr(v, "item") else str(v)) + "\n")
+    return path
+
+
+# ---------- Données SQL (backend) ----------
+def _copy_block(f, table: str, df: pd.DataFrame) -> None:
+    """Bloc COPY ... FROM stdin (format texte PostgreSQL, NULL = \\N)."""
+    f.write(f"COPY {table} ({', '.join(df.columns)}) FROM stdin;\n")
+    df.to_csv(f, sep="\t", header=False, index=False, na_rep="\\N", date_format="%Y-%m-%d %H:%M:%S.%f")
+    f.write("\\.\n\n")
+
+
+def write_sql_seed(
+    generator: SyntheticTransactionGenerator,
+    path: str | Path,
+    caught_ratio: float = 0.7,
+    review_ratio: float = 0.002,
+) -> Path:
+    """
+    Écrit les données du backend (users, wallets, transactions, human_reviews) en COPY PostgreSQL.
+
+    Statuts (transactions.kyc_status) : fraude détectée → REJECTED, échec → FAILED,
+    sinon VALIDATED. Revues humaines : fraudes non détectées (label "fraud") et
+    un échantillon de légitimes (label "legit") — cf. src/data/production.py.
+
+    Args:
+        generator: Générateur du flux
+        path: Fichier .sql (psql -f)
+        caught_ratio: Part des fraudes rejetées à la transaction
+        review_ratio: Part des transactions légitimes revues
+
+    Returns:
+        Chemin du fichier
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    wallets = generator.wallets()
+    rng = np.random.default_rng([generator.config.seed, 2])
+    with open(path, "w") as f:
+        config = generator.config
+        f.write(f"-- Données synthétiques ({config.n_transactions:,} transactions, seed {config.seed})\n")
+        f.write("BEGIN;\n\n")
+        _copy_block(
+            f,
+            "users",
+            pd.DataFrame(
+                {
+                    "user_id": wallets["user_id"],
+                    "email": wallets["user_id"] + "@synthetic.local",
+                    "hashed_password": "!synthetic",  # connexion impossible
+                    "full_name": "Synthetic " + wallets["user_id"],
+                    "is_active": "t",
+                    "risk_level": wallets["risk_level"].str.upper(),
+                    "country_home": wallets["home_country"],
+                    "trust_score": 100,
+                    "created_at": wallets["created_at"].dt.tz_localize(None),
+                }
+            ),
+        )
+        _copy_block(
+            f,
+            "wallets",
+            pd.DataFrame(
+                {
+                    "wallet_id": wallets["wallet_id"],
+                    "user_id": wallets["user_id"],
+                    "currency": "PYC",
+                    "balance": wallets["balance"].map("{:.2f}".format),
+                    "kyc_status": "VERIFIED",
+                    "updated_at": wallets["created_at"].dt.tz_localize(None),
+                }
+            ),
+        )
+        for block in generator.iter_blocks():
+            fraud = block["is_fraud"].to_numpy() == 1
+            caught = fraud & (rng.random(len(block)) < caught_ratio)
+            status = np.where(caught, "REJECTED", np.where(block["status"] == "FAILED", "FAILED", "VALIDATED"))
+            created_at = block["created_at"].dt.tz_localize(None)
+            _copy_block(
+                f,
+                "transactions",
+                pd.DataFrame(
+                    {
+                        "transaction_id": block["transaction_id"],
+                        "initiator_user_id": block["initiator_user_id"],
+                        "source_wallet_id": block["source_wallet_id"],
+                        "destination_wallet_id": block["destination_wallet_id"],
+                        "amount": block["amount"].map("{:.2f}".format),
+                        "currency": block["currency"],
+                        "transaction_type": block["transaction_type"],
+                        "direction": block["direction"].str.upper(),
+                        "country": block["country"],
+                        "created_at": created_at,
+                        "kyc_status": status,
+                    }
+                ),
+            )
+            reviewed = (fraud & ~caught) | (~fraud & (rng.random(len(block)) < review_ratio))
+            if reviewed.any():
+                delay = pd.to_timedelta(rng.exponential(2.0, size=int(reviewed.sum())), unit="D")
+                _copy_block(
+                    f,
+                    "human_reviews",
+                    pd.DataFrame(
+                        {
+                            "review_id": "rev_" + block["transaction_id"][reviewed],
+                            "transaction_id": block["transaction_id"][reviewed],
+                            "analyst_id": "synthetic",
+                            "action": np.where(fraud[reviewed], "BLOCK", "APPROVE"),
+                            "label": np.where(fraud[reviewed], "fraud", "legit"),
+                            "final_status": np.where(fraud[reviewed], "REJECTED", "VALIDATED"),
+                            "created_at": created_at[reviewed] + delay,
+                        }
+                    ),
+                )
+        f.write("COMMIT;\n")
+    return path
+
+
+def dataset_card(config: SyntheticConfig, counts: Dict[str, Any]) -> Dict[str, Any]:
+    """Carte d'identité du dataset généré (cf. Data/README.md)."""
+    return {
+        "name": "synthetic_payon",
+        "source": "src/data/synthetic.py",
+        "label": "is_fraud (0/1), fraud_pattern",
+        "time_field": "created_at",
+        "config": asdict(config),
+        **counts,
+    }
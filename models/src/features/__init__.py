@@ -4,12 +4,32 @@ Module de feature engineering.
 Ce module gère l'extraction et le calcul des features pour les transactions.
 """
 
+from .cache import FeatureCache
+from .checkpoint import FeatureCheckpoint
 from .extractor import extract_transaction_features
 from .aggregator import compute_historical_aggregates
+from .parallel import compute_historical_features_parallel
 from .pipeline import FeaturePipeline
+from .pruning import PruningPlan, feature_requirement, importance_table, plan_pruning
+from .sketches import SlidingHyperLogLog, SpaceSaving
+from .streaming import StreamingFeatureEngine, replay_historical_features
+from .vectorized import compute_historical_features_vectorized, compute_transaction_features_vectorized
 
 __all__ = [
     "extract_transaction_features",
     "compute_historical_aggregates",
     "FeaturePipeline",
+    "compute_historical_features_vectorized",
+    "compute_transaction_features_vectorized",
+    "compute_historical_features_parallel",
+    "FeatureCache",
+    "FeatureCheckpoint",
+    "StreamingFeatureEngine",
+    "replay_historical_features",
+    "SlidingHyperLogLog",
+    "SpaceSaving",
+    "PruningPlan",
+    "feature_requirement",
+    "importance_table",
+    "plan_pruning",
 ]
@@ -9,6 +9,10 @@ Gestion du cas 0 transaction historique : toutes les features peuvent être null
 
 Pour l'entraînement, compute_historical_aggregates() calcule les features
 depuis l'historique brut (nécessaire car pas de format enrichi).
+
+Features décroissantes (half_lives) : sommes pondérées par 2^(-âge / demi-vie)
+sur tout l'historique fourni, calculables en ligne avec un état O(1) par
+wallet (dernier timestamp + quelques flottants).
 """
 
 from __future__ import annotations
@@ -66,6 +70,7 @@ def compute_historical_aggregates(
     transaction: Dict[str, Any],
     historical_data: List[Dict[str, Any]] | pd.DataFrame | None = None,
     windows: List[str] | None = None,
+    half_lives: List[str] | None = None,
 ) -> Dict[str, Any]:
     """
     Calcule les agrégats historiques depuis l'historique brut.
@@ -77,6 +82,7 @@ def compute_historical_aggregates(
         transaction: Transaction courante (doit avoir created_at, source_wallet_id, etc.)
         historical_data: Liste de transactions historiques (DataFrame ou liste de dicts)
         windows: Liste des fenêtres temporelles (ex: ["5m", "1h", "24h", "7d", "30d"])
+        half_lives: Demi-vies des features décroissantes (ex: ["1h", "24h"] ; défaut: aucune)
 
     Returns:
         Dictionnaire de features historiques calculées
@@ -95,24 +101,24 @@ def compute_historical_aggregates(
     
     if tx_created_at is None:
         # Pas de timestamp → retourner features vides
-        return _get_empty_historical_features(windows)
+        return _get_empty_historical_features(windows, half_lives)
     
     # Convertir l'historique en DataFrame si nécessaire
     if isinstance(historical_data, list):
         if len(historical_data) == 0:
-            return _get_empty_historical_features(windows)
+            return _get_empty_historical_features(windows, half_lives)
         hist_df = pd.DataFrame(historical_data)
     elif isinstance(historical_data, pd.DataFrame):
         hist_df = historical_data.copy()
     else:
-        return _get_empty_historical_features(windows)
+        return _get_empty_historical_features(windows, half_lives)
     
     # Filtrer : uniquement les transactions AVANT la transaction courante (event-time)
     hist_df["created_at"] = pd.to_datetime(hist_df["created_at"], utc=True)
     hist_df = hist_df[hist_df["created_at"] < tx_created_at].copy()
     
     if len(hist_df) == 0:
-        return _get_empty_historical_features(windows)
+        return _get_empty_historical_features(windows, half_lives)
     
     features = {}
     
@@ -251,19 +257,62 @@ def compute_historical_aggregates(
         features["src_failed_count_24h"] = 0
         features["src_failed_ratio_7d"] = 0.0
     
+    # ========== FEATURES DÉCROISSANTES (EWMA) ==========
+    if half_lives:
+        features.update(_compute_decayed_features(hist_df, source_wallet_id, tx_created_at, half_lives))
+    
     return features
 
 
-def _parse_datetime(dt_str: str | None) -> datetime | None:
-    """Parse une date string en datetime UTC."""
+def _compute_decayed_features(
+    hist_df: pd.DataFrame,
+    source_wallet_id: Any,
+    tx_created_at: datetime,
+    half_lives: List[str],
+) -> Dict[str, float]:
+    """
+    Calcule les features décroissantes du wallet source.
+
+    Pour chaque demi-vie h, somme sur les transactions sortantes passées de
+    w = 2^(-âge / h) : nombre, montant, et nouveaux destinataires (premier
+    échange du wallet avec ce destinataire, toutes directions).
+
+    Args:
+        hist_df: Historique antérieur à la transaction
+        source_wallet_id: Wallet source
+        tx_created_at: Date de la transaction courante
+        half_lives: Demi-vies (ex: ["1h", "24h", "7d"])
+
+    Returns:
+        Dictionnaire {src_decayed_*_{demi-vie}: valeur}
+    """
+    wallet_hist = hist_df[hist_df["source_wallet_id"] == source_wallet_id]
+    outgoing = (wallet_hist["direction"] == "outgoing").to_numpy()
+    age_seconds = (tx_created_at - wallet_hist["created_at"]).dt.total_seconds().to_numpy()
+    amounts = wallet_hist["amount"].fillna(0).to_numpy(dtype=float)
+    first_seen = wallet_hist.groupby("destination_wallet_id")["created_at"].transform("min")
+    novel = outgoing & (wallet_hist["created_at"] == first_seen).to_numpy()
+
+    features = {}
+    for half_life in half_lives:
+        weights = 0.5 ** (age_seconds / _parse_window(half_life).total_seconds())
+        features[f"src_decayed_tx_count_out_{half_life}"] = float(weights[outgoing].sum())
+        features[f"src_decayed_amount_sum_out_{half_life}"] = float((weights * amounts)[outgoing].sum())
+        features[f"src_decayed_new_destinations_{half_life}"] = float(weights[novel].sum())
+    return features
+
+
+def _parse_datetime(dt_str: str | datetime | None) -> datetime | None:
+    """Parse une date (string ou datetime, ex: pd.Timestamp) en datetime UTC."""
     if dt_str is None:
         return None
-    
+
     try:
         from dateutil import parser
         from dateutil.tz import UTC
-        
-        dt = parser.parse(dt_str)
+
+        # Les lignes de DataFrame (entraînement) portent des pd.Timestamp, pas des strings
+        dt = dt_str if isinstance(dt_str, datetime) else parser.parse(dt_str)
         if dt.tzinfo is None:
             dt = dt.replace(tzinfo=UTC)
         else:
@@ -288,7 +337,7 @@ def _parse_window(window: str) -> timedelta:
         raise ValueError(f"Fenêtre invalide: {window}")
 
 
-def _get_empty_historical_features(windows: List[str]) -> Dict[str, Any]:
+def _get_empty_historical_features(windows: List[str], half_lives: List[str] | None = None) -> Dict[str, Any]:
     """Retourne un dictionnaire de features historiques vides."""
     features = {}
     
@@ -318,4 +367,10 @@ def _get_empty_historical_features(windows: List[str]) -> Dict[str, Any]:
     features["src_failed_count_24h"] = 0
     features["src_failed_ratio_7d"] = 0.0
     
+    # Features décroissantes
+    for half_life in half_lives or []:
+        features[f"src_decayed_tx_count_out_{half_life}"] = 0.0
+        features[f"src_decayed_amount_sum_out_{half_life}"] = 0.0
+        features[f"src_decayed_new_destinations_{half_life}"] = 0.0
+    
     return features
@@ -0,0 +1,192 @@
+"""
+Cache disque des features d'entraînement, adressé par contenu.
+
+La clé est un hash SHA-256 de :
+- le contenu des fichiers de données d'entrée
+- les paramètres de split et de features (ratios, fenêtres, lookback, ...)
+- la version du code de features (contenu des sources src/features/*.py)
+
+Une entrée contient une matrice de features par split (un .npy par colonne,
+relu en mémoire mappée) et un manifest.json. L'écriture se fait dans un
+dossier temporaire renommé atomiquement : une entrée est complète ou absente.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_FILE = "manifest.json"
+_FEATURE_SOURCES = Path(__file__).parent
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 du contenu d'un fichier, ou d'un dossier (chemins relatifs + contenus, lecture par blocs)."""
+    path = Path(path)
+    digest = hashlib.sha256()
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    for file in files:
+        if path.is_dir():
+            digest.update(file.relative_to(path).as_posix().encode())
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def feature_code_version(sources: Iterable[Path] | None = None) -> str:
+    """
+    Version du code de features : hash du contenu des sources.
+
+    Args:
+        sources: Fichiers sources (défaut: src/features/*.py)
+
+    Returns:
+        Hash hexadécimal (16 caractères)
+    """
+    digest = hashlib.sha256()
+    for path in sorted(sources or _FEATURE_SOURCES.glob("*.py")):
+        digest.update(path.name.encode())
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class FeatureCache:
+    """
+    Cache des features par split ({nom: DataFrame}), une entrée par clé.
+
+    Usage:
+        cache = FeatureCache("artifacts/feature_cache")
+        key = cache.key([data_path], {"windows": windows, "train_ratio": 0.7})
+        features = cache.load(key)
+        if features is None:
+            features = compute_features_for_splits(...)
+            cache.save(key, features)
+    """
+
+    def __init__(self, root: str | Path):
+        """
+        Initialise le cache.
+
+        Args:
+            root: Dossier racine du cache
+        """
+        self.root = Path(root)
+
+    def key(
+        self,
+        data_files: List[str | Path],
+        params: Dict[str, Any],
+        code_version: str | None = None,
+    ) -> str:
+        """
+        Calcule la clé d'une entrée.
+
+        Args:
+            data_files: Fichiers de données d'entrée (hash du contenu)
+            params: Paramètres de split et de features (sérialisables en JSON)
+            code_version: Version du code de features (défaut: feature_code_version())
+
+        Returns:
+            Clé hexadécimale
+        """
+        payload = {
+            "data": {Path(path).name: file_digest(Path(path)) for path in data_files},
+            "params": params,
+            "code": code_version or feature_code_version(),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key
+
+    def load(self, key: str) -> Dict[str, pd.DataFrame] | None:
+        """
+        Charge une entrée (colonnes en mémoire mappée, lecture seule).
+
+        Args:
+            key: Clé de l'entrée
+
+        Returns:
+            Features par split, ou None si l'entrée est absente ou illisible
+        """
+        entry = self._entry(key)
+        manifest_path = entry / MANIFEST_FILE
+        if not manifest_path.exists():
+            return None
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            splits = {}
+            for name, split in manifest["splits"].items():
+                arrays = {
+                    column: np.asarray(np.load(entry / name / f"{i:04d}.npy", mmap_mode="r"))
+                    for i, column in enumerate(split["columns"])
+                }
+                splits[name] = pd.DataFrame(arrays, columns=split["columns"], copy=False)
+            return splits
+        except Exception as e:
+            print(f"⚠️  Entrée de cache illisible ({key}): {e}")
+            return None
+
+    def save(self, key: str, splits: Dict[str, pd.DataFrame], metadata: Dict[str, Any] | None = None) -> Path:
+        """
+        Enregistre une entrée (écriture atomique).
+
+        Args:
+            key: Clé de l'entrée
+            splits: Features par split
+            metadata: Informations complémentaires stockées dans le manifest
+
+        Returns:
+            Dossier de l'entrée
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        entry = self._entry(key)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{key}.", dir=self.root))
+        try:
+            manifest = {"key": key, "created_at": time.time(), "metadata": metadata or {}, "splits": {}}
+            for name, df in splits.items():
+                (tmp_dir / name).mkdir()
+                columns = [str(c) for c in df.columns]
+                for i, column in enumerate(df.columns):
+                    np.save(tmp_dir / name / f"{i:04d}.npy", np.ascontiguousarray(df[column].to_numpy()))
+                manifest["splits"][name] = {"rows": len(df), "columns": columns}
+            with open(tmp_dir / MANIFEST_FILE, "w") as f:
+                json.dump(manifest, f, indent=2, default=str)
+            if entry.exists():
+                shutil.rmtree(entry)
+            os.replace(tmp_dir, entry)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return entry
+
+    def invalidate(self, key: str | None = None) -> int:
+        """
+        Supprime une entrée, ou tout le cache.
+
+        Args:
+            key: Clé à supprimer (None = toutes les entrées)
+
+        Returns:
+            Nombre d'entrées supprimées
+        """
+        if not self.root.exists():
+            return 0
+        entries = [self._entry(key)] if key else [p for p in self.root.iterdir() if p.is_dir()]
+        removed = 0
+        for entry in entries:
+            if entry.exists():
+                shutil.rmtree(entry)
+                removed += 1
+        return removed
@@ -0,0 +1,140 @@
+"""
+Points de reprise du calcul des features historiques (jobs préemptibles).
+
+Le calcul est découpé en shards de wallets (partition exacte, cf. parallel.py).
+Chaque shard terminé est écrit dans un dossier de travail :
+- shard-XXXXX.npz : positions des lignes et valeurs (n_features × lignes du shard)
+- manifest.json : clé du calcul, colonnes, shards terminés
+
+Écritures atomiques (fichier temporaire + os.replace) : après un arrêt
+brutal, un shard est soit complet et listé dans le manifest, soit recalculé.
+La clé couvre les données encodées, les paramètres et le code des features :
+un dossier de travail d'un autre calcul n'est jamais réutilisé.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .cache import feature_code_version
+
+MANIFEST_FILE = "manifest.json"
+
+
+def checkpoint_key(encoded: Dict[str, np.ndarray], params: Dict[str, Any], n_shards: int) -> str:
+    """
+    Clé d'un calcul : hash des colonnes encodées, des paramètres et du code.
+
+    Args:
+        encoded: Colonnes encodées (cf. vectorized._encode_columns)
+        params: Paramètres du moteur (fenêtres, lookback, demi-vies, ...)
+        n_shards: Nombre de shards (définit le découpage)
+
+    Returns:
+        Clé hexadécimale
+    """
+    digest = hashlib.sha256()
+    for name in sorted(encoded):
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(encoded[name]).tobytes())
+    digest.update(json.dumps({"params": params, "n_shards": n_shards}, sort_keys=True, default=str).encode())
+    digest.update(feature_code_version().encode())
+    return digest.hexdigest()[:32]
+
+
+def _atomic_write(path: Path, write) -> None:
+    """Écrit un fichier via un fichier temporaire du même dossier renommé atomiquement."""
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+class FeatureCheckpoint:
+    """
+    Dossier de travail d'un calcul de features par shards.
+
+    Usage:
+        checkpoint = FeatureCheckpoint(work_dir, key, columns, n_rows)
+        for shard in range(n_shards):
+            if shard in checkpoint.completed:
+                rows, values = checkpoint.load_shard(shard)
+            else:
+                ...
+                checkpoint.save_shard(shard, rows, values)
+        checkpoint.clear()
+    """
+
+    def __init__(self, work_dir: str | Path, key: str, columns: List[str], n_rows: int):
+        """
+        Ouvre (ou crée) le dossier de travail d'un calcul.
+
+        Args:
+            work_dir: Dossier racine des points de reprise
+            key: Clé du calcul (cf. checkpoint_key)
+            columns: Colonnes de features (ordre des lignes de values)
+            n_rows: Nombre de lignes du dataset
+        """
+        self.path = Path(work_dir) / key
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.manifest = {"key": key, "columns": list(columns), "rows": int(n_rows), "completed": {}}
+        manifest_path = self.path / MANIFEST_FILE
+        if manifest_path.exists():
+            try:
+                with open(manifest_path, "r") as f:
+                    manifest = json.load(f)
+                if manifest.get("columns") == self.manifest["columns"] and manifest.get("rows") == n_rows:
+                    self.manifest = manifest
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Manifest de reprise illisible ({manifest_path}): {e}")
+
+    @property
+    def completed(self) -> set:
+        """Shards terminés."""
+        return {int(shard) for shard in self.manifest["completed"]}
+
+    def _shard_path(self, shard: int) -> Path:
+        return self.path / f"shard-{shard:05d}.npz"
+
+    def save_shard(self, shard: int, rows: np.ndarray, values: np.ndarray) -> None:
+        """
+        Enregistre un shard terminé (fichier puis manifest, écritures atomiques).
+
+        Args:
+            shard: Numéro du shard
+            rows: Positions des lignes du shard dans le dataset
+            values: Features du shard (n_features × len(rows))
+        """
+        _atomic_write(self._shard_path(shard), lambda f: np.savez(f, rows=rows, values=values))
+        self.manifest["completed"][str(shard)] = int(len(rows))
+        payload = json.dumps(self.manifest, indent=2).encode()
+        _atomic_write(self.path / MANIFEST_FILE, lambda f: f.write(payload))
+
+    def load_shard(self, shard: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Relit un shard terminé.
+
+        Returns:
+            (positions des lignes, valeurs n_features × lignes)
+        """
+        with np.load(self._shard_path(shard)) as data:
+            return data["rows"], data["values"]
+
+    def clear(self) -> None:
+        """Supprime le dossier de travail (calcul terminé)."""
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -92,7 +92,8 @@ def extract_transaction_features(transaction: Dict[str, Any]) -> Dict[str, Any]:
             from dateutil import parser
             from dateutil.tz import UTC
 
-            dt = parser.parse(created_at_str)
+            # Les lignes de DataFrame (entraînement) portent des pd.Timestamp, pas des strings
+            dt = created_at_str if isinstance(created_at_str, datetime) else parser.parse(created_at_str)
             if dt.tzinfo is None:
                 dt = dt.replace(tzinfo=UTC)
             else:
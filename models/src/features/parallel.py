@@ -0,0 +1,222 @@
+"""
+Calcul parallèle des features historiques, partitionné par wallet source.
+
+Les features historiques d'une transaction ne dépendent que de l'historique
+de son wallet source : un partitionnement par hash du wallet est exact.
+
+- les colonnes sont encodées une fois (codes numériques) et copiées en
+  mémoire partagée ; les features sont écrites directement dans un bloc
+  partagé (n_features × n_lignes)
+- un seul Pool de processus longue durée ; chaque tâche ne transporte que
+  des noms de segments et un numéro de shard (IPC quasi nulle)
+- chaque worker calcule tout son shard avec le moteur vectorisé
+- optionnellement, chaque shard terminé est persisté (reprise après préemption)
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import time
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .aggregator import _get_empty_historical_features
+from .vectorized import _encode_columns, _features_frame, _historical_from_columns
+
+# En dessous, le coût de démarrage des processus dépasse le gain
+PARALLEL_MIN_ROWS = 100_000
+# Granularité minimale des points de reprise (travail perdu au pire : 1 / CHECKPOINT_MIN_SHARDS)
+CHECKPOINT_MIN_SHARDS = 32
+
+
+def _share(array: np.ndarray, segments: List[SharedMemory]) -> Tuple[str, tuple, str]:
+    """Copie un tableau en mémoire partagée et retourne sa description (nom, shape, dtype)."""
+    shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+    segments.append(shm)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm.name, array.shape, array.dtype.str
+
+
+def _compute_shard(
+    task: Tuple[Dict[str, Tuple[str, tuple, str]], int, List[str], Dict[str, Any]],
+) -> Tuple[int, int, float]:
+    """
+    Calcule les features d'un shard de wallets (exécuté dans un worker).
+
+    Les workers partagent le resource tracker du parent : seul le parent
+    libère (unlink) les segments.
+
+    Args:
+        task: (descriptions des segments partagés, numéro de shard, colonnes de sortie,
+            paramètres du moteur)
+
+    Returns:
+        (numéro de shard, nombre de lignes, durée en secondes)
+    """
+    specs, shard, columns, params = task
+    start_time = time.time()
+    attached = {name: SharedMemory(name=spec[0]) for name, spec in specs.items()}
+    try:
+        arrays = {
+            name: np.ndarray(spec[1], dtype=np.dtype(spec[2]), buffer=attached[name].buf)
+            for name, spec in specs.items()
+        }
+        bounds = arrays.pop("shard_bounds")
+        rows = arrays.pop("shard_rows")[bounds[shard] : bounds[shard + 1]]
+        output = arrays.pop("output")
+        if len(rows) == 0:
+            return shard, 0, 0.0
+        encoded = {name: values[rows] for name, values in arrays.items()}
+        features = _historical_from_columns(encoded, **params)
+        for i, name in enumerate(columns):
+            output[i, rows] = features[name]
+        return shard, len(rows), time.time() - start_time
+    finally:
+        arrays = None
+        for shm in attached.values():
+            shm.close()
+
+
+def _fill_from_checkpoint(checkpoint, output: np.ndarray, n_shards: int) -> List[int]:
+    """Recopie les shards terminés dans output et retourne les shards restant à calculer."""
+    pending = []
+    for shard in range(n_shards):
+        if shard in checkpoint.completed:
+            try:
+                rows, values = checkpoint.load_shard(shard)
+                output[:, rows] = values
+                continue
+            except Exception as e:
+                print(f"   ⚠️  Shard {shard} illisible, recalcul: {e}")
+        pending.append(shard)
+    return pending
+
+
+def compute_historical_features_parallel(
+    transactions_df: pd.DataFrame,
+    windows: List[str] | None = None,
+    lookback: str | None = "7d",
+    half_lives: List[str] | None = None,
+    n_jobs: int | None = None,
+    n_shards: int | None = None,
+    max_pairs: int = 5_000_000,
+    verbose: bool = False,
+    checkpoint_dir: str | Path | None = None,
+) -> pd.DataFrame:
+    """
+    Features historiques (moteur vectorisé) calculées en parallèle par shard de wallets.
+
+    Résultat identique à compute_historical_features_vectorized().
+
+    Avec checkpoint_dir, chaque shard terminé est persisté (cf. checkpoint.py) :
+    un calcul interrompu reprend aux shards manquants, avec un résultat
+    identique à un calcul sans interruption. Le dossier de travail est
+    supprimé à la fin du calcul.
+
+    Args:
+        transactions_df: Transactions
+        windows: Fenêtres du profil source (défaut: ["5m", "1h", "24h", "7d", "30d"])
+        lookback: Profondeur d'historique (None = historique complet)
+        half_lives: Demi-vies des features décroissantes
+        n_jobs: Nombre de processus (défaut: nombre de cores - 1)
+        n_shards: Nombre de shards de wallets (défaut: 4 × n_jobs pour équilibrer la charge,
+            au moins CHECKPOINT_MIN_SHARDS avec points de reprise)
+        max_pairs: Taille max des blocs d'expansion, par worker
+        verbose: Afficher la progression
+        checkpoint_dir: Dossier des points de reprise (None = pas de reprise)
+
+    Returns:
+        DataFrame des features historiques (même ordre de lignes que l'entrée, index 0..n-1)
+    """
+    if windows is None:
+        windows = ["5m", "1h", "24h", "7d", "30d"]
+    if n_jobs is None:
+        n_jobs = max(1, mp.cpu_count() - 1)
+    n_shards = n_shards or (max(4 * n_jobs, CHECKPOINT_MIN_SHARDS) if checkpoint_dir else 4 * n_jobs)
+
+    df = transactions_df.reset_index(drop=True)
+    columns = list(_get_empty_historical_features(windows, half_lives).keys())
+    encoded = _encode_columns(df)
+    params = {
+        "windows": windows,
+        "lookback": lookback,
+        "max_pairs": max_pairs,
+        "half_lives": half_lives,
+    }
+    if (n_jobs <= 1 and checkpoint_dir is None) or len(df) == 0:
+        return _features_frame(_historical_from_columns(encoded, **params), windows, half_lives)
+
+    # Partition par hash du wallet (codes de factorisation) : lignes de chaque shard contiguës
+    shard = encoded["wallet"] % n_shards
+    shard_rows = np.argsort(shard, kind="stable")
+    shard_bounds = np.searchsorted(shard[shard_rows], np.arange(n_shards + 1), side="left")
+
+    checkpoint = None
+    if checkpoint_dir is not None:
+        from .checkpoint import FeatureCheckpoint, checkpoint_key
+
+        key = checkpoint_key(encoded, params, n_shards)
+        checkpoint = FeatureCheckpoint(checkpoint_dir, key, columns, len(df))
+
+    def _save(shard_id: int, output: np.ndarray) -> None:
+        if checkpoint is not None:
+            rows = shard_rows[shard_bounds[shard_id] : shard_bounds[shard_id + 1]]
+            checkpoint.save_shard(shard_id, rows, output[:, rows])
+
+    start_time = time.time()
+    if n_jobs <= 1:
+        # Séquentiel, shard par shard (points de reprise)
+        output = np.zeros((len(columns), len(df)), dtype=np.float64)
+        pending = _fill_from_checkpoint(checkpoint, output, n_shards)
+        if verbose:
+            print(f"   💾 Reprise: {n_shards - len(pending)}/{n_shards} shards déjà calculés ({checkpoint.path})")
+        for shard_id in pending:
+            rows = shard_rows[shard_bounds[shard_id] : shard_bounds[shard_id + 1]]
+            if len(rows):
+                features = _historical_from_columns({name: values[rows] for name, values in encoded.items()}, **params)
+                for i, name in enumerate(columns):
+                    output[i, rows] = features[name]
+            _save(shard_id, output)
+            if verbose and len(rows):
+                print(f"      shard {shard_id}: {len(rows):,} lignes ({time.time() - start_time:.1f}s)", flush=True)
+        features = _features_frame({name: output[i] for i, name in enumerate(columns)}, windows, half_lives)
+        checkpoint.clear()
+        return features
+
+    segments: List[SharedMemory] = []
+    try:
+        specs = {name: _share(values, segments) for name, values in encoded.items()}
+        specs["shard_rows"] = _share(shard_rows, segments)
+        specs["shard_bounds"] = _share(shard_bounds, segments)
+        specs["output"] = _share(np.zeros((len(columns), len(df)), dtype=np.float64), segments)
+        output = np.ndarray((len(columns), len(df)), dtype=np.float64, buffer=segments[-1].buf)
+        pending = list(range(n_shards))
+        if checkpoint is not None:
+            pending = _fill_from_checkpoint(checkpoint, output, n_shards)
+            if verbose:
+                print(f"   💾 Reprise: {n_shards - len(pending)}/{n_shards} shards déjà calculés ({checkpoint.path})")
+
+        if verbose:
+            print(f"   🚀 {n_jobs} processus, {n_shards} shards de wallets ({len(df):,} transactions)")
+        tasks = [(specs, s, columns, params) for s in pending]
+        with mp.Pool(processes=n_jobs) as pool:
+            for shard_id, n_rows, elapsed in pool.imap_unordered(_compute_shard, tasks):
+                _save(shard_id, output)
+                if verbose and n_rows:
+                    print(f"      shard {shard_id}: {n_rows:,} lignes en {elapsed:.1f}s", flush=True)
+        if verbose:
+            print(f"   ✅ Shards terminés en {time.time() - start_time:.1f}s")
+
+        features = _features_frame({name: output[i] for i, name in enumerate(columns)}, windows, half_lives)
+        del output
+        if checkpoint is not None:
+            checkpoint.clear()
+        return features
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,305 @@
+"""
+Élagage des features selon leur importance et leur coût de calcul en ligne.
+
+Chaque feature historique dépend d'un agrégat calculé par le backend sur une
+fenêtre (ex: transactions sortantes du wallet source sur 30 jours) : c'est
+l'unité de coût en ligne (une requête SQL / un parcours de fenêtre). Les
+features transactionnelles sont gratuites (lues sur la transaction).
+
+Importance combinée (parts normalisées, pondérées par la config) :
+- gain et nombre de splits LightGBM
+- impact par permutation sur le score calibré de l'IsolationForest
+
+L'élagage supprime d'abord des agrégats entiers (toutes leurs features),
+par rapport importance/coût croissant, tant que l'importance cumulée perdue
+reste sous max_importance_loss ; puis les features isolées d'importance
+inférieure à min_feature_importance, dans le même budget.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .aggregator import _parse_window
+
+# Agrégat (unité de calcul en ligne) requis par chaque famille de features historiques
+_REQUIREMENT_PATTERNS: List[Tuple[str, str]] = [
+    (r"^src_tx_(count|amount_sum|amount_mean|amount_max)_out_", "src_outgoing"),
+    (r"^src_unique_destinations_", "src_outgoing"),
+    (r"^is_new_destination_", "src_dst_pair"),
+    (r"^src_to_dst_tx_count_", "src_dst_pair"),
+    (r"^days_since_last_src_to_dst$", "src_dst_pair"),
+    (r"^src_destination_(concentration|entropy)_", "src_destination_distribution"),
+    (r"^is_new_country_", "src_countries"),
+    (r"^country_mismatch$", "src_countries"),
+    (r"^src_failed_(count|ratio)_", "src_status"),
+    (r"^src_decayed_", "src_decayed"),
+]
+_WINDOW_SUFFIX = re.compile(r"_(\d+[mhd])$")
+# Features historiques sans suffixe de fenêtre
+_IMPLICIT_WINDOWS = {"country_mismatch": "30d", "days_since_last_src_to_dst": None}
+
+DEFAULT_PRUNING_CONFIG: Dict[str, Any] = {
+    "importance_weights": {"gain": 0.5, "split": 0.2, "permutation": 0.3},
+    "max_importance_loss": 0.02,
+    "min_feature_importance": 0.001,
+    "permutation_rows": 5000,
+    "keep": [],
+    "costs": {
+        "aggregates": {
+            "transaction": 0.0,
+            "src_outgoing": 1.0,
+            "src_dst_pair": 1.0,
+            "src_destination_distribution": 1.5,
+            "src_countries": 1.0,
+            "src_status": 1.0,
+            "src_decayed": 0.2,
+        },
+        "per_window_day": 0.1,
+        "full_history_days": 90,
+    },
+}
+
+
+def feature_requirement(feature: str) -> Tuple[str, str | None]:
+    """
+    Agrégat et fenêtre nécessaires au calcul en ligne d'une feature.
+
+    Args:
+        feature: Nom de la feature (colonne du feature_schema.json)
+
+    Returns:
+        (agrégat, fenêtre) ; fenêtre None = historique complet ou sans fenêtre
+        ("transaction", None) pour les features lues sur la transaction
+    """
+    for pattern, aggregate in _REQUIREMENT_PATTERNS:
+        if re.search(pattern, feature):
+            if feature in _IMPLICIT_WINDOWS:
+                return aggregate, _IMPLICIT_WINDOWS[feature]
+            if aggregate == "src_decayed":
+                return aggregate, None  # état O(1) par wallet, pas de fenêtre
+            match = _WINDOW_SUFFIX.search(feature)
+            return aggregate, match.group(1) if match else None
+    return "transaction", None
+
+
+def requirement_label(requirement: Tuple[str, str | None]) -> str:
+    """Libellé d'un agrégat pour les rapports (ex: "src_outgoing[30d]")."""
+    aggregate, window = requirement
+    if aggregate in ("transaction", "src_decayed"):
+        return aggregate
+    return f"{aggregate}[{window or 'full'}]"
+
+
+def requirement_cost(requirement: Tuple[str, str | None], costs: Dict[str, Any] | None = None) -> float:
+    """
+    Coût relatif du calcul en ligne d'un agrégat : coût fixe + coût par jour de fenêtre.
+
+    Args:
+        requirement: (agrégat, fenêtre) de feature_requirement
+        costs: Section pruning.costs de feature_config.yaml
+
+    Returns:
+        Coût (0 pour les features transactionnelles)
+    """
+    defaults = DEFAULT_PRUNING_CONFIG["costs"]
+    costs = {**defaults, **(costs or {})}
+    aggregate, window = requirement
+    base = float({**defaults["aggregates"], **(costs.get("aggregates") or {})}.get(aggregate, 1.0))
+    if aggregate in ("transaction", "src_decayed"):
+        return base
+    days = _parse_window(window).total_seconds() / 86400 if window else float(costs["full_history_days"])
+    return base + float(costs["per_window_day"]) * days
+
+
+def _shares(values: pd.Series) -> pd.Series:
+    """Normalise des importances en parts (somme 1, zéros si toutes nulles)."""
+    values = values.clip(lower=0).astype(float)
+    total = values.sum()
+    return values / total if total > 0 else values * 0.0
+
+
+def lightgbm_importance(booster) -> pd.DataFrame:
+    """
+    Parts de gain et de splits de chaque feature d'un booster LightGBM.
+
+    Args:
+        booster: lgb.Booster entraîné
+
+    Returns:
+        DataFrame (index: features) avec les colonnes gain et split
+    """
+    names = booster.feature_name()
+    return pd.DataFrame(
+        {
+            "gain": _shares(pd.Series(booster.feature_importance("gain"), index=names)),
+            "split": _shares(pd.Series(booster.feature_importance("split"), index=names)),
+        }
+    )
+
+
+def permutation_impact(model, X: pd.DataFrame, max_rows: int = 5000, random_state: int = 42) -> pd.Series:
+    """
+    Impact de la permutation de chaque feature sur le score d'un modèle (parts normalisées).
+
+    Impact = moyenne de |score permuté - score| sur un échantillon de X.
+
+    Args:
+        model: Modèle exposant predict(X) -> scores (ex: UnsupervisedModel, scores calibrés)
+        X: Features (colonnes du modèle)
+        max_rows: Taille maximale de l'échantillon
+        random_state: Graine de l'échantillon et des permutations
+
+    Returns:
+        Parts d'impact par feature
+    """
+    sample = X.sample(n=max_rows, random_state=random_state) if len(X) > max_rows else X
+    sample = sample.reset_index(drop=True).copy()
+    rng = np.random.default_rng(random_state)
+    base = np.asarray(model.predict(sample), dtype=np.float64)
+    impacts = {}
+    for column in sample.columns:
+        original = sample[column].to_numpy(copy=True)
+        sample[column] = rng.permutation(original)
+        impacts[column] = float(np.mean(np.abs(np.asarray(model.predict(sample), dtype=np.float64) - base)))
+        sample[column] = original
+    return _shares(pd.Series(impacts, dtype=float))
+
+
+def importance_table(
+    features: List[str],
+    gain_split: pd.DataFrame | None = None,
+    permutation: pd.Series | None = None,
+    config: Dict[str, Any] | None = None,
+) -> pd.DataFrame:
+    """
+    Importance combinée et coût en ligne de chaque feature.
+
+    Args:
+        features: Features candidates (feature_schema.json actuel)
+        gain_split: Parts gain/split LightGBM (lightgbm_importance), optionnel
+        permutation: Parts d'impact IsolationForest (permutation_impact), optionnel
+        config: Section pruning de feature_config.yaml
+
+    Returns:
+        DataFrame (index: features) : gain, split, permutation, importance (somme 1),
+        aggregate, window, requirement, cost
+    """
+    config = {**DEFAULT_PRUNING_CONFIG, **(config or {})}
+    weights = {**DEFAULT_PRUNING_CONFIG["importance_weights"], **(config.get("importance_weights") or {})}
+    table = pd.DataFrame(index=pd.Index(features, name="feature"))
+    table["gain"] = (gain_split["gain"] if gain_split is not None else pd.Series(dtype=float)).reindex(features)
+    table["split"] = (gain_split["split"] if gain_split is not None else pd.Series(dtype=float)).reindex(features)
+    table["permutation"] = (permutation if permutation is not None else pd.Series(dtype=float)).reindex(features)
+    table = table.fillna(0.0)
+
+    # Pondération limitée aux sources disponibles
+    available = {
+        "gain": gain_split is not None,
+        "split": gain_split is not None,
+        "permutation": permutation is not None,
+    }
+    total_weight = sum(float(weights[k]) for k, ok in available.items() if ok)
+    table["importance"] = 0.0
+    if total_weight > 0:
+        for source, ok in available.items():
+            if ok:
+                table["importance"] += float(weights[source]) / total_weight * table[source]
+
+    requirements = [feature_requirement(f) for f in features]
+    table["aggregate"] = [r[0] for r in requirements]
+    table["window"] = [r[1] for r in requirements]
+    table["requirement"] = [requirement_label(r) for r in requirements]
+    table["cost"] = [requirement_cost(r, config.get("costs")) for r in requirements]
+    return table
+
+
+@dataclass
+class PruningPlan:
+    """Résultat de plan_pruning : features conservées / supprimées et agrégats éliminés."""
+
+    kept_features: List[str]
+    dropped_features: List[str]
+    dropped_requirements: List[str] = field(default_factory=list)
+    kept_requirements: List[str] = field(default_factory=list)
+    importance_lost: float = 0.0
+    cost_before: float = 0.0
+    cost_after: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Résumé sérialisable (pruning_report.json)."""
+        return {
+            "features_before": len(self.kept_features) + len(self.dropped_features),
+            "features_after": len(self.kept_features),
+            "kept_features": self.kept_features,
+            "dropped_features": self.dropped_features,
+            "dropped_requirements": self.dropped_requirements,
+            "kept_requirements": self.kept_requirements,
+            "importance_lost": self.importance_lost,
+            "online_cost_before": self.cost_before,
+            "online_cost_after": self.cost_after,
+        }
+
+
+def plan_pruning(table: pd.DataFrame, config: Dict[str, Any] | None = None) -> PruningPlan:
+    """
+    Choisit les features à supprimer (agrégats entiers, puis features isolées).
+
+    Args:
+        table: Table d'importance_table
+        config: Section pruning de feature_config.yaml (max_importance_loss,
+            min_feature_importance, keep)
+
+    Returns:
+        PruningPlan (ordre des features conservées = ordre de table)
+    """
+    config = {**DEFAULT_PRUNING_CONFIG, **(config or {})}
+    budget = float(config["max_importance_loss"])
+    min_importance = float(config["min_feature_importance"])
+    keep = set(config.get("keep") or [])
+
+    dropped: set = set()
+    lost = 0.0
+
+    # 1. Agrégats entiers : le moins d'importance par unité de coût d'abord
+    groups = (
+        table[table["cost"] > 0]
+        .groupby("requirement")
+        .agg(importance=("importance", "sum"), cost=("cost", "first"))
+    )
+    groups["ratio"] = groups["importance"] / groups["cost"]
+    groups = groups.sort_values(["ratio", "cost"], ascending=[True, False])
+    for requirement, group in groups.iterrows():
+        members = table.index[table["requirement"] == requirement]
+        if keep.intersection(members):
+            continue
+        if lost + group["importance"] <= budget:
+            dropped.update(members)
+            lost += float(group["importance"])
+
+    # 2. Features isolées peu importantes (les plus coûteuses d'abord à importance égale)
+    remaining = table.drop(index=list(dropped))
+    candidates = remaining[(remaining["importance"] < min_importance) & ~remaining.index.isin(list(keep))]
+    for feature, row in candidates.sort_values(["importance", "cost"], ascending=[True, False]).iterrows():
+        if lost + row["importance"] <= budget:
+            dropped.add(feature)
+            lost += float(row["importance"])
+
+    kept_table = table[~table.index.isin(list(dropped))]
+    # Un agrégat est éliminé quand plus aucune feature conservée n'en dépend
+    kept_requirements = set(kept_table.loc[kept_table["cost"] > 0, "requirement"])
+    all_requirements = table.loc[table["cost"] > 0].drop_duplicates("requirement").set_index("requirement")["cost"]
+    return PruningPlan(
+        kept_features=list(kept_table.index),
+        dropped_features=[f for f in table.index if f in dropped],
+        dropped_requirements=sorted(set(all_requirements.index) - kept_requirements),
+        kept_requirements=sorted(kept_requirements),
+        importance_lost=lost,
+        cost_before=float(all_requirements.sum()),
+        cost_after=float(all_requirements[sorted(kept_requirements)].sum()),
+    )
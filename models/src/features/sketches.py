@@ -0,0 +1,187 @@
+"""
+Sketches à mémoire bornée pour les features de destinataires.
+
+- SlidingHyperLogLog : nombre de destinataires distincts sur fenêtre glissante
+  (HyperLogLog dont chaque registre garde la liste des maxima futurs possibles,
+  au plus 65 - precision entrées par registre)
+- SpaceSaving : top-k des destinataires (concentration, entropie estimée)
+
+Utilisés par StreamingFeatureEngine(destination_backend="sketch") pour que
+l'état par wallet reste plat pour les wallets marchands / hubs.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from bisect import bisect_left
+from typing import Any, Dict, List
+
+
+def _hash64(value: Any) -> int:
+    """Hash 64 bits stable entre processus (hash() Python est salé pour les str)."""
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "little")
+
+
+def _alpha(m: int) -> float:
+    """Constante de correction de biais HyperLogLog."""
+    if m == 16:
+        return 0.673
+    if m == 32:
+        return 0.697
+    if m == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / m)
+
+
+class SlidingHyperLogLog:
+    """
+    Nombre de distincts sur fenêtre glissante [now - window, now[.
+
+    Chaque registre conserve les couples (temps, rang) non dominés : rangs
+    strictement décroissants quand le temps croît. Le rang maximal d'une
+    fenêtre est celui de la première entrée encore dans la fenêtre.
+    """
+
+    def __init__(self, precision: int = 7):
+        """
+        Initialise le sketch.
+
+        Args:
+            precision: log2 du nombre de registres (4-16, erreur ≈ 1.04 / sqrt(2^precision))
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError(f"precision doit être entre 4 et 16 (reçu: {precision})")
+        self.precision = precision
+        self.m = 1 << precision
+        self._registers: Dict[int, List[tuple]] = {}  # seuls les registres non vides
+
+    def add(self, value: Any, time: int) -> None:
+        """Ajoute une valeur observée à l'instant time (instants croissants)."""
+        h = _hash64(value)
+        index = h & (self.m - 1)
+        rank = (64 - self.precision) - (h >> self.precision).bit_length() + 1
+        entries = self._registers.setdefault(index, [])
+        while entries and entries[-1][1] <= rank:
+            entries.pop()
+        entries.append((time, rank))
+
+    def expire(self, cutoff: int) -> None:
+        """Supprime les entrées antérieures à cutoff (hors de toute fenêtre)."""
+        for index in list(self._registers):
+            entries = self._registers[index]
+            drop = bisect_left(entries, (cutoff,))
+            if drop == len(entries):
+                del self._registers[index]
+            elif drop:
+                del entries[:drop]
+
+    def count(self, now: int, window: int | None = None) -> float:
+        """
+        Estime le nombre de distincts dans [now - window, now[.
+
+        Args:
+            now: Instant de requête
+            window: Durée de la fenêtre (None = tout l'historique conservé)
+
+        Returns:
+            Estimation du nombre de valeurs distinctes
+        """
+        cutoff = None if window is None else now - window
+        zeros = self.m
+        inverse_sum = 0.0
+        for entries in self._registers.values():
+            position = 0 if cutoff is None else bisect_left(entries, (cutoff,))
+            if position < len(entries):
+                zeros -= 1
+                inverse_sum += 2.0 ** -entries[position][1]
+        inverse_sum += zeros
+        estimate = _alpha(self.m) * self.m * self.m / inverse_sum
+        if estimate <= 2.5 * self.m and zeros:
+            estimate = self.m * math.log(self.m / zeros)  # linear counting (petits effectifs)
+        return estimate
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._registers.values())
+
+
+class SpaceSaving:
+    """
+    Top-k Space-Saving avec retrait (fenêtre glissante).
+
+    Un retrait décrémente l'élément s'il est suivi (sinon il était dans le
+    résidu). Exact tant que le nombre de distincts reste <= capacity.
+    """
+
+    def __init__(self, capacity: int = 16):
+        """
+        Initialise le sketch.
+
+        Args:
+            capacity: Nombre maximal d'éléments suivis
+        """
+        if capacity < 1:
+            raise ValueError(f"capacity doit être >= 1 (reçu: {capacity})")
+        self.capacity = capacity
+        self.counts: Dict[Any, int] = {}
+
+    def add(self, item: Any) -> None:
+        """Compte une occurrence de item."""
+        if item in self.counts:
+            self.counts[item] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = 1
+        else:
+            # Remplace l'élément le moins fréquent (surestimation bornée par son compte)
+            victim = min(self.counts, key=self.counts.__getitem__)
+            self.counts[item] = self.counts.pop(victim) + 1
+
+    def remove(self, item: Any) -> None:
+        """Retire une occurrence de item (sortie de fenêtre)."""
+        count = self.counts.get(item)
+        if count is None:
+            return
+        if count > 1:
+            self.counts[item] = count - 1
+        else:
+            del self.counts[item]
+
+    def top(self) -> int:
+        """Compte estimé de l'élément le plus fréquent."""
+        return max(self.counts.values()) if self.counts else 0
+
+    def entropy(self, total: int, known: int, distinct: float) -> float:
+        """
+        Estime l'entropie (bits) de la distribution des éléments.
+
+        Les éléments suivis contribuent exactement ; le résidu (known - suivis)
+        est supposé réparti uniformément sur les distincts non suivis.
+
+        Args:
+            total: Nombre total d'événements (dénominateur des probabilités)
+            known: Nombre d'événements avec un élément non null
+            distinct: Nombre estimé d'éléments distincts
+
+        Returns:
+            Entropie estimée
+        """
+        if total <= 0:
+            return 0.0
+        entropy = 0.0
+        tracked = 0
+        for count in self.counts.values():
+            count = min(count, known - tracked)
+            if count <= 0:
+                break
+            tracked += count
+            p = count / total
+            entropy -= p * math.log2(p)
+        residual = known - tracked
+        if residual > 0:
+            buckets = max(distinct - len(self.counts), 1.0)
+            p = residual / total / buckets
+            entropy -= residual / total * math.log2(p)
+        return max(entropy, 0.0)
+
+    def __len__(self) -> int:
+        return len(self.counts)
@@ -0,0 +1,580 @@
+"""
+Moteur incrémental de features historiques (état glissant par wallet).
+
+Traite les transactions dans l'ordre du temps et, pour chacune, émet les
+features historiques (mêmes clés et valeurs que compute_historical_aggregates()
+avec l'historique du wallet source sur la période de lookback) AVANT
+d'appliquer la transaction à l'état. Les transactions de même timestamp ne se
+voient pas entre elles (historique strictement antérieur).
+
+État par wallet, mis à jour en O(1) amorti :
+- par fenêtre : pointeur de début, count / somme courants, deque monotone
+  pour le max, compteur de destinataires (distincts = taille du compteur)
+- fenêtre 7d : fréquences de fréquences (top-1) et somme n·log2(n) (entropie)
+- fenêtre 30d : compteur de pays (mode, nouveau pays)
+- relation source → destination : timestamps par destinataire (toutes directions)
+- features décroissantes (half_lives) : dernier timestamp + 3 sommes par demi-vie
+
+Utilisé pour le replay d'entraînement (replay_historical_features, temps
+linéaire) et pour un calcul de features en ligne.
+
+Backend "sketch" (destination_backend="sketch") : les compteurs de
+destinataires sont remplacés par un SlidingHyperLogLog (distincts) et un
+top-k SpaceSaving (concentration / entropie 7d), à mémoire bornée par wallet.
+Les paires source → destination dont le dernier échange précède l'horizon
+(lookback, ou 30d si l'historique est illimité) sont évincées :
+days_since_last_src_to_dst est exact dans l'horizon, -1 au-delà.
+"""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_left
+from collections import Counter, defaultdict, deque
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from .aggregator import _get_empty_historical_features, _parse_window
+from .sketches import SlidingHyperLogLog, SpaceSaving
+
+# Fenêtres fixes de compute_historical_aggregates (relation, dispersion, pays, échecs)
+_RELATION_WINDOWS = ["24h", "7d", "30d"]
+_FAILED_STATUSES = {"FAILED", "CANCELED"}
+DESTINATION_BACKENDS = ("exact", "sketch")
+
+
+def _window_ns(window: str) -> int:
+    """Durée d'une fenêtre en nanosecondes."""
+    return int(_parse_window(window).total_seconds()) * 10**9
+
+
+def _is_missing(value: Any) -> bool:
+    """None ou NaN (valeurs ignorées par nunique / value_counts / dropna)."""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _to_ns(created_at: Any) -> int | None:
+    """created_at (str, datetime, pd.Timestamp, epoch ns) → epoch nanosecondes UTC."""
+    if created_at is None:
+        return None
+    if isinstance(created_at, int):
+        return created_at
+    try:
+        ts = pd.Timestamp(created_at)
+    except (TypeError, ValueError):
+        return None
+    if pd.isna(ts):
+        return None
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return int(ts.as_unit("ns").value)
+
+
+class _Event:
+    """Transaction sortante conservée dans les fenêtres d'un wallet."""
+
+    __slots__ = ("time", "amount", "destination", "country", "failed")
+
+    def __init__(self, time: int, amount: float, destination: Any, country: Any, failed: bool):
+        self.time = time
+        self.amount = amount
+        self.destination = destination
+        self.country = country
+        self.failed = failed
+
+
+class _WindowState:
+    """Agrégats courants d'une fenêtre glissante sur les transactions sortantes d'un wallet."""
+
+    def __init__(
+        self,
+        duration: int,
+        dispersion: bool = False,
+        countries: bool = False,
+        sketch_capacity: int | None = None,
+    ):
+        self.duration = duration
+        self.start = 0  # index absolu du premier événement dans la fenêtre
+        self.count = 0
+        self.amount_sum = 0.0
+        self.failed = 0
+        self.known_destinations = 0  # événements avec destinataire non null
+        self.max_queue: deque = deque()  # (index absolu, montant), montants décroissants
+        # Backend exact : compteur de destinataires (distincts = taille du compteur)
+        self.exact = sketch_capacity is None
+        self.destinations: Counter = Counter()
+        # Backend sketch : top-k des destinataires (fenêtre de dispersion uniquement)
+        self.top_k = SpaceSaving(sketch_capacity) if dispersion and not self.exact else None
+        # Dispersion (7d) : nombre de destinataires par fréquence, top-1, somme n·log2(n)
+        self.dispersion = dispersion
+        self.frequency_counts: Counter = Counter()
+        self.top = 0
+        self.n_log_n = 0.0
+        # Pays (30d)
+        self.countries: Counter | None = Counter() if countries else None
+
+    def _change_destination(self, destination: Any, delta: int) -> None:
+        old = self.destinations[destination]
+        new = old + delta
+        if new:
+            self.destinations[destination] = new
+        else:
+            del self.destinations[destination]
+        if not self.dispersion:
+            return
+        if old:
+            self.frequency_counts[old] -= 1
+            self.n_log_n -= old * math.log2(old)
+        if new:
+            self.frequency_counts[new] += 1
+            self.n_log_n += new * math.log2(new)
+        if new > self.top:
+            self.top = new
+        elif old == self.top and not self.frequency_counts[old]:
+            self.top = new
+
+    def add(self, index: int, event: _Event) -> None:
+        self.count += 1
+        self.amount_sum += event.amount
+        self.failed += event.failed
+        while self.max_queue and self.max_queue[-1][1] <= event.amount:
+            self.max_queue.pop()
+        self.max_queue.append((index, event.amount))
+        if not _is_missing(event.destination):
+            self.known_destinations += 1
+            if self.exact:
+                self._change_destination(event.destination, 1)
+            elif self.top_k is not None:
+                self.top_k.add(event.destination)
+        if self.countries is not None and not _is_missing(event.country):
+            self.countries[event.country] += 1
+
+    def remove(self, index: int, event: _Event) -> None:
+        self.count -= 1
+        self.amount_sum = self.amount_sum - event.amount if self.count else 0.0
+        self.failed -= event.failed
+        if self.max_queue and self.max_queue[0][0] == index:
+            self.max_queue.popleft()
+        if not _is_missing(event.destination):
+            self.known_destinations -= 1
+            if self.exact:
+                self._change_destination(event.destination, -1)
+            elif self.top_k is not None:
+                self.top_k.remove(event.destination)
+        if self.countries is not None and not _is_missing(event.country):
+            self.countries[event.country] -= 1
+            if not self.countries[event.country]:
+                del self.countries[event.country]
+
+    @property
+    def amount_max(self) -> float:
+        return self.max_queue[0][1] if self.max_queue else 0.0
+
+
+class _WalletState:
+    """État glissant d'un wallet source."""
+
+    def __init__(
+        self,
+        durations: Dict[str, int],
+        dispersion_key: str,
+        country_key: str,
+        sketch_precision: int | None = None,
+        sketch_capacity: int | None = None,
+        pair_horizon: int | None = None,
+    ):
+        self.events: List[_Event] = []  # transactions sortantes (index absolu = offset + position)
+        self.offset = 0
+        self.windows = {
+            key: _WindowState(
+                duration,
+                dispersion=key == dispersion_key,
+                countries=key == country_key,
+                sketch_capacity=sketch_capacity,
+            )
+            for key, duration in durations.items()
+        }
+        self.horizon = max(durations.values())
+        # Backend sketch : distincts de toutes les fenêtres depuis un seul HyperLogLog glissant
+        self.distinct = SlidingHyperLogLog(sketch_precision) if sketch_precision is not None else None
+        self.last_time: int | None = None  # dernière transaction (toutes directions)
+        # Features décroissantes : [count, montant, nouveaux destinataires] à l'instant decay_time
+        self.decay_time: int | None = None
+        self.decayed: Dict[str, List[float]] = {}
+        self.destination_times: Dict[Any, List[int]] = defaultdict(list)  # toutes directions
+        # Éviction des paires hors horizon (backend sketch ; None = historique complet conservé)
+        self.pair_horizon = pair_horizon
+        self._pairs_after_sweep = 0
+
+    def advance(self, now: int) -> None:
+        """Retire des fenêtres les événements sortis de [now - durée, now[."""
+        for window in self.windows.values():
+            cutoff = now - window.duration
+            while window.start - self.offset < len(self.events):
+                event = self.events[window.start - self.offset]
+                if event.time >= cutoff:
+                    break
+                window.remove(window.start, event)
+                window.start += 1
+        # Compaction : événements sortis de toutes les fenêtres
+        oldest = min(window.start for window in self.windows.values())
+        if oldest - self.offset > 1024 and oldest - self.offset > len(self.events) // 2:
+            del self.events[: oldest - self.offset]
+            self.offset = oldest
+            if self.distinct is not None:
+                self.distinct.expire(now - self.horizon)
+
+    def append(self, event: _Event) -> None:
+        index = self.offset + len(self.events)
+        self.events.append(event)
+        for window in self.windows.values():
+            window.add(index, event)
+        if self.distinct is not None and not _is_missing(event.destination):
+            self.distinct.add(event.destination, event.time)
+
+    def expire_destinations(self, now: int) -> None:
+        """
+        Évince les paires dont le dernier échange précède now - pair_horizon.
+
+        Balayage quand le nombre de paires a doublé depuis le précédent :
+        O(1) amorti par nouvelle paire, au plus 2× les paires vivantes.
+        """
+        if self.pair_horizon is None or len(self.destination_times) <= max(64, 2 * self._pairs_after_sweep):
+            return
+        cutoff = now - self.pair_horizon
+        for destination in [d for d, times in self.destination_times.items() if times[-1] < cutoff]:
+            del self.destination_times[destination]
+        for times in self.destination_times.values():
+            drop = bisect_left(times, cutoff)
+            if drop > 0:
+                del times[: min(drop, len(times) - 1)]
+        self._pairs_after_sweep = len(self.destination_times)
+
+    def destination_state_size(self) -> int:
+        """Nombre d'entrées conservées pour les features de destinataires (dont timestamps des paires)."""
+        size = sum(len(window.destinations) + len(window.top_k or ()) for window in self.windows.values())
+        size += sum(len(times) for times in self.destination_times.values())
+        return size + (len(self.distinct) if self.distinct is not None else 0)
+
+
+class StreamingFeatureEngine:
+    """
+    Features historiques incrémentales (état par wallet, O(1) amorti par transaction).
+
+    Usage:
+        engine = StreamingFeatureEngine(windows=["5m", "1h", "24h", "7d", "30d"])
+        for transaction in transactions_par_ordre_de_temps:
+            features = engine.process(transaction)
+    """
+
+    def __init__(
+        self,
+        windows: List[str] | None = None,
+        lookback: str | None = None,
+        destination_backend: str = "exact",
+        sketch_precision: int = 7,
+        sketch_capacity: int = 16,
+        half_lives: List[str] | None = None,
+    ):
+        """
+        Initialise le moteur.
+
+        Args:
+            windows: Fenêtres du profil source (défaut: ["5m", "1h", "24h", "7d", "30d"])
+            lookback: Profondeur d'historique (None = historique complet)
+            destination_backend: "exact" (compteurs) ou "sketch" (mémoire bornée par wallet)
+            sketch_precision: log2 du nombre de registres HyperLogLog (backend sketch)
+            sketch_capacity: Taille du top-k des destinataires 7d (backend sketch)
+            half_lives: Demi-vies des features décroissantes (sur tout l'historique,
+                le lookback ne s'applique pas)
+
+        Raises:
+            ValueError: Si le backend est inconnu
+        """
+        if destination_backend not in DESTINATION_BACKENDS:
+            raise ValueError(
+                f"Backend de destinataires inconnu: {destination_backend} (attendu: {', '.join(DESTINATION_BACKENDS)})"
+            )
+        self.destination_backend = destination_backend
+        self._sketch = (
+            {"sketch_precision": sketch_precision, "sketch_capacity": sketch_capacity}
+            if destination_backend == "sketch"
+            else {}
+        )
+        self.windows = windows or ["5m", "1h", "24h", "7d", "30d"]
+        self.lookback = None if lookback is None else _window_ns(lookback)
+        self.half_lives = list(half_lives or [])
+        self._half_life_ns = {h: _window_ns(h) for h in self.half_lives}
+
+        def effective(window: str) -> int:
+            duration = _window_ns(window)
+            return duration if self.lookback is None else min(duration, self.lookback)
+
+        # Fenêtres internes : profil + fenêtres fixes (dispersion 7d, pays 30d, échecs 24h/7d)
+        self._durations = {w: effective(w) for w in dict.fromkeys(self.windows + ["24h", "7d", "30d"])}
+        self._relation = {w: effective(w) for w in _RELATION_WINDOWS}
+        self._relation_horizon = max(self._relation.values())
+        # Backend sketch : paires source → destination conservées sur le lookback (30d sans lookback)
+        self._pair_horizon = (
+            (self.lookback if self.lookback is not None else self._relation_horizon) if self._sketch else None
+        )
+        self._wallets: Dict[Any, _WalletState] = {}
+        self._pending: List[tuple] = []  # transactions du timestamp courant, appliquées quand le temps avance
+        self._now: int | None = None
+
+    def _wallet(self, wallet_id: Any) -> _WalletState:
+        state = self._wallets.get(wallet_id)
+        if state is None:
+            state = _WalletState(
+                self._durations,
+                dispersion_key="7d",
+                country_key="30d",
+                pair_horizon=self._pair_horizon,
+                **self._sketch,
+            )
+            self._wallets[wallet_id] = state
+        return state
+
+    def _flush_pending(self) -> None:
+        for wallet_id, time, transaction in self._pending:
+            self._apply(wallet_id, time, transaction)
+        self._pending = []
+
+    def _apply(self, wallet_id: Any, time: int, transaction: Dict[str, Any]) -> None:
+        state = self._wallet(wallet_id)
+        state.last_time = time
+        destination = transaction.get("destination_wallet_id")
+        novel = False
+        if not _is_missing(destination):
+            times = state.destination_times[destination]
+            # Premier échange avec ce destinataire (dans l'horizon des paires en backend sketch)
+            novel = not times or times[0] == time or not self._pair_in_horizon(times[-1], time)
+            times.append(time)
+            if novel:
+                state.expire_destinations(time)
+        outgoing = transaction.get("direction") == "outgoing"
+        if self.half_lives and outgoing:
+            amount = transaction.get("amount")
+            self._decay(state, time)
+            for sums in state.decayed.values():
+                sums[0] += 1.0
+                sums[1] += 0.0 if _is_missing(amount) else float(amount)
+                sums[2] += 1.0 if novel else 0.0
+        if outgoing:
+            if "status" in transaction:
+                failed = transaction.get("status") in _FAILED_STATUSES
+            else:
+                failed = not _is_missing(transaction.get("reason_code"))
+            amount = transaction.get("amount")
+            amount = 0.0 if _is_missing(amount) else float(amount)
+            state.append(_Event(time, amount, destination, transaction.get("country"), failed))
+
+    def _pair_in_horizon(self, last: int, now: int) -> bool:
+        """Dernier échange d'une paire encore dans l'horizon des paires (toujours vrai en backend exact)."""
+        return self._pair_horizon is None or last >= now - self._pair_horizon
+
+    def process(self, transaction: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Émet les features historiques de la transaction, puis l'applique à l'état.
+
+        Args:
+            transaction: Transaction (created_at, source_wallet_id, destination_wallet_id,
+                direction, amount, country, status/reason_code)
+
+        Returns:
+            Features historiques (mêmes clés que compute_historical_aggregates())
+
+        Raises:
+            ValueError: Si les transactions ne sont pas dans l'ordre du temps
+        """
+        time = _to_ns(transaction.get("created_at"))
+        if time is None:
+            return _get_empty_historical_features(self.windows, self.half_lives)
+        if self._now is not None and time < self._now:
+            raise ValueError("Les transactions doivent être traitées dans l'ordre de created_at")
+        if self._now is None or time > self._now:
+            self._flush_pending()
+            self._now = time
+
+        wallet_id = transaction.get("source_wallet_id")
+        if _is_missing(wallet_id):
+            return _get_empty_historical_features(self.windows, self.half_lives)
+        features = self._features(wallet_id, time, transaction)
+        if self.half_lives:
+            features.update(self._decayed_features(wallet_id, time))
+        self._pending.append((wallet_id, time, transaction))
+        return features
+
+    def _decay(self, state: _WalletState, now: int) -> None:
+        """Ramène les sommes décroissantes du wallet à l'instant now."""
+        if state.decay_time is None:
+            state.decayed = {h: [0.0, 0.0, 0.0] for h in self.half_lives}
+        elif now > state.decay_time:
+            for half_life, sums in state.decayed.items():
+                factor = 0.5 ** ((now - state.decay_time) / self._half_life_ns[half_life])
+                sums[0] *= factor
+                sums[1] *= factor
+                sums[2] *= factor
+        state.decay_time = now
+
+    def _decayed_features(self, wallet_id: Any, now: int) -> Dict[str, float]:
+        """Features décroissantes du wallet à l'instant now (sans modifier l'état)."""
+        state = self._wallets.get(wallet_id)
+        features = {}
+        for half_life in self.half_lives:
+            sums = state.decayed.get(half_life) if state is not None and state.decay_time is not None else None
+            factor = 0.5 ** ((now - state.decay_time) / self._half_life_ns[half_life]) if sums else 0.0
+            features[f"src_decayed_tx_count_out_{half_life}"] = sums[0] * factor if sums else 0.0
+            features[f"src_decayed_amount_sum_out_{half_life}"] = sums[1] * factor if sums else 0.0
+            features[f"src_decayed_new_destinations_{half_life}"] = sums[2] * factor if sums else 0.0
+        return features
+
+    @staticmethod
+    def _distinct(state: _WalletState, window: _WindowState, now: int) -> int:
+        """Destinataires distincts d'une fenêtre (exact ou estimé par le HyperLogLog)."""
+        if window.exact:
+            return len(window.destinations)
+        if not window.known_destinations:
+            return 0
+        estimate = int(round(state.distinct.count(now, window.duration)))
+        return min(max(estimate, 1), window.known_destinations)
+
+    def destination_state_sizes(self) -> Dict[Any, int]:
+        """Taille de l'état de destinataires par wallet (entrées de compteurs ou de sketches)."""
+        return {wallet_id: state.destination_state_size() for wallet_id, state in self._wallets.items()}
+
+    def _features(self, wallet_id: Any, now: int, transaction: Dict[str, Any]) -> Dict[str, Any]:
+        state = self._wallets.get(wallet_id)
+        has_history = (
+            state is not None
+            and state.last_time is not None
+            and (self.lookback is None or state.last_time >= now - self.lookback)
+        )
+        if not has_history:
+            return _get_empty_historical_features(self.windows, self.half_lives)
+
+        state.advance(now)
+        features: Dict[str, Any] = {}
+
+        # Profil wallet source
+        for window in self.windows:
+            w = state.windows[window]
+            features[f"src_tx_count_out_{window}"] = w.count
+            features[f"src_tx_amount_sum_out_{window}"] = float(w.amount_sum) if w.count else 0.0
+            features[f"src_tx_amount_mean_out_{window}"] = float(w.amount_sum / w.count) if w.count else 0.0
+            features[f"src_tx_amount_max_out_{window}"] = float(w.amount_max) if w.count else 0.0
+            features[f"src_unique_destinations_{window}"] = self._distinct(state, w, now)
+
+        # Relation source → destination (toutes directions)
+        destination = transaction.get("destination_wallet_id")
+        if destination:
+            times = state.destination_times.get(destination) if not _is_missing(destination) else None
+            if times:
+                # Élague les timestamps hors horizon (le dernier est gardé pour days_since)
+                drop = bisect_left(times, now - self._relation_horizon)
+                if drop > 0:
+                    del times[: min(drop, len(times) - 1)]
+            for window in _RELATION_WINDOWS:
+                in_window = len(times) - bisect_left(times, now - self._relation[window]) if times else 0
+                features[f"is_new_destination_{window}"] = 1 if in_window == 0 else 0
+            features["src_to_dst_tx_count_30d"] = (
+                len(times) - bisect_left(times, now - self._relation["30d"]) if times else 0
+            )
+            last = times[-1] if times else None
+            if (
+                last is not None
+                and (self.lookback is None or last >= now - self.lookback)
+                and self._pair_in_horizon(last, now)
+            ):
+                features["days_since_last_src_to_dst"] = float((now - last) / 1e9 / 86400)
+            else:
+                features["days_since_last_src_to_dst"] = -1.0
+        else:
+            for window in _RELATION_WINDOWS:
+                features[f"is_new_destination_{window}"] = 1
+            features["src_to_dst_tx_count_30d"] = 0
+            features["days_since_last_src_to_dst"] = None
+
+        # Dispersion des destinataires (7 jours)
+        w7 = state.windows["7d"]
+        if w7.count > 0 and w7.known_destinations > 0 and w7.top_k is not None:
+            features["src_destination_concentration_7d"] = float(min(w7.top_k.top(), w7.known_destinations) / w7.count)
+            features["src_destination_entropy_7d"] = float(
+                w7.top_k.entropy(w7.count, w7.known_destinations, self._distinct(state, w7, now))
+            )
+        elif w7.count > 0 and w7.known_destinations > 0:
+            features["src_destination_concentration_7d"] = float(w7.top / w7.count)
+            # -Σ p·log2(p) avec p = n/N : (K/N)·log2(N) - Σ n·log2(n) / N
+            entropy = w7.known_destinations / w7.count * math.log2(w7.count) - w7.n_log_n / w7.count
+            features["src_destination_entropy_7d"] = float(max(entropy, 0.0))
+        else:
+            features["src_destination_concentration_7d"] = 0.0
+            features["src_destination_entropy_7d"] = 0.0
+
+        # Localisation (30 jours)
+        country = transaction.get("country")
+        w30 = state.windows["30d"]
+        if country:
+            if w30.count > 0:
+                countries = w30.countries
+                features["is_new_country_30d"] = 1 if _is_missing(country) or country not in countries else 0
+                if countries:
+                    top = max(countries.values())
+                    most_common = min(c for c, n in countries.items() if n == top)
+                    features["country_mismatch"] = 1 if most_common and country != most_common else 0
+                else:
+                    features["country_mismatch"] = 0
+            else:
+                features["is_new_country_30d"] = 1
+                features["country_mismatch"] = 0
+        else:
+            features["is_new_country_30d"] = 0
+            features["country_mismatch"] = 0
+
+        # Statuts & échecs
+        features["src_failed_count_24h"] = state.windows["24h"].failed
+        features["src_failed_ratio_7d"] = float(w7.failed / w7.count) if w7.count else 0.0
+
+        return features
+
+
+def replay_historical_features(
+    transactions_df: pd.DataFrame,
+    windows: List[str] | None = None,
+    lookback: str | None = None,
+    engine: StreamingFeatureEngine | None = None,
+    half_lives: List[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Rejoue un dataset dans l'ordre du temps avec StreamingFeatureEngine.
+
+    Args:
+        transactions_df: Transactions
+        windows: Fenêtres du profil source
+        lookback: Profondeur d'historique (None = historique complet)
+        engine: Moteur préconfiguré (ex: backend sketch) ; windows/lookback/half_lives ignorés si fourni
+        half_lives: Demi-vies des features décroissantes
+
+    Returns:
+        Features historiques (même ordre de lignes que l'entrée, index 0..n-1,
+        days_since_last_src_to_dst = -1.0 si pas de destination)
+    """
+    if engine is None:
+        engine = StreamingFeatureEngine(windows=windows, lookback=lookback, half_lives=half_lives)
+    df = transactions_df.reset_index(drop=True)
+    times = pd.to_datetime(df["created_at"], utc=True).dt.as_unit("ns").astype("int64")
+    order = times.sort_values(kind="mergesort").index
+
+    records = df.to_dict("records")
+    time_values = times.to_numpy()
+    rows: List[Dict[str, Any] | None] = [None] * len(df)
+    for position in order:
+        transaction = records[position]
+        transaction["created_at"] = int(time_values[position])
+        features = engine.process(transaction)
+        if features.get("days_since_last_src_to_dst") is None:
+            features["days_since_last_src_to_dst"] = -1.0
+        rows[position] = features
+    columns = list(_get_empty_historical_features(engine.windows, engine.half_lives).keys())
+    return pd.DataFrame(rows, columns=columns)
@@ -9,8 +9,10 @@ from __future__ import annotations
 
 import multiprocessing as mp
 from functools import partial
+from pathlib import Path
 from typing import Any, Dict, List
 
+import numpy as np
 import pandas as pd
 
 try:
@@ -19,14 +21,19 @@ try:
 except ImportError:
     HAS_TQDM = False
 
-from .aggregator import compute_historical_aggregates
+from ..utils.profiling import annotate, step
+from .aggregator import _parse_window, compute_historical_aggregates
 from .extractor import extract_transaction_features
+from .parallel import PARALLEL_MIN_ROWS, compute_historical_features_parallel
 from .pipeline import FeaturePipeline
+from .streaming import replay_historical_features
+from .vectorized import compute_historical_features_vectorized, compute_transaction_features_vectorized
 
 
 def _compute_features_single(
     args: tuple,
     windows: List[str],
+    half_lives: List[str] | None = None,
 ) -> Dict[str, Any]:
     """
     Fonction helper pour calculer les features d'une seule transaction.
@@ -36,6 +43,7 @@ def _compute_features_single(
     Args:
         args: Tuple (idx, transaction_dict, historical_df_dict)
         windows: Liste des fenêtres temporelles
+        half_lives: Demi-vies des features décroissantes
     
     Returns:
         Dictionnaire de features
@@ -57,6 +65,7 @@ def _compute_features_single(
         transaction=transaction_dict,
         historical_data=historical_df,
         windows=windows,
+        half_lives=half_lives,
     )
     
     # Combiner toutes les features
@@ -69,29 +78,72 @@ def _compute_features_single(
     return all_features
 
 
+def _vectorized_historical_features(
+    transactions_df: pd.DataFrame,
+    windows: List[str],
+    lookback: str | None,
+    half_lives: List[str] | None,
+    n_jobs: int,
+    verbose: bool,
+    checkpoint_dir: str | Path | None = None,
+) -> pd.DataFrame:
+    """
+    Moteur vectorisé, parallélisé par shard de wallets au-delà de PARALLEL_MIN_ROWS lignes
+    (toujours par shards avec points de reprise).
+    """
+    if checkpoint_dir is not None or (n_jobs > 1 and len(transactions_df) >= PARALLEL_MIN_ROWS):
+        return compute_historical_features_parallel(
+            transactions_df,
+            windows=windows,
+            lookback=lookback,
+            half_lives=half_lives,
+            n_jobs=n_jobs if len(transactions_df) >= PARALLEL_MIN_ROWS else 1,
+            verbose=verbose,
+            checkpoint_dir=checkpoint_dir,
+        )
+    return compute_historical_features_vectorized(
+        transactions_df, windows=windows, lookback=lookback, half_lives=half_lives
+    )
+
+
 def compute_features_for_dataset(
     transactions_df: pd.DataFrame,
     windows: List[str] | None = None,
     verbose: bool = True,
     n_jobs: int | None = None,
     chunk_size: int = 1000,
+    engine: str = "vectorized",
+    lookback: str | None = "7d",
+    half_lives: List[str] | None = None,
+    checkpoint_dir: str | Path | None = None,
 ) -> pd.DataFrame:
     """
     Calcule les features pour un dataset complet (pour l'entraînement).
 
     Pour chaque transaction, calcule :
     - Features transactionnelles (depuis la transaction)
-    - Features historiques (depuis toutes les transactions AVANT cette transaction)
+    - Features historiques (depuis les transactions du wallet source AVANT cette transaction)
+
+    Deux moteurs produisent les mêmes colonnes :
+    - "vectorized" (défaut) : passe colonnaire unique (src/features/vectorized.py)
+    - "legacy" : compute_historical_aggregates() par transaction (référence, lent ;
+      historique limité aussi aux 50 000 lignes précédentes)
 
     Args:
-        transactions_df: DataFrame des transactions (doit être trié par created_at)
+        transactions_df: DataFrame des transactions (trié par created_at si besoin)
         windows: Liste des fenêtres temporelles (défaut: ["5m", "1h", "24h", "7d", "30d"])
         verbose: Afficher la progression
-        n_jobs: Nombre de processus parallèles (défaut: nombre de cores - 1)
-        chunk_size: Taille des chunks pour la parallélisation (défaut: 1000)
+        n_jobs: Nombre de processus parallèles (défaut: nombre de cores - 1) ; moteur vectorisé :
+            shards de wallets au-delà de PARALLEL_MIN_ROWS lignes
+        chunk_size: Taille des chunks pour la parallélisation, moteur legacy (défaut: 1000)
+        engine: "vectorized", "streaming" (replay incrémental) ou "legacy"
+        lookback: Profondeur d'historique (défaut: "7d", None = historique complet,
+            moteurs vectorisé et streaming uniquement)
+        half_lives: Demi-vies des features décroissantes (ex: ["1h", "24h"] ; défaut: aucune)
+        checkpoint_dir: Points de reprise par shard de wallets (moteur vectorisé ; None = aucun)
 
     Returns:
-        DataFrame avec les features calculées
+        DataFrame avec les features calculées (lignes dans l'ordre de created_at)
     """
     if windows is None:
         windows = ["5m", "1h", "24h", "7d", "30d"]
@@ -101,12 +153,41 @@ def compute_features_for_dataset(
         n_jobs = max(1, mp.cpu_count() - 1)  # Laisser 1 core libre
     
     # S'assurer que le DataFrame est trié par created_at
+    # (tri stable : un dataset déjà trié garde son ordre, les labels restent alignés)
     if "created_at" in transactions_df.columns:
-        transactions_df = transactions_df.sort_values("created_at").reset_index(drop=True)
+        transactions_df = transactions_df.sort_values("created_at", kind="mergesort").reset_index(drop=True)
     
     # Convertir created_at en datetime si nécessaire
     if transactions_df["created_at"].dtype != "datetime64[ns, UTC]":
         transactions_df["created_at"] = pd.to_datetime(transactions_df["created_at"], utc=True)
+
+    if engine in ("vectorized", "streaming"):
+        import time
+        start_time = time.time()
+        if verbose:
+            print(f"🔧 Dataset: {len(transactions_df)} transactions")
+            print(f"   Mode: moteur {engine} (lookback: {lookback or 'historique complet'})")
+        with step("historical_features", rows=len(transactions_df)):
+            if engine == "vectorized":
+                historical_df = _vectorized_historical_features(
+                    transactions_df, windows, lookback, half_lives, n_jobs, verbose, checkpoint_dir
+                )
+            else:
+                historical_df = replay_historical_features(
+                    transactions_df, windows=windows, lookback=lookback, half_lives=half_lives
+                )
+            annotate(historical=historical_df)
+        with step("transaction_features", rows=len(transactions_df)):
+            transaction_df = compute_transaction_features_vectorized(transactions_df)
+            annotate(transaction=transaction_df)
+        features_df = pd.concat([transaction_df, historical_df], axis=1)
+        annotate(rows=len(transactions_df), transactions=transactions_df, features=features_df)
+        if verbose:
+            elapsed = time.time() - start_time
+            print(f"   ✅ Features calculées en {elapsed:.1f}s ({len(features_df) / max(elapsed, 1e-9):.0f} it/s)")
+        return features_df
+    elif engine != "legacy":
+        raise ValueError(f"Moteur de features inconnu: {engine} (attendu 'vectorized', 'streaming' ou 'legacy')")
     
     # OPTIMISATION: Pré-calculer la colonne created_at comme array numpy pour searchsorted
     # searchsorted utilise une recherche binaire (O(log n)) au lieu d'un scan linéaire (O(n))
@@ -139,6 +220,8 @@ def compute_features_for_dataset(
         else:
             chunk_iterator = range(n_chunks)
         
+        # Un seul pool pour tous les chunks (pas de démarrage de processus par chunk)
+        pool = mp.Pool(processes=n_jobs)
         for chunk_idx in chunk_iterator:
             start_idx = chunk_idx * chunk_size
             end_idx = min((chunk_idx + 1) * chunk_size, len(transactions_df))
@@ -220,11 +303,10 @@ def compute_features_for_dataset(
             if verbose:
                 print(f"   🔄 Calcul des features en cours...", flush=True)
             
-            with mp.Pool(processes=n_jobs) as pool:
-                chunk_features = pool.map(
-                    partial(_compute_features_single, windows=windows),
-                    chunk_args,
-                )
+            chunk_features = pool.map(
+                partial(_compute_features_single, windows=windows, half_lives=half_lives),
+                chunk_args,
+            )
             
             chunk_time = time.time() - chunk_start_time
             chunk_speed = len(chunk_args) / chunk_time if chunk_time > 0 else 0
@@ -251,6 +333,8 @@ def compute_features_for_dataset(
                       f"Temps écoulé: {elapsed/60:.1f}min", flush=True)
             
             features_list.extend(chunk_features)
+        pool.close()
+        pool.join()
     else:
         # Mode séquentiel (petit dataset ou n_jobs=1)
         if verbose:
@@ -302,12 +386,12 @@ def compute_features_for_dataset(
         if verbose and HAS_TQDM:
             iterator = tqdm(args_list, desc="Calcul des features", unit="it")
             features_list = [
-                _compute_features_single(args, windows) for args in iterator
+                _compute_features_single(args, windows, half_lives) for args in iterator
             ]
         else:
             features_list = []
             for idx, args in enumerate(args_list):
-                features_list.append(_compute_features_single(args, windows))
+                features_list.append(_compute_features_single(args, windows, half_lives))
                 
                 if verbose and (idx + 1) % 100 == 0:
                     elapsed = time.time() - start_time
@@ -320,10 +404,83 @@ def compute_features_for_dataset(
     
     # Convertir en DataFrame
     features_df = pd.DataFrame(features_list)
+    annotate(rows=len(transactions_df), transactions=transactions_df, features=features_df)
     
     return features_df
 
 
+def compute_features_for_splits(
+    splits: Dict[str, pd.DataFrame],
+    windows: List[str] | None = None,
+    lookback: str | None = None,
+    verbose: bool = True,
+    half_lives: List[str] | None = None,
+    n_jobs: int | None = None,
+    checkpoint_dir: str | Path | None = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Calcule les features de plusieurs splits en une seule passe sur la timeline complète.
+
+    Les splits (ex: train, val) sont concaténés puis featurisés ensemble : une
+    transaction de validation voit l'historique situé dans la période de train.
+    Les features sont ensuite redécoupées, dans l'ordre des lignes de chaque split.
+
+    Args:
+        splits: Splits temporels {nom: DataFrame}
+        windows: Fenêtres du profil source (défaut: ["5m", "1h", "24h", "7d", "30d"])
+        lookback: Profondeur d'historique (None = historique complet)
+        verbose: Afficher la progression
+        half_lives: Demi-vies des features décroissantes (défaut: aucune)
+        n_jobs: Processus pour le calcul par shard de wallets (défaut: nombre de cores - 1)
+        checkpoint_dir: Points de reprise par shard de wallets (None = aucun) : un calcul
+            interrompu reprend aux shards manquants
+
+    Returns:
+        Features par split {nom: DataFrame (index 0..n-1)}
+    """
+    if windows is None:
+        windows = ["5m", "1h", "24h", "7d", "30d"]
+
+    if lookback is not None:
+        lookback_delta = _parse_window(lookback)
+        truncated = [w for w in windows + ["30d"] if _parse_window(w) > lookback_delta]
+        if truncated and verbose:
+            print(f"   ⚠️  Lookback {lookback} < fenêtres {sorted(set(truncated))}: historique tronqué")
+
+    names = list(splits.keys())
+    timeline = pd.concat([splits[name] for name in names], ignore_index=True)
+    boundaries = np.cumsum([0] + [len(splits[name]) for name in names])
+
+    import time
+    start_time = time.time()
+    if verbose:
+        print(f"🔧 Timeline complète: {len(timeline):,} transactions ({', '.join(f'{n}: {len(splits[n]):,}' for n in names)})")
+        print(f"   Fenêtres: {windows} | lookback: {lookback or 'historique complet'}")
+        if half_lives:
+            print(f"   Demi-vies (features décroissantes): {half_lives}")
+
+    # Le moteur vectorisé conserve l'ordre des lignes d'entrée : pas de réalignement
+    with step("transaction_features", rows=len(timeline)):
+        transaction_features = compute_transaction_features_vectorized(timeline)
+        annotate(transaction=transaction_features)
+    with step("historical_features", rows=len(timeline)):
+        historical_features = _vectorized_historical_features(
+            timeline, windows, lookback, half_lives, n_jobs or max(1, mp.cpu_count() - 1), verbose, checkpoint_dir
+        )
+        annotate(historical=historical_features)
+    features = pd.concat([transaction_features, historical_features], axis=1)
+    annotate(rows=len(timeline), timeline=timeline, features=features)
+
+    if verbose:
+        elapsed = time.time() - start_time
+        print(f"   ✅ Features calculées en {elapsed:.1f}s ({len(features) / max(elapsed, 1e-9):.0f} it/s)")
+
+    return {
+        name: features.iloc[boundaries[i] : boundaries[i + 1]].reset_index(drop=True)
+        for i, name in enumerate(names)
+    }
+
+
 def compute_features_batch(
     transactions_df: pd.DataFrame,
     batch_size: int = 1000,
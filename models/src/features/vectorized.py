@@ -0,0 +1,586 @@
+"""
+Moteur vectorisé des features historiques pour l'entraînement.
+
+Calcule, pour toutes les lignes d'un dataset en une passe colonnaire, les mêmes
+features que compute_historical_aggregates() (mêmes clés, mêmes valeurs à la
+précision flottante près), sans construire un DataFrame d'historique par
+transaction.
+
+Historique d'une transaction (même définition que le chemin d'entraînement
+historique) : transactions du même source_wallet_id avec
+created_at dans [created_at - lookback, created_at[ (strictement avant).
+
+Principe :
+- tri unique par (source_wallet_id, created_at)
+- bornes de fenêtres par searchsorted sur une clé composite
+  (wallet × (R + 1) + rang temporel), R = nombre de timestamps distincts
+- comptes par sommes préfixes entières, sommes/maxima par rolling pandas sur
+  les bornes calculées (une seule passe Cython pour tous les wallets)
+- destinataires distincts par fenêtre : chaque ligne j compte pour les
+  fenêtres qui la contiennent et ne contiennent pas son occurrence précédente
+  (intervalle de lignes obtenu par searchsorted, puis somme cumulée)
+- concentration/entropie et pays : expansion (ligne, historique) uniquement
+  pour les fenêtres qui en ont besoin, par blocs de taille bornée
+- features décroissantes : sommes préfixes de v·exp(λ·t) par segment de
+  temps (exposants bornés), plus la retenue du segment précédent
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+from .aggregator import _get_empty_historical_features, _parse_window
+
+# Fenêtres fixes de compute_historical_aggregates (relation, dispersion, pays, échecs)
+_RELATION_WINDOWS = ["24h", "7d", "30d"]
+_DISPERSION_WINDOW = "7d"
+_COUNTRY_WINDOW = "30d"
+_FAILED_STATUSES = ["FAILED", "CANCELED"]
+# Longueur d'un segment des sommes décroissantes, en constantes de temps (exp(±500) reste en float64 ;
+# au-delà d'un segment, le poids résiduel exp(-500) est négligeable)
+_DECAY_SEGMENT = 500.0
+
+
+class _BoundsIndexer(BaseIndexer):
+    """Fenêtres rolling pandas à bornes précalculées (start/end monotones)."""
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        return self.start, self.end
+
+
+def _window_ns(window: str) -> int:
+    """Durée d'une fenêtre en nanosecondes."""
+    return (_parse_window(window) // timedelta(microseconds=1)) * 1000
+
+
+def _timestamps_ns(created_at: pd.Series) -> np.ndarray:
+    """created_at → epoch nanosecondes (int64, UTC)."""
+    ts = pd.to_datetime(created_at, utc=True)
+    return ts.dt.as_unit("ns").astype("int64").to_numpy()
+
+
+def _codes(values: pd.Series, sort: bool = False) -> np.ndarray:
+    """Codes entiers (valeurs manquantes → -1)."""
+    try:
+        codes, _ = pd.factorize(values, sort=sort)
+    except TypeError:
+        codes, _ = pd.factorize(values.astype(str).where(values.notna()), sort=sort)
+    return codes.astype(np.int64)
+
+
+def _truthy(values: pd.Series) -> np.ndarray:
+    """Vérité Python de chaque valeur (comme `if value:` ; NaN est vrai, None/"" faux)."""
+    return values.to_numpy(dtype=object).astype(bool)
+
+
+def _prefix(mask: np.ndarray) -> np.ndarray:
+    """Somme préfixe exclusive d'un indicateur (count sur [lo, hi[ = P[hi] - P[lo])."""
+    return np.concatenate([[0], np.cumsum(mask, dtype=np.int64)])
+
+
+def _sorted_index(group: np.ndarray, rank: np.ndarray, stride: int, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Index trié par (groupe, rang temporel) sur un sous-ensemble de lignes.
+
+    Returns:
+        (positions triées, clés composites triées)
+    """
+    order = rows[np.lexsort((rank[rows], group[rows]))]
+    return order, group[order] * stride + rank[order]
+
+
+def _distinct_in_windows(lo: np.ndarray, hi: np.ndarray, positions: np.ndarray, prev: np.ndarray) -> np.ndarray:
+    """
+    Nombre de valeurs distinctes dans chaque fenêtre [lo_i, hi_i[.
+
+    La ligne j (occurrence précédente de même valeur : prev[j], -1 sinon)
+    compte pour la fenêtre i ssi lo_i <= j < hi_i et prev[j] < lo_i. lo et hi
+    étant monotones, ces fenêtres forment un intervalle [start, end] de i.
+
+    Args:
+        lo, hi: Bornes des fenêtres (monotones croissantes)
+        positions: Positions j des lignes éligibles
+        prev: Position de l'occurrence précédente de même valeur (-1 si aucune)
+
+    Returns:
+        Comptes distincts par fenêtre
+    """
+    n = len(lo)
+    start = np.maximum(np.searchsorted(hi, positions, side="right"), np.searchsorted(lo, prev, side="right"))
+    end = np.searchsorted(lo, positions, side="right") - 1
+    valid = start <= end
+    diff = np.bincount(start[valid], minlength=n + 1) - np.bincount(end[valid] + 1, minlength=n + 1)
+    return np.cumsum(diff[:n])
+
+
+def _previous_occurrence(positions: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Position de l'occurrence précédente de la même clé (positions croissantes), -1 sinon."""
+    order = np.lexsort((positions, keys))
+    sorted_keys = keys[order]
+    sorted_pos = positions[order]
+    prev_sorted = np.where(
+        np.concatenate([[False], sorted_keys[1:] == sorted_keys[:-1]]),
+        np.concatenate([[-1], sorted_pos[:-1]]),
+        -1,
+    )
+    prev = np.empty_like(prev_sorted)
+    prev[order] = prev_sorted
+    return prev
+
+
+def _iter_expanded_blocks(rows: np.ndarray, lo: np.ndarray, hi: np.ndarray, max_pairs: int):
+    """
+    Produit des blocs (indice local de ligne, position d'historique) de taille bornée.
+
+    Args:
+        rows: Lignes (positions triées) à développer
+        lo, hi: Bornes de fenêtre
+        max_pairs: Nombre maximal de paires par bloc (mémoire bornée)
+
+    Yields:
+        (rows du bloc, indice local i pour chaque paire, position j pour chaque paire)
+    """
+    lengths = (hi[rows] - lo[rows]).astype(np.int64)
+    cumulative = np.cumsum(lengths)
+    start = 0
+    while start < len(rows):
+        base = cumulative[start - 1] if start > 0 else 0
+        end = max(int(np.searchsorted(cumulative, base + max_pairs, side="right")), start + 1)
+        block_rows = rows[start:end]
+        block_lengths = lengths[start:end]
+        total = int(block_lengths.sum())
+        local = np.repeat(np.arange(len(block_rows)), block_lengths)
+        offsets = np.arange(total) - np.repeat(np.cumsum(block_lengths) - block_lengths, block_lengths)
+        positions = np.repeat(lo[block_rows], block_lengths) + offsets
+        yield block_rows, local, positions
+        start = end
+
+
+def _counts_per_row(local: np.ndarray, codes: np.ndarray, n_codes: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Comptes par (ligne locale, code) → (ligne, code, compte)."""
+    keys, counts = np.unique(local * n_codes + codes, return_counts=True)
+    return keys // n_codes, keys % n_codes, counts
+
+
+def _decayed_sums(
+    wallet: np.ndarray,
+    times: np.ndarray,
+    hi: np.ndarray,
+    half_life_ns: int,
+    values: List[np.ndarray],
+) -> List[np.ndarray]:
+    """
+    Sommes décroissantes Σ v_i · 2^(-(t_k - t_i) / demi-vie) sur les lignes i
+    du même wallet strictement avant k.
+
+    Args:
+        wallet, times: Wallet et timestamp (ns) des lignes, triées par (wallet, temps)
+        hi: Première ligne de même (wallet, timestamp) que k (historique = lignes < hi)
+        half_life_ns: Demi-vie en nanosecondes
+        values: Valeurs v à sommer (une somme par tableau)
+
+    Returns:
+        Sommes décroissantes, une par tableau de values
+    """
+    rate = math.log(2) / half_life_ns
+    elapsed = (times - times.min()).astype(np.float64)
+    segment_length = _DECAY_SEGMENT / rate
+    segment = np.floor(elapsed / segment_length).astype(np.int64)
+    exponent = rate * (elapsed - segment * segment_length)  # dans [0, _DECAY_SEGMENT[
+
+    new_group = np.concatenate([[True], (wallet[1:] != wallet[:-1]) | (segment[1:] != segment[:-1])])
+    group = np.cumsum(new_group) - 1
+    group_start = np.flatnonzero(new_group)
+    # Retenue : le groupe précédent est le même wallet sur le segment immédiatement antérieur
+    previous_adjacent = np.zeros(len(group_start), dtype=bool)
+    previous_adjacent[1:] = (wallet[group_start[1:]] == wallet[group_start[1:] - 1]) & (
+        segment[group_start[1:]] == segment[group_start[1:] - 1] + 1
+    )
+    last = hi - 1
+    in_group = last >= group_start[group]
+    carry_group = np.maximum(group - 1, 0)
+    has_carry = previous_adjacent[group]
+
+    results = []
+    for value in values:
+        scaled = value * np.exp(exponent)
+        cumulative = pd.Series(scaled).groupby(group).cumsum().to_numpy()
+        totals = np.bincount(group, weights=scaled)
+        own = np.where(in_group, cumulative[np.maximum(last, 0)], 0.0)
+        carry = np.where(has_carry, totals[carry_group] * math.exp(-_DECAY_SEGMENT), 0.0)
+        results.append(np.exp(-exponent) * (own + carry))
+    return results
+
+
+def _encode_columns(transactions_df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Encode les colonnes utiles aux features historiques en tableaux numériques.
+
+    Les valeurs sont remplacées par des codes entiers (-1 = manquant) ; la
+    vérité Python des valeurs (`if value:`) est conservée à part, et les pays
+    sont codés dans l'ordre trié (le plus petit code = la plus petite valeur).
+
+    Args:
+        transactions_df: Transactions (index 0..n-1)
+
+    Returns:
+        Tableaux colonnaires {nom: array} dans l'ordre des lignes
+    """
+    df = transactions_df
+    n = len(df)
+    outgoing = (
+        (df["direction"].to_numpy(dtype=object) == "outgoing") if "direction" in df.columns else np.zeros(n, dtype=bool)
+    )
+    if "status" in df.columns:
+        failed = outgoing & df["status"].isin(_FAILED_STATUSES).to_numpy()
+    elif "reason_code" in df.columns:
+        failed = outgoing & df["reason_code"].notna().to_numpy()
+    else:
+        failed = np.zeros(n, dtype=bool)
+    has_destination = "destination_wallet_id" in df.columns
+    has_country = "country" in df.columns
+    return {
+        "times": _timestamps_ns(df["created_at"]),
+        "wallet": _codes(df["source_wallet_id"]),
+        "destination": _codes(df["destination_wallet_id"]) if has_destination else np.full(n, -1, dtype=np.int64),
+        "destination_truthy": _truthy(df["destination_wallet_id"]) if has_destination else np.zeros(n, dtype=bool),
+        "outgoing": outgoing.astype(bool),
+        "amount": pd.to_numeric(df["amount"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64),
+        "country": _codes(df["country"], sort=True) if has_country else np.full(n, -1, dtype=np.int64),
+        "country_truthy": _truthy(df["country"]) if has_country else np.zeros(n, dtype=bool),
+        "failed": failed.astype(bool),
+    }
+
+
+def compute_historical_features_vectorized(
+    transactions_df: pd.DataFrame,
+    windows: List[str] | None = None,
+    lookback: str | None = "7d",
+    max_pairs: int = 5_000_000,
+    half_lives: List[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Calcule les features historiques de toutes les transactions d'un dataset.
+
+    Les valeurs sont celles de compute_historical_aggregates() appelée avec
+    l'historique du wallet source sur la période de lookback, après gestion
+    des null (days_since_last_src_to_dst = -1.0 si pas de destination).
+    Une transaction sans source_wallet_id n'a pas d'historique.
+
+    Args:
+        transactions_df: Transactions (created_at, source_wallet_id,
+            destination_wallet_id, direction, amount, country, status/reason_code)
+        windows: Fenêtres du profil source (défaut: ["5m", "1h", "24h", "7d", "30d"])
+        lookback: Profondeur d'historique (ex: "7d" ; None = historique complet)
+        max_pairs: Taille max des blocs d'expansion (mémoire bornée)
+        half_lives: Demi-vies des features décroissantes (calculées sur tout
+            l'historique : la décroissance remplace le lookback)
+
+    Returns:
+        DataFrame des features historiques (même ordre de lignes que l'entrée,
+        index 0..n-1), colonnes dans l'ordre de compute_historical_aggregates()
+    """
+    if windows is None:
+        windows = ["5m", "1h", "24h", "7d", "30d"]
+
+    df = transactions_df.reset_index(drop=True)
+    columns = list(_get_empty_historical_features(windows, half_lives).keys())
+    if len(df) == 0:
+        return pd.DataFrame(columns=columns)
+
+    out = _historical_from_columns(_encode_columns(df), windows, lookback, max_pairs, half_lives)
+    return _features_frame(out, windows, half_lives)
+
+
+def _features_frame(out: Dict[str, np.ndarray], windows: List[str], half_lives: List[str] | None) -> pd.DataFrame:
+    """Tableaux de features → DataFrame typé (int64 / float64), colonnes dans l'ordre de l'agrégateur."""
+    empty_defaults = _get_empty_historical_features(windows, half_lives)
+    return pd.DataFrame(
+        {
+            name: out[name].astype(np.int64) if isinstance(default, int) else out[name].astype(np.float64)
+            for name, default in empty_defaults.items()
+        },
+        columns=list(empty_defaults.keys()),
+    )
+
+
+def _historical_from_columns(
+    encoded: Dict[str, np.ndarray],
+    windows: List[str],
+    lookback: str | None,
+    max_pairs: int,
+    half_lives: List[str] | None = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Cœur du moteur vectorisé sur des colonnes encodées (voir _encode_columns()).
+
+    Args:
+        encoded: Tableaux colonnaires (toutes les lignes d'un ensemble de wallets)
+        windows: Fenêtres du profil source
+        lookback: Profondeur d'historique (None = historique complet)
+        max_pairs: Taille max des blocs d'expansion
+        half_lives: Demi-vies des features décroissantes
+
+    Returns:
+        Features {nom: array} dans l'ordre des lignes d'entrée
+    """
+    times = encoded["times"]
+    n = len(times)
+    unique_times = np.unique(times)
+    rank = np.searchsorted(unique_times, times)
+    stride = len(unique_times) + 1
+    wallet = encoded["wallet"]
+
+    # Tri unique par (wallet, temps) : toutes les fenêtres sont des plages [lo, hi[
+    order = np.lexsort((rank, wallet))
+    w_s = wallet[order]
+    r_s = rank[order]
+    t_s = times[order]
+    keys = w_s * stride + r_s
+
+    def rank_of(t: np.ndarray) -> np.ndarray:
+        return np.searchsorted(unique_times, t, side="left")
+
+    hi = np.searchsorted(keys, keys, side="left")  # strictement avant la transaction
+    if lookback is None:
+        lo_lookback = np.searchsorted(keys, w_s * stride, side="left")
+        lookback_ns = None
+    else:
+        lookback_ns = _window_ns(lookback)
+        lo_lookback = np.searchsorted(keys, w_s * stride + rank_of(t_s - lookback_ns), side="left")
+
+    def lo_for(window: str) -> np.ndarray:
+        delta = _window_ns(window)
+        if lookback_ns is not None and delta >= lookback_ns:
+            return lo_lookback
+        return np.maximum(np.searchsorted(keys, w_s * stride + rank_of(t_s - delta), side="left"), lo_lookback)
+
+    has_history = (hi > lo_lookback) & (w_s >= 0)
+
+    outgoing = encoded["outgoing"][order]
+    amount = encoded["amount"][order]
+    destination = encoded["destination"][order]
+    out_prefix = _prefix(outgoing)
+
+    out: Dict[str, np.ndarray] = {}
+
+    # ---------- Profil wallet source ----------
+    amount_out = pd.Series(np.where(outgoing, amount, np.nan))
+    eligible_dest = np.flatnonzero(outgoing & (destination >= 0))
+    prev_dest = _previous_occurrence(eligible_dest, w_s[eligible_dest] * (destination.max() + 1) + destination[eligible_dest])
+
+    lo_cache: Dict[str, np.ndarray] = {}
+    unique_cache: Dict[str, np.ndarray] = {}
+    for window in windows:
+        lo = lo_for(window)
+        lo_cache[window] = lo
+        indexer = _BoundsIndexer(start=lo, end=hi)
+        count = out_prefix[hi] - out_prefix[lo]
+        amount_sum = amount_out.fillna(0.0).rolling(indexer, min_periods=0).sum().to_numpy()
+        amount_max = amount_out.rolling(indexer, min_periods=0).max().fillna(0.0).to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            amount_mean = np.where(count > 0, amount_sum / np.maximum(count, 1), 0.0)
+        unique = _distinct_in_windows(lo, hi, eligible_dest, prev_dest)
+        unique_cache[window] = unique
+
+        out[f"src_tx_count_out_{window}"] = count
+        out[f"src_tx_amount_sum_out_{window}"] = np.where(count > 0, amount_sum, 0.0)
+        out[f"src_tx_amount_mean_out_{window}"] = amount_mean
+        out[f"src_tx_amount_max_out_{window}"] = np.where(count > 0, amount_max, 0.0)
+        out[f"src_unique_destinations_{window}"] = unique
+
+    # ---------- Relation source → destination (toutes directions) ----------
+    dest_query = encoded["destination_truthy"][order] & (destination >= 0)
+    pair = np.where(destination >= 0, _codes(pd.Series(w_s * (destination.max() + 1) + destination)), -1)
+    pair_rows = np.flatnonzero(pair >= 0)
+    pair_order, pair_keys = _sorted_index(pair, r_s, stride, pair_rows)
+    q = np.flatnonzero(dest_query)
+    q_base = pair[q] * stride
+    pair_hi = np.searchsorted(pair_keys, q_base + r_s[q], side="left")
+    if lookback_ns is None:
+        pair_lo_lookback = np.searchsorted(pair_keys, q_base, side="left")
+    else:
+        pair_lo_lookback = np.searchsorted(pair_keys, q_base + rank_of(t_s[q] - lookback_ns), side="left")
+
+    for window in _RELATION_WINDOWS:
+        is_new = np.ones(n, dtype=np.int64)
+        delta = _window_ns(window)
+        pair_lo = np.maximum(np.searchsorted(pair_keys, q_base + rank_of(t_s[q] - delta), side="left"), pair_lo_lookback)
+        is_new[q] = (pair_hi - pair_lo == 0).astype(np.int64)
+        out[f"is_new_destination_{window}"] = is_new
+        if window == "30d":
+            src_to_dst = np.zeros(n, dtype=np.int64)
+            src_to_dst[q] = pair_hi - pair_lo
+            out["src_to_dst_tx_count_30d"] = src_to_dst
+
+    days_since = np.full(n, -1.0)
+    seen = pair_hi > pair_lo_lookback
+    last_time = t_s[pair_order[pair_hi[seen] - 1]]
+    days_since[q[seen]] = (t_s[q[seen]] - last_time) / 1e9 / 86400
+    out["days_since_last_src_to_dst"] = days_since
+
+    # ---------- Dispersion des destinataires (7 jours) ----------
+    lo7 = lo_cache.get(_DISPERSION_WINDOW)
+    if lo7 is None:
+        lo7 = lo_for(_DISPERSION_WINDOW)
+    unique7 = unique_cache.get(_DISPERSION_WINDOW)
+    if unique7 is None:
+        unique7 = _distinct_in_windows(lo7, hi, eligible_dest, prev_dest)
+    count7 = out_prefix[hi] - out_prefix[lo7]
+    dest_prefix = _prefix(outgoing & (destination >= 0))
+    known7 = dest_prefix[hi] - dest_prefix[lo7]
+
+    # Sans destinataire répété : top-1 = 1/N, entropie = U/N × log2(N)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        concentration = np.where(known7 > 0, 1.0 / np.maximum(count7, 1), 0.0)
+        entropy = np.where(known7 > 0, unique7 / np.maximum(count7, 1) * np.log2(np.maximum(count7, 1)), 0.0)
+
+    repeated = np.flatnonzero(unique7 < known7)
+    n_dest_codes = int(destination.max()) + 1
+    for block_rows, local, positions in _iter_expanded_blocks(repeated, lo7, hi, max_pairs):
+        keep = outgoing[positions] & (destination[positions] >= 0)
+        row_idx, _, counts = _counts_per_row(local[keep], destination[positions[keep]], n_dest_codes)
+        totals = count7[block_rows][row_idx]
+        top = np.zeros(len(block_rows), dtype=np.int64)
+        np.maximum.at(top, row_idx, counts)
+        p = counts / totals
+        concentration[block_rows] = top / count7[block_rows]
+        entropy[block_rows] = -np.bincount(row_idx, weights=p * np.log2(p), minlength=len(block_rows))
+
+    out["src_destination_concentration_7d"] = np.where(count7 > 0, concentration, 0.0)
+    out["src_destination_entropy_7d"] = np.where(count7 > 0, entropy, 0.0)
+
+    # ---------- Localisation (30 jours, transactions sortantes) ----------
+    is_new_country = np.zeros(n, dtype=np.int64)
+    country_mismatch = np.zeros(n, dtype=np.int64)
+    country = encoded["country"][order]
+    country_query = encoded["country_truthy"][order]
+    if country_query.any():
+        # Codes des valeurs fausses (ex: "") : un mode faux ne compte pas comme mismatch
+        falsy_codes = np.unique(country[~country_query & (country >= 0)])
+        lo30 = lo_cache.get(_COUNTRY_WINDOW)
+        if lo30 is None:
+            lo30 = lo_for(_COUNTRY_WINDOW)
+        count30 = out_prefix[hi] - out_prefix[lo30]
+        country_prefix = _prefix(outgoing & (country >= 0))
+        known30 = country_prefix[hi] - country_prefix[lo30]
+
+        # Aucun pays connu dans la fenêtre : nouveau pays, pas de mode
+        is_new_country[country_query] = 1
+        rows = np.flatnonzero(country_query & (count30 > 0) & (known30 > 0))
+        n_country_codes = int(country.max()) + 1
+        for block_rows, local, positions in _iter_expanded_blocks(rows, lo30, hi, max_pairs):
+            keep = outgoing[positions] & (country[positions] >= 0)
+            row_idx, codes, counts = _counts_per_row(local[keep], country[positions[keep]], n_country_codes)
+            # Mode : compte max, puis plus petit code (= plus petite valeur, comme Series.mode())
+            ranked = np.lexsort((codes, -counts, row_idx))
+            first = ranked[np.concatenate([[True], row_idx[ranked][1:] != row_idx[ranked][:-1]])]
+            mode = np.full(len(block_rows), -1, dtype=np.int64)
+            mode[row_idx[first]] = codes[first]
+            current = country[block_rows]
+            seen_country = np.zeros(len(block_rows), dtype=bool)
+            matches = codes == current[row_idx]
+            seen_country[row_idx[matches]] = True
+            is_new_country[block_rows] = (~seen_country).astype(np.int64)
+            truthy_mode = (mode >= 0) & ~np.isin(mode, falsy_codes)
+            country_mismatch[block_rows] = (truthy_mode & (current != mode)).astype(np.int64)
+    out["is_new_country_30d"] = is_new_country
+    out["country_mismatch"] = country_mismatch
+
+    # ---------- Statuts & échecs ----------
+    failed = encoded["failed"][order]
+    failed_prefix = _prefix(failed)
+    lo24 = lo_cache.get("24h")
+    if lo24 is None:
+        lo24 = lo_for("24h")
+    out["src_failed_count_24h"] = failed_prefix[hi] - failed_prefix[lo24]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["src_failed_ratio_7d"] = np.where(
+            count7 > 0, (failed_prefix[hi] - failed_prefix[lo7]) / np.maximum(count7, 1), 0.0
+        )
+
+    # ---------- Pas d'historique : valeurs par défaut de compute_historical_aggregates ----------
+    empty_defaults = _get_empty_historical_features(windows)
+    no_history = ~has_history
+    for name, default in empty_defaults.items():
+        out[name] = np.where(no_history, default, out[name])
+
+    # ---------- Features décroissantes (historique complet du wallet) ----------
+    if half_lives:
+        # Nouveau destinataire : premier timestamp de la paire (wallet, destinataire)
+        first_rank = np.full(max(int(pair.max()) + 1, 1), stride, dtype=np.int64)
+        np.minimum.at(first_rank, pair[pair_rows], r_s[pair_rows])
+        novel = outgoing & (pair >= 0) & (r_s == first_rank[np.maximum(pair, 0)])
+        has_wallet = w_s >= 0
+        for half_life in half_lives:
+            count, amount_sum, new_destinations = _decayed_sums(
+                w_s,
+                t_s,
+                hi,
+                _window_ns(half_life),
+                [outgoing.astype(np.float64), np.where(outgoing, amount, 0.0), novel.astype(np.float64)],
+            )
+            out[f"src_decayed_tx_count_out_{half_life}"] = np.where(has_wallet, count, 0.0)
+            out[f"src_decayed_amount_sum_out_{half_life}"] = np.where(has_wallet, amount_sum, 0.0)
+            out[f"src_decayed_new_destinations_{half_life}"] = np.where(has_wallet, new_destinations, 0.0)
+        empty_defaults = _get_empty_historical_features(windows, half_lives)
+
+    # Retour à l'ordre d'entrée
+    inverse = np.empty(n, dtype=np.int64)
+    inverse[order] = np.arange(n)
+    return {name: out[name][inverse] for name in empty_defaults}
+
+
+def compute_transaction_features_vectorized(transactions_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Features transactionnelles de extract_transaction_features(), pour tout un dataset.
+
+    Args:
+        transactions_df: Transactions
+
+    Returns:
+        DataFrame (même ordre de lignes, index 0..n-1)
+    """
+    df = transactions_df.reset_index(drop=True)
+    n = len(df)
+
+    def column(name: str, default=None) -> pd.Series:
+        return df[name] if name in df.columns else pd.Series([default] * n, dtype=object)
+
+    amount = df["amount"] if "amount" in df.columns else pd.Series(0, index=df.index)
+    amount_values = pd.to_numeric(amount, errors="coerce").to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        log_amount = np.where(amount_values > 0, np.log(1 + np.where(amount_values > 0, amount_values, 0.0)), 0.0)
+
+    direction = column("direction", "")
+    tx_type = column("transaction_type", "")
+    country = column("country", "")
+
+    created_at = pd.to_datetime(column("created_at"), utc=True, errors="coerce")
+    hour = created_at.dt.hour.fillna(0).astype(np.int64)
+    day = created_at.dt.dayofweek.fillna(0).astype(np.int64)
+
+    return pd.DataFrame(
+        {
+            "amount": amount.to_numpy(),
+            "log_amount": log_amount,
+            "currency_is_pyc": (column("currency") == "PYC").to_numpy(dtype=bool),
+            "direction_outgoing": (direction == "outgoing").astype(np.int64).to_numpy(),
+            "direction_incoming": (direction == "incoming").astype(np.int64).to_numpy(),
+            "transaction_type_p2p": (tx_type == "P2P").astype(np.int64).to_numpy(),
+            "transaction_type_merchant": (tx_type == "MERCHANT").astype(np.int64).to_numpy(),
+            "transaction_type_cashin": (tx_type == "CASHIN").astype(np.int64).to_numpy(),
+            "transaction_type_cashout": (tx_type == "CASHOUT").astype(np.int64).to_numpy(),
+            "hour_of_day": hour.to_numpy(),
+            "day_of_week": day.to_numpy(),
+            "country_fr": (country == "FR").astype(np.int64).to_numpy(),
+            "country_be": (country == "BE").astype(np.int64).to_numpy(),
+            "country_kp": (country == "KP").astype(np.int64).to_numpy(),
+        }
+    )
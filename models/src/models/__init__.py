@@ -1,11 +1,12 @@
 """
 Module de modèles ML.
 
-Ce module contient les modèles supervisé et non supervisé.
+Ce module contient les modèles supervisé, non supervisé et distillé.
 """
 
 from .base import BaseModel
+from .distilled import DistilledModel
 from .supervised import SupervisedModel
 from .unsupervised import UnsupervisedModel
 
-__all__ = ["BaseModel", "SupervisedModel", "UnsupervisedModel"]
+__all__ = ["BaseModel", "DistilledModel", "SupervisedModel", "UnsupervisedModel"]
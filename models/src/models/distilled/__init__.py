@@ -0,0 +1,11 @@
+"""
+Modèle distillé (LightGBM compact).
+
+Ce module contient le modèle qui reproduit le score de l'ensemble
+(supervisé + non supervisé) pour le mode de scoring rapide.
+"""
+
+from .predictor import DistilledPredictor
+from .train import DistilledModel, distill_ensemble, fidelity_report
+
+__all__ = ["DistilledModel", "DistilledPredictor", "distill_ensemble", "fidelity_report"]
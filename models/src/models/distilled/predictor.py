@@ -0,0 +1,105 @@
+"""
+Prédiction unitaire avec le modèle distillé (mode de scoring SCORING_MODE=distilled).
+
+Chemin court pour les canaux sensibles à la latence : une ligne numpy
+construite directement depuis le dictionnaire de features (pas de
+DataFrame), un seul petit booster évalué en mono-thread.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+from .train import DistilledModel
+
+DISTILLED_MODEL_FILE = "distilled_model.pkl"
+
+
+def _default_value(feature: str) -> float:
+    """Valeur d'une feature absente (mêmes conventions que les prédicteurs de l'ensemble)."""
+    if "is_" in feature and "new" in feature:
+        return 1.0  # nouveau compte par défaut
+    if "days_since" in feature:
+        return -1.0  # jamais
+    return 0.0
+
+
+class DistilledPredictor:
+    """Prédicteur du modèle distillé (partie ML du score global)."""
+
+    def __init__(
+        self,
+        model_path: Path | None = None,
+        model: DistilledModel | None = None,
+        model_version: str | None = None,
+    ):
+        """
+        Initialise le prédicteur.
+
+        Args:
+            model_path: Chemin vers le modèle sauvegardé
+            model: Instance de modèle (alternative à model_path)
+            model_version: Version du modèle (ex: "v1.0.0")
+
+        Raises:
+            ValueError: Si ni model_path ni model n'est fourni
+        """
+        if model is not None:
+            self.model = model
+        elif model_path is not None:
+            self.model = DistilledModel()
+            self.model.load(model_path)
+        else:
+            raise ValueError("Il faut fournir model_path ou model")
+        self.model_version = model_version or self.model.model_version
+        self.feature_names = list(self.model.feature_names)
+        self._defaults = np.array([_default_value(f) for f in self.feature_names], dtype=np.float64)
+        self._booster = self.model.model
+
+    @classmethod
+    def load_version(cls, version: str, artifacts_dir: Path | None = None) -> "DistilledPredictor":
+        """
+        Charge le modèle distillé d'une version.
+
+        Args:
+            version: Version du modèle (ex: "v1.0.0" ou "latest")
+            artifacts_dir: Dossier des artefacts (défaut: "artifacts")
+
+        Returns:
+            Instance de DistilledPredictor
+
+        Raises:
+            FileNotFoundError: Si la version n'a pas de modèle distillé
+        """
+        artifacts_dir = artifacts_dir or Path("artifacts")
+        version_dir = artifacts_dir / "latest" if version == "latest" else artifacts_dir / (
+            version if version.startswith("v") else f"v{version}"
+        )
+        model_path = version_dir / DISTILLED_MODEL_FILE
+        if not model_path.exists():
+            raise FileNotFoundError(f"Modèle distillé non trouvé: {model_path}")
+        return cls(model_path=model_path, model_version=version_dir.resolve().name)
+
+    def predict(self, features: Dict[str, Any]) -> float:
+        """
+        Prédit la partie ML du score global pour une transaction.
+
+        Args:
+            features: Features de la transaction (dictionnaire de FeaturePipeline)
+
+        Returns:
+            Score [0,1] (à combiner avec les règles par GlobalScorer.combine)
+        """
+        row = self._defaults.copy()
+        for i, name in enumerate(self.feature_names):
+            value = features.get(name)
+            if value is not None:
+                try:
+                    row[i] = float(value)
+                except (TypeError, ValueError):
+                    pass
+        score = self._booster.predict(row.reshape(1, -1), num_threads=1)[0]
+        return float(min(1.0, max(0.0, score)))
@@ -0,0 +1,271 @@
+"""
+Distillation de l'ensemble (LightGBM + IsolationForest + GlobalScorer) en un modèle compact.
+
+Le modèle "élève" est un petit gradient boosting (peu d'arbres, peu profonds)
+ajusté sur la partie ML du score global du "maître" :
+
+    model_score = w_sup × s_sup + w_unsup × s_unsup
+
+Les règles restent évaluées telles quelles au scoring (hard blocks, boost) :
+risk_score = clip((w_rule × rule_score + model_score) × boost_factor), comme
+GlobalScorer. Les lignes de la queue (scores élevés, là où se trouvent les
+seuils REVIEW/BLOCK) sont surpondérées.
+"""
+
+from __future__ import annotations
+
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from ...scoring.scorer import GlobalScorer
+from ..base import BaseModel
+from ..supervised.datasets import to_float32_matrix
+
+DECISIONS = ("APPROVE", "REVIEW", "BLOCK")
+
+
+def ensemble_model_scores(
+    features: pd.DataFrame,
+    supervised_model,
+    unsupervised_model,
+    scorer: GlobalScorer | None = None,
+) -> pd.Series:
+    """
+    Partie ML du score global de l'ensemble (rule_score = 0, boost_factor = 1).
+
+    Args:
+        features: Features (colonnes des deux modèles)
+        supervised_model: SupervisedModel entraîné
+        unsupervised_model: UnsupervisedModel entraîné
+        scorer: Poids du score global (défaut: GlobalScorer())
+
+    Returns:
+        Scores [0,1] (index de features)
+    """
+    weights = (scorer or GlobalScorer()).weights
+    unsupervised_columns = getattr(unsupervised_model.model, "feature_names_in_", features.columns)
+    supervised = np.asarray(supervised_model.predict(features), dtype=np.float64)
+    unsupervised = np.asarray(unsupervised_model.predict(features[list(unsupervised_columns)]), dtype=np.float64)
+    scores = weights["supervised"] * supervised + weights["unsupervised"] * unsupervised
+    return pd.Series(np.clip(scores, 0.0, 1.0), index=features.index)
+
+
+def decision_buckets(risk_scores: np.ndarray, thresholds: Dict[str, float]) -> np.ndarray:
+    """Décision par score (APPROVE / REVIEW / BLOCK), seuils de thresholds.json."""
+    risk_scores = np.asarray(risk_scores, dtype=np.float64)
+    buckets = np.full(len(risk_scores), "APPROVE", dtype=object)
+    buckets[risk_scores >= thresholds["review_threshold"]] = "REVIEW"
+    buckets[risk_scores >= thresholds["block_threshold"]] = "BLOCK"
+    return buckets
+
+
+def fidelity_report(
+    teacher_scores: np.ndarray,
+    student_scores: np.ndarray,
+    thresholds: Dict[str, float],
+) -> Dict[str, Any]:
+    """
+    Fidélité de l'élève au maître, globale et par décision du maître.
+
+    Les scores comparés sont des risk_score sans règle déclenchée (rule_score = 0).
+
+    Args:
+        teacher_scores: Scores de l'ensemble
+        student_scores: Scores du modèle distillé
+        thresholds: Seuils BLOCK / REVIEW (thresholds.json)
+
+    Returns:
+        Erreurs absolues, corrélation de rang, accord des décisions, matrice de confusion
+    """
+    teacher = np.asarray(teacher_scores, dtype=np.float64)
+    student = np.asarray(student_scores, dtype=np.float64)
+    errors = np.abs(student - teacher)
+    teacher_buckets = decision_buckets(teacher, thresholds)
+    student_buckets = decision_buckets(student, thresholds)
+    # Corrélation de Spearman : Pearson des rangs
+    ranks = pd.DataFrame({"teacher": teacher, "student": student}).rank()
+    rank_correlation = float(ranks["teacher"].corr(ranks["student"])) if len(teacher) > 1 else float("nan")
+
+    buckets = {}
+    for decision in DECISIONS:
+        mask = teacher_buckets == decision
+        buckets[decision] = {
+            "count": int(mask.sum()),
+            "agreement": float((student_buckets[mask] == decision).mean()) if mask.any() else None,
+            "mean_abs_error": float(errors[mask].mean()) if mask.any() else None,
+            "student_decisions": {d: int((student_buckets[mask] == d).sum()) for d in DECISIONS},
+        }
+    return {
+        "rows": int(len(teacher)),
+        "mean_abs_error": float(errors.mean()) if len(errors) else 0.0,
+        "p99_abs_error": float(np.quantile(errors, 0.99)) if len(errors) else 0.0,
+        "max_abs_error": float(errors.max()) if len(errors) else 0.0,
+        "rank_correlation": rank_correlation,
+        "decision_agreement": float((teacher_buckets == student_buckets).mean()) if len(teacher) else 1.0,
+        "buckets": buckets,
+    }
+
+
+def request_latency_us(predict_one: Callable[[int], Any], n_requests: int) -> float:
+    """Durée moyenne (µs) d'une prédiction unitaire, predict_one(i) pour i < n_requests."""
+    start = time.perf_counter()
+    for i in range(n_requests):
+        predict_one(i)
+    return (time.perf_counter() - start) / max(n_requests, 1) * 1e6
+
+
+class DistilledModel(BaseModel):
+    """Modèle compact (LightGBM, peu d'arbres peu profonds) reproduisant le score de l'ensemble."""
+
+    def __init__(self, model_version: str = "1.0.0", config: Dict[str, Any] | None = None):
+        """
+        Initialise le modèle distillé.
+
+        Args:
+            model_version: Version du modèle
+            config: Hyperparamètres (section distilled de model_config.yaml)
+        """
+        super().__init__(model_version)
+        default_config = {
+            "objective": "cross_entropy",  # cibles continues dans [0,1]
+            "num_leaves": 8,
+            "max_depth": 3,
+            "learning_rate": 0.1,
+            "min_child_samples": 50,
+            "n_estimators": 60,
+            "tail_quantile": 0.95,
+            "tail_weight": 10.0,
+            "verbose": -1,
+            "random_state": 42,
+        }
+        self.config = {**default_config, **(config or {})}
+        self.feature_names: List[str] = []
+
+    def _train_params(self) -> tuple[Dict[str, Any], int]:
+        """Paramètres lgb.train et nombre d'arbres."""
+        params = {
+            k: v for k, v in self.config.items() if k not in ("n_estimators", "tail_quantile", "tail_weight")
+        }
+        return params, int(self.config["n_estimators"])
+
+    def train(self, X: pd.DataFrame, y=None, **kwargs) -> None:
+        """
+        Ajuste le modèle sur les scores du maître.
+
+        Args:
+            X: Features
+            y: Scores de l'ensemble [0,1] (cibles)
+            **kwargs: Arguments additionnels (non utilisés)
+
+        Raises:
+            ValueError: Si y est absent
+        """
+        if y is None:
+            raise ValueError("Les scores de l'ensemble (y) sont requis pour la distillation")
+        targets = np.clip(np.asarray(y, dtype=np.float64), 0.0, 1.0)
+        # Surpondérer la queue : les décisions REVIEW/BLOCK se jouent dans les scores élevés
+        weights = np.ones(len(targets))
+        tail = targets >= np.quantile(targets, float(self.config["tail_quantile"]))
+        weights[tail] = float(self.config["tail_weight"])
+
+        params, num_boost_round = self._train_params()
+        self.feature_names = [str(c) for c in X.columns]
+        train_set = lgb.Dataset(
+            to_float32_matrix(X), label=targets, weight=weights, feature_name=self.feature_names, free_raw_data=True
+        )
+        self.model = lgb.train(params, train_set, num_boost_round=num_boost_round)
+        self.is_trained = True
+
+    def predict(self, X: pd.DataFrame) -> pd.Series:
+        """
+        Prédit la partie ML du score global.
+
+        Args:
+            X: Features
+
+        Returns:
+            Scores [0,1]
+        """
+        if not self.is_trained:
+            raise ValueError("Le modèle doit être entraîné avant la prédiction")
+        scores = self.model.predict(to_float32_matrix(X[self.feature_names]))
+        return pd.Series(np.clip(scores, 0.0, 1.0), index=X.index)
+
+    def save(self, path: Path) -> None:
+        """Sauvegarde le modèle."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(
+                {
+                    "model": self.model,
+                    "config": self.config,
+                    "feature_names": self.feature_names,
+                    "model_version": self.model_version,
+                },
+                f,
+            )
+
+    def load(self, path: Path) -> None:
+        """Charge le modèle."""
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+            self.model = data["model"]
+            self.config = data.get("config", {})
+            self.feature_names = data["feature_names"]
+            self.model_version = data.get("model_version", "1.0.0")
+        self.is_trained = True
+
+
+def distill_ensemble(
+    train_features: pd.DataFrame,
+    supervised_model,
+    unsupervised_model,
+    thresholds: Dict[str, float],
+    val_features: pd.DataFrame | None = None,
+    config: Dict[str, Any] | None = None,
+    scorer: GlobalScorer | None = None,
+) -> tuple[DistilledModel, Dict[str, Any]]:
+    """
+    Distille l'ensemble et mesure la fidélité (sur val_features, sinon sur le train).
+
+    Args:
+        train_features: Features d'ajustement (données historiques)
+        supervised_model: SupervisedModel du maître
+        unsupervised_model: UnsupervisedModel du maître
+        thresholds: Seuils BLOCK / REVIEW de l'ensemble
+        val_features: Features de contrôle de la fidélité (optionnel)
+        config: Hyperparamètres du modèle distillé
+        scorer: Poids du score global (défaut: GlobalScorer())
+
+    Returns:
+        (modèle distillé, rapport de fidélité)
+    """
+    features = list(train_features.columns)
+    start_time = time.time()
+    teacher_train = ensemble_model_scores(train_features, supervised_model, unsupervised_model, scorer)
+    teacher_val = None
+    if val_features is not None:
+        teacher_val = ensemble_model_scores(val_features[features], supervised_model, unsupervised_model, scorer)
+
+    model = DistilledModel(config=config)
+    model.train(train_features, teacher_train)
+    fit_seconds = time.time() - start_time
+
+    eval_features = val_features[features] if val_features is not None else train_features
+    teacher = teacher_val if teacher_val is not None else teacher_train
+    report = fidelity_report(teacher.to_numpy(), model.predict(eval_features).to_numpy(), thresholds)
+    report.update(
+        {
+            "evaluated_on": "validation" if val_features is not None else "train",
+            "fit_seconds": fit_seconds,
+            "trees": int(model.model.num_trees()),
+            "features": len(features),
+        }
+    )
+    return model, report
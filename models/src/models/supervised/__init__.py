@@ -5,6 +5,7 @@ Ce module contient le modèle supervisé pour la détection de fraude.
 """
 
 from .predictor import SupervisedPredictor
-from .train import SupervisedModel, train_supervised_model
+from .datasets import DatasetCache
+from .train import BoosterClassifier, SupervisedModel, train_supervised_model
 
-__all__ = ["SupervisedModel", "train_supervised_model", "SupervisedPredictor"]
+__all__ = ["SupervisedModel", "train_supervised_model", "SupervisedPredictor", "BoosterClassifier", "DatasetCache"]
@@ -0,0 +1,182 @@
+"""
+Datasets LightGBM : matrices float32 et cache binaire.
+
+La construction d'un lgb.Dataset (échantillonnage des valeurs, calcul des
+bins de l'histogramme) est refaite à chaque entraînement si l'on passe des
+DataFrames au wrapper scikit-learn. Ici :
+- les features sont converties une fois en matrice float32 (ordre colonne,
+  sans copie intermédiaire du DataFrame)
+- le Dataset est construit avec free_raw_data, puis sauvegardé au format
+  binaire LightGBM ; un run suivant sur les mêmes données le relit directement
+  (bins compris), validation incluse
+
+La clé d'une entrée couvre la matrice, les labels, les colonnes et les
+paramètres qui influencent la construction des bins.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import resource
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+# Paramètres LightGBM figés dans un Dataset construit
+DATASET_PARAMS = (
+    "max_bin",
+    "max_bin_by_feature",
+    "min_data_in_bin",
+    "bin_construct_sample_cnt",
+    "data_random_seed",
+    "use_missing",
+    "zero_as_missing",
+    "linear_tree",
+)
+
+
+def to_float32_matrix(df: pd.DataFrame) -> np.ndarray:
+    """
+    Convertit des features en matrice float32 (ordre colonne, NaN conservés).
+
+    Les colonnes non numériques sont converties avec pd.to_numeric (valeurs
+    invalides → NaN).
+
+    Args:
+        df: Features
+
+    Returns:
+        Matrice (n_lignes × n_features), float32, Fortran-contiguë
+    """
+    matrix = np.empty((len(df), df.shape[1]), dtype=np.float32, order="F")
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        if not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values)):
+            values = pd.to_numeric(values, errors="coerce")
+        matrix[:, i] = values.to_numpy(dtype=np.float32, na_value=np.nan)
+    return matrix
+
+
+def dataset_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Paramètres de construction d'un Dataset (sous-ensemble de params)."""
+    selected = {key: params[key] for key in DATASET_PARAMS if key in params}
+    # Pas de pré-filtrage dépendant de min_data_in_leaf : le binaire reste valable
+    # quand les hyperparamètres d'arbre changent
+    return {**selected, "feature_pre_filter": False, "verbose": -1}
+
+
+def peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus (Mo)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class DatasetCache:
+    """
+    Cache des Datasets LightGBM au format binaire.
+
+    Usage:
+        cache = DatasetCache("artifacts/feature_cache/lgb_datasets")
+        train_set, stats = cache.build(X, y, params)
+        val_set, _ = cache.build(X_val, y_val, params, reference=train_set)
+    """
+
+    def __init__(self, root: str | Path | None = None):
+        """
+        Initialise le cache.
+
+        Args:
+            root: Dossier des binaires (None = construction sans cache)
+        """
+        self.root = Path(root) if root is not None else None
+        self._keys: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def path(self, dataset: lgb.Dataset) -> Path | None:
+        """Binaire d'un Dataset construit (ou relu) par ce cache, None sans cache."""
+        key = self._keys.get(dataset)
+        return self.root / f"{key}.bin" if key is not None else None
+
+    def key(self, matrix: np.ndarray, labels: np.ndarray, columns: list, params: Dict[str, Any], role: str) -> str:
+        """Clé d'un Dataset : contenu de la matrice et des labels, colonnes, paramètres, rôle."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps({"columns": columns, "params": params, "role": role}, sort_keys=True, default=str).encode())
+        digest.update(str(matrix.shape).encode())
+        digest.update(np.asfortranarray(matrix).T.data)  # vue C-contiguë, sans copie
+        digest.update(np.ascontiguousarray(labels, dtype=np.float32).tobytes())
+        return digest.hexdigest()[:32]
+
+    def build(
+        self,
+        X: pd.DataFrame | np.ndarray,
+        y: pd.Series | np.ndarray,
+        params: Dict[str, Any],
+        reference: lgb.Dataset | None = None,
+        weight: np.ndarray | None = None,
+    ) -> Tuple[lgb.Dataset, Dict[str, float]]:
+        """
+        Construit (ou relit) un Dataset.
+
+        Args:
+            X: Features (DataFrame ou matrice)
+            y: Labels
+            params: Paramètres LightGBM (seuls ceux de construction sont utilisés)
+            reference: Dataset d'entraînement (bins partagés, pour la validation)
+            weight: Poids des lignes (optionnel)
+
+        Returns:
+            (Dataset construit, statistiques: secondes, cache_hit, pic RSS)
+        """
+        start_time = time.time()
+        columns = [str(c) for c in X.columns] if isinstance(X, pd.DataFrame) else [f"f{i}" for i in range(X.shape[1])]
+        matrix = to_float32_matrix(X) if isinstance(X, pd.DataFrame) else np.asarray(X, dtype=np.float32)
+        labels = np.asarray(y, dtype=np.float32)
+        construct_params = dataset_params(params)
+
+        path = None
+        if self.root is not None:
+            # Un Dataset de validation dépend des bins de sa référence
+            role = f"valid:{self._keys.get(reference)}" if reference is not None else "train"
+            if weight is not None:
+                labels_key = np.concatenate([labels, np.asarray(weight, dtype=np.float32)])
+            else:
+                labels_key = labels
+            key = self.key(matrix, labels_key, columns, construct_params, role)
+            path = self.root / f"{key}.bin"
+
+        if path is not None and path.exists():
+            dataset = lgb.Dataset(str(path), reference=reference, params=construct_params, free_raw_data=True)
+            dataset.construct()
+            cache_hit = True
+        else:
+            dataset = lgb.Dataset(
+                matrix,
+                label=labels,
+                weight=weight,
+                feature_name=columns,
+                reference=reference,
+                params=construct_params,
+                free_raw_data=True,
+            )
+            dataset.construct()
+            cache_hit = False
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+                dataset.save_binary(str(tmp_path))
+                os.replace(tmp_path, path)
+        del matrix
+        if path is not None:
+            self._keys[dataset] = key
+
+        stats = {
+            "seconds": time.time() - start_time,
+            "cache_hit": float(cache_hit),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        return dataset, stats
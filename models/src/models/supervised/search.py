@@ -0,0 +1,274 @@
+"""
+Recherche d'hyperparamètres LightGBM (grille, aléatoire, successive halving).
+
+- les Datasets train/validation sont construits une fois (binaires LightGBM,
+  cf. datasets.py) ; chaque worker les relit une fois, puis enchaîne les essais
+- un Pool de processus, chacun limité à threads_per_worker threads
+  (n_workers × threads_per_worker ≤ nombre de cores)
+- score d'un essai : PR-AUC de validation (métrique LightGBM
+  average_precision, avec early stopping)
+- successive halving : tous les candidats démarrent avec un petit budget
+  d'itérations ; à chaque palier, seul le meilleur 1/eta continue avec un
+  budget multiplié par eta
+- chaque essai est loggé dans MLflow en run imbriqué du run courant
+"""
+
+from __future__ import annotations
+
+import itertools
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+from .datasets import DATASET_PARAMS, DatasetCache
+from .train import SupervisedModel, compute_scale_pos_weight
+
+SEARCH_STRATEGIES = ("grid", "random", "halving")
+
+# Datasets relus par chaque worker (initialisés par _init_worker)
+_WORKER_DATA: Dict[str, Any] = {}
+
+
+@dataclass
+class Trial:
+    """Résultat d'un essai (un candidat évalué à un palier)."""
+
+    candidate: int
+    rung: int
+    params: Dict[str, Any]
+    num_boost_round: int
+    pr_auc: float
+    best_iteration: int
+    seconds: float
+
+
+def generate_candidates(
+    param_grid: Dict[str, List[Any]],
+    strategy: str = "grid",
+    n_candidates: int | None = None,
+    seed: int = 42,
+) -> List[Dict[str, Any]]:
+    """
+    Génère les configurations candidates.
+
+    Args:
+        param_grid: Valeurs possibles par hyperparamètre
+        strategy: "grid" (produit complet) ; "random" ou "halving" (tirage sans remise
+            de n_candidates configurations, grille complète si n_candidates est None)
+        n_candidates: Nombre de candidats tirés
+        seed: Graine du tirage
+
+    Returns:
+        Liste de configurations (dictionnaires)
+
+    Raises:
+        ValueError: Si la stratégie est inconnue ou si la grille contient des
+            paramètres de construction des Datasets (partagés par tous les essais)
+    """
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Stratégie de recherche inconnue: {strategy} (attendu: {', '.join(SEARCH_STRATEGIES)})")
+    frozen = sorted(set(param_grid) & set(DATASET_PARAMS))
+    if frozen:
+        raise ValueError(f"Paramètres de Dataset non recherchables (Datasets partagés): {', '.join(frozen)}")
+
+    names = sorted(param_grid)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+    if strategy == "grid" or n_candidates is None or n_candidates >= len(combinations):
+        return combinations
+    rng = np.random.default_rng(seed)
+    chosen = rng.choice(len(combinations), size=n_candidates, replace=False)
+    return [combinations[i] for i in sorted(chosen)]
+
+
+def _init_worker(train_path: str, val_path: str, threads: int) -> None:
+    """Relit les Datasets une fois par worker et limite ses threads."""
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    train_set = lgb.Dataset(train_path, params={"feature_pre_filter": False, "verbose": -1}, free_raw_data=True)
+    train_set.construct()
+    val_set = lgb.Dataset(val_path, reference=train_set, free_raw_data=True)
+    val_set.construct()
+    _WORKER_DATA.update({"train": train_set, "val": val_set, "threads": threads})
+
+
+def _run_trial(task: Tuple[int, int, Dict[str, Any], int, int]) -> Trial:
+    """
+    Entraîne un candidat et retourne sa PR-AUC de validation (exécuté dans un worker).
+
+    Args:
+        task: (candidat, palier, paramètres lgb.train, budget d'itérations, patience d'early stopping)
+    """
+    candidate, rung, params, num_boost_round, stopping_rounds = task
+    start_time = time.time()
+    params = {
+        **params,
+        "metric": "average_precision",
+        "num_threads": _WORKER_DATA["threads"],
+        "verbose": -1,
+    }
+    booster = lgb.train(
+        params,
+        _WORKER_DATA["train"],
+        num_boost_round=num_boost_round,
+        valid_sets=[_WORKER_DATA["val"]],
+        valid_names=["valid_0"],
+        callbacks=[lgb.early_stopping(stopping_rounds=stopping_rounds, verbose=False)],
+    )
+    return Trial(
+        candidate=candidate,
+        rung=rung,
+        params={k: v for k, v in params.items() if k not in ("metric", "num_threads", "verbose")},
+        num_boost_round=num_boost_round,
+        pr_auc=float(booster.best_score["valid_0"]["average_precision"]),
+        best_iteration=int(booster.best_iteration or num_boost_round),
+        seconds=time.time() - start_time,
+    )
+
+
+def _log_trial(mlflow, trial: Trial, candidate_params: Dict[str, Any]) -> None:
+    """Logge un essai en run MLflow imbriqué."""
+    with mlflow.start_run(run_name=f"trial-{trial.candidate:03d}-rung-{trial.rung}", nested=True):
+        mlflow.log_params({**candidate_params, "candidate": trial.candidate, "rung": trial.rung})
+        mlflow.log_metrics(
+            {
+                "val_pr_auc": trial.pr_auc,
+                "num_boost_round": float(trial.num_boost_round),
+                "best_iteration": float(trial.best_iteration),
+                "trial_seconds": trial.seconds,
+            }
+        )
+
+
+def run_search(
+    train_data: pd.DataFrame,
+    train_labels: pd.Series,
+    val_data: pd.DataFrame,
+    val_labels: pd.Series,
+    search_config: Dict[str, Any],
+    base_config: Dict[str, Any] | None = None,
+    n_workers: int | None = None,
+    threads_per_worker: int | None = None,
+    dataset_cache_dir: str | Path | None = None,
+    mlflow=None,
+    sample_weight: np.ndarray | None = None,
+    negative_sampling_rate: float | None = None,
+) -> Tuple[Dict[str, Any], List[Trial]]:
+    """
+    Recherche la meilleure configuration LightGBM (PR-AUC de validation).
+
+    Args:
+        train_data: Features d'entraînement
+        train_labels: Labels d'entraînement
+        val_data: Features de validation
+        val_labels: Labels de validation
+        search_config: Section supervised.search de model_config.yaml :
+            strategy, param_grid, n_candidates, seed, min_rounds, max_rounds,
+            eta, early_stopping_rounds
+        base_config: Configuration de départ du modèle (surchargée par chaque candidat)
+        n_workers: Nombre de processus (défaut: cores / threads_per_worker)
+        threads_per_worker: Threads LightGBM par processus (défaut: 1)
+        dataset_cache_dir: Cache des Datasets binaires (None = dossier temporaire)
+        mlflow: Module mlflow avec un run actif (None = pas de logging)
+        sample_weight: Poids des lignes d'entraînement (sous-échantillonnage corrigé par poids)
+        negative_sampling_rate: Taux de conservation des légitimes (correction "prior" si
+            sample_weight est None) ; les essais optimisent le même objectif que
+            l'entraînement final (train_supervised_model)
+
+    Returns:
+        (meilleure configuration pour train_supervised_model, essais)
+    """
+    strategy = search_config.get("strategy", "halving")
+    candidates = generate_candidates(
+        search_config.get("param_grid") or {},
+        strategy=strategy,
+        n_candidates=search_config.get("n_candidates"),
+        seed=search_config.get("seed", 42),
+    )
+    max_rounds = int(search_config.get("max_rounds", 1000))
+    min_rounds = int(search_config.get("min_rounds", 50)) if strategy == "halving" else max_rounds
+    eta = int(search_config.get("eta", 3))
+    stopping_rounds = int(search_config.get("early_stopping_rounds", 50))
+    threads_per_worker = threads_per_worker or 1
+    n_workers = n_workers or max(1, mp.cpu_count() // threads_per_worker)
+    n_workers = max(1, min(n_workers, len(candidates)))
+
+    # Paramètres lgb.train de chaque candidat (mêmes conversions que l'entraînement final)
+    scale_pos_weight = compute_scale_pos_weight(train_labels, sample_weight, negative_sampling_rate)
+    base_config = base_config or {}
+    train_params = [
+        SupervisedModel(config={**base_config, **candidate})._train_params(scale_pos_weight)[0]
+        for candidate in candidates
+    ]
+
+    # Datasets construits une fois, relus par chaque worker
+    tmp_dir = None
+    if dataset_cache_dir is None:
+        tmp_dir = Path(tempfile.mkdtemp(prefix="lgb_search_"))
+    cache = DatasetCache(dataset_cache_dir or tmp_dir)
+    train_set, _ = cache.build(train_data, train_labels, train_params[0], weight=sample_weight)
+    val_set, _ = cache.build(val_data, val_labels, train_params[0], reference=train_set)
+    initargs = (str(cache.path(train_set)), str(cache.path(val_set)), threads_per_worker)
+    del train_set, val_set
+
+    print(
+        f"   🔎 Recherche {strategy}: {len(candidates)} candidats, "
+        f"{n_workers} processus × {threads_per_worker} thread(s)"
+    )
+    trials: List[Trial] = []
+    survivors = list(range(len(candidates)))
+    rounds = min(min_rounds, max_rounds) if len(candidates) > 1 else max_rounds
+    rung = 0
+    pool = mp.Pool(processes=n_workers, initializer=_init_worker, initargs=initargs) if n_workers > 1 else None
+    try:
+        if pool is None:
+            _init_worker(*initargs)
+        while True:
+            tasks = [(c, rung, train_params[c], rounds, stopping_rounds) for c in survivors]
+            results = pool.imap_unordered(_run_trial, tasks) if pool is not None else map(_run_trial, tasks)
+            rung_trials = []
+            for trial in results:
+                rung_trials.append(trial)
+                if mlflow is not None:
+                    _log_trial(mlflow, trial, candidates[trial.candidate])
+            rung_trials.sort(key=lambda t: (-t.pr_auc, t.candidate))
+            trials.extend(rung_trials)
+            best = rung_trials[0]
+            print(
+                f"      palier {rung}: {len(survivors)} candidats × {rounds} itérations, "
+                f"meilleure PR-AUC {best.pr_auc:.4f} (candidat {best.candidate})"
+            )
+            if rounds >= max_rounds:
+                break
+            # Élagage : seul le meilleur 1/eta continue, avec un budget eta fois plus grand
+            # (budget complet pour le dernier candidat)
+            survivors = [t.candidate for t in rung_trials[: max(1, len(survivors) // eta)]]
+            rounds = max_rounds if len(survivors) == 1 else min(rounds * eta, max_rounds)
+            rung += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        _WORKER_DATA.clear()
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    best_config = {**base_config, **candidates[best.candidate], "n_estimators": best.num_boost_round}
+    print(f"   🏆 Meilleure configuration (PR-AUC {best.pr_auc:.4f}): {candidates[best.candidate]}")
+    if mlflow is not None:
+        mlflow.log_params({f"search_best_{k}": v for k, v in candidates[best.candidate].items()})
+        mlflow.log_metrics({"search_best_pr_auc": best.pr_auc, "search_trials": float(len(trials))})
+    return best_config, trials
+
+
+def trials_frame(trials: List[Trial]) -> pd.DataFrame:
+    """Essais sous forme de DataFrame (une ligne par essai, paramètres à plat)."""
+    rows = [{**{k: v for k, v in asdict(t).items() if k != "params"}, **t.params} for t in trials]
+    return pd.DataFrame(rows)
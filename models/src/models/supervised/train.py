@@ -13,7 +13,73 @@ import numpy as np
 import pandas as pd
 from sklearn.metrics import average_precision_score
 
+from ...data.sampling import prior_correction
 from ..base import BaseModel
+from .datasets import DatasetCache, to_float32_matrix
+
+# Paramètres propres au wrapper scikit-learn (sans équivalent dans lgb.train)
+_SKLEARN_ONLY_PARAMS = ("n_estimators", "class_weight", "importance_type")
+
+
+def compute_scale_pos_weight(
+    labels: pd.Series | np.ndarray,
+    sample_weight: np.ndarray | None = None,
+    negative_sampling_rate: float | None = None,
+) -> float:
+    """
+    scale_pos_weight de l'objectif d'entraînement (partagé par train() et la recherche).
+
+    Args:
+        labels: Labels (0/1 pour fraude)
+        sample_weight: Poids des lignes (correction "weight" : effectifs pondérés)
+        negative_sampling_rate: Taux de conservation des légitimes ; sans poids,
+            correction "prior" appliquée aux prédictions, donc pas de scale_pos_weight
+
+    Returns:
+        legit / fraud (effectifs pondérés), 1.0 sans fraude ou en correction "prior"
+    """
+    if negative_sampling_rate is not None and sample_weight is None:
+        return 1.0
+    weights = np.ones(len(labels)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+    fraud_count = float(weights[np.asarray(labels) == 1].sum())
+    legit_count = float(weights.sum()) - fraud_count
+    return legit_count / fraud_count if fraud_count > 0 else 1.0
+
+
+class BoosterClassifier:
+    """
+    Booster LightGBM exposé comme un classifieur binaire (predict_proba, feature_name_).
+
+    Remplace LGBMClassifier après un entraînement par lgb.train (Datasets
+    construits une fois, réutilisables) ; même interface pour la prédiction.
+    """
+
+    def __init__(self, booster: lgb.Booster, negative_sampling_rate: float | None = None):
+        """
+        Args:
+            booster: Booster entraîné (objectif binaire)
+            negative_sampling_rate: Taux de conservation des légitimes d'un entraînement
+                sous-échantillonné sans poids (probabilités corrigées, cf. prior_correction)
+        """
+        self.booster_ = booster
+        self.negative_sampling_rate = negative_sampling_rate
+        self.feature_name_ = booster.feature_name()
+        self.best_iteration_ = booster.best_iteration
+        self.classes_ = np.array([0, 1])
+
+    def predict_proba(self, X: pd.DataFrame | np.ndarray) -> np.ndarray:
+        """Probabilités [classe 0, classe 1] (meilleure itération si early stopping)."""
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_name_] if set(self.feature_name_) <= set(X.columns) else X
+        proba = self.booster_.predict(X)
+        rate = getattr(self, "negative_sampling_rate", None)
+        if rate is not None:
+            proba = prior_correction(proba, rate)
+        return np.column_stack([1.0 - proba, proba])
+
+    def predict(self, X: pd.DataFrame | np.ndarray) -> np.ndarray:
+        """Classe prédite (seuil 0.5)."""
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
 
 
 class SupervisedModel(BaseModel):
@@ -48,56 +114,190 @@ class SupervisedModel(BaseModel):
         
         # Initialiser le modèle
         self.model = lgb.LGBMClassifier(**self.config)
+        self.dataset_stats: Dict[str, float] = {}
+
+    def _train_params(self, scale_pos_weight: float) -> tuple[Dict[str, Any], int]:
+        """Paramètres lgb.train (noms scikit-learn acceptés comme alias) et nombre d'itérations."""
+        params = {k: v for k, v in self.config.items() if k not in _SKLEARN_ONLY_PARAMS}
+        params["scale_pos_weight"] = scale_pos_weight
+        return params, int(self.config.get("n_estimators", 100))
 
     def train(self, X: pd.DataFrame, y: pd.Series, **kwargs) -> None:
         """
         Entraîne le modèle LightGBM.
 
+        Les Datasets (train et validation) sont construits une fois depuis des
+        matrices float32, ou relus depuis le cache binaire si dataset_cache_dir
+        est fourni. Durées de construction et pic mémoire : self.dataset_stats.
+
         Args:
             X: Features d'entraînement
             y: Labels (0/1 pour fraude)
-            **kwargs: Arguments additionnels (ex: val_data, val_labels)
+            **kwargs: Arguments additionnels (ex: val_data, val_labels, dataset_cache_dir,
+                sample_weight, negative_sampling_rate)
+
+        Entraînement sous-échantillonné (cf. src/data/sampling.py) :
+        - avec sample_weight, les poids restaurent la distribution d'origine
+          (scale_pos_weight calculé sur les effectifs pondérés)
+        - avec negative_sampling_rate seul, pas de scale_pos_weight : les
+          probabilités prédites sont ramenées à la prévalence d'origine
         """
-        # Calculer scale_pos_weight pour gérer le déséquilibre
-        fraud_count = y.sum()
-        legit_count = len(y) - fraud_count
-        
-        if fraud_count > 0:
-            scale_pos_weight = legit_count / fraud_count
-        else:
-            scale_pos_weight = 1.0
-        
-        # Mettre à jour la config avec scale_pos_weight
-        self.model.set_params(scale_pos_weight=scale_pos_weight)
-        
+        sample_weight = kwargs.get("sample_weight")
+        negative_sampling_rate = kwargs.get("negative_sampling_rate")
+        # scale_pos_weight pour gérer le déséquilibre
+        scale_pos_weight = compute_scale_pos_weight(y, sample_weight, negative_sampling_rate)
+        params, num_boost_round = self._train_params(scale_pos_weight)
+        prior_rate = negative_sampling_rate if sample_weight is None else None
+
         # Préparer les données de validation si fournies
         val_data = kwargs.get("val_data")
         val_labels = kwargs.get("val_labels")
-        
+        cache = DatasetCache(kwargs.get("dataset_cache_dir"))
+
+        train_set, train_stats = cache.build(X, y, params, weight=sample_weight)
+        self.dataset_stats = {
+            "train_dataset_seconds": train_stats["seconds"],
+            "train_dataset_cache_hit": train_stats["cache_hit"],
+            "dataset_peak_rss_mb": train_stats["peak_rss_mb"],
+        }
+        print(
+            f"   🧱 Dataset train: {train_stats['seconds']:.1f}s"
+            f"{' (cache binaire)' if train_stats['cache_hit'] else ''}"
+        )
+
         if val_data is not None and val_labels is not None:
-            # Early stopping avec validation set
+            # Early stopping avec validation set (bins du train)
+            val_set, val_stats = cache.build(val_data, val_labels, params, reference=train_set)
+            self.dataset_stats.update(
+                {
+                    "val_dataset_seconds": val_stats["seconds"],
+                    "val_dataset_cache_hit": val_stats["cache_hit"],
+                    "dataset_peak_rss_mb": val_stats["peak_rss_mb"],
+                }
+            )
             callbacks = [
                 lgb.early_stopping(stopping_rounds=50, verbose=False),
                 lgb.log_evaluation(period=100, show_stdv=False),
             ]
-            
-            self.model.fit(
-                X,
-                y,
-                eval_set=[(val_data, val_labels)],
+            booster = lgb.train(
+                params,
+                train_set,
+                num_boost_round=num_boost_round,
+                valid_sets=[val_set],
+                valid_names=["valid_0"],
                 callbacks=callbacks,
             )
-            
+            self.model = BoosterClassifier(booster, negative_sampling_rate=prior_rate)
+
             # Calculer PR-AUC sur le validation set
             val_pred = self.model.predict_proba(val_data)[:, 1]
             pr_auc = average_precision_score(val_labels, val_pred)
             print(f"   📊 PR-AUC (validation): {pr_auc:.4f}")
         else:
             # Entraînement sans validation set
-            self.model.fit(X, y)
-        
+            booster = lgb.train(params, train_set, num_boost_round=num_boost_round)
+            self.model = BoosterClassifier(booster, negative_sampling_rate=prior_rate)
+
         self.is_trained = True
 
+    def refresh(
+        self,
+        X: pd.DataFrame,
+        y: pd.Series,
+        num_boost_round: int = 100,
+        learning_rate: float | None = None,
+        val_data: pd.DataFrame | None = None,
+        val_labels: pd.Series | None = None,
+        early_stopping_rounds: int = 20,
+        sample_weight: np.ndarray | None = None,
+    ) -> Dict[str, float]:
+        """
+        Poursuit l'entraînement du booster existant sur de nouveaux labels (init_model).
+
+        Les arbres existants sont conservés ; au plus num_boost_round arbres sont
+        ajoutés. Les paramètres du booster (dont scale_pos_weight) sont repris :
+        les labels de revue ne reflètent pas la prévalence réelle. Les Datasets
+        ne sont pas pré-construits : LightGBM calcule le score initial de chaque
+        ligne avec le booster existant.
+
+        Args:
+            X: Features des transactions labellisées
+            y: Labels (0/1 pour fraude)
+            num_boost_round: Nombre maximal d'arbres ajoutés
+            learning_rate: Taux d'apprentissage des nouveaux arbres (défaut: celui du modèle)
+            val_data: Features de contrôle (early stopping et comparaison)
+            val_labels: Labels de contrôle
+            early_stopping_rounds: Patience de l'early stopping
+            sample_weight: Poids des lignes (optionnel)
+
+        Returns:
+            Métriques : arbres avant/après, PR-AUC de contrôle avant/après (si val_data)
+
+        Un LGBMClassifier entraîné (artefacts antérieurs à lgb.train) est converti
+        en BoosterClassifier : même booster, mêmes prédictions.
+
+        Raises:
+            ValueError: Si le modèle n'est pas un modèle LightGBM entraîné
+        """
+        if (
+            self.is_trained
+            and isinstance(self.model, lgb.LGBMClassifier)
+            and self.model.__sklearn_is_fitted__()
+        ):
+            self.model = BoosterClassifier(self.model.booster_)
+        if not self.is_trained or not isinstance(self.model, BoosterClassifier):
+            raise ValueError("Le rafraîchissement nécessite un modèle LightGBM entraîné (BoosterClassifier)")
+        base = self.model
+        features = base.feature_name_
+        params = {k: v for k, v in base.booster_.params.items() if k not in ("num_iterations", "metric")}
+        if learning_rate is not None:
+            params["learning_rate"] = learning_rate
+        params.update({"metric": "average_precision", "feature_pre_filter": False, "verbose": -1})
+
+        train_set = lgb.Dataset(
+            to_float32_matrix(X[features]),
+            label=np.asarray(y, dtype=np.float32),
+            weight=sample_weight,
+            feature_name=features,
+            free_raw_data=True,
+        )
+        metrics = {"trees_before": float(base.booster_.current_iteration())}
+        valid_sets, callbacks = [], []
+        if val_data is not None and val_labels is not None:
+            valid_sets = [
+                lgb.Dataset(
+                    to_float32_matrix(val_data[features]),
+                    label=np.asarray(val_labels, dtype=np.float32),
+                    reference=train_set,
+                    free_raw_data=True,
+                )
+            ]
+            callbacks = [lgb.early_stopping(stopping_rounds=early_stopping_rounds, verbose=False)]
+            metrics["val_pr_auc_before"] = float(
+                average_precision_score(val_labels, base.predict_proba(val_data)[:, 1])
+            )
+
+        booster = lgb.train(
+            params,
+            train_set,
+            num_boost_round=num_boost_round,
+            init_model=base.booster_,
+            valid_sets=valid_sets,
+            valid_names=["valid_0"] if valid_sets else None,
+            callbacks=callbacks,
+        )
+        self.model = BoosterClassifier(booster, negative_sampling_rate=getattr(base, "negative_sampling_rate", None))
+        metrics["trees_after"] = float(booster.best_iteration or booster.current_iteration())
+        if valid_sets:
+            metrics["val_pr_auc_after"] = float(
+                average_precision_score(val_labels, self.model.predict_proba(val_data)[:, 1])
+            )
+            print(
+                f"   📊 PR-AUC (contrôle): {metrics['val_pr_auc_before']:.4f} → {metrics['val_pr_auc_after']:.4f}"
+            )
+        print(f"   🌲 Arbres: {metrics['trees_before']:.0f} → {metrics['trees_after']:.0f}")
+        return metrics
+
     def predict(self, X: pd.DataFrame) -> pd.Series:
         """
         Prédit la probabilité de fraude.
@@ -146,6 +346,9 @@ def train_supervised_model(
     val_data: pd.DataFrame | None = None,
     val_labels: pd.Series | None = None,
     config: Dict[str, Any] | None = None,
+    dataset_cache_dir: Path | None = None,
+    sample_weight: np.ndarray | None = None,
+    negative_sampling_rate: float | None = None,
 ) -> SupervisedModel:
     """
     Entraîne un modèle supervisé.
@@ -156,10 +359,22 @@ def train_supervised_model(
         val_data: Features de validation (optionnel)
         val_labels: Labels de validation (optionnel)
         config: Configuration des hyperparamètres
+        dataset_cache_dir: Cache des Datasets LightGBM binaires (None = pas de cache)
+        sample_weight: Poids des lignes d'entraînement (sous-échantillonnage corrigé par poids)
+        negative_sampling_rate: Taux de conservation des légitimes (correction "prior" si
+            sample_weight est None)
 
     Returns:
         Modèle entraîné
     """
     model = SupervisedModel(config=config)
-    model.train(train_data, train_labels, val_data=val_data, val_labels=val_labels)
+    model.train(
+        train_data,
+        train_labels,
+        val_data=val_data,
+        val_labels=val_labels,
+        dataset_cache_dir=dataset_cache_dir,
+        sample_weight=sample_weight,
+        negative_sampling_rate=negative_sampling_rate,
+    )
     return model
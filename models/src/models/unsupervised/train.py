@@ -51,6 +51,35 @@ class UnsupervisedModel(BaseModel):
 
         self.is_trained = True
 
+    def recalibrate(self, X: pd.DataFrame) -> Dict[str, float]:
+        """
+        Recalcule la calibration [0,1] sur une fenêtre récente, sans réentraîner la forêt.
+
+        Args:
+            X: Features de la fenêtre (transactions légitimes de préférence)
+
+        Returns:
+            Bornes de calibration avant/après (min_before, max_before, min, max)
+
+        Raises:
+            ValueError: Si le modèle n'est pas entraîné ou si X est vide
+        """
+        if not self.is_trained:
+            raise ValueError("Le modèle doit être entraîné avant la recalibration")
+        if len(X) == 0:
+            raise ValueError("Fenêtre de recalibration vide")
+
+        previous = dict(self.quantile_mapper or {})
+        scores = self.model.score_samples(X)
+        self.quantile_mapper = {
+            "min": float(np.min(scores)),
+            "max": float(np.max(scores)),
+        }
+        return {
+            **{f"{k}_before": float(v) for k, v in previous.items()},
+            **self.quantile_mapper,
+        }
+
     def predict(self, X: pd.DataFrame) -> pd.Series:
         """
         Prédit le score d'anomalie calibré [0,1].
@@ -1,9 +1,24 @@
 """
 Monitoring des prédictions pour Vertex AI Model Monitoring.
 
-Logging des inferences vers GCS (JSONL) pour alimenter Vertex.
+Logging des inferences vers GCS (JSONL) pour alimenter Vertex, et monitoring
+de drift en ligne (histogrammes glissants, endpoint /drift) et hors ligne
+(rapport en streaming sur les logs, scripts/drift_report.py).
 """
 
+from .drift import DriftMonitor, build_reference_histograms, load_drift_reference
 from .gcs_logger import log_inference_to_gcs
+from .log_readers import GCSLogReader, LocalLogReader, open_log_reader
+from .summary import LogSummary, QuantileSketch
 
-__all__ = ["log_inference_to_gcs"]
+__all__ = [
+    "DriftMonitor",
+    "build_reference_histograms",
+    "load_drift_reference",
+    "log_inference_to_gcs",
+    "GCSLogReader",
+    "LocalLogReader",
+    "open_log_reader",
+    "LogSummary",
+    "QuantileSketch",
+]
@@ -0,0 +1,320 @@
+"""
+Monitoring de drift en ligne (dans le ML Engine).
+
+Maintient en mémoire, pour chaque feature et chaque score, des histogrammes à
+buckets fixes sur une fenêtre glissante (anneau de slots temporels), puis
+calcule PSI et KS contre les histogrammes de référence écrits à l'entraînement
+(drift_reference.json, voir scripts/train.py).
+
+Coût par requête : un calcul d'indices de buckets vectorisé et un incrément de
+tableau numpy. Mémoire constante (n_slots × n_features × n_buckets).
+Pas de verrou : sous forte concurrence, quelques incréments peuvent être perdus
+au moment où un slot est recyclé, ce qui est acceptable pour du monitoring.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Scores suivis en plus des features (clés de ScoringResult)
+SCORE_NAMES = ["risk_score", "supervised_score", "unsupervised_score"]
+
+# Lissage des proportions nulles pour le PSI
+_PSI_EPSILON = 1e-4
+
+
+def _parse_window(window: str) -> timedelta:
+    """Parse une fenêtre temporelle (ex: "15m", "1h", "24h", "7d")."""
+    if window.endswith("m"):
+        return timedelta(minutes=int(window[:-1]))
+    elif window.endswith("h"):
+        return timedelta(hours=int(window[:-1]))
+    elif window.endswith("d"):
+        return timedelta(days=int(window[:-1]))
+    else:
+        raise ValueError(f"Fenêtre invalide: {window}")
+
+
+def _to_float(value: Any) -> float:
+    """Convertit une valeur de feature en float (NaN si non numérique / absente)."""
+    if value is None or isinstance(value, (list, tuple, dict, str)):
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def compute_bucket_edges(values: np.ndarray, n_bins: int = 10) -> List[float]:
+    """
+    Calcule des bornes de buckets par quantiles (dédupliquées).
+
+    Args:
+        values: Valeurs de référence (NaN ignorés)
+        n_bins: Nombre de buckets visé
+
+    Returns:
+        Bornes croissantes (len <= n_bins - 1)
+    """
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return []
+    quantiles = np.quantile(finite, np.linspace(0.0, 1.0, n_bins + 1)[1:-1])
+    edges = np.unique(quantiles)
+    # Variable binaire/constante : au moins une borne au-dessus du minimum
+    if edges.size == 0 or (edges.size == 1 and edges[0] == finite.min()):
+        edges = np.unique(np.append(edges, np.nextafter(finite.min(), np.inf)))
+    return [float(e) for e in edges]
+
+
+def histogram_counts(values: np.ndarray, edges: List[float]) -> Dict[str, Any]:
+    """
+    Compte les valeurs par bucket (bucket i = edges[i-1] <= v < edges[i]).
+
+    Args:
+        values: Valeurs
+        edges: Bornes des buckets
+
+    Returns:
+        {"counts": [...] (len(edges) + 1), "missing": nb de valeurs NaN}
+    """
+    finite_mask = np.isfinite(values)
+    idx = np.searchsorted(np.asarray(edges, dtype=np.float64), values[finite_mask], side="right")
+    counts = np.bincount(idx, minlength=len(edges) + 1)
+    return {"counts": [int(c) for c in counts], "missing": int((~finite_mask).sum())}
+
+
+def build_reference_histograms(
+    frame: pd.DataFrame | Dict[str, pd.Series],
+    n_bins: int = 10,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Construit les histogrammes de référence pour chaque colonne numérique.
+
+    Args:
+        frame: Features (ou scores) d'entraînement ; un dictionnaire de séries
+            pour des scores de longueurs différentes (pas de NaN de padding)
+        n_bins: Nombre de buckets par colonne
+
+    Returns:
+        {colonne: {"edges": [...], "counts": [...], "missing": int}}
+    """
+    reference = {}
+    for column, series in frame.items():
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64)
+        edges = compute_bucket_edges(values, n_bins=n_bins)
+        reference[column] = {"edges": edges, **histogram_counts(values, edges)}
+    return reference
+
+
+def load_drift_reference(version: str, artifacts_dir: Path | None = None) -> Dict[str, Any]:
+    """
+    Charge drift_reference.json d'une version de modèle.
+
+    Args:
+        version: Version du modèle (ex: "v1.0.0" ou "latest")
+        artifacts_dir: Dossier des artefacts (défaut: "artifacts")
+
+    Returns:
+        Référence ({"version", "features", "scores"})
+    """
+    if artifacts_dir is None:
+        artifacts_dir = Path("artifacts")
+
+    # Résoudre "latest" vers la vraie version
+    if version == "latest":
+        latest_path = artifacts_dir / "latest"
+        if latest_path.exists() and latest_path.is_symlink():
+            version = latest_path.readlink().name
+        else:
+            version_dirs = [d for d in artifacts_dir.iterdir() if d.is_dir() and d.name.startswith("v")]
+            if not version_dirs:
+                raise FileNotFoundError(f"Aucune version trouvée dans {artifacts_dir}")
+            version = sorted(version_dirs, key=lambda x: x.name)[-1].name
+
+    if not version.startswith("v"):
+        version = f"v{version}"
+
+    reference_path = artifacts_dir / version / "drift_reference.json"
+    if not reference_path.exists():
+        raise FileNotFoundError(f"Référence de drift non trouvée: {reference_path}")
+    with open(reference_path, "r") as f:
+        return json.load(f)
+
+
+def population_stability_index(reference: np.ndarray, current: np.ndarray) -> float:
+    """PSI entre deux histogrammes (comptes sur les mêmes buckets)."""
+    ref_total = reference.sum()
+    cur_total = current.sum()
+    if ref_total == 0 or cur_total == 0:
+        return 0.0
+    ref_p = np.clip(reference / ref_total, _PSI_EPSILON, None)
+    cur_p = np.clip(current / cur_total, _PSI_EPSILON, None)
+    return float(np.sum((cur_p - ref_p) * np.log(cur_p / ref_p)))
+
+
+def ks_statistic(reference: np.ndarray, current: np.ndarray) -> float:
+    """Statistique KS (écart max entre CDF) calculée sur les buckets."""
+    ref_total = reference.sum()
+    cur_total = current.sum()
+    if ref_total == 0 or cur_total == 0:
+        return 0.0
+    return float(np.max(np.abs(np.cumsum(reference) / ref_total - np.cumsum(current) / cur_total)))
+
+
+class DriftMonitor:
+    """
+    Histogrammes glissants par feature/score et comparaison à la référence.
+
+    Les comptes sont stockés dans un anneau de `n_slots` slots de
+    `slot_seconds` secondes : counts[slot, feature, bucket]. Le dernier bucket
+    de chaque feature compte les valeurs manquantes (None, NaN, ±inf). Un
+    score à None (modèle non évalué) n'est pas observé : son "count" peut être
+    inférieur au nombre de requêtes.
+    """
+
+    def __init__(
+        self,
+        reference: Dict[str, Any],
+        slot_seconds: int = 60,
+        retention: str = "24h",
+    ):
+        """
+        Initialise le moniteur.
+
+        Args:
+            reference: Contenu de drift_reference.json ({"features": {...}, "scores": {...}})
+            slot_seconds: Durée d'un slot (résolution temporelle des fenêtres)
+            retention: Fenêtre maximale interrogeable (ex: "24h")
+        """
+        self.reference_version = reference.get("version")
+        histograms = {**reference.get("features", {}), **reference.get("scores", {})}
+        self.names: List[str] = list(histograms.keys())
+        self.score_names = [name for name in reference.get("scores", {})]
+        self.slot_seconds = int(slot_seconds)
+        self.n_slots = max(1, int(_parse_window(retention).total_seconds() // self.slot_seconds))
+
+        n_edges = max((len(h["edges"]) for h in histograms.values()), default=0)
+        # Bornes complétées par +inf : le nombre de bornes <= valeur donne l'indice du bucket
+        self._edges = np.full((len(self.names), max(n_edges, 1)), np.inf)
+        self._n_buckets = np.zeros(len(self.names), dtype=np.int64)
+        self._reference = []
+        for i, name in enumerate(self.names):
+            edges = histograms[name]["edges"]
+            self._edges[i, : len(edges)] = edges
+            self._n_buckets[i] = len(edges) + 1
+            self._reference.append(
+                np.array(histograms[name]["counts"] + [histograms[name].get("missing", 0)], dtype=np.float64)
+            )
+        self._missing_bucket = self._edges.shape[1] + 1
+        self._feature_index = np.arange(len(self.names))
+        self._is_score = np.array([name in self.score_names for name in self.names], dtype=bool)
+
+        self._counts = np.zeros((self.n_slots, len(self.names), self._missing_bucket + 1), dtype=np.int32)
+        self._slot_ids = np.full(self.n_slots, -1, dtype=np.int64)
+
+    @classmethod
+    def from_file(cls, path: Path, **kwargs) -> "DriftMonitor":
+        """Charge un moniteur depuis un fichier drift_reference.json."""
+        with open(path, "r") as f:
+            return cls(json.load(f), **kwargs)
+
+    @classmethod
+    def load_version(cls, version: str, artifacts_dir: Path | None = None, **kwargs) -> "DriftMonitor":
+        """
+        Charge la référence de drift d'une version de modèle.
+
+        Args:
+            version: Version du modèle (ex: "v1.0.0" ou "latest")
+            artifacts_dir: Dossier des artefacts (défaut: "artifacts")
+
+        Returns:
+            Instance de DriftMonitor
+        """
+        return cls(load_drift_reference(version, artifacts_dir), **kwargs)
+
+    def _slot(self, timestamp: float) -> int:
+        """Retourne la position dans l'anneau (en recyclant le slot s'il est périmé)."""
+        slot_id = int(timestamp // self.slot_seconds)
+        position = slot_id % self.n_slots
+        if self._slot_ids[position] != slot_id:
+            self._counts[position] = 0
+            self._slot_ids[position] = slot_id
+        return position
+
+    def observe(
+        self,
+        features: Dict[str, Any],
+        scores: Dict[str, Any] | None = None,
+        timestamp: float | None = None,
+    ) -> None:
+        """
+        Enregistre une requête scorée.
+
+        Args:
+            features: Features de la transaction
+            scores: Scores (risk_score, supervised_score, unsupervised_score) ;
+                un score à None n'a pas été calculé et n'est pas compté
+            timestamp: Epoch secondes (défaut: maintenant)
+        """
+        values_source = {**features, **(scores or {})}
+        raw = [values_source.get(name) for name in self.names]
+        values = np.array([_to_float(value) for value in raw], dtype=np.float64)
+        buckets = (values[:, None] >= self._edges).sum(axis=1)
+        # NaN et ±inf : bucket manquant (comme histogram_counts pour la référence)
+        buckets[~np.isfinite(values)] = self._missing_bucket
+        # Score non calculé (None : BLOCK des règles, mode distillé) : pas d'observation
+        observed = ~(self._is_score & np.array([value is None for value in raw]))
+        position = self._slot(time.time() if timestamp is None else timestamp)
+        self._counts[position, self._feature_index[observed], buckets[observed]] += 1
+
+    def _window_counts(self, window: str, now: float) -> tuple[np.ndarray, int]:
+        """Somme les slots de la fenêtre demandée."""
+        n_window_slots = max(1, int(_parse_window(window).total_seconds() // self.slot_seconds))
+        if n_window_slots > self.n_slots:
+            raise ValueError(f"Fenêtre {window} supérieure à la rétention du moniteur")
+        current_slot = int(now // self.slot_seconds)
+        in_window = (self._slot_ids > current_slot - n_window_slots) & (self._slot_ids <= current_slot)
+        counts = self._counts[in_window].sum(axis=0, dtype=np.int64)
+        return counts, n_window_slots
+
+    def report(self, window: str = "1h", now: float | None = None) -> Dict[str, Any]:
+        """
+        Calcule PSI et KS par feature/score sur une fenêtre glissante.
+
+        Args:
+            window: Fenêtre (ex: "15m", "1h", "24h")
+            now: Epoch secondes (défaut: maintenant)
+
+        Returns:
+            Rapport JSON-sérialisable
+        """
+        counts, _ = self._window_counts(window, time.time() if now is None else now)
+        features = {}
+        for i, name in enumerate(self.names):
+            n_buckets = int(self._n_buckets[i])
+            current = np.append(counts[i, :n_buckets], counts[i, self._missing_bucket]).astype(np.float64)
+            reference = self._reference[i]
+            features[name] = {
+                "count": int(current.sum()),
+                "psi": population_stability_index(reference, current),
+                "ks": ks_statistic(reference[:-1], current[:-1]),
+                "missing_rate": float(current[-1] / current.sum()) if current.sum() else 0.0,
+            }
+
+        requests = max((f["count"] for f in features.values()), default=0)
+        return {
+            "window": window,
+            "reference_version": self.reference_version,
+            "requests": requests,
+            "features": {k: v for k, v in features.items() if k not in self.score_names},
+            "scores": {k: v for k, v in features.items() if k in self.score_names},
+        }
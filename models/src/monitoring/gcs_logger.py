@@ -35,6 +35,7 @@ def log_inference_to_gcs(
     risk_score: float,
     decision: str,
     model_version: str,
+    components: Dict[str, Any] | None = None,
 ) -> None:
     """
     Écrit une ligne JSONL dans GCS pour Vertex Model Monitoring.
@@ -49,6 +50,9 @@ def log_inference_to_gcs(
         risk_score: Score de risque retourné.
         decision: Décision (APPROVE, REVIEW, BLOCK).
         model_version: Version du modèle.
+        components: Scores intermédiaires (rule_score, supervised_score,
+            unsupervised_score, distilled_score, boost_factor, rules_decision).
+            Permet de rejouer les poids/seuils hors ligne (src/scoring/simulation.py).
     """
     bucket_name = (os.getenv("MONITORING_GCS_BUCKET") or "").strip()
     if not bucket_name:
@@ -67,12 +71,15 @@ def log_inference_to_gcs(
     blob_name = f"{prefix}/{date_path}/{uuid.uuid4().hex}.jsonl"
 
     # Une ligne JSONL : request_time + features + risk_score + decision + model_version
+    # (+ scores intermédiaires si fournis)
     row: Dict[str, Any] = {
         "request_time": now.isoformat(),
         "risk_score": float(risk_score),
         "decision": str(decision),
         "model_version": str(model_version),
     }
+    for k, v in (components or {}).items():
+        row[k] = _to_json_serializable(v)
     for k, v in features.items():
         row[k] = _to_json_serializable(v)
 
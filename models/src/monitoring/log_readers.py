@@ -0,0 +1,129 @@
+"""
+Lecteurs de logs d'inférence (JSONL) en streaming.
+
+Les logs écrits par gcs_logger.py sont rangés par jour :
+<prefix>/YYYY/MM/DD/<uuid>.jsonl. Les lecteurs produisent les lignes une par
+une (jamais le contenu complet d'un jour en mémoire) :
+- LocalLogReader : dossier local (ex: logs téléchargés avec gsutil rsync)
+- GCSLogReader : bucket GCS, blobs lus en flux (google-cloud-storage requis)
+
+`open_log_reader()` choisit le lecteur selon la source ("gs://..." ou chemin).
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+
+def date_prefixes(days_back: int, end_date: date | None = None) -> List[str]:
+    """
+    Liste les sous-dossiers YYYY/MM/DD des `days_back` derniers jours.
+
+    Args:
+        days_back: Nombre de jours (0 = pas de filtre de date)
+        end_date: Dernier jour inclus (défaut: aujourd'hui UTC)
+
+    Returns:
+        Liste de préfixes "YYYY/MM/DD" (du plus récent au plus ancien)
+    """
+    end_date = end_date or datetime.now(timezone.utc).date()
+    return [(end_date - timedelta(days=offset)).strftime("%Y/%m/%d") for offset in range(days_back)]
+
+
+def _iter_jsonl_lines(lines: Iterator[str]) -> Iterator[Dict[str, Any]]:
+    """Parse des lignes JSONL (lignes vides et invalides ignorées)."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue
+
+
+class LocalLogReader:
+    """Lit les fichiers .jsonl d'un dossier local (récursivement)."""
+
+    def __init__(self, root: Path, day_prefixes: List[str] | None = None):
+        """
+        Initialise le lecteur.
+
+        Args:
+            root: Dossier racine des logs (ou un fichier .jsonl)
+            day_prefixes: Sous-dossiers "YYYY/MM/DD" à lire (None = tout)
+        """
+        self.root = Path(root)
+        self.day_prefixes = day_prefixes
+
+    def iter_files(self) -> Iterator[Path]:
+        """Liste les fichiers à lire (ordre déterministe)."""
+        if self.root.is_file():
+            yield self.root
+            return
+        roots = [self.root / prefix for prefix in self.day_prefixes] if self.day_prefixes else [self.root]
+        for root in roots:
+            if root.exists():
+                yield from sorted(root.rglob("*.jsonl"))
+
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        """Produit les lignes de log une par une."""
+        for path in self.iter_files():
+            with open(path, "r") as f:
+                yield from _iter_jsonl_lines(f)
+
+
+class GCSLogReader:
+    """Lit les blobs .jsonl d'un bucket GCS en flux."""
+
+    def __init__(self, bucket: str, prefix: str, day_prefixes: List[str] | None = None):
+        """
+        Initialise le lecteur.
+
+        Args:
+            bucket: Nom du bucket
+            prefix: Préfixe des logs (ex: "monitoring/inference_logs")
+            day_prefixes: Sous-dossiers "YYYY/MM/DD" à lire (None = tout le préfixe)
+        """
+        self.bucket = bucket
+        self.prefix = prefix.strip().strip("/")
+        self.day_prefixes = day_prefixes
+
+    def _prefixes(self) -> List[str]:
+        if not self.day_prefixes:
+            return [f"{self.prefix}/" if self.prefix else ""]
+        return [f"{self.prefix}/{day}/" if self.prefix else f"{day}/" for day in self.day_prefixes]
+
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        """Produit les lignes de log une par une (blobs lus ligne à ligne)."""
+        from google.cloud import storage
+
+        client = storage.Client()
+        for prefix in self._prefixes():
+            for blob in client.list_blobs(self.bucket, prefix=prefix):
+                if not blob.name.endswith(".jsonl"):
+                    continue
+                with blob.open("r") as f:
+                    yield from _iter_jsonl_lines(f)
+
+
+def open_log_reader(source: str, days_back: int = 0, end_date: date | None = None):
+    """
+    Construit le lecteur adapté à la source.
+
+    Args:
+        source: "gs://bucket/prefix" ou chemin local
+        days_back: Nombre de jours à lire (0 = tout)
+        end_date: Dernier jour inclus (défaut: aujourd'hui UTC)
+
+    Returns:
+        Lecteur exposant iter_rows()
+    """
+    day_prefixes = date_prefixes(days_back, end_date) if days_back > 0 else None
+    if source.startswith("gs://"):
+        bucket, _, prefix = source[len("gs://"):].partition("/")
+        return GCSLogReader(bucket, prefix, day_prefixes)
+    return LocalLogReader(Path(source), day_prefixes)
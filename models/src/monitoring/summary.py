@@ -0,0 +1,282 @@
+"""
+Résumé incrémental des logs d'inférence en mémoire bornée.
+
+Les lignes sont accumulées par lots de taille fixe ; chaque lot met à jour :
+- des histogrammes à buckets fixes (bornes de drift_reference.json) → PSI/KS
+- un sketch de quantiles par feature/score (QuantileSketch, type DDSketch)
+- les comptes de décisions et de versions de modèle
+
+La mémoire ne dépend pas du nombre de jours lus : taille du lot + nombre de
+buckets des histogrammes et des sketches.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from .drift import SCORE_NAMES, _to_float, ks_statistic, population_stability_index
+
+# Au-delà de ce PSI, la feature est signalée comme dérivée (seuil usuel)
+PSI_ALERT_THRESHOLD = 0.2
+
+# Champs de log qui ne sont pas des features
+_METADATA_FIELDS = {"request_time", "decision", "model_version", "rules_decision"}
+
+# Scores suivis dans le rapport (en plus de ceux de la référence)
+_REPORT_SCORES = SCORE_NAMES + ["rule_score"]
+
+
+class QuantileSketch:
+    """
+    Sketch de quantiles à erreur relative bornée (principe de DDSketch).
+
+    Une valeur x > 0 tombe dans le bucket ceil(log_gamma(x)) avec
+    gamma = (1 + a) / (1 - a) : tout quantile est estimé à ±a (relatif) près.
+    Les valeurs négatives ont leur propre store, zéro est compté à part. Au-delà
+    de `max_buckets`, les plus petits buckets (en valeur absolue) sont fusionnés.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048):
+        """
+        Initialise le sketch.
+
+        Args:
+            relative_accuracy: Erreur relative visée sur les quantiles
+            max_buckets: Nombre maximum de buckets par signe
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self._positive: Dict[int, int] = {}
+        self._negative: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+
+    def _add_to_store(self, store: Dict[int, int], magnitudes: np.ndarray) -> None:
+        if magnitudes.size == 0:
+            return
+        keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        for key, count in zip(unique_keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+        if len(store) > self.max_buckets:
+            # Fusion des plus petits buckets dans le plus petit bucket conservé
+            keys_sorted = sorted(store)
+            n_collapse = len(store) - self.max_buckets + 1
+            target = keys_sorted[n_collapse - 1]
+            collapsed = sum(store.pop(k) for k in keys_sorted[: n_collapse - 1])
+            store[target] += collapsed
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Ajoute un lot de valeurs (NaN ignorés).
+
+        Args:
+            values: Valeurs float64
+        """
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        self.count += int(values.size)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.zero_count += int((values == 0).sum())
+        self._add_to_store(self._positive, values[values > 0])
+        self._add_to_store(self._negative, -values[values < 0])
+
+    def _bucket_value(self, key: int) -> float:
+        """Valeur représentative d'un bucket (milieu relatif)."""
+        return 2 * self.gamma**key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float | None:
+        """
+        Estime un quantile.
+
+        Args:
+            q: Quantile dans [0, 1]
+
+        Returns:
+            Valeur estimée (None si le sketch est vide)
+        """
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        cumulative = 0
+        # Ordre croissant : négatifs (magnitude décroissante), zéro, positifs
+        for key in sorted(self._negative, reverse=True):
+            cumulative += self._negative[key]
+            if cumulative > rank:
+                return max(-self._bucket_value(key), self.min)
+        cumulative += self.zero_count
+        if cumulative > rank:
+            return 0.0
+        for key in sorted(self._positive):
+            cumulative += self._positive[key]
+            if cumulative > rank:
+                return min(self._bucket_value(key), self.max)
+        return self.max
+
+
+class LogSummary:
+    """
+    Agrège des lignes de logs d'inférence et les compare à la référence d'entraînement.
+    """
+
+    def __init__(
+        self,
+        reference: Dict[str, Any] | None = None,
+        quantiles: Iterable[float] = (0.01, 0.1, 0.5, 0.9, 0.99),
+        relative_accuracy: float = 0.01,
+        batch_size: int = 10_000,
+    ):
+        """
+        Initialise le résumé.
+
+        Args:
+            reference: Contenu de drift_reference.json (None = pas de PSI/KS)
+            quantiles: Quantiles rapportés
+            relative_accuracy: Erreur relative des sketches de quantiles
+            batch_size: Nombre de lignes accumulées avant mise à jour vectorisée
+        """
+        self.reference = reference
+        self.quantiles = list(quantiles)
+        self.relative_accuracy = relative_accuracy
+        self.batch_size = batch_size
+
+        self.requests_total = 0
+        self.decisions: Dict[str, int] = {}
+        self.model_versions: Dict[str, int] = {}
+        self.first_request_time: str | None = None
+        self.last_request_time: str | None = None
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._names: List[str] | None = None
+        self._sketches: Dict[str, QuantileSketch] = {}
+        self._edges: Dict[str, np.ndarray] = {}
+        self._counts: Dict[str, np.ndarray] = {}
+        self._missing: Dict[str, int] = {}
+        self._score_names: set = set(_REPORT_SCORES)
+
+        if reference:
+            histograms = {**reference.get("features", {}), **reference.get("scores", {})}
+            self._score_names |= set(reference.get("scores", {}))
+            for name, histogram in histograms.items():
+                self._edges[name] = np.asarray(histogram["edges"], dtype=np.float64)
+            names = list(histograms) + [s for s in _REPORT_SCORES if s not in histograms]
+            self._init_names(names)
+
+    def _init_names(self, names: List[str]) -> None:
+        self._names = names
+        for name in names:
+            self._sketches[name] = QuantileSketch(self.relative_accuracy)
+            self._missing[name] = 0
+            if name in self._edges:
+                self._counts[name] = np.zeros(len(self._edges[name]) + 1, dtype=np.int64)
+
+    def update(self, row: Dict[str, Any]) -> None:
+        """Ajoute une ligne de log (mise à jour effective par lots)."""
+        self.requests_total += 1
+        decision = str(row.get("decision", "")).strip() or "UNKNOWN"
+        self.decisions[decision] = self.decisions.get(decision, 0) + 1
+        model_version = str(row.get("model_version", "unknown")).strip()
+        self.model_versions[model_version] = self.model_versions.get(model_version, 0) + 1
+        request_time = row.get("request_time")
+        if request_time:
+            if self.first_request_time is None or request_time < self.first_request_time:
+                self.first_request_time = request_time
+            if self.last_request_time is None or request_time > self.last_request_time:
+                self.last_request_time = request_time
+
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def update_many(self, rows: Iterable[Dict[str, Any]]) -> "LogSummary":
+        """Ajoute toutes les lignes d'un itérateur (ex: reader.iter_rows())."""
+        for row in rows:
+            self.update(row)
+        self.flush()
+        return self
+
+    def flush(self) -> None:
+        """Met à jour histogrammes et sketches avec le lot en attente."""
+        if not self._buffer:
+            return
+        if self._names is None:
+            # Sans référence : colonnes numériques vues dans le premier lot
+            names = []
+            for row in self._buffer:
+                for key, value in row.items():
+                    if key not in _METADATA_FIELDS and key not in names and not math.isnan(_to_float(value)):
+                        names.append(key)
+            self._init_names(names)
+
+        for name in self._names:
+            rows = self._buffer
+            if name in self._score_names:
+                # Score à null dans le log : non calculé (BLOCK des règles, mode distillé), pas d'observation
+                rows = [row for row in rows if not (name in row and row[name] is None)]
+            values = np.array([_to_float(row.get(name)) for row in rows], dtype=np.float64)
+            finite_mask = np.isfinite(values)
+            self._missing[name] += int((~finite_mask).sum())
+            self._sketches[name].update(values)
+            if name in self._counts:
+                edges = self._edges[name]
+                idx = np.searchsorted(edges, values[finite_mask], side="right")
+                self._counts[name] += np.bincount(idx, minlength=len(edges) + 1)
+        self._buffer = []
+
+    def _column_report(self, name: str) -> Dict[str, Any]:
+        sketch = self._sketches[name]
+        total = sketch.count + self._missing[name]
+        column: Dict[str, Any] = {
+            "count": sketch.count,
+            "missing_rate": self._missing[name] / total if total else 0.0,
+            "min": sketch.min if sketch.count else None,
+            "max": sketch.max if sketch.count else None,
+            "mean": sketch.sum / sketch.count if sketch.count else None,
+            "quantiles": {f"p{int(round(q * 100)):02d}": sketch.quantile(q) for q in self.quantiles},
+        }
+        if name in self._counts:
+            histogram = (self.reference.get("features", {}) | self.reference.get("scores", {}))[name]
+            reference_counts = np.array(histogram["counts"] + [histogram.get("missing", 0)], dtype=np.float64)
+            current = np.append(self._counts[name], self._missing[name]).astype(np.float64)
+            column["psi"] = population_stability_index(reference_counts, current)
+            column["ks"] = ks_statistic(reference_counts[:-1], current[:-1])
+        return column
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Rapport compact (JSON-sérialisable).
+
+        Returns:
+            Volumes, décisions, versions, statistiques et drift par feature/score
+        """
+        self.flush()
+        columns = {name: self._column_report(name) for name in (self._names or [])}
+        drifted = sorted(
+            (name for name, c in columns.items() if c.get("psi", 0.0) >= PSI_ALERT_THRESHOLD),
+            key=lambda name: columns[name]["psi"],
+            reverse=True,
+        )
+        return {
+            "generated_at_utc": datetime.now(timezone.utc).isoformat(),
+            "reference_version": (self.reference or {}).get("version"),
+            "requests_total": self.requests_total,
+            "period": {"first": self.first_request_time, "last": self.last_request_time},
+            "decisions": dict(sorted(self.decisions.items())),
+            "model_versions": dict(sorted(self.model_versions.items(), key=lambda x: x[1], reverse=True)),
+            "psi_alert_threshold": PSI_ALERT_THRESHOLD,
+            "drifted": drifted,
+            "features": {k: v for k, v in columns.items() if k not in self._score_names},
+            "scores": {k: v for k, v in columns.items() if k in self._score_names},
+        }
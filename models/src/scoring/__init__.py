@@ -6,6 +6,7 @@ et prend la décision finale.
 """
 
 from .decision import DecisionEngine
+from .pipeline import ScoringPipeline, ScoringResult
 from .scorer import GlobalScorer
 
-__all__ = ["GlobalScorer", "DecisionEngine"]
+__all__ = ["GlobalScorer", "DecisionEngine", "ScoringPipeline", "ScoringResult"]
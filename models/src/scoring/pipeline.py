@@ -0,0 +1,284 @@
+"""
+Pipeline de scoring complet.
+
+Enchaîne exactement les étapes de l'endpoint POST /score :
+FeaturePipeline → RulesEngine → prédicteurs → GlobalScorer → DecisionEngine.
+
+Utilisé par l'API et par le scoring offline (scripts/score_offline.py) pour
+garantir que les deux chemins produisent les mêmes scores.
+
+Mode "distilled" (SCORING_MODE=distilled) : les deux modèles sont remplacés
+par le modèle distillé, qui prédit directement leur partie du score global ;
+les règles et la décision sont inchangées.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+from ..features.pipeline import FeaturePipeline
+from ..rules.engine import RulesEngine
+from .decision import DecisionEngine
+from .scorer import GlobalScorer
+
+# Score utilisé quand un modèle n'est pas chargé (même valeur que l'API historique)
+DEFAULT_MODEL_SCORE = 0.5
+
+SCORING_MODES = ("full", "distilled")
+
+
+@dataclass
+class ScoringResult:
+    """Résultat complet du scoring, avec tous les scores intermédiaires."""
+
+    features: Dict[str, Any]
+    rule_score: float
+    rules_decision: str  # ALLOW, BOOST_SCORE, BLOCK
+    boost_factor: float
+    supervised_score: float | None  # None si BLOCK par les règles (ML non évalué)
+    unsupervised_score: float | None
+    risk_score: float
+    decision: str  # APPROVE, REVIEW, BLOCK
+    reasons: List[str] = field(default_factory=list)
+    model_version: str = "unknown"
+    distilled_score: float | None = None  # mode distillé : partie ML du score (modèles non évalués)
+
+    def components(self) -> Dict[str, Any]:
+        """Scores intermédiaires (réponse API, logs d'inférence, simulateur)."""
+        components = {
+            "rule_score": self.rule_score,
+            "rules_decision": self.rules_decision,
+            "boost_factor": self.boost_factor,
+            "supervised_score": self.supervised_score,
+            "unsupervised_score": self.unsupervised_score,
+        }
+        if self.distilled_score is not None:
+            components["distilled_score"] = self.distilled_score
+        return components
+
+
+class ScoringPipeline:
+    """
+    Pipeline de scoring de bout en bout pour une transaction enrichie.
+
+    Les composants sont injectables (tests, scoring offline) ; `load()` construit
+    le pipeline tel que l'API le sert.
+    """
+
+    def __init__(
+        self,
+        feature_pipeline: FeaturePipeline | None = None,
+        rules_engine: RulesEngine | None = None,
+        supervised_predictor: Any | None = None,
+        unsupervised_predictor: Any | None = None,
+        global_scorer: GlobalScorer | None = None,
+        decision_engine: DecisionEngine | None = None,
+        model_version: str = "latest",
+        distilled_predictor: Any | None = None,
+    ):
+        """
+        Initialise le pipeline.
+
+        Args:
+            feature_pipeline: Pipeline de features (défaut: FeaturePipeline())
+            rules_engine: Moteur de règles (défaut: RulesEngine())
+            supervised_predictor: Prédicteur supervisé (None = score par défaut)
+            unsupervised_predictor: Prédicteur non supervisé (None = score par défaut)
+            global_scorer: Scorer global (défaut: GlobalScorer())
+            decision_engine: Moteur de décision (défaut: DecisionEngine())
+            model_version: Version du modèle rapportée dans les résultats
+            distilled_predictor: Prédicteur distillé (remplace les deux modèles s'il est fourni)
+        """
+        self.feature_pipeline = feature_pipeline or FeaturePipeline()
+        self.rules_engine = rules_engine or RulesEngine()
+        self.supervised_predictor = supervised_predictor
+        self.unsupervised_predictor = unsupervised_predictor
+        self.global_scorer = global_scorer or GlobalScorer()
+        self.decision_engine = decision_engine or DecisionEngine()
+        self.model_version = model_version
+        self.distilled_predictor = distilled_predictor
+
+    @property
+    def scoring_mode(self) -> str:
+        """Mode de scoring effectif ("full" ou "distilled")."""
+        return "distilled" if self.distilled_predictor is not None else "full"
+
+    @classmethod
+    def load(
+        cls,
+        model_version: str = "latest",
+        artifacts_dir: Path | None = None,
+        verbose: bool = True,
+        scoring_mode: str = "full",
+    ) -> "ScoringPipeline":
+        """
+        Construit le pipeline servi par l'API (modèles chargés depuis les artefacts).
+
+        Un modèle absent n'est pas bloquant : le score par défaut est utilisé.
+        En mode "distilled", sans modèle distillé pour la version, le pipeline
+        complet est chargé.
+
+        Args:
+            model_version: Version du modèle (ex: "v1.0.0" ou "latest")
+            artifacts_dir: Dossier des artefacts (défaut: "artifacts")
+            verbose: Afficher l'état de chargement des modèles
+            scoring_mode: "full" (ensemble) ou "distilled" (modèle distillé)
+
+        Returns:
+            Instance de ScoringPipeline
+
+        Raises:
+            ValueError: Si le mode de scoring est inconnu
+        """
+        from ..models.supervised.predictor import SupervisedPredictor
+        from ..models.unsupervised.predictor import UnsupervisedPredictor
+
+        if scoring_mode not in SCORING_MODES:
+            raise ValueError(f"Mode de scoring inconnu: {scoring_mode} (attendu: {', '.join(SCORING_MODES)})")
+        artifacts_dir = artifacts_dir or Path("artifacts")
+
+        if scoring_mode == "distilled":
+            from ..models.distilled.predictor import DistilledPredictor
+
+            try:
+                distilled_predictor = DistilledPredictor.load_version(model_version, artifacts_dir)
+                if verbose:
+                    print(f"✅ Modèle distillé chargé: {model_version} (mode distilled)")
+                return cls(distilled_predictor=distilled_predictor, model_version=model_version)
+            except Exception as e:
+                if verbose:
+                    print(f"⚠️  Modèle distillé non disponible, scoring complet: {e}")
+
+        try:
+            supervised_predictor = SupervisedPredictor.load_version(model_version, artifacts_dir)
+            if verbose:
+                print(f"✅ Modèle supervisé chargé: {model_version}")
+        except Exception as e:
+            if verbose:
+                print(f"⚠️  Modèle supervisé non disponible: {e}")
+            supervised_predictor = None
+
+        try:
+            unsupervised_predictor = UnsupervisedPredictor.load_version(model_version, artifacts_dir)
+            if verbose:
+                print(f"✅ Modèle non supervisé chargé: {model_version}")
+        except Exception as e:
+            if verbose:
+                print(f"⚠️  Modèle non supervisé non disponible: {e}")
+            unsupervised_predictor = None
+
+        return cls(
+            supervised_predictor=supervised_predictor,
+            unsupervised_predictor=unsupervised_predictor,
+            model_version=model_version,
+        )
+
+    def score(
+        self,
+        transaction: Dict[str, Any],
+        context: Dict[str, Any] | None = None,
+    ) -> ScoringResult:
+        """
+        Score une transaction enrichie.
+
+        Args:
+            transaction: Transaction enrichie (features.transactional et features.historical)
+            context: Contexte additionnel pour les règles
+
+        Returns:
+            Résultat du scoring avec les scores intermédiaires
+
+        Raises:
+            ValueError: Si la transaction n'est pas au format enrichi
+        """
+        context = context or {}
+
+        # 1. Feature Engineering (format enrichi uniquement)
+        features = self.feature_pipeline.transform(transaction)
+
+        # 2. Règles métier
+        rules_output = self.rules_engine.evaluate(transaction, features, context)
+
+        # Si BLOCK, arrêter ici (modèles ML non évalués)
+        if rules_output.decision == "BLOCK":
+            return ScoringResult(
+                features=features,
+                rule_score=float(rules_output.rule_score),
+                rules_decision=rules_output.decision,
+                boost_factor=float(rules_output.boost_factor),
+                supervised_score=None,
+                unsupervised_score=None,
+                risk_score=float(rules_output.rule_score),
+                decision="BLOCK",
+                reasons=rules_output.reasons,
+                model_version=self.model_version,
+            )
+
+        # 3. Scoring ML (mode distillé : un seul modèle pour la partie ML du score)
+        if self.distilled_predictor is not None:
+            distilled_score = self.distilled_predictor.predict(features)
+            risk_score = self.global_scorer.combine(
+                rule_score=rules_output.rule_score,
+                model_score=distilled_score,
+                boost_factor=rules_output.boost_factor,
+            )
+            decision = self.decision_engine.decide(
+                risk_score=risk_score,
+                reasons=rules_output.reasons,
+                hard_block=False,
+                model_version=self.model_version,
+            )
+            return ScoringResult(
+                features=features,
+                rule_score=float(rules_output.rule_score),
+                rules_decision=rules_output.decision,
+                boost_factor=float(rules_output.boost_factor),
+                supervised_score=None,
+                unsupervised_score=None,
+                risk_score=decision.risk_score,
+                decision=decision.decision,
+                reasons=decision.reasons,
+                model_version=self.model_version,
+                distilled_score=float(distilled_score),
+            )
+
+        if self.supervised_predictor:
+            supervised_score = self.supervised_predictor.predict(features)
+        else:
+            supervised_score = DEFAULT_MODEL_SCORE
+
+        if self.unsupervised_predictor:
+            unsupervised_score = self.unsupervised_predictor.predict(features)
+        else:
+            unsupervised_score = DEFAULT_MODEL_SCORE
+
+        # 4. Score global
+        risk_score = self.global_scorer.compute_score(
+            rule_score=rules_output.rule_score,
+            supervised_score=supervised_score,
+            unsupervised_score=unsupervised_score,
+            boost_factor=rules_output.boost_factor,
+        )
+
+        # 5. Décision finale
+        decision = self.decision_engine.decide(
+            risk_score=risk_score,
+            reasons=rules_output.reasons,
+            hard_block=False,
+            model_version=self.model_version,
+        )
+
+        return ScoringResult(
+            features=features,
+            rule_score=float(rules_output.rule_score),
+            rules_decision=rules_output.decision,
+            boost_factor=float(rules_output.boost_factor),
+            supervised_score=float(supervised_score),
+            unsupervised_score=float(unsupervised_score),
+            risk_score=decision.risk_score,
+            decision=decision.decision,
+            reasons=decision.reasons,
+            model_version=self.model_version,
+        )
@@ -62,11 +62,28 @@ class GlobalScorer:
         Returns:
             Score global de risque [0,1]
         """
-        risk_score = (
-            self.weights["rule_score"] * rule_score
-            + self.weights["supervised"] * supervised_score
+        model_score = (
+            self.weights["supervised"] * supervised_score
             + self.weights["unsupervised"] * unsupervised_score
         )
+        return self.combine(rule_score, model_score, boost_factor)
+
+    def combine(self, rule_score: float, model_score: float, boost_factor: float = 1.0) -> float:
+        """
+        Combine le score des règles et la partie ML déjà pondérée.
+
+        Utilisé directement par le mode distillé (model_score prédit par un
+        seul modèle, cf. src/models/distilled).
+
+        Args:
+            rule_score: Score des règles [0,1]
+            model_score: w_sup × s_sup + w_unsup × s_unsup
+            boost_factor: Facteur de boost à appliquer (défaut: 1.0)
+
+        Returns:
+            Score global de risque [0,1]
+        """
+        risk_score = self.weights["rule_score"] * rule_score + model_score
 
         # Appliquer le boost_factor
         risk_score = risk_score * boost_factor
@@ -0,0 +1,254 @@
+"""
+Simulateur "what-if" des poids et seuils du scoring global.
+
+Recalcule, à partir des scores intermédiaires loggés (logs d'inférence JSONL
+ou sortie Parquet de scripts/score_offline.py), les décisions obtenues pour
+une grille de poids (GlobalScorer) et de seuils (DecisionEngine), sans
+re-scorer les transactions.
+
+Tout est vectorisé avec numpy : pour chaque jeu de poids, les scores sont
+triés une seule fois, puis chaque couple de seuils est évalué par recherche
+binaire (searchsorted) sur les scores triés et les labels cumulés.
+
+Les lignes scorées en mode distillé (distilled_score) n'ont pas de scores
+supervisé / non supervisé : leur partie ML est le distilled_score, appris sur
+les poids de l'entraînement. Seul le poids des règles varie pour ces lignes.
+"""
+
+from __future__ import annotations
+
+import json
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+COMPONENT_COLUMNS = ["rule_score", "supervised_score", "unsupervised_score", "distilled_score", "boost_factor"]
+
+
+@dataclass
+class ScoreComponents:
+    """Scores intermédiaires chargés en colonnes numpy (une entrée par transaction)."""
+
+    rule_score: np.ndarray
+    supervised_score: np.ndarray  # NaN si BLOCK par les règles
+    unsupervised_score: np.ndarray
+    boost_factor: np.ndarray
+    hard_block: np.ndarray  # bool : BLOCK décidé par les règles (ML non évalué)
+    labels: np.ndarray | None = None  # 0/1 si disponibles
+    distilled_score: np.ndarray | None = None  # partie ML du mode distillé, NaN en mode ensemble
+
+    def __len__(self) -> int:
+        return len(self.rule_score)
+
+
+def _iter_component_files(paths: Iterable[Path]) -> Iterable[Path]:
+    """Liste les fichiers .jsonl / .parquet (les dossiers sont parcourus récursivement)."""
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            yield from sorted(p for p in path.rglob("*") if p.suffix in (".jsonl", ".parquet"))
+        else:
+            yield path
+
+
+def load_score_components(
+    paths: Iterable[Path],
+    label_column: str | None = None,
+) -> ScoreComponents:
+    """
+    Charge les scores intermédiaires depuis des logs d'inférence ou des sorties offline.
+
+    Les lignes sans scores intermédiaires (logs antérieurs) sont ignorées.
+
+    Args:
+        paths: Fichiers ou dossiers (.jsonl = logs d'inférence, .parquet = score_offline)
+        label_column: Colonne de label 0/1 (ex: "is_fraud"), optionnelle
+
+    Returns:
+        ScoreComponents
+    """
+    columns = {name: array("d") for name in COMPONENT_COLUMNS}
+    hard_block = array("b")
+    labels = array("d")
+
+    def _append(rule, sup, unsup, distilled, boost, rules_decision, label) -> None:
+        columns["rule_score"].append(float(rule))
+        columns["supervised_score"].append(np.nan if sup is None else float(sup))
+        columns["unsupervised_score"].append(np.nan if unsup is None else float(unsup))
+        columns["distilled_score"].append(np.nan if distilled is None else float(distilled))
+        columns["boost_factor"].append(1.0 if boost is None else float(boost))
+        hard_block.append(1 if rules_decision == "BLOCK" else 0)
+        labels.append(np.nan if label is None else float(label))
+
+    for path in _iter_component_files(paths):
+        if path.suffix == ".parquet":
+            import pyarrow.parquet as pq
+
+            wanted = COMPONENT_COLUMNS + ["rules_decision"] + ([label_column] if label_column else [])
+            parquet_file = pq.ParquetFile(path)
+            available = [c for c in wanted if c in parquet_file.schema_arrow.names]
+            for batch in parquet_file.iter_batches(columns=available):
+                df = batch.to_pandas()
+                if "rule_score" not in df.columns:
+                    continue
+                df = df[df["rule_score"].notna()]
+                for name in COMPONENT_COLUMNS:
+                    values = df[name] if name in df.columns else pd.Series(np.nan, index=df.index)
+                    if name == "boost_factor":
+                        values = values.fillna(1.0)
+                    columns[name].extend(values.to_numpy(dtype=np.float64))
+                rules_decision = df.get("rules_decision", pd.Series("", index=df.index))
+                hard_block.extend((rules_decision == "BLOCK").to_numpy(dtype=np.int8))
+                if label_column and label_column in df.columns:
+                    labels.extend(df[label_column].to_numpy(dtype=np.float64))
+                else:
+                    labels.extend(np.full(len(df), np.nan))
+        else:
+            with open(path, "r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    row = json.loads(line)
+                    if row.get("rule_score") is None:
+                        continue
+                    _append(
+                        row["rule_score"],
+                        row.get("supervised_score"),
+                        row.get("unsupervised_score"),
+                        row.get("distilled_score"),
+                        row.get("boost_factor"),
+                        row.get("rules_decision"),
+                        row.get(label_column) if label_column else None,
+                    )
+
+    label_array = np.frombuffer(labels, dtype=np.float64)
+    has_labels = label_array.size > 0 and not np.isnan(label_array).all()
+    distilled = np.frombuffer(columns["distilled_score"], dtype=np.float64)
+    return ScoreComponents(
+        rule_score=np.frombuffer(columns["rule_score"], dtype=np.float64),
+        supervised_score=np.frombuffer(columns["supervised_score"], dtype=np.float64),
+        unsupervised_score=np.frombuffer(columns["unsupervised_score"], dtype=np.float64),
+        boost_factor=np.frombuffer(columns["boost_factor"], dtype=np.float64),
+        hard_block=np.frombuffer(hard_block, dtype=np.int8).astype(bool),
+        labels=np.nan_to_num(label_array, nan=0.0).astype(np.int8) if has_labels else None,
+        distilled_score=distilled if np.isfinite(distilled).any() else None,
+    )
+
+
+def compute_risk_scores(components: ScoreComponents, weights: Dict[str, float]) -> np.ndarray:
+    """
+    Recalcule le score global (même formule que GlobalScorer.compute_score).
+
+    Les lignes du mode distillé prennent leur distilled_score comme partie ML
+    (GlobalScorer.combine) : les poids supervisé / non supervisé ne s'y appliquent pas.
+
+    Args:
+        components: Scores intermédiaires
+        weights: Poids {"rule_score", "supervised", "unsupervised"}
+
+    Returns:
+        Scores globaux [0,1] (les hard blocks gardent leur rule_score)
+    """
+    model_score = (
+        weights["supervised"] * np.nan_to_num(components.supervised_score)
+        + weights["unsupervised"] * np.nan_to_num(components.unsupervised_score)
+    )
+    if components.distilled_score is not None:
+        distilled = components.distilled_score
+        model_score = np.where(np.isnan(distilled), model_score, distilled)
+    risk = (weights["rule_score"] * components.rule_score + model_score) * components.boost_factor
+    risk = np.clip(risk, 0.0, 1.0)
+    return np.where(components.hard_block, components.rule_score, risk)
+
+
+def simulate_grid(
+    components: ScoreComponents,
+    weight_grid: List[Dict[str, float]],
+    threshold_grid: List[Dict[str, float]],
+) -> pd.DataFrame:
+    """
+    Évalue toutes les combinaisons (poids × seuils) en une passe vectorisée par jeu de poids.
+
+    Les transactions bloquées par les règles restent BLOCK quelle que soit la
+    combinaison (comme en production).
+
+    Args:
+        components: Scores intermédiaires
+        weight_grid: Liste de poids {"rule_score", "supervised", "unsupervised"}
+        threshold_grid: Liste de seuils {"block", "review"}
+
+    Returns:
+        DataFrame (une ligne par combinaison) : taux APPROVE/REVIEW/BLOCK et,
+        si les labels sont disponibles, précision/rappel de BLOCK et de
+        "flagged" (REVIEW + BLOCK)
+    """
+    n_total = len(components)
+    if n_total == 0:
+        raise ValueError("Aucune ligne avec des scores intermédiaires")
+
+    scored = ~components.hard_block
+    n_hard_block = int(components.hard_block.sum())
+    labels = components.labels
+    total_pos = int(labels.sum()) if labels is not None else 0
+    hard_block_pos = int(labels[components.hard_block].sum()) if labels is not None else 0
+
+    block_thresholds = np.array([t["block"] for t in threshold_grid], dtype=np.float64)
+    review_thresholds = np.array([t["review"] for t in threshold_grid], dtype=np.float64)
+
+    records = []
+    for weights in weight_grid:
+        risk = compute_risk_scores(components, weights)[scored]
+        order = np.argsort(risk, kind="stable")
+        sorted_risk = risk[order]
+        n_scored = len(sorted_risk)
+
+        # count_ge(t) = nombre de scores >= t (recherche binaire sur les scores triés)
+        block_idx = np.searchsorted(sorted_risk, block_thresholds, side="left")
+        review_idx = np.searchsorted(sorted_risk, review_thresholds, side="left")
+        block_count = n_scored - block_idx
+        # REVIEW = review <= score < block (vide si review >= block)
+        flagged_idx = np.minimum(block_idx, review_idx)
+        flagged_count = n_scored - flagged_idx
+        review_count = flagged_count - block_count
+
+        total_block = block_count + n_hard_block
+        total_flagged = flagged_count + n_hard_block
+
+        candidate = {
+            "w_rule_score": weights["rule_score"],
+            "w_supervised": weights["supervised"],
+            "w_unsupervised": weights["unsupervised"],
+        }
+        metrics: Dict[str, Any] = {
+            "block_rate": total_block / n_total,
+            "review_rate": review_count / n_total,
+            "approve_rate": (n_total - total_flagged) / n_total,
+        }
+
+        if labels is not None:
+            # Positifs cumulés dans l'ordre des scores triés → positifs au-dessus d'un seuil
+            cum_pos = np.concatenate([[0], np.cumsum(labels[scored][order], dtype=np.int64)])
+            scored_pos = cum_pos[-1]
+            block_tp = scored_pos - cum_pos[block_idx] + hard_block_pos
+            flagged_tp = scored_pos - cum_pos[flagged_idx] + hard_block_pos
+            with np.errstate(divide="ignore", invalid="ignore"):
+                metrics["block_precision"] = np.where(total_block > 0, block_tp / total_block, 0.0)
+                metrics["block_recall"] = block_tp / total_pos if total_pos else np.zeros(len(threshold_grid))
+                metrics["flagged_precision"] = np.where(total_flagged > 0, flagged_tp / total_flagged, 0.0)
+                metrics["flagged_recall"] = flagged_tp / total_pos if total_pos else np.zeros(len(threshold_grid))
+
+        block_df = pd.DataFrame(
+            {
+                **candidate,
+                "block_threshold": block_thresholds,
+                "review_threshold": review_thresholds,
+                **metrics,
+            }
+        )
+        records.append(block_df)
+
+    return pd.concat(records, ignore_index=True)
@@ -1,11 +1,13 @@
 """
 Utilitaires partagés.
 
-Ce module contient les fonctions utilitaires pour la configuration
-et le versioning.
+Ce module contient les fonctions utilitaires pour la configuration,
+le versioning, l'exécution en étapes et le profilage.
 """
 
 from .config import load_config
+from .profiling import Profiler, annotate, step
+from .stages import Stage, StageReport, run_stages
 from .versioning import get_model_version, save_artifacts
 
-__all__ = ["load_config", "get_model_version", "save_artifacts"]
+__all__ = ["load_config", "get_model_version", "save_artifacts", "Stage", "StageReport", "run_stages", "Profiler", "annotate", "step"]
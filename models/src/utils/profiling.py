@@ -0,0 +1,356 @@
+"""
+Profilage léger du pipeline d'entraînement (durée, CPU, mémoire).
+
+Pour chaque étape : durée, temps CPU du processus (threads et processus
+enfants terminés compris), pic de mémoire résidente (échantillonné dans
+/proc pendant l'étape, processus enfants vivants compris), lignes/s et
+taille des DataFrames produits.
+Optionnellement, les N plus grosses allocations de l'étape (tracemalloc).
+
+Les étapes s'imbriquent par thread (nom "parent/enfant") ; les mesures
+processus (CPU, RSS, tracemalloc) sont partagées entre étapes simultanées.
+
+Usage:
+    profiler = Profiler(tracemalloc_top=10)
+    with profiler.activate():
+        with step("features", rows=len(df)):
+            features = compute(df)
+            annotate(features=features)
+    profiler.log_to_mlflow(mlflow)
+
+Sans profiler actif, step() et annotate() ne font rien.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import resource
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pandas as pd
+
+# Profiler actif (partagé par tous les threads du processus)
+_ACTIVE: "Profiler | None" = None
+
+
+def _proc_rss_pages(pid: int | str) -> int:
+    """Pages résidentes d'un processus (/proc/<pid>/statm)."""
+    with open(f"/proc/{pid}/statm", "r") as f:
+        return int(f.read().split()[1])
+
+
+def _descendant_pids(pid: int) -> List[int]:
+    """
+    PIDs des processus descendants vivants (workers de pools, joblib, LightGBM...).
+
+    Lit /proc/<pid>/task/*/children ; si le noyau ne l'expose pas, reconstruit
+    l'arbre depuis le ppid de /proc/<pid>/stat.
+    """
+    descendants: List[int] = []
+    if os.path.exists(f"/proc/{pid}/task/{pid}/children"):
+        queue = [pid]
+        while queue:
+            parent = queue.pop()
+            try:
+                for task in os.listdir(f"/proc/{parent}/task"):
+                    with open(f"/proc/{parent}/task/{task}/children", "r") as f:
+                        children = [int(child) for child in f.read().split()]
+                    descendants.extend(children)
+                    queue.extend(children)
+            except (OSError, ValueError):
+                continue  # processus terminé pendant le parcours
+        return descendants
+
+    children_of: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children_of.setdefault(ppid, []).append(int(entry))
+    queue = [pid]
+    while queue:
+        children = children_of.get(queue.pop(), [])
+        descendants.extend(children)
+        queue.extend(children)
+    return descendants
+
+
+def current_rss_mb(include_children: bool = True) -> float:
+    """
+    Mémoire résidente actuelle du processus (Mo).
+
+    Avec include_children, la RSS des processus descendants vivants est ajoutée
+    (les pages partagées après fork sont comptées pour chaque processus : borne
+    haute). Si /proc est absent : pic depuis le démarrage (getrusage, enfants
+    terminés compris).
+
+    Args:
+        include_children: Ajouter la RSS des processus enfants (récursivement)
+    """
+    try:
+        pages = _proc_rss_pages("self")
+    except (OSError, ValueError, IndexError):
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if include_children:
+            rss += resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return rss / 1024.0
+    if include_children:
+        for pid in _descendant_pids(os.getpid()):
+            try:
+                pages += _proc_rss_pages(pid)
+            except (OSError, ValueError, IndexError):
+                continue  # enfant terminé entre-temps
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+
+
+def available_memory_mb() -> float | None:
+    """Mémoire disponible (MemAvailable de /proc/meminfo, Mo), None si inconnue."""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024.0
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def process_cpu_seconds() -> float:
+    """Temps CPU du processus (user + system, tous threads, enfants terminés compris)."""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def frame_size_mb(df: pd.DataFrame | pd.Series) -> float:
+    """Taille d'un DataFrame (buffers des colonnes, sans parcourir les objets Python)."""
+    usage = df.memory_usage(index=True, deep=False)
+    return float(usage.sum() if isinstance(usage, pd.Series) else usage) / (1024.0 * 1024.0)
+
+
+class RssSampler(threading.Thread):
+    """Échantillonne la RSS du processus et de ses enfants, garde le pic de chaque mesure en cours."""
+
+    def __init__(self, interval: float = 0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peaks: Dict[Any, float] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def start_stage(self, key: Any) -> None:
+        with self._lock:
+            self.peaks[key] = current_rss_mb()
+
+    def end_stage(self, key: Any) -> float:
+        with self._lock:
+            return max(self.peaks.pop(key, 0.0), current_rss_mb())
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            rss = current_rss_mb()
+            with self._lock:
+                for key in self.peaks:
+                    self.peaks[key] = max(self.peaks[key], rss)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+@dataclass
+class ProfileRecord:
+    """Mesures d'une étape profilée."""
+
+    name: str
+    started_at: float = 0.0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rss_start_mb: float = 0.0
+    rss_end_mb: float = 0.0
+    peak_rss_mb: float = 0.0
+    rows: int | None = None
+    rows_per_second: float | None = None
+    frames_mb: Dict[str, float] = field(default_factory=dict)
+    top_allocations: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class Profiler:
+    """Collecte les mesures des étapes exécutées pendant activate()."""
+
+    def __init__(self, tracemalloc_top: int = 0, interval: float = 0.1):
+        """
+        Initialise le profiler.
+
+        Args:
+            tracemalloc_top: Nombre d'allocations (par ligne de code) conservées par
+                étape (0 = tracemalloc désactivé ; ralentit les allocations Python)
+            interval: Période d'échantillonnage de la RSS (secondes)
+        """
+        self.tracemalloc_top = tracemalloc_top
+        self.interval = interval
+        self.records: List[ProfileRecord] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sampler: RssSampler | None = None
+        self._origin = time.time()
+
+    @contextmanager
+    def activate(self) -> Iterator["Profiler"]:
+        """Active le profiler (step() et annotate() l'utilisent) jusqu'à la sortie du bloc."""
+        global _ACTIVE
+        previous = _ACTIVE
+        self._sampler = RssSampler(self.interval)
+        self._sampler.start()
+        started_tracemalloc = self.tracemalloc_top > 0 and not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start()
+        _ACTIVE = self
+        try:
+            yield self
+        finally:
+            _ACTIVE = previous
+            self._sampler.stop()
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+    def _stack(self) -> List[ProfileRecord]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def stage(self, name: str, rows: int | None = None) -> Iterator[ProfileRecord]:
+        """
+        Mesure une étape.
+
+        Args:
+            name: Nom de l'étape (préfixé par l'étape englobante du même thread)
+            rows: Lignes traitées (pour lignes/s ; aussi via annotate)
+
+        Yields:
+            Enregistrement de l'étape (complété à la sortie)
+        """
+        stack = self._stack()
+        record = ProfileRecord(name=f"{stack[-1].name}/{name}" if stack else name, rows=rows)
+        snapshot = tracemalloc.take_snapshot() if self.tracemalloc_top and tracemalloc.is_tracing() else None
+        if self._sampler is not None:
+            self._sampler.start_stage(id(record))
+        record.started_at = time.time() - self._origin
+        record.rss_start_mb = current_rss_mb()
+        start_wall, start_cpu = time.perf_counter(), process_cpu_seconds()
+        stack.append(record)
+        try:
+            yield record
+        finally:
+            stack.pop()
+            record.wall_seconds = time.perf_counter() - start_wall
+            record.cpu_seconds = process_cpu_seconds() - start_cpu
+            record.rss_end_mb = current_rss_mb()
+            record.peak_rss_mb = (
+                self._sampler.end_stage(id(record)) if self._sampler is not None else record.rss_end_mb
+            )
+            if record.rows is not None and record.wall_seconds > 0:
+                record.rows_per_second = record.rows / record.wall_seconds
+            if snapshot is not None and tracemalloc.is_tracing():
+                own_frames = [tracemalloc.Filter(False, tracemalloc.__file__)]
+                stats = (
+                    tracemalloc.take_snapshot()
+                    .filter_traces(own_frames)
+                    .compare_to(snapshot.filter_traces(own_frames), "lineno")[: self.tracemalloc_top]
+                )
+                record.top_allocations = [
+                    {
+                        "location": str(stat.traceback[0]),
+                        "size_diff_mb": stat.size_diff / (1024.0 * 1024.0),
+                        "count_diff": stat.count_diff,
+                    }
+                    for stat in stats
+                ]
+            with self._lock:
+                self.records.append(record)
+
+    def annotate(self, rows: int | None = None, **frames: pd.DataFrame) -> None:
+        """Complète l'étape en cours du thread : lignes traitées, tailles de DataFrames."""
+        stack = self._stack()
+        if not stack:
+            return
+        if rows is not None:
+            stack[-1].rows = int(rows)
+        for name, df in frames.items():
+            if df is not None:
+                stack[-1].frames_mb[name] = frame_size_mb(df)
+
+    def report(self) -> Dict[str, Any]:
+        """Rapport complet (une entrée par étape, ordre de fin)."""
+        with self._lock:
+            return {
+                "peak_rss_mb": max((r.peak_rss_mb for r in self.records), default=0.0),
+                "stages": [asdict(r) for r in self.records],
+            }
+
+    def metrics(self) -> Dict[str, float]:
+        """Métriques à plat pour MLflow (profile.<étape>.<mesure>)."""
+        metrics: Dict[str, float] = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            prefix = f"profile.{record.name.replace('/', '.')}"
+            metrics[f"{prefix}.wall_seconds"] = record.wall_seconds
+            metrics[f"{prefix}.cpu_seconds"] = record.cpu_seconds
+            metrics[f"{prefix}.peak_rss_mb"] = record.peak_rss_mb
+            if record.rows_per_second is not None:
+                metrics[f"{prefix}.rows_per_second"] = record.rows_per_second
+            for frame, size in record.frames_mb.items():
+                metrics[f"{prefix}.{frame}_mb"] = size
+        return metrics
+
+    def save(self, path: Path) -> Path:
+        """Enregistre le rapport JSON."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    def log_to_mlflow(self, mlflow, artifact_file: str = "profile_report.json") -> None:
+        """Logge les métriques et le rapport JSON dans le run MLflow actif."""
+        mlflow.log_metrics(self.metrics())
+        mlflow.log_dict(self.report(), artifact_file)
+
+    def summary(self) -> str:
+        """Tableau texte des étapes de premier niveau et de leurs sous-étapes."""
+        lines = [f"   {'étape':<40} {'durée':>8} {'CPU':>8} {'pic RSS':>10} {'lignes/s':>11}"]
+        with self._lock:
+            records = sorted(self.records, key=lambda r: r.started_at)
+        for r in records:
+            speed = f"{r.rows_per_second:,.0f}" if r.rows_per_second is not None else "-"
+            lines.append(
+                f"   {r.name:<40} {r.wall_seconds:7.1f}s {r.cpu_seconds:7.1f}s {r.peak_rss_mb:7,.0f} Mo {speed:>11}"
+            )
+        return "\n".join(lines)
+
+
+def active_profiler() -> Profiler | None:
+    """Profiler actif (None hors de Profiler.activate())."""
+    return _ACTIVE
+
+
+def step(name: str, rows: int | None = None):
+    """Mesure une étape avec le profiler actif (contexte vide sans profiler)."""
+    return _ACTIVE.stage(name, rows=rows) if _ACTIVE is not None else nullcontext()
+
+
+def annotate(rows: int | None = None, **frames: pd.DataFrame) -> None:
+    """Complète l'étape en cours du profiler actif (sans effet sans profiler)."""
+    if _ACTIVE is not None:
+        _ACTIVE.annotate(rows=rows, **frames)
@@ -0,0 +1,208 @@
+"""
+Exécution d'un pipeline en étapes déclarées (graphe de dépendances).
+
+Chaque étape déclare ses entrées et ses sorties (noms de résultats). Les
+étapes prêtes et indépendantes s'exécutent en parallèle (threads : les
+calculs lourds libèrent le GIL ou lancent leurs propres processus), dans
+la limite d'un budget mémoire estimé. Une étape dont les sorties sont déjà
+en cache (fonction cached) n'est pas exécutée.
+
+Les étapes main_thread s'exécutent dans le thread principal (ex: logging
+MLflow, dont le run actif est propre au thread), en parallèle des autres.
+
+Rapport par étape : statut, durée, pic de mémoire résidente du processus
+pendant l'étape (échantillonné dans /proc ; partagé entre étapes concurrentes).
+Avec un profiler actif (cf. profiling.py), chaque étape exécutée y est
+mesurée (CPU, lignes/s, tailles des DataFrames, allocations).
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from .profiling import RssSampler, available_memory_mb, step
+
+
+@dataclass
+class Stage:
+    """
+    Étape du pipeline.
+
+    fn reçoit les entrées en arguments nommés et retourne un dictionnaire
+    contenant (au moins) les sorties déclarées. cached reçoit les mêmes
+    arguments et retourne les sorties si elles sont déjà disponibles, sinon
+    None. memory_mb (nombre ou fonction des entrées) est l'estimation
+    utilisée pour le budget mémoire.
+    """
+
+    name: str
+    fn: Callable[..., Dict[str, Any]]
+    inputs: Sequence[str] = ()
+    outputs: Sequence[str] = ()
+    memory_mb: float | Callable[..., float] = 0.0
+    cached: Callable[..., Dict[str, Any] | None] | None = None
+    main_thread: bool = False
+
+
+@dataclass
+class StageReport:
+    """Mesures d'une étape exécutée (ou relue depuis le cache)."""
+
+    name: str
+    status: str
+    started_at: float
+    seconds: float
+    peak_rss_mb: float
+    memory_estimate_mb: float
+
+
+def _validate(stages: Sequence[Stage], available: set) -> None:
+    """Vérifie les noms, les producteurs des entrées et l'absence de cycle."""
+    producers: Dict[str, str] = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers or output in available:
+                raise ValueError(f"Sortie produite deux fois: {output} ({stage.name})")
+            producers[output] = stage.name
+    if len({stage.name for stage in stages}) != len(stages):
+        raise ValueError("Noms d'étapes dupliqués")
+    for stage in stages:
+        missing = [name for name in stage.inputs if name not in producers and name not in available]
+        if missing:
+            raise ValueError(f"Étape {stage.name}: entrées sans producteur: {', '.join(missing)}")
+
+    # Tri topologique (détection de cycle)
+    done = set(available)
+    remaining = list(stages)
+    while remaining:
+        ready = [stage for stage in remaining if all(name in done for name in stage.inputs)]
+        if not ready:
+            raise ValueError(f"Cycle entre les étapes: {', '.join(stage.name for stage in remaining)}")
+        for stage in ready:
+            done.update(stage.outputs)
+            remaining.remove(stage)
+
+
+def run_stages(
+    stages: Sequence[Stage],
+    initial: Dict[str, Any] | None = None,
+    max_workers: int = 2,
+    memory_budget_mb: float | None = None,
+    verbose: bool = True,
+) -> Tuple[Dict[str, Any], List[StageReport]]:
+    """
+    Exécute les étapes dans l'ordre des dépendances, en parallèle quand c'est possible.
+
+    Une étape prête démarre si le nombre d'étapes en cours est inférieur à
+    max_workers et si son estimation mémoire tient dans le budget restant
+    (une étape seule démarre toujours, même au-delà du budget).
+
+    Args:
+        stages: Étapes (l'ordre de déclaration départage les étapes prêtes)
+        initial: Résultats disponibles au départ
+        max_workers: Nombre maximal d'étapes simultanées
+        memory_budget_mb: Budget mémoire (défaut: 75% de la mémoire disponible, sans limite si inconnue)
+        verbose: Afficher le démarrage et la fin des étapes
+
+    Returns:
+        (tous les résultats, rapports par étape dans l'ordre de fin)
+
+    Raises:
+        ValueError: Si le graphe est invalide (entrée sans producteur, cycle, doublon)
+        Exception: La première erreur levée par une étape (les étapes en cours se terminent)
+    """
+    results: Dict[str, Any] = dict(initial or {})
+    _validate(stages, set(results))
+    if memory_budget_mb is None:
+        available = available_memory_mb()
+        memory_budget_mb = 0.75 * available if available is not None else float("inf")
+
+    pending = list(stages)
+    running: Dict[Future, Tuple[Stage, float, float]] = {}
+    reports: List[StageReport] = []
+    memory_used = 0.0
+    cache_checked: set = set()
+    origin = time.time()
+    sampler = RssSampler()
+    sampler.start()
+
+    def _inputs(stage: Stage) -> Dict[str, Any]:
+        return {name: results[name] for name in stage.inputs}
+
+    def _call(stage: Stage, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        with step(stage.name):
+            return stage.fn(**kwargs)
+
+    def _finish(stage: Stage, outputs: Dict[str, Any] | None, status: str, start: float, estimate: float) -> None:
+        missing = [name for name in stage.outputs if name not in (outputs or {})]
+        if missing:
+            raise ValueError(f"Étape {stage.name}: sorties manquantes: {', '.join(missing)}")
+        results.update({name: outputs[name] for name in stage.outputs})
+        peak = sampler.end_stage(stage.name)
+        report = StageReport(stage.name, status, start - origin, time.time() - start, peak, estimate)
+        reports.append(report)
+        if verbose:
+            print(f"⏱️  [{stage.name}] {status} en {report.seconds:.1f}s (pic RSS {peak:,.0f} Mo)", flush=True)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="stage")
+    try:
+        while pending or running:
+            progressed = False
+            main_stage = None
+            for stage in list(pending):
+                if not all(name in results for name in stage.inputs):
+                    continue
+                kwargs = _inputs(stage)
+                if stage.cached is not None and stage.name not in cache_checked:
+                    cache_checked.add(stage.name)
+                    start = time.time()
+                    sampler.start_stage(stage.name)
+                    outputs = stage.cached(**kwargs)
+                    if outputs is not None:
+                        pending.remove(stage)
+                        _finish(stage, outputs, "cache", start, 0.0)
+                        progressed = True
+                        continue
+                    sampler.end_stage(stage.name)
+                if stage.main_thread and main_stage is not None:
+                    continue
+                estimate = float(stage.memory_mb(**kwargs) if callable(stage.memory_mb) else stage.memory_mb)
+                busy = len(running) + (main_stage is not None)
+                if busy and (busy >= max_workers or memory_used + estimate > memory_budget_mb):
+                    continue
+                pending.remove(stage)
+                memory_used += estimate
+                progressed = True
+                if verbose:
+                    print(f"▶️  [{stage.name}] démarrage (estimation {estimate:,.0f} Mo)", flush=True)
+                if stage.main_thread:
+                    main_stage = (stage, kwargs, estimate)
+                    continue
+                sampler.start_stage(stage.name)
+                running[executor.submit(_call, stage, kwargs)] = (stage, time.time(), estimate)
+
+            if main_stage is not None:
+                # Exécution dans le thread principal, les étapes soumises continuent en parallèle
+                stage, kwargs, estimate = main_stage
+                start = time.time()
+                sampler.start_stage(stage.name)
+                outputs = _call(stage, kwargs)
+                memory_used -= estimate
+                _finish(stage, outputs, "ok", start, estimate)
+                continue
+
+            if running:
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage, start, estimate = running.pop(future)
+                    memory_used -= estimate
+                    _finish(stage, future.result(), "ok", start, estimate)
+            elif not progressed:
+                raise RuntimeError(f"Étapes bloquées: {', '.join(stage.name for stage in pending)}")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        sampler.stop()
+    return results, reports
@@ -0,0 +1,73 @@
+"""
+Tests de la suite de benchmarks (parité golden, comparaison des rapports).
+"""
+
+
+def test_outputs_match_golden_reference():
+    """Features, règles, scores et décisions identiques à tests/fixtures/benchmark_golden.json."""
+    from src.benchmark import BenchmarkConfig, BenchmarkWorkload, compare_golden, golden_outputs, load_golden
+
+    golden = load_golden()
+    with BenchmarkWorkload.build(BenchmarkConfig(**golden["config"])) as workload:
+        outputs = golden_outputs(workload)
+
+    # Le handler /score et le pipeline produisent la même réponse
+    for transaction in outputs["transactions"]:
+        assert transaction["api_risk_score"] == transaction["risk_score"]
+        assert transaction["api_decision"] == transaction["decision"]
+    assert compare_golden(golden, outputs) == []
+
+    # Un écart au-delà de la tolérance est rapporté
+    transactions = [dict(outputs["transactions"][0], risk_score=0.5)] + outputs["transactions"][1:]
+    altered = dict(outputs, transactions=transactions)
+    differences = compare_golden(golden, altered)
+    assert len(differences) == 1 and differences[0].startswith("transactions[0].risk_score")
+
+
+def test_compare_results_flags_slower_cases():
+    """La comparaison de deux rapports se fait par élément et classe chaque cas."""
+    from src.benchmark import BenchmarkResult, compare_results
+
+    def report(*results):
+        return {"results": [r.to_dict() for r in results]}
+
+    baseline = report(
+        BenchmarkResult("rules.evaluate", items=100, seconds=[0.010, 0.010]),
+        BenchmarkResult("api.score", items=100, seconds=[0.100]),
+        BenchmarkResult("removed.case", items=1, seconds=[0.001]),
+    )
+    current = report(
+        BenchmarkResult("rules.evaluate", items=200, seconds=[0.010]),  # lot doublé, même durée
+        BenchmarkResult("api.score", items=100, seconds=[0.150]),
+        BenchmarkResult("added.case", items=1, seconds=[0.001]),
+    )
+
+    comparison = compare_results(baseline, current, tolerance=0.1).set_index("name")
+    assert comparison.loc["rules.evaluate", "status"] == "faster"
+    assert comparison.loc["rules.evaluate", "speedup"] == 2.0
+    assert comparison.loc["api.score", "status"] == "slower"
+    assert comparison.loc["removed.case", "status"] == "removed"
+    assert comparison.loc["added.case", "status"] == "added"
+
+
+def test_drift_in_distilled_mode_tracks_distilled_score():
+    """SCORING_MODE=distilled : /drift suit distilled_score, pas les scores des modèles non évalués."""
+    from src.benchmark import BenchmarkConfig, BenchmarkWorkload
+    from src.benchmark.suite import BENCHMARK_VERSION, api_client
+    from src.monitoring.drift import DriftMonitor
+
+    with BenchmarkWorkload.build(BenchmarkConfig(rows=5_000, payloads=40)) as workload:
+        with api_client(workload) as client:
+            import api.main as api_main
+
+            api_main.scoring_pipeline = workload.distilled_pipeline
+            api_main.drift_monitor = DriftMonitor.load_version(BENCHMARK_VERSION, workload.artifacts_dir)
+            scored = [client.post("/score", json=request).json() for request in workload.requests]
+            report = client.get("/drift", params={"window": "1h"}).json()
+
+    computed = sum(response["components"]["distilled_score"] is not None for response in scored)
+    assert 0 < computed < len(scored)  # les BLOCK des règles ne sont pas observés
+    assert report["scores"]["distilled_score"]["count"] == computed
+    assert report["scores"]["distilled_score"]["missing_rate"] == 0.0
+    assert report["scores"]["supervised_score"]["count"] == 0
+    assert report["scores"]["supervised_score"]["psi"] == 0.0
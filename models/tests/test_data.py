@@ -0,0 +1,175 @@
+"""
+Tests de la préparation et du stockage des données.
+"""
+
+from tests.test_features import _synthetic_transactions
+
+
+def test_columnar_dataset_roundtrip_and_pushdown(tmp_path):
+    """Parquet typé partitionné : relecture fidèle, filtres de période et de taille, mêmes features."""
+    import numpy as np
+    import pandas as pd
+
+    from src.data.columnar import ColumnarDatasetWriter, load_columnar_dataset
+    from src.data.preparation import prepare_training_data
+    from src.features.vectorized import compute_historical_features_vectorized
+
+    transactions = _synthetic_transactions(seed=7)
+    transactions["is_fraud"] = np.arange(len(transactions)) % 7 == 0
+    path = tmp_path / "paysim_mapped.parquet"
+    with ColumnarDatasetWriter(path) as writer:
+        writer.write(transactions.iloc[:100])
+        writer.write(transactions.iloc[100:])
+    assert len(list(path.glob("date=*"))) > 30
+
+    loaded = load_columnar_dataset(path)
+    assert loaded["amount"].dtype == np.float32
+    assert loaded["is_fraud"].dtype == np.int8
+    assert isinstance(loaded["source_wallet_id"].dtype, pd.CategoricalDtype)
+    assert loaded["created_at"].tolist() == transactions["created_at"].tolist()
+    assert loaded["source_wallet_id"].astype(object).tolist() == transactions["source_wallet_id"].tolist()
+    # Manquants : None → NaN (comme une relecture CSV), "" conservé
+    reference = transactions.assign(
+        amount=transactions["amount"].astype(np.float32),
+        destination_wallet_id=transactions["destination_wallet_id"].where(transactions["destination_wallet_id"].notna(), np.nan),
+        country=transactions["country"].where(transactions["country"].notna(), np.nan),
+    )
+    assert loaded["destination_wallet_id"].astype(object).fillna("<NA>").tolist() == (
+        reference["destination_wallet_id"].fillna("<NA>").tolist()
+    )
+    pd.testing.assert_frame_equal(
+        compute_historical_features_vectorized(loaded, lookback=None),
+        compute_historical_features_vectorized(reference, lookback=None),
+    )
+
+    tail = load_columnar_dataset(path, tail_rows=40)
+    assert tail["transaction_id"].tolist() == transactions["transaction_id"].iloc[-40:].tolist()
+    period = load_columnar_dataset(path, start="2026-01-10", end="2026-01-20 12:00", columns=["amount"])
+    mask = (transactions["created_at"] >= "2026-01-10") & (transactions["created_at"] < "2026-01-20 12:00")
+    assert list(period.columns) == ["created_at", "amount"]
+    assert period["created_at"].tolist() == transactions.loc[mask, "created_at"].tolist()
+
+    train, val, test = prepare_training_data(loaded, train_end="2026-01-25", val_end="2026-02-01")
+    assert train["created_at"].max() < pd.Timestamp("2026-01-25", tz="UTC") <= val["created_at"].min()
+    assert val["created_at"].max() < pd.Timestamp("2026-02-01", tz="UTC") <= test["created_at"].min()
+    assert len(train) + len(val) + len(test) == len(transactions)
+
+
+def test_paysim_conversion_streams_with_aligned_timestamps(tmp_path):
+    """Conversion PaySim par blocs : timestamps (step, rang) alignés sur les lignes, indépendants des blocs."""
+    import numpy as np
+    import pandas as pd
+
+    from src.data.columnar import load_columnar_dataset
+    from src.data.preparation import PAYSIM_BASE_TIMESTAMP, convert_paysim_to_columnar, map_paysim_to_payon
+
+    rng = np.random.default_rng(3)
+    n = 60
+    raw = pd.DataFrame(
+        {
+            "step": rng.integers(1, 30, n),  # volontairement non trié
+            "type": rng.choice(["PAYMENT", "TRANSFER", "CASH_OUT", "DEBIT", "CASH_IN"], n),
+            "amount": rng.exponential(1000, n).round(2),
+            "nameOrig": [f"C{i % 9}" for i in range(n)],
+            "oldbalanceOrg": 0.0,
+            "nameDest": [f"M{i % 13}" for i in range(n)],
+            "isFraud": (np.arange(n) % 11 == 0).astype(int),
+        }
+    )
+    raw_path = tmp_path / "paysim.csv"
+    raw.to_csv(raw_path, index=False)
+
+    mapped = map_paysim_to_payon(raw_path, chunk_size=1000)
+    dataset = tmp_path / "paysim_mapped.parquet"
+    csv_path = tmp_path / "paysim_mapped.csv"
+    assert convert_paysim_to_columnar(raw_path, dataset, csv_path=csv_path, chunk_size=7) == n
+
+    # Ordre du fichier conservé dans le CSV : chaque ligne garde ses propres step et rang
+    streamed = pd.read_csv(csv_path)
+    rank = raw.groupby("step").cumcount()
+    expected = PAYSIM_BASE_TIMESTAMP + pd.to_timedelta(raw["step"], unit="h") + pd.to_timedelta(rank, unit="s")
+    assert pd.to_datetime(streamed["created_at"], utc=True).tolist() == expected.tolist()
+    assert streamed["transaction_id"].tolist() == [f"paysim_{i}" for i in range(n)]
+    assert streamed["source_wallet_id"].tolist() == raw["nameOrig"].tolist()
+    assert (streamed["direction"] == "outgoing").tolist() == raw["type"].isin(["CASH_OUT", "DEBIT", "TRANSFER"]).tolist()
+
+    # Même résultat par blocs (Parquet) et en un seul bloc (trié par created_at)
+    loaded = load_columnar_dataset(dataset)
+    assert loaded["transaction_id"].tolist() == mapped["transaction_id"].tolist()
+    assert loaded["created_at"].tolist() == mapped["created_at"].tolist()
+    assert loaded["is_fraud"].tolist() == mapped["is_fraud"].tolist()
+
+
+def test_negative_downsampling_is_stratified_and_weighted():
+    """Toutes les fraudes conservées ; par strate jour × wallet, les poids restaurent l'effectif des légitimes."""
+    import numpy as np
+    import pandas as pd
+
+    import pytest
+
+    from src.data.sampling import downsample_negatives, prior_correction
+
+    transactions = _synthetic_transactions(n=5000, seed=3)
+    labels = (np.arange(len(transactions)) % 50 == 0).astype(int)
+
+    rows, weights = downsample_negatives(transactions, labels, rate=0.2, seed=0)
+
+    assert np.all(np.diff(rows) > 0)
+    assert set(np.flatnonzero(labels)) <= set(rows)
+    assert np.all(weights[labels[rows] == 1] == 1.0)
+    kept = transactions.iloc[rows].assign(weight=weights, label=labels[rows])
+    strata = [transactions["created_at"].dt.floor("D"), transactions["source_wallet_id"]]
+    expected = transactions[labels == 0].groupby([s[labels == 0] for s in strata]).size()
+    kept_negatives = kept[kept["label"] == 0]
+    restored = kept_negatives.groupby([s.loc[kept_negatives.index] for s in strata])["weight"].sum()
+    pd.testing.assert_series_equal(restored.reindex(expected.index).fillna(0.0), expected.astype(float), check_names=False)
+    assert abs(len(kept_negatives) / (labels == 0).sum() - 0.2) < 0.02
+    # Transactions et labels de lignes différentes (ex: échantillon) : erreur explicite
+    with pytest.raises(ValueError):
+        downsample_negatives(transactions, labels[:1000], rate=0.2)
+
+    # Correction de prior : odds × rate ; identité à rate = 1
+    np.testing.assert_allclose(prior_correction(np.array([0.5]), 0.1), [0.1 / 1.1])
+    np.testing.assert_allclose(prior_correction(np.array([0.2, 0.7]), 1.0), [0.2, 0.7])
+
+
+def test_synthetic_generator_is_deterministic_and_writes_all_outputs(tmp_path):
+    """Générateur synthétique : flux reproductible, fraudes injectées, sorties brutes / payloads / SQL."""
+    import json
+
+    import pandas as pd
+
+    from src.data.columnar import load_columnar_dataset
+    from src.data.synthetic import (
+        SyntheticTransactionGenerator,
+        build_score_payloads,
+        write_payloads,
+        write_raw,
+        write_sql_seed,
+    )
+
+    config = {"n_transactions": 20_000, "days": 5, "seed": 7, "fraud_rate": 0.02}
+    generator = SyntheticTransactionGenerator(config)
+    df = generator.generate()
+    pd.testing.assert_frame_equal(df, SyntheticTransactionGenerator(config).generate())
+    assert len(df) == 20_000 and df["transaction_id"].is_unique
+    assert df["created_at"].is_monotonic_increasing
+    assert 0.01 < df["is_fraud"].mean() < 0.03
+    assert set(df.loc[df["is_fraud"] == 1, "fraud_pattern"]) == {"burst", "structuring", "circular", "account_takeover"}
+    # Activité en loi de puissance : les 10% de wallets les plus actifs font bien plus de 10% du flux
+    activity = df["source_wallet_id"].value_counts()
+    assert activity.head(len(activity) // 10).sum() > 0.3 * len(df)
+
+    rows = write_raw(generator.iter_blocks(), tmp_path / "paysim_mapped.parquet")
+    loaded = load_columnar_dataset(tmp_path / "paysim_mapped.parquet")
+    assert rows == len(loaded) == len(df) and int(loaded["is_fraud"].sum()) == int(df["is_fraud"].sum())
+
+    payloads = build_score_payloads(df, generator.wallets(), n_payloads=50, seed=1)
+    write_payloads(payloads, tmp_path / "score_payloads.jsonl")
+    request = json.loads((tmp_path / "score_payloads.jsonl").read_text().splitlines()[0])
+    assert set(request) == {"transaction", "context"}
+    assert {"transactional", "historical"} <= set(request["transaction"]["features"])
+    assert "src_tx_count_out_30d" in request["transaction"]["features"]["historical"]
+
+    sql = write_sql_seed(generator, tmp_path / "seed.sql").read_text()
+    assert sql.count("COPY transactions") == generator.n_blocks and sql.rstrip().endswith("COMMIT;")
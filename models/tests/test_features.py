@@ -26,3 +26,328 @@ def test_feature_pipeline():
     """Test le pipeline complet de features."""
     # TODO: Implémenter
     pass
+
+
+def _synthetic_transactions(n=250, seed=0):
+    """Transactions synthétiques avec cas limites (égalités de timestamps, None/NaN/"")."""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    seconds = np.sort(rng.integers(0, 40 * 86400, n))
+    seconds[5:15] = seconds[5]
+    return pd.DataFrame(
+        {
+            "transaction_id": [f"tx_{i}" for i in range(n)],
+            "created_at": pd.Timestamp("2026-01-01", tz="UTC") + pd.to_timedelta(seconds, unit="s"),
+            "source_wallet_id": rng.choice([f"wallet_{i}" for i in range(6)], n),
+            "destination_wallet_id": rng.choice(["d1", "d2", "d3", "d4", None, ""], n),
+            "direction": rng.choice(["outgoing", "incoming"], n, p=[0.8, 0.2]),
+            "transaction_type": rng.choice(["P2P", "MERCHANT", "CASHOUT"], n),
+            "currency": "PYC",
+            "amount": np.where(rng.random(n) < 0.05, np.nan, rng.exponential(100, n)),
+            "country": rng.choice(["FR", "BE", "KP", None, ""], n),
+            "status": rng.choice(["SUCCESS", "FAILED", "CANCELED"], n, p=[0.8, 0.1, 0.1]),
+        }
+    )
+
+
+def test_vectorized_engine_matches_legacy():
+    """Le moteur vectorisé produit les mêmes features que compute_historical_aggregates()."""
+    import numpy as np
+
+    from src.features.training import compute_features_for_dataset
+
+    transactions = _synthetic_transactions()
+    legacy = compute_features_for_dataset(transactions, verbose=False, n_jobs=1, engine="legacy")
+    vectorized = compute_features_for_dataset(transactions, verbose=False, engine="vectorized")
+
+    assert list(vectorized.columns) == list(legacy.columns)
+    assert vectorized["src_tx_count_out_7d"].sum() > 0
+    for column in legacy.columns:
+        np.testing.assert_allclose(
+            vectorized[column].astype(float), legacy[column].astype(float), rtol=1e-9, atol=1e-9, err_msg=column
+        )
+
+
+def test_features_for_splits_keep_history_across_splits():
+    """La validation voit l'historique du train (une seule passe sur la timeline)."""
+    from src.features.training import compute_features_for_dataset, compute_features_for_splits
+
+    transactions = _synthetic_transactions(seed=1)
+    train, val = transactions.iloc[:180], transactions.iloc[180:].reset_index(drop=True)
+
+    per_split = compute_features_for_splits({"train": train, "val": val}, verbose=False)
+    full = compute_features_for_dataset(transactions, verbose=False, lookback=None)
+    isolated_val = compute_features_for_dataset(val, verbose=False, lookback=None)
+
+    assert len(per_split["val"]) == len(val)
+    assert per_split["val"].equals(full.iloc[180:].reset_index(drop=True))
+    assert (per_split["val"]["src_tx_count_out_30d"] > isolated_val["src_tx_count_out_30d"]).any()
+
+
+def test_streaming_engine_matches_aggregator():
+    """Le moteur incrémental émet, avant application, les features de compute_historical_aggregates()."""
+    import numpy as np
+    import pandas as pd
+
+    from src.features.aggregator import compute_historical_aggregates
+    from src.features.streaming import StreamingFeatureEngine, replay_historical_features
+    from src.features.vectorized import compute_historical_features_vectorized
+
+    transactions = _synthetic_transactions(seed=2)
+    engine = StreamingFeatureEngine(lookback="7d")
+    for position, transaction in enumerate(transactions.to_dict("records")):
+        streamed = engine.process(transaction)
+        history = transactions.iloc[:position]
+        history = history[
+            (history["source_wallet_id"] == transaction["source_wallet_id"])
+            & (history["created_at"] >= transaction["created_at"] - pd.Timedelta("7d"))
+            & (history["created_at"] < transaction["created_at"])
+        ]
+        expected = compute_historical_aggregates(transaction, history)
+        assert streamed.keys() == expected.keys()
+        for name, value in expected.items():
+            if value is None:
+                assert streamed[name] is None, name
+            else:
+                assert streamed[name] == pytest.approx(value, rel=1e-9, abs=1e-9), name
+
+    # Replay complet (historique illimité) = moteur vectorisé
+    replayed = replay_historical_features(transactions, lookback=None)
+    vectorized = compute_historical_features_vectorized(transactions, lookback=None)
+    for column in vectorized.columns:
+        np.testing.assert_allclose(replayed[column], vectorized[column], rtol=1e-9, atol=1e-9, err_msg=column)
+
+
+def test_sketch_backend_tracks_exact_destination_features():
+    """Backend sketch : distincts approchés (HyperLogLog glissant), top-k exact sous sa capacité."""
+    import numpy as np
+
+    from src.features.sketches import SlidingHyperLogLog
+    from src.features.streaming import StreamingFeatureEngine, replay_historical_features
+
+    sketch = SlidingHyperLogLog(precision=10)
+    for i in range(20_000):
+        sketch.add(f"dest_{i}", i)
+    assert sketch.count(20_000) == pytest.approx(20_000, rel=0.1)
+    assert sketch.count(20_000, window=2_000) == pytest.approx(2_000, rel=0.1)
+    assert len(sketch) <= sketch.m * (65 - sketch.precision)
+
+    transactions = _synthetic_transactions(seed=3)
+    exact = replay_historical_features(transactions, lookback=None)
+    engine = StreamingFeatureEngine(destination_backend="sketch", sketch_precision=8, sketch_capacity=8)
+    sketched = replay_historical_features(transactions, engine=engine)
+
+    for column in ["src_destination_concentration_7d", "src_destination_entropy_7d"]:
+        np.testing.assert_allclose(sketched[column], exact[column], rtol=1e-9, atol=1e-9, err_msg=column)
+    error = (sketched["src_unique_destinations_30d"] - exact["src_unique_destinations_30d"]).abs()
+    assert error.max() <= 1
+    assert list(sketched.columns) == list(exact.columns)
+
+
+def test_sketch_backend_evicts_stale_destination_pairs():
+    """Wallet hub : paires hors horizon évincées (état borné), days_since exact dans l'horizon."""
+    import numpy as np
+    import pandas as pd
+
+    from src.features.streaming import StreamingFeatureEngine, replay_historical_features
+
+    # Un wallet paie un nouveau destinataire toutes les heures pendant 120 jours, et d1 tous les 40 jours
+    hours = 120 * 24
+    destinations = [f"dest_{i}" for i in range(hours)]
+    for i in range(0, hours, 40 * 24):
+        destinations[i] = "d1"
+    transactions = pd.DataFrame(
+        {
+            "transaction_id": [f"tx_{i}" for i in range(hours)],
+            "created_at": pd.Timestamp("2026-01-01", tz="UTC") + pd.to_timedelta(np.arange(hours), unit="h"),
+            "source_wallet_id": "hub",
+            "destination_wallet_id": destinations,
+            "direction": "outgoing",
+            "amount": 10.0,
+            "country": "FR",
+            "status": "SUCCESS",
+        }
+    )
+    exact_engine = StreamingFeatureEngine()
+    exact = replay_historical_features(transactions, engine=exact_engine)
+    engine = StreamingFeatureEngine(destination_backend="sketch", sketch_precision=8, sketch_capacity=8)
+    sketched = replay_historical_features(transactions, engine=engine)
+
+    # Sketch : au plus 2× les paires de l'horizon (30d) ; exact : une paire par destinataire de l'historique
+    assert len(engine._wallets["hub"].destination_times) <= 2 * 30 * 24
+    assert exact_engine.destination_state_sizes()["hub"] > hours
+    assert engine.destination_state_sizes()["hub"] < exact_engine.destination_state_sizes()["hub"] / 2
+
+    for column in ["src_to_dst_tx_count_30d", "is_new_destination_30d"]:
+        np.testing.assert_array_equal(sketched[column], exact[column], err_msg=column)
+    # d1 revient après 40 jours : hors horizon en sketch (-1), exact sinon
+    returns = transactions.index[(transactions["destination_wallet_id"] == "d1") & (transactions.index > 0)]
+    assert (exact.loc[returns, "days_since_last_src_to_dst"] == 40.0).all()
+    assert (sketched.loc[returns, "days_since_last_src_to_dst"] == -1.0).all()
+    others = transactions.index.difference(returns)
+    np.testing.assert_array_equal(
+        sketched.loc[others, "days_since_last_src_to_dst"], exact.loc[others, "days_since_last_src_to_dst"]
+    )
+
+
+def test_decayed_features_match_across_engines():
+    """Features décroissantes : même valeur pour l'agrégateur, le moteur vectorisé et le moteur incrémental."""
+    import json
+    import re
+    from pathlib import Path
+
+    import numpy as np
+
+    from src.features.aggregator import compute_historical_aggregates
+    from src.features.streaming import replay_historical_features
+    from src.features.vectorized import compute_historical_features_vectorized
+
+    half_lives = ["1h", "2d"]
+    transactions = _synthetic_transactions(seed=4)
+    vectorized = compute_historical_features_vectorized(transactions, lookback=None, half_lives=half_lives)
+    replayed = replay_historical_features(transactions, lookback=None, half_lives=half_lives)
+
+    decayed = [c for c in vectorized.columns if c.startswith("src_decayed_")]
+    assert len(decayed) == 6
+    assert vectorized["src_decayed_new_destinations_2d"].max() > 0
+    schema_path = Path(__file__).parent.parent / "schemas" / "enriched_transaction.schema.json"
+    historical = json.loads(schema_path.read_text())["properties"]["features"]["properties"]["historical"]
+    for column in decayed:
+        assert any(re.match(pattern, column) for pattern in historical["patternProperties"]), column
+    for column in decayed:
+        np.testing.assert_allclose(replayed[column], vectorized[column], rtol=1e-9, atol=1e-12, err_msg=column)
+
+    for position in range(0, len(transactions), 25):
+        transaction = transactions.iloc[position].to_dict()
+        expected = compute_historical_aggregates(transaction, transactions.iloc[:position], half_lives=half_lives)
+        for column in decayed:
+            assert vectorized.loc[position, column] == pytest.approx(expected[column], rel=1e-9, abs=1e-12), column
+
+
+def test_parallel_engine_matches_vectorized():
+    """Calcul par shards de wallets (mémoire partagée, pool unique) = moteur vectorisé."""
+    import pandas as pd
+
+    from src.features.parallel import compute_historical_features_parallel
+    from src.features.vectorized import compute_historical_features_vectorized
+
+    transactions = _synthetic_transactions(seed=5)
+    expected = compute_historical_features_vectorized(transactions, lookback=None, half_lives=["1h"])
+    sharded = compute_historical_features_parallel(
+        transactions, lookback=None, half_lives=["1h"], n_jobs=2, n_shards=3
+    )
+    pd.testing.assert_frame_equal(sharded, expected, check_exact=False, rtol=1e-9)
+
+
+def test_checkpointed_features_resume_after_interruption(tmp_path, monkeypatch):
+    """Calcul interrompu : reprise aux shards manquants, résultat identique à un calcul sans arrêt."""
+    import pandas as pd
+
+    from src.features import parallel
+    from src.features.vectorized import compute_historical_features_vectorized
+
+    transactions = _synthetic_transactions(seed=9)
+    expected = compute_historical_features_vectorized(transactions, lookback="7d", half_lives=["1h"])
+    compute_shard = parallel._historical_from_columns
+    state = {"calls": 0, "preempt_at": 3}
+
+    def preempted(encoded, **params):
+        if state["calls"] == state["preempt_at"]:
+            raise KeyboardInterrupt("préemption")
+        state["calls"] += 1
+        return compute_shard(encoded, **params)
+
+    monkeypatch.setattr(parallel, "_historical_from_columns", preempted)
+    kwargs = {"lookback": "7d", "half_lives": ["1h"], "n_jobs": 1, "n_shards": 5, "checkpoint_dir": tmp_path}
+    with pytest.raises(KeyboardInterrupt):
+        parallel.compute_historical_features_parallel(transactions, **kwargs)
+    (work_dir,) = tmp_path.iterdir()
+    assert len(list(work_dir.glob("shard-*.npz"))) == 3
+
+    state.update(calls=0, preempt_at=None)
+    resumed = parallel.compute_historical_features_parallel(transactions, **kwargs)
+    assert state["calls"] == 2
+    pd.testing.assert_frame_equal(resumed, expected, check_exact=False, rtol=1e-9)
+    assert not work_dir.exists()
+
+
+def test_feature_cache_roundtrip_and_invalidation(tmp_path):
+    """Cache adressé par contenu : relecture mappée, clé sensible aux données et paramètres."""
+    import numpy as np
+    import pandas as pd
+
+    from src.features.cache import FeatureCache
+
+    data_file = tmp_path / "data.csv"
+    data_file.write_text("a,b\n1,2\n")
+    cache = FeatureCache(tmp_path / "cache")
+    features = {
+        "train": pd.DataFrame({"amount": [1.5, 2.0], "src_tx_count_out_1h": np.array([0, 3], dtype=np.int64)}),
+        "val": pd.DataFrame({"amount": [4.0], "src_tx_count_out_1h": np.array([1], dtype=np.int64)}),
+    }
+
+    key = cache.key([data_file], {"windows": ["1h"]})
+    assert cache.load(key) is None
+    cache.save(key, features)
+    loaded = cache.load(key)
+    for name, df in features.items():
+        pd.testing.assert_frame_equal(loaded[name], df)
+    # Colonnes relues sans copie : la chaîne de vues remonte au fichier mappé
+    base, chain = loaded["train"]["amount"].to_numpy(), []
+    while base is not None:
+        chain.append(type(base).__name__)
+        base = getattr(base, "base", None)
+    assert "mmap" in chain
+
+    assert cache.key([data_file], {"windows": ["24h"]}) != key
+    data_file.write_text("a,b\n1,3\n")
+    assert cache.key([data_file], {"windows": ["1h"]}) != key
+    assert cache.invalidate() == 1
+    assert cache.load(key) is None
+
+
+def test_pruning_drops_cheapest_unimportant_aggregates():
+    """Élagage : agrégat entier peu important supprimé, features gratuites et importantes conservées."""
+    import pandas as pd
+
+    from src.features.pruning import feature_requirement, importance_table, plan_pruning
+
+    assert feature_requirement("src_tx_amount_max_out_7d") == ("src_outgoing", "7d")
+    assert feature_requirement("is_new_destination_24h") == ("src_dst_pair", "24h")
+    assert feature_requirement("country_mismatch") == ("src_countries", "30d")
+    assert feature_requirement("days_since_last_src_to_dst") == ("src_dst_pair", None)
+    assert feature_requirement("direction_outgoing") == ("transaction", None)
+
+    features = [
+        "amount",
+        "country_kp",
+        "src_tx_count_out_30d",
+        "src_tx_amount_sum_out_30d",
+        "src_tx_count_out_5m",
+        "src_tx_amount_sum_out_5m",
+        "src_failed_count_24h",
+    ]
+    gain_split = pd.DataFrame(
+        {
+            "gain": [0.5, 0.0, 0.3, 0.19, 0.004, 0.006, 0.0],
+            "split": [0.5, 0.0, 0.3, 0.19, 0.004, 0.006, 0.0],
+        },
+        index=features,
+    )
+    permutation = pd.Series([0.6, 0.0, 0.2, 0.19, 0.005, 0.005, 0.0], index=features)
+    table = importance_table(features, gain_split, permutation)
+    assert abs(table["importance"].sum() - 1.0) < 1e-9
+    assert table.loc["src_tx_count_out_30d", "cost"] > table.loc["src_tx_count_out_5m", "cost"]
+
+    plan = plan_pruning(table, {"max_importance_loss": 0.02, "min_feature_importance": 0.001, "keep": []})
+    assert plan.dropped_requirements == ["src_outgoing[5m]", "src_status[24h]"]
+    assert set(plan.dropped_features) == {
+        "src_tx_count_out_5m",
+        "src_tx_amount_sum_out_5m",
+        "src_failed_count_24h",
+        "country_kp",
+    }
+    assert plan.kept_features == ["amount", "src_tx_count_out_30d", "src_tx_amount_sum_out_30d"]
+    assert plan.importance_lost <= 0.02 and plan.cost_after < plan.cost_before
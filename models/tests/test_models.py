@@ -31,3 +31,185 @@ def test_unsupervised_model_predict():
     """Test la prédiction du modèle non supervisé."""
     # TODO: Implémenter
     pass
+
+
+def test_supervised_dataset_cache_reuses_binary(tmp_path):
+    """Les Datasets LightGBM sont relus depuis le cache binaire, prédictions identiques."""
+    import numpy as np
+    import pandas as pd
+
+    from src.models.supervised import train_supervised_model
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(2000, 5)), columns=[f"f{i}" for i in range(5)])
+    y = pd.Series((X["f0"] + rng.normal(scale=0.5, size=2000) > 1.5).astype(int))
+    config = {"n_estimators": 20, "random_state": 0}
+
+    models = [
+        train_supervised_model(X[:1500], y[:1500], X[1500:], y[1500:], config=config, dataset_cache_dir=tmp_path)
+        for _ in range(2)
+    ]
+
+    assert models[0].dataset_stats["train_dataset_cache_hit"] == 0.0
+    assert models[1].dataset_stats["train_dataset_cache_hit"] == 1.0
+    assert models[1].dataset_stats["val_dataset_cache_hit"] == 1.0
+    np.testing.assert_allclose(models[0].predict(X[1500:]), models[1].predict(X[1500:]))
+
+
+def test_hyperparameter_search_prunes_by_pr_auc():
+    """Successive halving : 1/eta des candidats par palier, meilleur candidat du dernier palier."""
+    import numpy as np
+    import pandas as pd
+
+    from src.models.supervised.search import generate_candidates, run_search
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(3000, 4)), columns=[f"f{i}" for i in range(4)])
+    y = pd.Series((X["f0"] + rng.normal(scale=0.5, size=3000) > 1.5).astype(int))
+    search_config = {
+        "strategy": "halving",
+        "param_grid": {"num_leaves": [7, 15, 31], "learning_rate": [0.05, 0.1, 0.2]},
+        "n_candidates": 6,
+        "min_rounds": 10,
+        "max_rounds": 40,
+        "eta": 3,
+        "early_stopping_rounds": 10,
+    }
+
+    best_config, trials = run_search(X[:2000], y[:2000], X[2000:], y[2000:], search_config, n_workers=2)
+
+    assert [sum(t.rung == r for t in trials) for r in range(3)] == [6, 2, 1]
+    final = trials[-1]
+    assert final.num_boost_round == 40
+    assert best_config["num_leaves"] == final.params["num_leaves"]
+    assert final.candidate in {t.candidate for t in trials if t.rung == 1}
+    with pytest.raises(ValueError):
+        generate_candidates({"max_bin": [63, 255]})
+
+
+def test_search_uses_sampling_correction_objective(tmp_path):
+    """Les essais optimisent l'objectif de l'entraînement final (poids ou correction "prior")."""
+    import lightgbm as lgb
+    import numpy as np
+    import pandas as pd
+
+    from src.models.supervised import train_supervised_model
+    from src.models.supervised.search import run_search
+    from src.models.supervised.train import compute_scale_pos_weight
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(3000, 4)), columns=[f"f{i}" for i in range(4)])
+    y = pd.Series((X["f0"] + rng.normal(scale=0.5, size=3000) > 1.5).astype(int))
+    weights = np.where(y[:2000] == 1, 1.0, 4.0)  # légitimes conservés à 25%
+    search_config = {"strategy": "grid", "param_grid": {"num_leaves": [7, 15]}, "max_rounds": 20}
+
+    _, trials = run_search(
+        X[:2000], y[:2000], X[2000:], y[2000:], search_config, n_workers=1,
+        dataset_cache_dir=tmp_path, sample_weight=weights,
+    )
+    expected = compute_scale_pos_weight(y[:2000], weights)
+    assert expected > compute_scale_pos_weight(y[:2000])
+    assert all(t.params["scale_pos_weight"] == expected for t in trials)
+
+    # Le Dataset d'entraînement des essais porte les poids ; l'entraînement final le relit
+    model = train_supervised_model(
+        X[:2000], y[:2000], X[2000:], y[2000:], config={"n_estimators": 20},
+        dataset_cache_dir=tmp_path, sample_weight=weights,
+    )
+    assert model.dataset_stats["train_dataset_cache_hit"] == 1.0
+    train_bins = [lgb.Dataset(str(path)).construct() for path in tmp_path.glob("*.bin")]
+    assert any(d.get_weight() is not None and np.allclose(d.get_weight(), weights) for d in train_bins)
+
+    _, trials = run_search(
+        X[:2000], y[:2000], X[2000:], y[2000:], search_config, n_workers=1, negative_sampling_rate=0.25
+    )
+    assert all(t.params["scale_pos_weight"] == 1.0 for t in trials)
+
+
+def test_refresh_continues_booster_and_recalibrates(tmp_path):
+    """Le rafraîchissement ajoute des arbres au booster existant ; la calibration suit la fenêtre récente."""
+    import numpy as np
+    import pandas as pd
+
+    from src.models.supervised import SupervisedModel, train_supervised_model
+    from src.models.unsupervised import train_unsupervised_model
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(3000, 4)), columns=[f"f{i}" for i in range(4)])
+    y = pd.Series((X["f0"] + rng.normal(scale=0.5, size=3000) > 1.5).astype(int))
+    base = train_supervised_model(X[:2000], y[:2000], config={"n_estimators": 10, "random_state": 0})
+    base.save(tmp_path / "supervised_model.pkl")
+    model = SupervisedModel()
+    model.load(tmp_path / "supervised_model.pkl")
+
+    # Nouveaux labels : la fraude dépend aussi de f1
+    y_new = pd.Series((X["f0"] + X["f1"] + rng.normal(scale=0.5, size=3000) > 1.5).astype(int))
+    metrics = model.refresh(
+        X[2000:2800], y_new[2000:2800], num_boost_round=30, val_data=X[2800:], val_labels=y_new[2800:]
+    )
+
+    assert metrics["trees_before"] == 10
+    assert 10 < metrics["trees_after"] <= 40
+    assert metrics["val_pr_auc_after"] > metrics["val_pr_auc_before"]
+    assert not np.allclose(model.predict(X[2800:]), base.predict(X[2800:]))
+
+    unsupervised = train_unsupervised_model(X[:2000], config={"random_state": 0})
+    calibration = unsupervised.recalibrate(X[2000:] * 3.0)
+    assert calibration["min"] < calibration["min_before"]
+    assert unsupervised.predict(X[2000:] * 3.0).between(0.0, 1.0).all()
+
+
+def test_distilled_model_reproduces_ensemble_score():
+    """Le modèle distillé suit le score de l'ensemble ; prédiction unitaire identique au batch."""
+    import numpy as np
+    import pandas as pd
+
+    from src.models.distilled import DistilledPredictor, distill_ensemble
+    from src.models.supervised import train_supervised_model
+    from src.models.unsupervised import train_unsupervised_model
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(4000, 4)), columns=[f"f{i}" for i in range(4)])
+    y = pd.Series((X["f0"] + rng.normal(scale=0.5, size=4000) > 1.5).astype(int))
+    supervised = train_supervised_model(X[:3000], y[:3000], config={"n_estimators": 50, "random_state": 0})
+    unsupervised = train_unsupervised_model(X[:3000], config={"random_state": 0})
+    thresholds = {"block_threshold": 0.5, "review_threshold": 0.3}
+
+    model, report = distill_ensemble(X[:3000], supervised, unsupervised, thresholds, val_features=X[3000:])
+
+    assert report["rows"] == 1000
+    assert sum(bucket["count"] for bucket in report["buckets"].values()) == 1000
+    assert report["rank_correlation"] > 0.8
+    assert report["decision_agreement"] > 0.9
+    predictor = DistilledPredictor(model=model)
+    batch = model.predict(X[3000:3010])
+    single = [predictor.predict(row) for row in X[3000:3010].to_dict(orient="records")]
+    np.testing.assert_allclose(single, batch.to_numpy(), rtol=1e-6)
+
+
+def test_refresh_accepts_pickled_lgbm_classifier(tmp_path):
+    """Un LGBMClassifier picklé (artefact antérieur) est rafraîchi via son booster."""
+    import lightgbm as lgb
+    import numpy as np
+    import pandas as pd
+
+    from src.models.supervised import BoosterClassifier, SupervisedModel
+
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(3000, 4)), columns=[f"f{i}" for i in range(4)])
+    y = pd.Series((X["f0"] + rng.normal(scale=0.5, size=3000) > 1.5).astype(int))
+    legacy = SupervisedModel()
+    legacy.model = lgb.LGBMClassifier(n_estimators=10, verbose=-1, random_state=0).fit(X[:2000], y[:2000])
+    legacy.is_trained = True
+    legacy.save(tmp_path / "supervised_model.pkl")
+    model = SupervisedModel()
+    model.load(tmp_path / "supervised_model.pkl")
+    before = model.predict(X[2000:])
+
+    metrics = model.refresh(X[2000:2800], y[2000:2800], num_boost_round=10)
+
+    assert isinstance(model.model, BoosterClassifier)
+    assert list(model.model.feature_name_) == list(X.columns)
+    assert metrics["trees_before"] == 10
+    assert metrics["trees_after"] == 20
+    assert not np.allclose(model.predict(X[2000:]), before)
@@ -0,0 +1,141 @@
+"""
+Tests du monitoring de drift en ligne.
+"""
+
+import json
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src.monitoring.drift import DriftMonitor, build_reference_histograms
+from src.monitoring.log_readers import open_log_reader
+from src.monitoring.summary import LogSummary, QuantileSketch
+
+
+def _reference():
+    rng = np.random.default_rng(0)
+    features = pd.DataFrame({"amount": rng.normal(100, 10, 5000), "is_new_user": rng.integers(0, 2, 5000)})
+    scores = pd.DataFrame({"risk_score": rng.uniform(0, 0.5, 5000)})
+    return {
+        "version": "test",
+        "features": build_reference_histograms(features),
+        "scores": build_reference_histograms(scores),
+    }
+
+
+def test_drift_monitor_detects_shift_in_window():
+    """Une distribution décalée donne un PSI élevé, la référence un PSI faible."""
+    monitor = DriftMonitor(_reference(), slot_seconds=60, retention="2h")
+    rng = np.random.default_rng(1)
+    now = 1_700_000_000.0
+
+    # Trafic "normal" il y a 90 minutes, trafic décalé dans les 15 dernières minutes
+    for amount in rng.normal(100, 10, 2000):
+        monitor.observe({"amount": amount, "is_new_user": 0}, {"risk_score": 0.2}, timestamp=now - 5400)
+    for amount in rng.normal(160, 10, 2000):
+        monitor.observe({"amount": amount, "is_new_user": None}, {"risk_score": 0.2}, timestamp=now - 300)
+
+    recent = monitor.report("15m", now=now)
+    assert recent["requests"] == 2000
+    assert recent["features"]["amount"]["psi"] > 1.0
+    assert recent["features"]["amount"]["ks"] > 0.8
+    assert recent["features"]["is_new_user"]["missing_rate"] == 1.0
+    assert set(recent["scores"]) == {"risk_score"}
+
+    old = monitor.report("2h", now=now - 5400)
+    assert old["requests"] == 2000
+    assert old["features"]["amount"]["psi"] < 0.05
+    assert old["features"]["amount"]["ks"] < 0.05
+
+
+def test_drift_monitor_recycles_expired_slots():
+    """La mémoire est constante : un slot réutilisé après la rétention est remis à zéro."""
+    monitor = DriftMonitor(_reference(), slot_seconds=60, retention="1h")
+    now = 1_700_000_000.0
+    monitor.observe({"amount": 100.0, "is_new_user": 1}, timestamp=now)
+    monitor.observe({"amount": 100.0, "is_new_user": 1}, timestamp=now + 3600)
+
+    assert monitor.report("1h", now=now + 3600)["requests"] == 1
+    assert monitor.report("1h", now=now)["requests"] == 0
+
+
+def test_drift_monitor_skips_uncomputed_scores():
+    """Un score None (BLOCK des règles) n'est pas compté ; ±inf va dans le bucket manquant."""
+    monitor = DriftMonitor(_reference(), slot_seconds=60, retention="1h")
+    rng = np.random.default_rng(3)
+    now = 1_700_000_000.0
+    for amount, risk in zip(rng.normal(100, 10, 1000), rng.uniform(0, 0.5, 1000)):
+        monitor.observe({"amount": amount, "is_new_user": 0}, {"risk_score": risk}, timestamp=now)
+    for _ in range(1000):
+        monitor.observe({"amount": np.inf, "is_new_user": 0}, {"risk_score": None}, timestamp=now)
+
+    report = monitor.report("1h", now=now)
+    assert report["requests"] == 2000
+    assert report["scores"]["risk_score"]["count"] == 1000
+    assert report["scores"]["risk_score"]["missing_rate"] == 0.0
+    assert report["scores"]["risk_score"]["psi"] < 0.05
+    assert report["features"]["amount"]["count"] == 2000
+    assert report["features"]["amount"]["missing_rate"] == 0.5
+
+
+def test_log_summary_skips_uncomputed_scores():
+    """Score à null dans le log (BLOCK des règles) : ni compté ni manquant, PSI inchangé."""
+    rng = np.random.default_rng(4)
+    rows = [{"decision": "APPROVE", "amount": amount, "is_new_user": 0, "risk_score": risk}
+            for amount, risk in zip(rng.normal(100, 10, 1000), rng.uniform(0, 0.5, 1000))]
+    rows += [{"decision": "BLOCK", "amount": 100.0, "is_new_user": 0, "risk_score": None}] * 1000
+
+    report = LogSummary(_reference(), batch_size=64).update_many(rows).report()
+
+    assert report["scores"]["risk_score"]["count"] == 1000
+    assert report["scores"]["risk_score"]["missing_rate"] == 0.0
+    assert report["scores"]["risk_score"]["psi"] < 0.05
+    assert report["scores"]["rule_score"]["missing_rate"] == 1.0
+
+
+def test_quantile_sketch_relative_error():
+    """Les quantiles estimés respectent l'erreur relative du sketch."""
+    values = np.random.default_rng(2).lognormal(4, 1.5, 50_000)
+    values[:100] = 0.0
+    values[100:600] *= -1
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for batch in np.array_split(values, 7):
+        sketch.update(batch)
+
+    assert sketch.count == len(values)
+    for q in (0.01, 0.5, 0.9, 0.99):
+        exact = np.quantile(values, q, method="lower")
+        assert abs(sketch.quantile(q) - exact) <= 0.011 * abs(exact) + 1e-9
+
+
+def test_log_summary_streams_local_logs(tmp_path):
+    """Le rapport est construit en streaming depuis un dossier de logs JSONL."""
+    day_dir = tmp_path / "2026" / "03" / "20"
+    day_dir.mkdir(parents=True)
+    rng = np.random.default_rng(3)
+    with open(day_dir / "a.jsonl", "w") as f:
+        for i, amount in enumerate(rng.normal(160, 10, 500)):
+            row = {
+                "request_time": f"2026-03-20T10:{i % 60:02d}:00+00:00",
+                "decision": "APPROVE" if i % 10 else "REVIEW",
+                "model_version": "v1.0.0",
+                "risk_score": 0.2,
+                "amount": amount,
+                "is_new_user": 0,
+            }
+            f.write(json.dumps(row) + "\n")
+    # Jour hors période : ignoré
+    old_dir = tmp_path / "2026" / "03" / "01"
+    old_dir.mkdir(parents=True)
+    (old_dir / "b.jsonl").write_text(json.dumps({"decision": "BLOCK", "amount": 1.0}) + "\n")
+
+    reader = open_log_reader(str(tmp_path), days_back=2, end_date=date(2026, 3, 20))
+    report = LogSummary(_reference(), batch_size=64).update_many(reader.iter_rows()).report()
+
+    assert report["requests_total"] == 500
+    assert report["decisions"] == {"APPROVE": 450, "REVIEW": 50}
+    assert report["drifted"][0] == "amount"
+    assert 150 < report["features"]["amount"]["quantiles"]["p50"] < 170
+    assert report["scores"]["risk_score"]["count"] == 500
+    assert report["scores"]["rule_score"]["missing_rate"] == 1.0
@@ -0,0 +1,125 @@
+"""
+Tests des utilitaires (exécution en étapes).
+"""
+
+import pytest
+
+
+def test_stages_run_independent_branches_concurrently_and_skip_cached():
+    """Branches indépendantes simultanées, étapes en cache non exécutées, dépendances respectées."""
+    import threading
+    import time
+
+    from src.utils.stages import Stage, run_stages
+
+    started = {}
+    both_running = threading.Barrier(2, timeout=5)
+
+    def branch(name):
+        def run():
+            started[name] = time.time()
+            both_running.wait()  # échoue si les branches ne sont pas simultanées
+            return {f"{name}_data": name}
+
+        return run
+
+    def never_run(**inputs):
+        raise AssertionError("étape en cache exécutée")
+
+    stages = [
+        Stage("paysim", branch("paysim"), outputs=("paysim_data",)),
+        Stage("payon", branch("payon"), outputs=("payon_data",)),
+        Stage(
+            "features",
+            never_run,
+            inputs=("payon_data",),
+            outputs=("payon_features",),
+            cached=lambda payon_data: {"payon_features": f"cached:{payon_data}"},
+        ),
+        Stage(
+            "calibrate",
+            lambda paysim_data, payon_features: {"thresholds": (paysim_data, payon_features)},
+            inputs=("paysim_data", "payon_features"),
+            outputs=("thresholds",),
+            main_thread=True,
+        ),
+    ]
+
+    results, reports = run_stages(stages, max_workers=2, verbose=False)
+
+    assert results["thresholds"] == ("paysim", "cached:payon")
+    status = {report.name: report.status for report in reports}
+    assert status == {"paysim": "ok", "payon": "ok", "features": "cache", "calibrate": "ok"}
+    assert reports[-1].name == "calibrate"
+    assert all(report.peak_rss_mb > 0 for report in reports)
+
+
+def test_stages_reject_invalid_graph():
+    """Entrée sans producteur et cycle détectés avant exécution."""
+    from src.utils.stages import Stage, run_stages
+
+    with pytest.raises(ValueError):
+        run_stages([Stage("a", lambda missing: {}, inputs=("missing",))], verbose=False)
+    with pytest.raises(ValueError):
+        run_stages(
+            [
+                Stage("a", lambda y: {"x": 1}, inputs=("y",), outputs=("x",)),
+                Stage("b", lambda x: {"y": 1}, inputs=("x",), outputs=("y",)),
+            ],
+            verbose=False,
+        )
+
+
+def test_profiler_records_nested_steps_and_sizes():
+    """Étapes imbriquées mesurées (lignes/s, tailles, allocations) ; step() sans effet hors profiler."""
+    import numpy as np
+    import pandas as pd
+
+    from src.utils.profiling import Profiler, annotate, step
+
+    with step("hors_profiler"):
+        annotate(rows=10)
+
+    profiler = Profiler(tracemalloc_top=3)
+    with profiler.activate():
+        with step("features", rows=1000):
+            with step("historical"):
+                df = pd.DataFrame({"x": np.ones(1000)})
+                annotate(rows=len(df), features=df)
+
+    records = {record.name: record for record in profiler.records}
+    assert set(records) == {"features", "features/historical"}
+    assert records["features/historical"].frames_mb["features"] > 0
+    assert records["features/historical"].top_allocations
+    assert records["features"].rows_per_second > 0
+    metrics = profiler.metrics()
+    assert "profile.features.historical.wall_seconds" in metrics
+    assert "profile.features.historical.features_mb" in metrics
+
+
+def test_profiler_rss_includes_child_processes():
+    """La RSS mesurée inclut les processus enfants vivants (workers), pic de l'étape compris."""
+    import subprocess
+    import sys
+    import time
+
+    from src.utils.profiling import Profiler, current_rss_mb, step
+
+    profiler = Profiler(interval=0.02)
+    with profiler.activate():
+        with step("workers"):
+            child = subprocess.Popen(
+                [sys.executable, "-c", "import time; b = b'x' * (200 << 20); print(1, flush=True); time.sleep(30)"],
+                stdout=subprocess.PIPE,
+            )
+            try:
+                child.stdout.readline()
+                time.sleep(0.1)  # laisse passer l'échantillonneur
+                own, total = current_rss_mb(include_children=False), current_rss_mb()
+            finally:
+                child.kill()
+                child.wait()
+
+    assert total - own > 150
+    assert profiler.records[0].peak_rss_mb > own + 150
+    assert current_rss_mb() < own + 150